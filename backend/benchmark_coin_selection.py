@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark coin selection on synthetic UTXO sets.
+
+Compares each algorithm in blocks/coin_selection.py (and the combined
+select_coins) against the legacy smallest-first accumulation on wallets of
+10 to 10,000 coins: wall time, input count, fee paid and waste.
+
+Usage:
+  python backend/benchmark_coin_selection.py [--json]
+"""
+import json
+import os
+import random
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR)
+
+from blocks import coin_selection  # noqa: E402  (pure Python, no Django setup needed)
+
+SIZES = [10, 100, 1000, 10000]
+FEE_RATE = 5.0
+BASE_VBYTES = 10 + coin_selection.P2WPKH_OUTPUT_VBYTES
+TRIALS = 5
+
+
+def synthetic_utxos(count, rng):
+    """Log-normal values around ~50k sats, like a faucet/reward wallet with some larger deposits."""
+    return [
+        {'txid': f'{i:064x}', 'vout': 0, 'value': max(coin_selection.DEFAULT_DUST_LIMIT, int(rng.lognormvariate(10.8, 1.4)))}
+        for i in range(count)
+    ]
+
+
+def legacy_smallest_first(utxos, amount):
+    selected = []
+    total = 0
+    for utxo in sorted(utxos, key=lambda u: u['value']):
+        selected.append(utxo)
+        total += utxo['value']
+        if total >= amount + FEE_RATE * (BASE_VBYTES + 31 + 68 * len(selected)):
+            return selected
+    return None
+
+
+def run():
+    rng = random.Random(42)
+    results = []
+    for size in SIZES:
+        for trial in range(TRIALS):
+            utxos = synthetic_utxos(size, rng)
+            total = sum(u['value'] for u in utxos)
+            amount = int(total * rng.uniform(0.05, 0.3))
+            params = coin_selection._selection_params(
+                amount, FEE_RATE, BASE_VBYTES, coin_selection.P2WPKH_INPUT_VBYTES,
+                coin_selection.P2WPKH_OUTPUT_VBYTES, coin_selection.P2WPKH_INPUT_VBYTES,
+                None, coin_selection.DEFAULT_DUST_LIMIT,
+            )
+            pool = coin_selection._effective_pool(utxos, params)
+
+            candidates = {'legacy_smallest_first': lambda: legacy_smallest_first(utxos, amount)}
+            for name, algorithm in coin_selection.SELECTION_ALGORITHMS.items():
+                candidates[name] = lambda algorithm=algorithm: algorithm(pool, params)
+
+            for name, func in candidates.items():
+                started = time.perf_counter()
+                selected = func()
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                result = coin_selection._finalize(name, selected, params)
+                results.append({
+                    'size': size,
+                    'trial': trial,
+                    'algorithm': name,
+                    'ms': round(elapsed_ms, 3),
+                    'found': result is not None,
+                    'inputs': len(result['selected']) if result else None,
+                    'fee_sats': result['fee_sats'] if result else None,
+                    'waste': round(result['waste'], 1) if result else None,
+                })
+
+            started = time.perf_counter()
+            best = coin_selection.select_coins(utxos, amount, FEE_RATE, base_vbytes=BASE_VBYTES)
+            results.append({
+                'size': size,
+                'trial': trial,
+                'algorithm': f"select_coins({best['algorithm'] if best else '-'})",
+                'ms': round((time.perf_counter() - started) * 1000, 3),
+                'found': best is not None,
+                'inputs': len(best['selected']) if best else None,
+                'fee_sats': best['fee_sats'] if best else None,
+                'waste': round(best['waste'], 1) if best else None,
+            })
+    return results
+
+
+def print_table(results):
+    print(f"{'size':>6}  {'algorithm':<32} {'ms':>9} {'inputs':>7} {'fee':>9} {'waste':>10}")
+    for row in results:
+        if row['trial'] != 0:
+            continue
+        print(
+            f"{row['size']:>6}  {row['algorithm']:<32} {row['ms']:>9.2f} "
+            f"{str(row['inputs']):>7} {str(row['fee_sats']):>9} {str(row['waste']):>10}"
+        )
+
+
+if __name__ == '__main__':
+    rows = run()
+    if '--json' in sys.argv:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_table(rows)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark k-shortest-path search and gate routing performance regressions.
+
+Times blocks/routing.py on the standard graph set from blocks/routing_bench.py
+(random graphs of 50 to 500 services and initial_data/routing.json with the
+intermediate services cloned), checks results against a brute-force oracle
+on small graphs, and optionally compares with a saved baseline report.
+
+With --legacy, synthetic graphs are also run through the best-first
+enumeration that find_optimal_paths used before Yen's search; it is stopped
+after LEGACY_MAX_POPS heap pops.
+
+Usage:
+  python backend/benchmark_routing.py [--json] [--quick] [--legacy]
+  python backend/benchmark_routing.py --write-baseline routing_baseline.json
+  python backend/benchmark_routing.py --baseline routing_baseline.json   # exit 1 on regression
+"""
+import argparse
+import heapq
+import json
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR)
+
+from blocks import routing, routing_bench  # noqa: E402  (pure Python, no Django setup needed)
+
+LEGACY_MAX_POPS = 200_000
+
+
+def legacy_best_first(num_nodes, edge_tail, edge_head, edge_cost, source, target, k):
+    """The pre-Yen search: push whole paths, rebuild the visited-node set per neighbour."""
+    out_edges, _ = routing.build_adjacency(num_nodes, edge_tail, edge_head)
+    pq = [(0.0, 0, (), source)]
+    tie = 1
+    seen = set()
+    found = []
+    pops = 0
+    while pq and len(found) < k:
+        pops += 1
+        if pops > LEGACY_MAX_POPS:
+            return None
+        cost, _, path, node = heapq.heappop(pq)
+        if path in seen:
+            continue
+        seen.add(path)
+        if node == target:
+            found.append((cost, path))
+            continue
+        for edge in out_edges[node]:
+            nodes_in_path = {source} | {edge_head[e] for e in path}
+            if edge_head[edge] in nodes_in_path:
+                continue
+            heapq.heappush(pq, (cost + edge_cost[edge], tie, path + (edge,), edge_head[edge]))
+            tie += 1
+    return found
+
+
+def legacy_rows(report, quick=False):
+    """Time the legacy search on the synthetic graphs and check it agrees with Yen's."""
+    graphs = routing_bench.benchmark_graphs(quick)
+    rows = []
+    for row in report['results']:
+        if not row['graph'].startswith('synthetic-'):
+            continue
+        num_nodes, edge_tail, edge_head, edge_cost, source, target = graphs[row['graph']]
+        paths = routing.k_shortest_paths(
+            source, target, row['k'], num_nodes=num_nodes, edge_tail=edge_tail, edge_head=edge_head,
+            edge_cost=edge_cost,
+        )
+        started = time.perf_counter()
+        legacy = legacy_best_first(num_nodes, edge_tail, edge_head, edge_cost, source, target, row['k'])
+        legacy_ms = (time.perf_counter() - started) * 1000
+        rows.append({
+            'graph': row['graph'],
+            'k': row['k'],
+            'legacy_ms': round(legacy_ms, 2) if legacy is not None else None,
+            'legacy_gave_up': legacy is None,
+            'same_costs': (
+                [round(c, 6) for c, _ in legacy] == [round(c, 6) for c, _ in paths]
+                if legacy is not None else None
+            ),
+        })
+    return rows
+
+
+def print_table(report):
+    print(f"{'graph':>14} {'nodes':>6} {'edges':>6} {'k':>5} {'paths':>6} {'ms':>9} {'spurs':>7}")
+    for row in report['results']:
+        print(
+            f"{row['graph']:>14} {row['nodes']:>6} {row['edges']:>6} {row['k']:>5} {row['paths']:>6} "
+            f"{row['ms']:>9.2f} {row['spur_searches']:>7}"
+        )
+    for row in report.get('legacy', []):
+        legacy = 'gave up' if row['legacy_gave_up'] else f"{row['legacy_ms']:.2f} ms"
+        print(f"legacy {row['graph']} k={row['k']}: {legacy} (same costs: {row['same_costs']})")
+    failures = report['oracle']['failures']
+    print(f"oracle: {report['oracle']['trials'] - len(failures)}/{report['oracle']['trials']} graphs match")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    parser.add_argument('--quick', action='store_true', help='smaller graph set')
+    parser.add_argument('--legacy', action='store_true', help='also time the pre-Yen search')
+    parser.add_argument('--baseline', help='report to compare against; exit 1 on regression')
+    parser.add_argument('--write-baseline', help='save this run as a baseline report')
+    parser.add_argument('--time-tolerance', type=float, default=routing_bench.DEFAULT_TIME_TOLERANCE)
+    args = parser.parse_args()
+
+    report = routing_bench.run_benchmark(quick=args.quick)
+    if args.legacy:
+        report['legacy'] = legacy_rows(report, quick=args.quick)
+    if args.write_baseline:
+        with open(args.write_baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = routing_bench.compare_to_baseline(
+                report, json.load(f), time_tolerance=args.time_tolerance,
+            )
+        report['regressions'] = regressions
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_table(report)
+        for line in regressions:
+            print(f'REGRESSION {line}')
+    return 1 if regressions or report['oracle']['failures'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
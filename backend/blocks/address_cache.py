@@ -0,0 +1,249 @@
+import hashlib
+import logging
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional
+
+from bitcoinlib.transactions import Output
+from django.core.cache import cache
+from django.utils import timezone
+
+from .btc import (
+    fetch_blockstream_address_stats,
+    fetch_blockstream_tip_height,
+    fetch_blockstream_utxos,
+    stats_to_balance,
+)
+from .models import AddressStateCache
+
+logger = logging.getLogger(__name__)
+
+# Rows are refreshed when the chain tip moves; the age cap covers mempool-only changes
+# and explorers that cannot report the tip height.
+ADDRESS_STATE_MAX_AGE_SECONDS = 600
+CHAIN_TIP_CACHE_SECONDS = 30
+CHAIN_TIP_CACHE_KEY = 'btc:chain_tip_height'
+
+_STATE_UPDATE_FIELDS = [
+    'scripthash',
+    'chain_balance_sats',
+    'mempool_balance_sats',
+    'tx_count',
+    'utxos',
+    'tip_height',
+    'is_stale',
+    'updated_at',
+]
+# A balance refresh must not overwrite a cached UTXO set it did not fetch;
+# get_cached_balances clears it separately when the address has changed.
+_BALANCE_UPDATE_FIELDS = [field for field in _STATE_UPDATE_FIELDS if field != 'utxos']
+
+
+def script_scripthash(lock_script: bytes) -> str:
+    """Return the Electrum-style scripthash (reversed SHA-256) for a scriptPubKey."""
+    return hashlib.sha256(bytes(lock_script or b'')).digest()[::-1].hex()
+
+
+def address_scripthash(address: str) -> str:
+    """Return the scripthash for an address, or '' if it cannot be parsed."""
+    try:
+        return script_scripthash(Output(0, address, network='bitcoin').lock_script)
+    except Exception:
+        return ''
+
+
+def get_chain_tip_height(base_url: str = None) -> Optional[int]:
+    """Return the explorer's tip height, memoized briefly to avoid one call per lookup."""
+    cached = cache.get(CHAIN_TIP_CACHE_KEY)
+    if cached is not None:
+        return cached
+    try:
+        height = fetch_blockstream_tip_height(base_url=base_url)
+    except Exception as exc:
+        logger.warning('Failed to fetch chain tip height: %s', exc)
+        return None
+    cache.set(CHAIN_TIP_CACHE_KEY, height, timeout=CHAIN_TIP_CACHE_SECONDS)
+    return height
+
+
+def _is_fresh(state: AddressStateCache, tip_height: Optional[int], now) -> bool:
+    if state.is_stale:
+        return False
+    if tip_height is not None and state.tip_height != tip_height:
+        return False
+    if not state.updated_at:
+        return False
+    return now - state.updated_at <= timedelta(seconds=ADDRESS_STATE_MAX_AGE_SECONDS)
+
+
+def load_address_states(addresses: Iterable[str], tip_height: Optional[int] = None) -> Dict[str, AddressStateCache]:
+    """Return fresh cached rows keyed by address; stale or missing addresses are omitted."""
+    wanted = [addr for addr in dict.fromkeys(addresses or []) if addr]
+    if not wanted:
+        return {}
+    now = timezone.now()
+    return {
+        state.address: state
+        for state in AddressStateCache.objects.filter(address__in=wanted)
+        if _is_fresh(state, tip_height, now)
+    }
+
+
+def _store_states(states: List[AddressStateCache], update_fields: List[str] = _STATE_UPDATE_FIELDS):
+    if not states:
+        return
+    AddressStateCache.objects.bulk_create(
+        states,
+        update_conflicts=True,
+        unique_fields=['address'],
+        update_fields=update_fields,
+    )
+
+
+def _store_balance_states(states: List[AddressStateCache]):
+    """
+    Upsert balance rows, keeping each row's cached UTXO set unless the
+    balances or tx count show the address changed since it was fetched.
+    """
+    if not states:
+        return
+    previous = {
+        address: rest
+        for address, *rest in AddressStateCache.objects.filter(
+            address__in=[state.address for state in states],
+        ).values_list('address', 'chain_balance_sats', 'mempool_balance_sats', 'tx_count')
+    }
+    _store_states(states, _BALANCE_UPDATE_FIELDS)
+
+    def changed(state):
+        chain, mempool, tx_count = previous[state.address]
+        # store_address_utxos does not know the tx count and records 0
+        return (chain, mempool) != (state.chain_balance_sats, state.mempool_balance_sats) or (
+            tx_count and tx_count != state.tx_count
+        )
+
+    empty = [state.address for state in states if state.utxos == []]
+    stale = [state.address for state in states if state.utxos != [] and state.address in previous and changed(state)]
+    if empty:
+        AddressStateCache.objects.filter(address__in=empty).update(utxos=[])
+    if stale:
+        AddressStateCache.objects.filter(address__in=stale).update(utxos=None)
+
+
+def get_cached_balances(
+    addresses: List[str],
+    include_mempool: bool = True,
+    base_url: str = None,
+    force_refresh: bool = False,
+) -> Dict[str, int]:
+    """Balances per address, served from the DB cache and fetched from the explorer on miss."""
+    addresses = [addr for addr in dict.fromkeys(addresses or []) if addr]
+    tip_height = get_chain_tip_height(base_url)
+    cached = {} if force_refresh else load_address_states(addresses, tip_height)
+
+    out: Dict[str, int] = {
+        addr: state.balance_sats(include_mempool)
+        for addr, state in cached.items()
+    }
+    missing = [addr for addr in addresses if addr not in cached]
+    if not missing:
+        return out
+
+    logger.debug('Address state cache: %s hits, %s misses', len(cached), len(missing))
+    stats = fetch_blockstream_address_stats(missing, base_url=base_url)
+    to_store = []
+    for addr in missing:
+        item = stats.get(addr)
+        out[addr] = stats_to_balance(item, include_mempool)
+        if item is None:
+            # Do not cache failed lookups
+            continue
+        scripthash = address_scripthash(addr)
+        if not scripthash:
+            continue
+        total = stats_to_balance(item, include_mempool=True)
+        to_store.append(AddressStateCache(
+            address=addr,
+            scripthash=scripthash,
+            chain_balance_sats=int(item.get('chain_balance') or 0),
+            mempool_balance_sats=int(item.get('mempool_balance') or 0),
+            tx_count=int(item.get('tx_count') or 0),
+            # An empty address has no UTXOs; record that so builders can skip it
+            utxos=[] if total <= 0 else None,
+            tip_height=tip_height,
+            is_stale=False,
+        ))
+    try:
+        _store_balance_states(to_store)
+    except Exception as exc:
+        logger.warning('Failed to persist address states: %s', exc)
+    return out
+
+
+def get_cached_utxos(address: str, base_url: str = None, force_refresh: bool = False) -> List[Dict]:
+    """
+    UTXO set for an address, served from the DB cache when fresh.
+    Raises requests exceptions when the explorer fetch fails.
+    """
+    tip_height = get_chain_tip_height(base_url)
+    if not force_refresh:
+        state = load_address_states([address], tip_height).get(address)
+        if state is not None and state.utxos is not None:
+            return list(state.utxos)
+
+    utxos = fetch_blockstream_utxos(address, base_url=base_url)
+    store_address_utxos(address, utxos, tip_height)
+    return utxos
+
+
+def store_address_utxos(address: str, utxos: List[Dict], tip_height: Optional[int] = None):
+    """Persist a freshly fetched UTXO set (and the balance it implies) for an address."""
+    scripthash = address_scripthash(address)
+    if not scripthash:
+        return
+    confirmed = sum(u['value'] for u in utxos if (u.get('status') or {}).get('confirmed'))
+    unconfirmed = sum(u['value'] for u in utxos) - confirmed
+    try:
+        existing = AddressStateCache.objects.filter(address=address).only('tx_count').first()
+        _store_states([AddressStateCache(
+            address=address,
+            scripthash=scripthash,
+            chain_balance_sats=confirmed,
+            mempool_balance_sats=unconfirmed,
+            tx_count=int(existing.tx_count) if existing else 0,
+            utxos=utxos,
+            tip_height=tip_height,
+            is_stale=False,
+        )])
+    except Exception as exc:
+        logger.warning('Failed to persist UTXO state for %s: %s', address, exc)
+
+
+def invalidate_scripthashes(scripthashes: Iterable[str]) -> int:
+    """Mark cached rows for the given scripthashes as stale."""
+    wanted = [sh for sh in set(scripthashes or []) if sh]
+    if not wanted:
+        return 0
+    return AddressStateCache.objects.filter(scripthash__in=wanted).update(is_stale=True)
+
+
+def invalidate_addresses(addresses: Iterable[str]) -> int:
+    """Mark cached rows for the given addresses as stale."""
+    return invalidate_scripthashes(address_scripthash(addr) for addr in (addresses or []) if addr)
+
+
+def invalidate_transaction(tx) -> int:
+    """Mark every address a (bitcoinlib) transaction spends from or pays to as stale."""
+    scripthashes = []
+    for inp in getattr(tx, 'inputs', None) or []:
+        address = getattr(inp, 'address', '') or ''
+        if address:
+            scripthashes.append(address_scripthash(address))
+    for out in getattr(tx, 'outputs', None) or []:
+        lock_script = getattr(out, 'lock_script', b'') or b''
+        if lock_script and not lock_script.startswith(b'\x6a'):
+            scripthashes.append(script_scripthash(lock_script))
+    try:
+        return invalidate_scripthashes(scripthashes)
+    except Exception as exc:
+        logger.warning('Failed to invalidate address states for tx: %s', exc)
+        return 0
@@ -1,8 +1,15 @@
+import base64
 import json
-from typing import Any, Optional
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+from django.core.cache import cache
+from django.db.models import Q, QuerySet
 from django.http import HttpRequest
 
+# Admin list totals are a full-table count; they are served from the cache this long
+LIST_COUNT_CACHE_SECONDS = 60
+
 
 def _parse_int(value: Any, default: Optional[int] = None) -> Optional[int]:
     """Safely parse an integer, returning default on failure."""
@@ -45,3 +52,56 @@ def _load_json_body(request: HttpRequest) -> Optional[dict]:
         return json.loads(raw)
     except json.JSONDecodeError:
         return None
+
+
+def encode_cursor(created_at: datetime, pk: int) -> str:
+    """Opaque keyset cursor for a (created_at, id) position."""
+    raw = f'{created_at.isoformat()}|{pk}'.encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_cursor; raises ValueError for a malformed cursor."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, pk = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8').rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (TypeError, UnicodeError, ValueError) as exc:
+        raise ValueError('잘못된 cursor 값입니다.') from exc
+
+
+def keyset_page(queryset: QuerySet, cursor: Optional[str], limit: int) -> Tuple[List[Any], Optional[str]]:
+    """
+    One page of ``queryset`` newest first by (created_at, id), starting
+    after ``cursor``. Returns (rows, next_cursor); next_cursor is None on
+    the last page. Seeks on the (created_at, id) index instead of COUNT(*)
+    plus OFFSET, so every page costs the same.
+    """
+    queryset = queryset.order_by('-created_at', '-id')
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    rows = list(queryset[:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
+
+
+def cached_list_counts(key: str, compute: Callable[[], Dict[str, int]]) -> Dict[str, int]:
+    """
+    Totals for an admin list from ``compute()`` (one aggregate over the
+    table), cached for LIST_COUNT_CACHE_SECONDS so repeated page loads do
+    not rescan. Only computed when the client asks (?with_count=1).
+    """
+    key = f'list_counts:{key}'
+    counts = cache.get(key)
+    if counts is None:
+        counts = compute()
+        cache.set(key, counts, timeout=LIST_COUNT_CACHE_SECONDS)
+    return counts
+
+
+def invalidate_list_counts(key: str) -> None:
+    """Drop cached totals for an admin list after a row is added or changed."""
+    cache.delete(f'list_counts:{key}')
@@ -1,5 +1,5 @@
 import os
-from typing import List, Dict
+from typing import List, Dict, Optional
 import requests
 import unicodedata
 
@@ -42,9 +42,10 @@ def derive_bip84_addresses(mnemonic: str, account: int = 0, change: int = 0, sta
         raise ValueError(f"Failed to derive addresses: {str(e)}")
 
 
-def fetch_blockstream_balances(addresses: List[str], base_url: str = None, include_mempool: bool = True, timeout: float = 8.0) -> Dict[str, int]:
+def fetch_blockstream_address_stats(addresses: List[str], base_url: str = None, timeout: float = 8.0) -> Dict[str, Optional[Dict[str, int]]]:
     """
-    Query Blockstream explorer for balances. Returns sats per address.
+    Query Blockstream explorer for per-address chain/mempool stats.
+    Returns {address: {'chain_balance', 'mempool_balance', 'tx_count'}}; failed lookups map to None.
     Uses concurrent requests with rate limiting to speed up lookups.
     """
     import time
@@ -52,15 +53,18 @@ def fetch_blockstream_balances(addresses: List[str], base_url: str = None, inclu
     import logging
 
     base = (base_url or os.environ.get('BTC_EXPLORER_API') or 'https://blockstream.info/api').rstrip('/')
-    out: Dict[str, int] = {}
+    out: Dict[str, Optional[Dict[str, int]]] = {}
     sess = requests.Session()
     logger = logging.getLogger(__name__)
 
+    started = time.monotonic()
+
     def fetch_single_address(addr: str, delay_sec: float) -> tuple:
-        """Fetch balance for a single address with rate limiting delay."""
+        """Fetch stats for a single address with rate limiting delay."""
         try:
-            # Add staggered delay to respect rate limits
-            time.sleep(delay_sec)
+            # Staggered start offsets (relative to the batch start) respect rate limits
+            # without adding the time spent queued behind other workers.
+            time.sleep(max(0.0, started + delay_sec - time.monotonic()))
 
             r = sess.get(f"{base}/address/{addr}", timeout=timeout)
 
@@ -74,13 +78,14 @@ def fetch_blockstream_balances(addresses: List[str], base_url: str = None, inclu
             data = r.json()
             c = data.get('chain_stats', {})
             m = data.get('mempool_stats', {})
-            bal = int(c.get('funded_txo_sum', 0)) - int(c.get('spent_txo_sum', 0))
-            if include_mempool:
-                bal += int(m.get('funded_txo_sum', 0)) - int(m.get('spent_txo_sum', 0))
-            return (addr, max(0, bal))
+            return (addr, {
+                'chain_balance': int(c.get('funded_txo_sum', 0)) - int(c.get('spent_txo_sum', 0)),
+                'mempool_balance': int(m.get('funded_txo_sum', 0)) - int(m.get('spent_txo_sum', 0)),
+                'tx_count': int(c.get('tx_count', 0)) + int(m.get('tx_count', 0)),
+            })
         except Exception as e:
             logger.warning(f"Failed to fetch balance for {addr}: {e}")
-            return (addr, 0)
+            return (addr, None)
 
     # Use ThreadPoolExecutor for concurrent requests with staggered delays
     # Max 5 workers to avoid overwhelming the API
@@ -92,12 +97,64 @@ def fetch_blockstream_balances(addresses: List[str], base_url: str = None, inclu
         }
 
         for future in concurrent.futures.as_completed(futures):
-            addr, balance = future.result()
-            out[addr] = balance
+            addr, stats = future.result()
+            out[addr] = stats
 
     return out
 
 
+def stats_to_balance(stats: Optional[Dict[str, int]], include_mempool: bool = True) -> int:
+    """Collapse explorer stats into a spendable balance in sats."""
+    if not stats:
+        return 0
+    bal = int(stats.get('chain_balance') or 0)
+    if include_mempool:
+        bal += int(stats.get('mempool_balance') or 0)
+    return max(0, bal)
+
+
+def fetch_blockstream_balances(addresses: List[str], base_url: str = None, include_mempool: bool = True, timeout: float = 8.0) -> Dict[str, int]:
+    """
+    Query Blockstream explorer for balances. Returns sats per address.
+    Failed lookups are reported as 0 sats.
+    """
+    stats = fetch_blockstream_address_stats(addresses, base_url=base_url, timeout=timeout)
+    return {addr: stats_to_balance(item, include_mempool) for addr, item in stats.items()}
+
+
+def fetch_blockstream_utxos(address: str, base_url: str = None, timeout: float = 5.0) -> List[Dict]:
+    """
+    Query Blockstream explorer for the UTXO set of one address.
+    Raises requests exceptions on transport/HTTP failures.
+    """
+    base = (base_url or os.environ.get('BTC_EXPLORER_API') or 'https://blockstream.info/api').rstrip('/')
+    resp = requests.get(f"{base}/address/{address}/utxo", timeout=timeout)
+    resp.raise_for_status()
+    utxos: List[Dict] = []
+    for item in resp.json():
+        txid = item.get('txid') or item.get('tx_hash') or ''
+        if not txid:
+            continue
+        vout = item.get('vout')
+        if vout is None:
+            vout = item.get('output') or item.get('n') or 0
+        utxos.append({
+            'txid': txid,
+            'vout': int(vout),
+            'value': int(item.get('value') or 0),
+            'status': item.get('status') or {},
+        })
+    return utxos
+
+
+def fetch_blockstream_tip_height(base_url: str = None, timeout: float = 5.0) -> int:
+    """Return the current chain tip height reported by the explorer."""
+    base = (base_url or os.environ.get('BTC_EXPLORER_API') or 'https://blockstream.info/api').rstrip('/')
+    resp = requests.get(f"{base}/blocks/tip/height", timeout=timeout)
+    resp.raise_for_status()
+    return int(resp.text.strip())
+
+
 def calc_total_sats(addr_balances: Dict[str, int]) -> int:
     return sum(int(v or 0) for v in (addr_balances or {}).values())
 
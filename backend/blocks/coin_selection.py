@@ -0,0 +1,265 @@
+"""
+Coin selection for admin-built transactions (time capsule sends).
+
+Each algorithm proposes a set of UTXOs; candidates are compared by their
+"waste" at the requested fee rate, as in Bitcoin Core:
+
+    waste = sum(input_vbytes * (fee_rate - long_term_fee_rate))
+            + (cost_of_change if the tx has change else excess paid to fees)
+
+The long-term fee rate (what spending an input later is assumed to cost)
+defaults to DEFAULT_LONG_TERM_FEE_FACTOR x the requested rate. Every input
+then adds waste, so a changeless match that needs extra inputs only wins
+when the inputs it adds cost less than creating and later spending a
+change output; otherwise the spend with fewer inputs (and a lower fee now)
+is picked. With long_term == fee_rate inputs would be free and any
+changeless set, however many inputs it burns, would beat a single input
+with change. Pass a long_term_fee_rate above fee_rate to favour
+consolidating small UTXOs while fees are low.
+
+Inputs are plain dicts with at least a ``value`` key (sats); the selected
+dicts are returned unchanged so callers keep their own metadata.
+"""
+import math
+import random
+
+P2WPKH_INPUT_VBYTES = 68
+P2WPKH_OUTPUT_VBYTES = 31
+DEFAULT_DUST_LIMIT = 294
+BNB_MAX_TRIES = 100_000
+KNAPSACK_MAX_ITERATIONS = 1000
+# Bounds knapsack work (iterations x pool size) on fragmented wallets
+KNAPSACK_MAX_STEPS = 2_000_000
+# Default long-term fee rate as a share of the requested rate (see module docstring)
+DEFAULT_LONG_TERM_FEE_FACTOR = 0.5
+
+
+def _selection_params(amount_sats, fee_rate, base_vbytes, input_vbytes, change_output_vbytes,
+                      change_spend_vbytes, long_term_fee_rate, dust_limit):
+    fee_rate = float(fee_rate)
+    long_term = fee_rate * DEFAULT_LONG_TERM_FEE_FACTOR if long_term_fee_rate is None else float(long_term_fee_rate)
+    change_fee = fee_rate * change_output_vbytes
+    return {
+        'amount': int(amount_sats),
+        'fee_rate': fee_rate,
+        'base_vbytes': float(base_vbytes),
+        'input_vbytes': float(input_vbytes),
+        'change_output_vbytes': float(change_output_vbytes),
+        'input_fee': fee_rate * input_vbytes,
+        'input_waste': (fee_rate - long_term) * input_vbytes,
+        'target': int(amount_sats) + fee_rate * base_vbytes,
+        'change_fee': change_fee,
+        'cost_of_change': change_fee + long_term * change_spend_vbytes,
+        'min_change': change_fee + dust_limit,
+        'dust_limit': int(dust_limit),
+    }
+
+
+def _effective_pool(utxos, params):
+    """Pair each spendable UTXO with its value net of the fee to spend it, largest first."""
+    pool = []
+    for utxo in utxos or []:
+        effective = int(utxo.get('value') or 0) - params['input_fee']
+        if effective > 0:
+            pool.append((effective, utxo))
+    pool.sort(key=lambda item: item[0], reverse=True)
+    return pool
+
+
+def _finalize(algorithm, selected, params):
+    """Turn a candidate selection into concrete change/fee figures and its waste score."""
+    if not selected:
+        return None
+    total = sum(int(utxo['value']) for utxo in selected)
+    num_inputs = len(selected)
+    vsize_no_change = params['base_vbytes'] + num_inputs * params['input_vbytes']
+    fee_no_change = math.ceil(params['fee_rate'] * math.ceil(vsize_no_change))
+    excess = total - params['amount'] - fee_no_change
+    if excess < 0:
+        return None
+
+    input_waste = num_inputs * params['input_waste']
+    fee_with_change = math.ceil(params['fee_rate'] * math.ceil(vsize_no_change + params['change_output_vbytes']))
+    change = total - params['amount'] - fee_with_change
+    if change >= params['dust_limit'] and excess >= params['min_change']:
+        return {
+            'algorithm': algorithm,
+            'selected': list(selected),
+            'total_sats': total,
+            'fee_sats': fee_with_change,
+            'change_sats': change,
+            'has_change': True,
+            'waste': input_waste + params['cost_of_change'],
+        }
+    return {
+        'algorithm': algorithm,
+        'selected': list(selected),
+        'total_sats': total,
+        'fee_sats': total - params['amount'],
+        'change_sats': 0,
+        'has_change': False,
+        'waste': input_waste + excess,
+    }
+
+
+def branch_and_bound(pool, params, max_tries=BNB_MAX_TRIES):
+    """Depth-first search for a changeless input set within cost_of_change of the target."""
+    target = params['target']
+    upper = target + params['cost_of_change']
+    input_waste = params['input_waste']
+    feerate_high = input_waste > 0
+
+    available = sum(effective for effective, _ in pool)
+    if available < target:
+        return None
+
+    selection = []
+    best = None
+    best_waste = math.inf
+    value = 0.0
+    waste = 0.0
+    index = 0
+    for _ in range(max_tries):
+        backtrack = False
+        if value + available < target or value > upper or (feerate_high and waste > best_waste):
+            backtrack = True
+        elif value >= target:
+            candidate_waste = waste + (value - target)
+            if candidate_waste <= best_waste:
+                best = list(selection)
+                best_waste = candidate_waste
+            backtrack = True
+
+        if backtrack:
+            if not selection:
+                break
+            # Give back the lookahead of UTXOs skipped since the last inclusion, then exclude it.
+            index -= 1
+            while index > selection[-1]:
+                available += pool[index][0]
+                index -= 1
+            value -= pool[index][0]
+            waste -= input_waste
+            selection.pop()
+        else:
+            effective = pool[index][0]
+            available -= effective
+            # Skip a UTXO equivalent to an excluded predecessor; that branch was already explored.
+            if not selection or index - 1 == selection[-1] or effective != pool[index - 1][0]:
+                selection.append(index)
+                value += effective
+                waste += input_waste
+        index += 1
+
+    if best is None:
+        return None
+    return [pool[i][1] for i in best]
+
+
+def largest_first(pool, params):
+    """Spend the biggest UTXOs until the amount, fees and a change output are covered."""
+    goal = params['target'] + params['min_change']
+    selected = []
+    value = 0.0
+    for effective, utxo in pool:
+        selected.append(utxo)
+        value += effective
+        if params['target'] <= value <= params['target'] + params['cost_of_change'] or value >= goal:
+            return selected
+    return selected if value >= params['target'] else None
+
+
+def knapsack(pool, params, seed=0):
+    """Stochastic subset-sum approximation (Bitcoin Core's knapsack solver) aiming for target + change."""
+    goal = params['target'] + params['min_change']
+    smaller = []
+    lowest_larger = None
+    for effective, utxo in pool:
+        if effective == goal:
+            return [utxo]
+        if effective < goal:
+            smaller.append((effective, utxo))
+        elif lowest_larger is None or effective < lowest_larger[0]:
+            lowest_larger = (effective, utxo)
+
+    smaller_total = sum(effective for effective, _ in smaller)
+    if smaller_total < goal:
+        return [lowest_larger[1]] if lowest_larger else None
+
+    rng = random.Random(seed)
+    iterations = max(1, min(KNAPSACK_MAX_ITERATIONS, KNAPSACK_MAX_STEPS // max(1, len(smaller))))
+    best_flags = [True] * len(smaller)
+    best_value = smaller_total
+    for _ in range(iterations):
+        if best_value == goal:
+            break
+        flags = [False] * len(smaller)
+        total = 0.0
+        reached = False
+        for npass in range(2):
+            if reached:
+                break
+            for i, (effective, _) in enumerate(smaller):
+                include = rng.random() < 0.5 if npass == 0 else not flags[i]
+                if not include:
+                    continue
+                total += effective
+                flags[i] = True
+                if total >= goal:
+                    reached = True
+                    if total < best_value:
+                        best_value = total
+                        best_flags = list(flags)
+                    total -= effective
+                    flags[i] = False
+
+    if lowest_larger and (best_value != goal and lowest_larger[0] <= best_value):
+        return [lowest_larger[1]]
+    return [utxo for (_, utxo), flag in zip(smaller, best_flags) if flag]
+
+
+def select_coins(
+    utxos,
+    amount_sats,
+    fee_rate,
+    *,
+    base_vbytes,
+    input_vbytes=P2WPKH_INPUT_VBYTES,
+    change_output_vbytes=P2WPKH_OUTPUT_VBYTES,
+    change_spend_vbytes=P2WPKH_INPUT_VBYTES,
+    long_term_fee_rate=None,
+    dust_limit=DEFAULT_DUST_LIMIT,
+    algorithms=None,
+):
+    """
+    Run the configured algorithms and return the lowest-waste selection, or None.
+
+    base_vbytes covers everything except inputs and the change output
+    (header, recipient outputs, memo output). Sizes may be fractional
+    (weight / 4); the transaction vsize is rounded up once, as on the network.
+    """
+    params = _selection_params(
+        amount_sats, fee_rate, base_vbytes, input_vbytes, change_output_vbytes,
+        change_spend_vbytes, long_term_fee_rate, dust_limit,
+    )
+    pool = _effective_pool(utxos, params)
+    if not pool:
+        return None
+
+    best = None
+    for name in algorithms or SELECTION_ALGORITHMS:
+        selected = SELECTION_ALGORITHMS[name](pool, params)
+        result = _finalize(name, selected, params)
+        if result is None:
+            continue
+        rank = (result['waste'], result['fee_sats'], len(result['selected']))
+        if best is None or rank < (best['waste'], best['fee_sats'], len(best['selected'])):
+            best = result
+    return best
+
+
+SELECTION_ALGORITHMS = {
+    'bnb': branch_and_bound,
+    'largest_first': largest_first,
+    'knapsack': knapsack,
+}
@@ -0,0 +1,344 @@
+"""
+In-process hot tier in front of CompatibilityAgentCache.
+
+Cache hits are served from an LRU of detached model instances, so a
+repeated compatibility request reads no rows and takes no SQLite write
+lock. Hit counts are accumulated in memory and written back by
+flush_hit_counts() as one UPDATE per distinct increment, at most every
+COMPAT_CACHE_FLUSH_SECONDS (triggered by the next hit) or as soon as
+COMPAT_CACHE_FLUSH_MAX keys are pending, and once more at exit.
+
+Entries expire after COMPAT_CACHE_HOT_TTL seconds so an admin edit made
+in another worker process shows up without a restart; edits and deletes
+in this process call invalidate() directly.
+
+The second half canonicalizes the inputs that go into cache keys:
+birthdates, birth times and genders in any common spelling map to one
+form, structured request data hashes independently of key order and
+whitespace, and saju_signature() identifies a request by the derived
+pillars and element counts, so narratives can be reused between people
+whose charts are identical (opt-in, see get_entry_by_saju_signature).
+Agents whose output is derived from the context text itself are never
+reused that way, and a reused narrative is given the requested names.
+"""
+import atexit
+import copy
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import date
+
+from django.conf import settings
+from django.db import OperationalError, ProgrammingError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CompatibilityAgentCache
+from .saju_util import analyze_elements, calculate_saju
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOT_SIZE = 1024
+DEFAULT_HOT_TTL = 300
+DEFAULT_FLUSH_SECONDS = 30
+DEFAULT_FLUSH_MAX = 500
+# Agents whose answer depends on the context text (highlight_story marks up the
+# narrative it is given), so an identical chart says nothing about it
+CONTEXT_DERIVED_AGENTS = frozenset({'highlight_story'})
+# Rows with the same saju signature considered when looking for one to reuse
+SAJU_MATCH_CANDIDATES = 5
+
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_hot = OrderedDict()  # cache_key -> (expires_at, CompatibilityAgentCache)
+_pending_hits = defaultdict(int)
+_last_flush = time.monotonic()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _remember(entry):
+    ttl = float(_setting('COMPAT_CACHE_HOT_TTL', DEFAULT_HOT_TTL))
+    size = int(_setting('COMPAT_CACHE_HOT_SIZE', DEFAULT_HOT_SIZE))
+    with _lock:
+        _hot[entry.cache_key] = (time.monotonic() + ttl, entry)
+        _hot.move_to_end(entry.cache_key)
+        while len(_hot) > size:
+            _hot.popitem(last=False)
+
+
+def get_cached_entry(cache_key, count_hit=True):
+    """
+    The cache row for ``cache_key`` or None; counts a hit unless told not
+    to. Serves from memory when possible and falls back to one SELECT. DB
+    errors propagate.
+    """
+    now = time.monotonic()
+    with _lock:
+        item = _hot.get(cache_key)
+        if item is not None and item[0] < now:
+            del _hot[cache_key]
+            item = None
+        if item is not None:
+            _hot.move_to_end(cache_key)
+    if item is not None:
+        entry = item[1]
+    else:
+        try:
+            entry = CompatibilityAgentCache.objects.get(cache_key=cache_key)
+        except CompatibilityAgentCache.DoesNotExist:
+            return None
+        _remember(entry)
+    if count_hit:
+        _record_hit(cache_key)
+    return entry
+
+
+def remember_entry(entry):
+    """Put a freshly saved row in the hot tier (write-through after an LLM call)."""
+    if entry is not None and entry.cache_key:
+        _remember(entry)
+
+
+def invalidate(cache_key):
+    with _lock:
+        _hot.pop(cache_key, None)
+
+
+def _record_hit(cache_key):
+    with _lock:
+        _pending_hits[cache_key] += 1
+        due = (
+            time.monotonic() - _last_flush >= float(_setting('COMPAT_CACHE_FLUSH_SECONDS', DEFAULT_FLUSH_SECONDS))
+            or len(_pending_hits) >= int(_setting('COMPAT_CACHE_FLUSH_MAX', DEFAULT_FLUSH_MAX))
+        )
+    if due:
+        flush_hit_counts(block=False)
+
+
+def pending_hit_count(cache_key):
+    with _lock:
+        return _pending_hits.get(cache_key, 0)
+
+
+def flush_hit_counts(block=True):
+    """
+    Write accumulated hit counts back: one UPDATE per distinct increment,
+    all in one transaction. Returns the number of rows touched. With
+    block=False a flush already running in another thread is not waited for.
+    """
+    global _last_flush
+    if not _flush_lock.acquire(blocking=block):
+        return 0
+    try:
+        with _lock:
+            pending = dict(_pending_hits)
+            _pending_hits.clear()
+            _last_flush = time.monotonic()
+        if not pending:
+            return 0
+
+        by_increment = defaultdict(list)
+        for cache_key, hits in pending.items():
+            by_increment[hits].append(cache_key)
+        now = timezone.now()
+        updated = 0
+        try:
+            with transaction.atomic():
+                for hits, keys in by_increment.items():
+                    updated += CompatibilityAgentCache.objects.filter(cache_key__in=keys).update(
+                        hit_count=F('hit_count') + hits, updated_at=now,
+                    )
+        except (OperationalError, ProgrammingError) as exc:
+            # Put the counts back so the next flush retries them
+            logger.warning('[Compatibility] Hit count flush failed: %s', exc)
+            with _lock:
+                for cache_key, hits in pending.items():
+                    _pending_hits[cache_key] += hits
+            return 0
+        return updated
+    finally:
+        _flush_lock.release()
+
+
+def reset_hot_cache():
+    """Drop the hot tier and pending counts without writing them (tests)."""
+    with _lock:
+        _hot.clear()
+        _pending_hits.clear()
+
+
+def _flush_at_exit():
+    try:
+        flush_hit_counts()
+    except Exception:  # interpreter shutdown: the DB may already be gone
+        pass
+
+
+atexit.register(_flush_at_exit)
+
+
+# --- Canonical cache inputs ---
+
+_DATE_RE = re.compile(r'^\s*(\d{4})\s*[-./년]?\s*(\d{1,2})\s*[-./월]?\s*(\d{1,2})\s*일?\s*$')
+_TIME_RE = re.compile(r'^(\d{1,2})\s*(?:[:시]\s*(\d{1,2})?\s*분?(?::\d{2})?)?$')
+_GENDER_ALIASES = {
+    'm': 'male', 'man': 'male', '남': 'male', '남자': 'male', '남성': 'male',
+    'f': 'female', 'woman': 'female', '여': 'female', '여자': 'female', '여성': 'female',
+}
+
+
+def normalize_birthdate(value):
+    """'1990-1-1', '1990.01.01', '19900101', '1990년 1월 1일' -> '1990-01-01'; unparseable input is returned stripped."""
+    text = str(value or '').strip()
+    match = _DATE_RE.match(text)
+    if not match:
+        return text
+    try:
+        return date(*(int(part) for part in match.groups())).isoformat()
+    except ValueError:
+        return text
+
+
+def normalize_birth_time(value):
+    """'9:05', '09:05:00', '0905', '9시 5분' -> '09:05'; unknown or unparseable -> ''."""
+    text = str(value or '').strip()
+    if text.isdigit() and len(text) in (3, 4):
+        text = f'{text[:-2]}:{text[-2:]}'
+    match = _TIME_RE.match(text)
+    if not match:
+        return ''
+    hour, minute = int(match.group(1)), int(match.group(2) or 0)
+    if hour > 23 or minute > 59:
+        return ''
+    return f'{hour:02d}:{minute:02d}'
+
+
+def normalize_gender(value):
+    text = str(value or '').strip().lower()
+    return _GENDER_ALIASES.get(text, text)
+
+
+def _canonical_value(value):
+    if isinstance(value, str):
+        return ' '.join(value.split())
+    if isinstance(value, dict):
+        return {str(key).strip(): _canonical_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical_value(item) for item in value]
+    return value
+
+
+def canonical_json(value):
+    """Key-order and whitespace independent JSON text for hashing."""
+    return json.dumps(_canonical_value(value), ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+
+
+def saju_profile(profile):
+    """
+    Normalized birth inputs plus derived pillars and element counts for a
+    profile dict, or None when it has no usable birthdate.
+    """
+    if not isinstance(profile, dict):
+        return None
+    birthdate = normalize_birthdate(profile.get('birthdate') or profile.get('birth_date'))
+    try:
+        year, month, day = (int(part) for part in birthdate.split('-'))
+        date(year, month, day)
+    except ValueError:
+        return None
+    birth_time = normalize_birth_time(profile.get('birth_time') or profile.get('birthtime'))
+    hour, minute = (int(part) for part in birth_time.split(':')) if birth_time else (None, None)
+    pillars = calculate_saju(year, month, day, hour, minute)
+    return {
+        'birthdate': birthdate,
+        'birth_time': birth_time,
+        'gender': normalize_gender(profile.get('gender')),
+        'pillars': [pillars['year_pillar'], pillars['month_pillar'], pillars['day_pillar'], pillars['time_pillar']],
+        'elements': analyze_elements(pillars),
+    }
+
+
+def structured_context_hash(structured):
+    """Hash of structured request data: canonical JSON plus the derived saju, if any."""
+    source = {'data': structured, 'saju': saju_profile(structured)}
+    return hashlib.sha256(canonical_json(source).encode('utf-8')).hexdigest()
+
+
+def saju_signature(agent_key, category, scope, profile, target_profile=None):
+    """
+    Hash of what a saju narrative depends on besides names: agent, category,
+    scope, and each person's pillars, element counts and gender. '' when the
+    subject (or a given target) has no usable birthdate, or for an agent in
+    CONTEXT_DERIVED_AGENTS.
+    """
+    if (agent_key or '').lower() in CONTEXT_DERIVED_AGENTS:
+        return ''
+    subject = saju_profile(profile)
+    target = saju_profile(target_profile) if target_profile else None
+    if subject is None or (target_profile and target is None):
+        return ''
+    parts = [
+        {'pillars': person['pillars'], 'elements': person['elements'], 'gender': person['gender']}
+        for person in (subject, target) if person
+    ]
+    source = canonical_json([(agent_key or '').lower(), (category or '').lower(), (scope or '').lower(), parts])
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+def _renamed_text(text, names):
+    """
+    ``text`` with each stored name replaced by the requested one
+    (``names``: [(stored, requested)]), or None when a stored name occurs
+    in the text but the request has no name to put in its place.
+    """
+    mapping = {}
+    for stored, requested in names:
+        if not stored or stored == requested or stored not in text:
+            continue
+        if not requested:
+            return None
+        mapping[stored] = requested
+    if not mapping:
+        return text
+    # One pass, so swapped subject/target names do not overwrite each other
+    pattern = re.compile('|'.join(re.escape(name) for name in sorted(mapping, key=len, reverse=True)))
+    return pattern.sub(lambda match: mapping[match.group(0)], text)
+
+
+def get_entry_by_saju_signature(signature, subject_name='', target_name=''):
+    """
+    A cache row with this saju signature whose narrative fits the requested
+    names (counts a hit), or None. Rows stored for the same names are
+    preferred; otherwise the names in the narrative are substituted on a
+    copy of the row, and rows naming someone the request leaves unnamed
+    are skipped.
+    """
+    if not signature:
+        return None
+    candidates = list(
+        CompatibilityAgentCache.objects.filter(saju_signature=signature)
+        .order_by('-hit_count', '-updated_at')
+        .values_list('cache_key', 'subject_name', 'target_name')[:SAJU_MATCH_CANDIDATES]
+    )
+    candidates.sort(key=lambda row: (row[1], row[2]) != (subject_name, target_name))
+    for cache_key, stored_subject, stored_target in candidates:
+        entry = get_cached_entry(cache_key, count_hit=False)
+        if entry is None:
+            continue
+        text = _renamed_text(entry.response_text, [(stored_subject, subject_name), (stored_target, target_name)])
+        if text is None:
+            continue
+        _record_hit(cache_key)
+        if text != entry.response_text:
+            # Hot-tier rows are shared; the substitution only goes to this request
+            entry = copy.copy(entry)
+            entry.response_text = text
+        return entry
+    return None
@@ -0,0 +1,311 @@
+"""
+Pairwise precompute for CompatibilityQuickPreset.
+
+Picking two quick presets on the compatibility page runs two pair
+reports (the duo-vs-Bitcoin team report and the direct pair report), each
+followed by a highlight pass. All four requests depend only on the two
+presets, so precompute_preset_pairs() can issue them ahead of time for
+every ordered preset pair, with the same context text and cache payload
+the page builds (CompatibilityPage.vue / compatibility/utils.js), and the
+page is then answered from CompatibilityAgentCache.
+
+preset_pair_matrix() returns the deterministic side for every pair
+(pillars, element counts, day-master relation, score and rating). The
+charts for all presets come from one saju_util.calculate_saju_many call.
+
+start_precompute_job() runs the precompute on a background thread and
+tracks it in a CompatibilityPrecomputeJob row, so the admin POST returns
+at once and any worker can report the job's progress.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.db import connection
+from django.utils import timezone
+
+from .models import CompatibilityPrecomputeJob, CompatibilityQuickPreset
+from .saju_util import ELEMENT_NAMES, calculate_saju_many, saju_row
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 4
+# Same temperature the page gets when it does not send one
+DEFAULT_TEMPERATURE = 0.7
+MAX_REPORTED_ERRORS = 20
+# A running job not updated for this long is treated as dead (its process exited)
+STALE_JOB_SECONDS = 15 * 60
+
+# compatibility/utils.js
+PAGE_ELEMENT_LABELS = ['목(木)', '화(火)', '토(土)', '금(金)', '수(水)']
+PAGE_ZODIAC = ['쥐', '소', '호랑이', '토끼', '용', '뱀', '말', '양', '원숭이', '닭', '개', '돼지']
+
+# Report chains per pair: (agent_key, cache category, cache scope, highlight category)
+PAIR_REPORTS = {
+    'duo': ('saju_bitcoin', 'duo_report', 'duo_vs_bitcoin', 'highlight_duo'),
+    'pair': ('pair_compatibility', 'pair_report', 'direct_pair', 'highlight_pair'),
+}
+
+# Five-element cycles, indices into ELEMENT_NAMES
+GENERATES = {0: 1, 1: 2, 2: 3, 3: 4, 4: 0}  # wood -> fire -> earth -> metal -> water -> wood
+CONTROLS = {0: 2, 2: 4, 4: 1, 1: 3, 3: 0}  # wood -> earth -> water -> fire -> metal -> wood
+RELATION_SCORES = {
+    'same': 70, 'generates': 85, 'generated_by': 85, 'controls': 55, 'controlled_by': 55,
+}
+RATINGS = [(85, '찰떡궁합'), (70, '균형 잡힌 합'), (55, '중립형 합'), (0, '주의가 필요한 합')]
+
+
+def page_profile(preset):
+    """The profile dict the page serializes into the cache payload for a preset."""
+    birthdate = preset.birthdate
+    year, month, day = birthdate.year, birthdate.month, birthdate.day
+    return {
+        'name': preset.label,
+        'birthdate': birthdate.isoformat(),
+        'birth_time': preset.birth_time.isoformat() if preset.birth_time else '',
+        'gender': preset.gender or '',
+        'zodiac': PAGE_ZODIAC[(year - 4) % 12],
+        'yin_yang': '양(陽)' if (year + month + day) % 2 == 0 else '음(陰)',
+        'element': PAGE_ELEMENT_LABELS[(year * 31 + month * 13 + day) % 5],
+    }
+
+
+def pair_requests(user, target, report):
+    """(agent_key, context, cache payload, highlight category) for one report of an ordered pair."""
+    agent_key, category, scope, highlight_category = PAIR_REPORTS[report]
+    if report == 'duo':
+        context = (
+            f"사용자: {user['name']} ({user['element']})\n"
+            f"비교 대상: {target['name']} ({target['element']})\n"
+            "비트코인과의 팀 궁합을 분석하라."
+        )
+    else:
+        context = f"두 사람({user['name']}, {target['name']})의 직접적인 사주 상생을 분석하라."
+    cache_payload = {'category': category, 'profile': user, 'target_profile': target, 'extra': {'scope': scope}}
+    return agent_key, context, cache_payload, highlight_category
+
+
+def highlight_request(narrative, user, target, category):
+    context = f'다음 텍스트에서 핵심 구절을 하이라이트하라:\n\n{narrative}'
+    return 'highlight_story', context, {'category': category, 'profile': user, 'target_profile': target}
+
+
+def _day_master_relation(a, b):
+    if a == b:
+        return 'same'
+    if GENERATES[a] == b:
+        return 'generates'
+    if GENERATES[b] == a:
+        return 'generated_by'
+    if CONTROLS[a] == b:
+        return 'controls'
+    return 'controlled_by'
+
+
+def pair_features(chart_a, chart_b):
+    """Deterministic compatibility of two charts (saju_row dict + 'elements' list)."""
+    relation = _day_master_relation(chart_a['day_master'], chart_b['day_master'])
+    combined = [x + y for x, y in zip(chart_a['elements'], chart_b['elements'])]
+    total = sum(combined) or 1
+    balance = round(100 * (1 - (max(combined) - min(combined)) / total))
+    score = max(0, min(100, round(0.6 * RELATION_SCORES[relation] + 0.4 * balance)))
+    return {
+        'relation': relation,
+        'elements': dict(zip(ELEMENT_NAMES, combined)),
+        'balance': balance,
+        'score': score,
+        'rating': next(label for threshold, label in RATINGS if score >= threshold),
+    }
+
+
+def preset_charts(presets):
+    """Charts for presets that have a birthdate, keyed by preset id, from one batch call."""
+    dated = [preset for preset in presets if preset.birthdate]
+    if not dated:
+        return {}
+    batch = calculate_saju_many(
+        [p.birthdate.year for p in dated],
+        [p.birthdate.month for p in dated],
+        [p.birthdate.day for p in dated],
+        [p.birth_time.hour if p.birth_time else -1 for p in dated],
+    )
+    charts = {}
+    for i, preset in enumerate(dated):
+        chart = saju_row(batch, i)
+        chart['elements'] = [int(count) for count in batch['elements'][i]]
+        # Day stem index // 2 is its element (갑을 wood, 병정 fire, ...)
+        chart['day_master'] = int(batch['day'][i]) % 10 // 2
+        charts[preset.id] = chart
+    return charts
+
+
+def active_presets(preset_ids=None):
+    presets = CompatibilityQuickPreset.objects.filter(is_active=True, birthdate__isnull=False)
+    if preset_ids:
+        presets = presets.filter(id__in=preset_ids)
+    return list(presets.order_by('sort_order', 'id'))
+
+
+def preset_pair_matrix(presets=None):
+    """Presets with their charts, and features for every ordered pair of distinct presets."""
+    presets = active_presets() if presets is None else presets
+    charts = preset_charts(presets)
+    pairs = []
+    for user in presets:
+        for target in presets:
+            if user.id == target.id or user.id not in charts or target.id not in charts:
+                continue
+            pairs.append({'user_id': user.id, 'target_id': target.id, **pair_features(charts[user.id], charts[target.id])})
+    return {
+        'presets': [
+            {'id': preset.id, 'label': preset.label, 'chart': {
+                key: value for key, value in charts[preset.id].items() if key != 'day_master'
+            }}
+            for preset in presets if preset.id in charts
+        ],
+        'pairs': pairs,
+    }
+
+
+def _run_chain(generate, user, target, report, temperature):
+    """Main report then its highlight; returns how many of the two were generated (not cached)."""
+    agent_key, context, cache_payload, highlight_category = pair_requests(user, target, report)
+    narrative, generated = generate(agent_key, context, cache_payload, temperature)
+    if not narrative:
+        return int(generated)
+    agent_key, context, cache_payload = highlight_request(narrative, user, target, highlight_category)
+    _highlight, highlight_generated = generate(agent_key, context, cache_payload, temperature)
+    return int(generated) + int(highlight_generated)
+
+
+def validate_reports(reports=None):
+    """Report keys to run (all by default); ValueError on an unknown key."""
+    reports = list(reports or PAIR_REPORTS)
+    unknown = [report for report in reports if report not in PAIR_REPORTS]
+    if unknown:
+        raise ValueError(f"알 수 없는 리포트 종류입니다: {', '.join(unknown)}")
+    return reports
+
+
+def precompute_preset_pairs(reports=None, preset_ids=None, concurrency=DEFAULT_CONCURRENCY, limit=None,
+                            temperature=DEFAULT_TEMPERATURE, progress=None):
+    """
+    Generate and cache the pair reports (and highlights) for every ordered
+    pair of active presets. Already cached requests are skipped, so reruns
+    only fill gaps. ``concurrency`` bounds parallel chains (the LLM gateway
+    applies its own per-provider limits on top); ``limit`` caps the number
+    of chains in this run. ``progress`` is called with the running summary
+    after each chain.
+    """
+    from .views import _generate_cached_narrative
+
+    reports = validate_reports(reports)
+
+    presets = active_presets(preset_ids)
+    profiles = {preset.id: page_profile(preset) for preset in presets}
+    chains = [
+        (profiles[user.id], profiles[target.id], report)
+        for user in presets for target in presets if user.id != target.id
+        for report in reports
+    ]
+    if limit:
+        chains = chains[:limit]
+
+    summary = {
+        'presets': len(presets), 'chains': len(chains), 'done': 0, 'generated': 0, 'failed': 0, 'errors': [],
+    }
+
+    def record_failure(chain, exc):
+        user, target, report = chain
+        summary['failed'] += 1
+        logger.warning('[CompatPresets] %s %s -> %s failed: %s', report, user['name'], target['name'], exc)
+        if len(summary['errors']) < MAX_REPORTED_ERRORS:
+            summary['errors'].append(f"{report} {user['name']} -> {target['name']}: {exc}")
+
+    def chain_done():
+        summary['done'] += 1
+        if progress:
+            progress(summary)
+
+    if concurrency <= 1:
+        for chain in chains:
+            try:
+                summary['generated'] += _run_chain(_generate_cached_narrative, *chain, temperature)
+            except Exception as exc:
+                record_failure(chain, exc)
+            chain_done()
+        return summary
+
+    def worker(chain):
+        try:
+            return _run_chain(_generate_cached_narrative, *chain, temperature)
+        finally:
+            # Each pool thread holds its own DB connection
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {executor.submit(worker, chain): chain for chain in chains}
+        for future in as_completed(futures):
+            try:
+                summary['generated'] += future.result()
+            except Exception as exc:
+                record_failure(futures[future], exc)
+            chain_done()
+    return summary
+
+
+def running_precompute_job():
+    """The job still in progress, if any; a running row left by a dead process is marked failed."""
+    job = CompatibilityPrecomputeJob.objects.filter(status='running').order_by('-created_at').first()
+    if job and job.updated_at < timezone.now() - timedelta(seconds=STALE_JOB_SECONDS):
+        CompatibilityPrecomputeJob.objects.filter(pk=job.pk, status='running').update(
+            status='failed', error='작업이 중단되었습니다.', finished_at=timezone.now(),
+        )
+        return None
+    return job
+
+
+def start_precompute_job(reports=None, preset_ids=None, concurrency=DEFAULT_CONCURRENCY, limit=None):
+    """
+    Record a job and run precompute_preset_pairs for it on a daemon thread.
+    Returns (job, started); when a job is already running that job is
+    returned with started=False. ValueError on unknown reports.
+    """
+    params = {
+        'reports': validate_reports(reports), 'preset_ids': preset_ids, 'concurrency': concurrency, 'limit': limit,
+    }
+    running = running_precompute_job()
+    if running:
+        return running, False
+    job = CompatibilityPrecomputeJob.objects.create(params=params)
+    threading.Thread(
+        target=_precompute_job_thread, args=(job.pk, params), name=f'compat-precompute-{job.pk}', daemon=True,
+    ).start()
+    return job, True
+
+
+def _precompute_job_thread(job_id, params):
+    try:
+        run_precompute_job(job_id, params)
+    finally:
+        connection.close()
+
+
+def run_precompute_job(job_id, params):
+    """Run one job to completion, saving the running summary on the job row."""
+    jobs = CompatibilityPrecomputeJob.objects.filter(pk=job_id)
+    lock = threading.Lock()
+
+    def progress(summary):
+        # Pool threads call this concurrently; one save at a time keeps the totals ordered
+        with lock:
+            jobs.update(summary=dict(summary, errors=list(summary['errors'])), updated_at=timezone.now())
+
+    try:
+        summary = precompute_preset_pairs(progress=progress, **params)
+    except Exception as exc:
+        logger.exception('[CompatPresets] Precompute job %s failed', job_id)
+        jobs.update(status='failed', error=str(exc), updated_at=timezone.now(), finished_at=timezone.now())
+        return
+    jobs.update(status='succeeded', summary=summary, updated_at=timezone.now(), finished_at=timezone.now())
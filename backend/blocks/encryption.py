@@ -5,6 +5,8 @@ import base64
 import os
 from cryptography.fernet import Fernet
 from decouple import config
+from django.conf import settings
+from django.utils.crypto import salted_hmac
 import logging
 
 logger = logging.getLogger(__name__)
@@ -138,4 +140,51 @@ def decrypt_mnemonic(encrypted_mnemonic: str) -> str:
 
 def is_encrypted_mnemonic(text: str) -> bool:
     """Convenience function to check if text is encrypted"""
-    return mnemonic_encryptor.is_encrypted(text)
\ No newline at end of file
+    return mnemonic_encryptor.is_encrypted(text)
+
+def _pin_lookup_secret():
+    return getattr(settings, 'KINGSTONE_PIN_LOOKUP_KEY', '') or None
+
+
+def pin_lookup_digest(username: str, pin: str) -> str:
+    """
+    Keyed HMAC of (username, PIN) used to find a wallet by PIN with one
+    indexed query. The key is KINGSTONE_PIN_LOOKUP_KEY (SECRET_KEY when
+    unset) and never stored in the database; rows store pin_lookup_key_id()
+    next to the digest so a changed key is detected per row.
+    """
+    value = f'{username}\x00{pin}'
+    return salted_hmac(
+        'blocks.KingstoneWallet.pin_lookup', value, secret=_pin_lookup_secret(), algorithm='sha256',
+    ).hexdigest()
+
+
+def pin_lookup_key_id() -> str:
+    """Short fingerprint of the current lookup key (reveals nothing about the key itself)."""
+    return salted_hmac(
+        'blocks.KingstoneWallet.pin_lookup_key_id', '', secret=_pin_lookup_secret(), algorithm='sha256',
+    ).hexdigest()[:16]
+
+
+def rebuild_pin_lookups(wallets) -> int:
+    """
+    Recompute pin_lookup (and its key id) for KingstoneWallet rows from
+    their encrypted PIN, e.g. after rotating the lookup key. Rows whose PIN
+    cannot be decrypted get '' and are backfilled at their next successful
+    PIN check. Returns the number of rows given a digest.
+    """
+    key_id = pin_lookup_key_id()
+    rebuilt = 0
+    for wallet in wallets:
+        lookup = ''
+        if wallet.pin_encrypted:
+            try:
+                lookup = pin_lookup_digest(wallet.username, decrypt_mnemonic(wallet.pin_encrypted))
+            except ValueError:
+                logger.warning("Could not decrypt PIN of Kingstone wallet %s; lookup left empty", wallet.wallet_id)
+        lookup_key_id = key_id if lookup else ''
+        if (wallet.pin_lookup, wallet.pin_lookup_key_id) != (lookup, lookup_key_id):
+            wallet.pin_lookup, wallet.pin_lookup_key_id = lookup, lookup_key_id
+            wallet.save(update_fields=['pin_lookup', 'pin_lookup_key_id'])
+        rebuilt += bool(lookup)
+    return rebuilt
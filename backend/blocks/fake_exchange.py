@@ -0,0 +1,186 @@
+"""
+Local stand-in for the exchange fee endpoints used by blocks/fee_ingest.py.
+
+Serves ``/<exchange>/...`` with the response shapes of the real APIs, so
+setting FEE_INGEST_BASE_URL to the server URL exercises the adapters end to
+end. Fees are held in ``server.fees`` (fractions, as the exchanges report
+them) and can be changed while the server runs; exchanges listed in
+``server.failing`` answer 500. With ``credentials`` ({exchange: {'key',
+'secret'[, 'passphrase']}}) requests to those exchanges must carry a valid
+signature (see fee_ingest.py) or get 401.
+
+    python -m blocks.fake_exchange 8765
+"""
+import base64
+import copy
+import hashlib
+import hmac
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+DEFAULT_FAKE_FEES = {
+    'upbit': {'trading': {'btc': '0.0005', 'usdt': '0.0001'}, 'withdrawal': {'onchain': '0.0002'}},
+    'bithumb': {'trading': {'btc': '0.0004', 'usdt': '0.0004'}, 'withdrawal': {'onchain': '0.0002'}},
+    'binance': {'trading': {'btc': '0.001'}, 'withdrawal': {'onchain': '0.00003', 'lightning': '0.000001'}},
+    'okx': {'trading': {'btc': '0.001'}, 'withdrawal': {'onchain': '0.00001', 'lightning': '0.00001'}},
+}
+
+
+def _upbit_style(fees, path, query):
+    if path == '/v1/orders/chance':
+        market = (query.get('market') or [''])[0].split('-')[-1].lower()
+        fee = fees['trading'].get(market)
+        if fee is None:
+            return None
+        return {'bid_fee': fee, 'ask_fee': fee, 'market': {'id': f'KRW-{market.upper()}'}}
+    if path == '/v1/withdraws/chance':
+        return {'currency': {'code': 'BTC', 'withdraw_fee': fees['withdrawal']['onchain']}}
+    return None
+
+
+def _binance(fees, path, query):
+    if path == '/sapi/v1/asset/tradeFee':
+        fee = fees['trading']['btc']
+        return [{'symbol': 'BTCUSDT', 'makerCommission': fee, 'takerCommission': fee}]
+    if path == '/sapi/v1/capital/config/getall':
+        names = {'onchain': 'BTC', 'lightning': 'LIGHTNING'}
+        return [{
+            'coin': 'BTC',
+            'networkList': [
+                {'network': names[kind], 'withdrawFee': fee} for kind, fee in fees['withdrawal'].items()
+            ],
+        }]
+    return None
+
+
+def _okx(fees, path, query):
+    if path == '/api/v5/account/trade-fee':
+        fee = f"-{fees['trading']['btc']}"
+        return {'code': '0', 'data': [{'instType': 'SPOT', 'maker': fee, 'taker': fee}]}
+    if path == '/api/v5/asset/currencies':
+        chains = {'onchain': 'BTC-Bitcoin', 'lightning': 'BTC-Lightning'}
+        return {'code': '0', 'data': [
+            {'ccy': 'BTC', 'chain': chains[kind], 'minFee': fee} for kind, fee in fees['withdrawal'].items()
+        ]}
+    return None
+
+
+_RESPONDERS = {'upbit': _upbit_style, 'bithumb': _upbit_style, 'binance': _binance, 'okx': _okx}
+
+
+def _hmac_sha256(secret, message):
+    return hmac.new(secret.encode('utf-8'), message.encode('utf-8'), hashlib.sha256)
+
+
+def _b64url_decode(segment):
+    return base64.urlsafe_b64decode(segment + '=' * (-len(segment) % 4))
+
+
+def _upbit_style_signed(credentials, headers, path, query):
+    token = (headers.get('Authorization') or '').removeprefix('Bearer ')
+    try:
+        header, payload, signature = token.split('.')
+        claims = json.loads(_b64url_decode(payload))
+    except ValueError:
+        return False
+    expected = _hmac_sha256(credentials['secret'], f'{header}.{payload}').digest()
+    query_hash = hashlib.sha512(unquote(query).encode('utf-8')).hexdigest() if query else None
+    return (
+        hmac.compare_digest(_b64url_decode(signature), expected)
+        and claims.get('access_key') == credentials['key']
+        and claims.get('query_hash') == query_hash
+    )
+
+
+def _binance_signed(credentials, headers, path, query):
+    unsigned, _, signature = query.rpartition('&signature=')
+    return (
+        headers.get('X-MBX-APIKEY') == credentials['key']
+        and 'timestamp=' in unsigned
+        and hmac.compare_digest(signature, _hmac_sha256(credentials['secret'], unsigned).hexdigest())
+    )
+
+
+def _okx_signed(credentials, headers, path, query):
+    request_path = f'{path}?{query}' if query else path
+    message = f"{headers.get('OK-ACCESS-TIMESTAMP', '')}GET{request_path}"
+    expected = base64.b64encode(_hmac_sha256(credentials['secret'], message).digest()).decode('ascii')
+    return (
+        headers.get('OK-ACCESS-KEY') == credentials['key']
+        and headers.get('OK-ACCESS-PASSPHRASE') == credentials['passphrase']
+        and hmac.compare_digest(headers.get('OK-ACCESS-SIGN', ''), expected)
+    )
+
+
+_VERIFIERS = {
+    'upbit': _upbit_style_signed, 'bithumb': _upbit_style_signed, 'binance': _binance_signed, 'okx': _okx_signed,
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        exchange, _, rest = url.path.lstrip('/').partition('/')
+        server = self.server
+        if exchange in server.failing:
+            return self._send(500, {'error': 'unavailable'})
+        credentials = server.credentials.get(exchange)
+        if credentials and not _VERIFIERS[exchange](credentials, self.headers, '/' + rest, url.query):
+            return self._send(401, {'error': 'invalid signature'})
+        responder = _RESPONDERS.get(exchange)
+        with server.lock:
+            fees = copy.deepcopy(server.fees.get(exchange))
+        body = responder(fees, '/' + rest, parse_qs(url.query)) if responder and fees else None
+        if body is None:
+            return self._send(404, {'error': 'not found'})
+        self._send(200, body)
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeExchangeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, fees=None, credentials=None):
+        super().__init__(('127.0.0.1', port), _Handler)
+        self.fees = copy.deepcopy(fees or DEFAULT_FAKE_FEES)
+        self.credentials = dict(credentials or {})
+        self.failing = set()
+        self.lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def set_fee(self, exchange, kind, key, value):
+        with self.lock:
+            self.fees[exchange][kind][key] = value
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == '__main__':
+    server = FakeExchangeServer(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8765)
+    print(f'Fake exchange fees at {server.url} (set FEE_INGEST_BASE_URL)')
+    server.serve_forever()
@@ -0,0 +1,205 @@
+"""
+Local mock of the OpenAI and Gemini HTTP APIs used by blocks/llm_gateway.py.
+
+Point OPENAI_API_BASE at ``<url>/v1`` and GEMINI_API_BASE at ``<url>`` and
+every gateway call lands here. Replies echo the user prompt unless
+``server.reply`` is set; ``server.fail(provider, status, times)`` queues
+error responses and ``server.delay`` slows every answer. Received request
+bodies are kept in ``server.requests`` as (provider, path, body). A system
+prompt seen before (per prompt_cache_key for OpenAI) is reported back as
+cached prompt tokens, roughly like the providers' prefix caches.
+
+Streaming requests (OpenAI ``stream: true``, Gemini ``streamGenerateContent``)
+get the reply as SSE, one word per event. If ``server.stream_gate`` is a
+threading.Event, the stream stops after the first event until it is set.
+
+    python -m blocks.fake_llm 8766
+"""
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            return self._send(400, {'error': {'message': 'invalid JSON'}})
+
+        if self.path.startswith('/v1/'):
+            provider = 'openai'
+        elif self.path.startswith('/v1beta/models/'):
+            provider = 'gemini'
+        else:
+            return self._send(404, {'error': {'message': 'not found'}})
+
+        with server.lock:
+            server.requests.append((provider, self.path, body))
+            failures = server.failures.get(provider)
+            status = failures.pop(0) if failures else None
+        if server.delay:
+            time.sleep(server.delay)
+        if status:
+            return self._send(status, {'error': {'code': status, 'message': 'mock failure'}})
+
+        if body.get('stream') or ':streamGenerateContent' in self.path:
+            return self._stream(provider, body)
+        if provider == 'openai' and self.path == '/v1/chat/completions':
+            prompt = body['messages'][-1]['content']
+            system = body['messages'][0]['content'] if len(body['messages']) > 1 else ''
+            cached = server.cached_prefix(body.get('prompt_cache_key'), system)
+            text = server.reply_for(prompt)
+            return self._send(200, {
+                'model': body.get('model'),
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}}],
+                'usage': {
+                    'prompt_tokens': len(system.split()) + len(prompt.split()),
+                    'prompt_tokens_details': {'cached_tokens': cached},
+                    'completion_tokens': len(text.split()),
+                },
+            })
+        if provider == 'openai' and self.path == '/v1/responses':
+            prompt = body.get('input', '')
+            text = server.reply_for(prompt)
+            return self._send(200, {
+                'model': body.get('model'),
+                'output': [{'type': 'message', 'content': [{'type': 'output_text', 'text': text}]}],
+                'usage': {'input_tokens': len(prompt.split()), 'output_tokens': len(text.split())},
+            })
+        if provider == 'gemini' and self.path.endswith(':generateContent'):
+            prompt = body['contents'][-1]['parts'][0]['text']
+            system = ((body.get('systemInstruction') or {}).get('parts') or [{}])[0].get('text', '')
+            cached = server.cached_prefix(None, system)
+            text = server.reply_for(prompt)
+            model = self.path[len('/v1beta/models/'):-len(':generateContent')]
+            return self._send(200, {
+                'modelVersion': model,
+                'candidates': [{'content': {'role': 'model', 'parts': [{'text': text}]}}],
+                'usageMetadata': {
+                    'promptTokenCount': len(system.split()) + len(prompt.split()),
+                    'cachedContentTokenCount': cached,
+                    'candidatesTokenCount': len(text.split()),
+                },
+            })
+        return self._send(404, {'error': {'message': 'not found'}})
+
+    def _stream(self, provider, body):
+        server = self.server
+        if provider == 'gemini':
+            model = self.path[len('/v1beta/models/'):].split(':', 1)[0]
+            prompt = body['contents'][-1]['parts'][0]['text']
+            text = server.reply_for(prompt)
+            events = [
+                {'modelVersion': model, 'candidates': [{'content': {'role': 'model', 'parts': [{'text': word}]}}]}
+                for word in _words(text)
+            ]
+            events[-1]['usageMetadata'] = {
+                'promptTokenCount': len(prompt.split()), 'candidatesTokenCount': len(text.split()),
+            }
+        elif self.path == '/v1/responses':
+            prompt = body.get('input', '')
+            text = server.reply_for(prompt)
+            events = [{'type': 'response.output_text.delta', 'delta': word} for word in _words(text)]
+            events.append({'type': 'response.completed', 'response': {
+                'model': body.get('model'),
+                'usage': {'input_tokens': len(prompt.split()), 'output_tokens': len(text.split())},
+            }})
+        else:
+            prompt = body['messages'][-1]['content']
+            text = server.reply_for(prompt)
+            events = [
+                {'model': body.get('model'), 'choices': [{'index': 0, 'delta': {'content': word}}]}
+                for word in _words(text)
+            ]
+            if (body.get('stream_options') or {}).get('include_usage'):
+                events.append({'model': body.get('model'), 'choices': [], 'usage': {
+                    'prompt_tokens': len(prompt.split()), 'completion_tokens': len(text.split()),
+                }})
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        for i, event in enumerate(events):
+            if i == 1 and server.stream_gate is not None:
+                server.stream_gate.wait(10)
+            self.wfile.write(f'data: {json.dumps(event, ensure_ascii=False)}\n\n'.encode('utf-8'))
+            self.wfile.flush()
+        if provider == 'openai':
+            self.wfile.write(b'data: [DONE]\n\n')
+
+    def _send(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _words(text):
+    """Split text into stream chunks that join back to the original."""
+    words = text.split(' ')
+    return [word + ' ' for word in words[:-1]] + [words[-1]]
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0):
+        super().__init__(('127.0.0.1', port), _Handler)
+        self.lock = threading.Lock()
+        self.requests = []
+        self.failures = {}
+        self.reply = None
+        self.delay = 0.0
+        self.prefixes = set()
+        self.stream_gate = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def reply_for(self, prompt):
+        if callable(self.reply):
+            return self.reply(prompt)
+        return self.reply if self.reply is not None else f'echo: {prompt}'
+
+    def cached_prefix(self, cache_key, system):
+        """Token count of ``system`` if it was sent before under the same key, else 0 (and remember it)."""
+        if not system:
+            return 0
+        with self.lock:
+            if (cache_key, system) in self.prefixes:
+                return len(system.split())
+            self.prefixes.add((cache_key, system))
+        return 0
+
+    def fail(self, provider, status, times=1):
+        with self.lock:
+            self.failures.setdefault(provider, []).extend([status] * times)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == '__main__':
+    server = FakeLLMServer(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8766)
+    print(f'Fake LLM APIs at {server.url} (OPENAI_API_BASE={server.url}/v1, GEMINI_API_BASE={server.url})')
+    server.serve_forever()
@@ -0,0 +1,359 @@
+"""
+Fee ingestion: pull trading and withdrawal fees from exchanges and write the
+ones that changed to Route, ExchangeRate and WithdrawalFee.
+
+Each exchange has an adapter ``fetch(base_url, timeout)`` that returns
+normalized quotes:
+
+    {'exchange': 'upbit', 'kind': 'trading', 'market': 'btc', 'fee_rate': Decimal('0.05')}
+    {'exchange': 'okx', 'kind': 'withdrawal', 'withdrawal_type': 'onchain', 'fee_btc': Decimal('0.00001')}
+
+fee_rate is a percentage, as stored on Route/ExchangeRate. Adapters run
+concurrently and only do HTTP; the diff and the writes happen afterwards on
+the caller's thread in one transaction. Rows flagged ``is_event`` hold
+admin-set promotional fees and are never overwritten.
+
+Every endpoint used here is private, so requests are signed with the
+exchange's API key from settings (read-only keys are enough):
+
+    upbit    UPBIT_ACCESS_KEY / UPBIT_SECRET_KEY        JWT (HS256) with a SHA512 query hash
+    bithumb  BITHUMB_ACCESS_KEY / BITHUMB_SECRET_KEY    same JWT scheme plus a timestamp
+    binance  BINANCE_API_KEY / BINANCE_API_SECRET       HMAC-SHA256 ``signature`` query parameter
+    okx      OKX_API_KEY / OKX_API_SECRET / OKX_API_PASSPHRASE
+                                                        base64 HMAC-SHA256 OK-ACCESS-SIGN header
+
+An exchange without keys is reported in ``errors`` and skipped.
+
+FEE_INGEST_BASE_URL (settings) points every adapter at ``<base>/<exchange>``
+instead of the real API, e.g. the stand-in in blocks/fake_exchange.py; there
+unsigned requests are allowed when no keys are configured.
+"""
+import base64
+import concurrent.futures
+import hashlib
+import hmac
+import json
+import logging
+import time
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+from urllib.parse import unquote, urlencode
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ExchangeRate, Route, WithdrawalFee
+from .routing_graph import bump_routing_graph_version
+
+logger = logging.getLogger(__name__)
+
+FEE_INGEST_TIMEOUT = 10
+FEE_INGEST_WORKERS = 4
+FEE_RATE_QUANTUM = Decimal('0.0001')
+FEE_BTC_QUANTUM = Decimal('0.00000001')
+
+EXCHANGE_API_BASES = {
+    'upbit': 'https://api.upbit.com',
+    'bithumb': 'https://api.bithumb.com',
+    'binance': 'https://api.binance.com',
+    'okx': 'https://www.okx.com',
+}
+
+# (exchange, market) -> trading route (source, destination) and ExchangeRate.exchange
+TRADING_ROUTES = {
+    ('upbit', 'btc'): (('user', 'upbit_btc'), 'upbit_btc'),
+    ('upbit', 'usdt'): (('user', 'upbit_usdt'), 'upbit_usdt'),
+    ('bithumb', 'btc'): (('user', 'bithumb_btc'), 'bithumb'),
+    ('bithumb', 'usdt'): (('user', 'bithumb_usdt'), None),
+    ('binance', 'btc'): (('binance_usdt', 'binance_btc'), 'binance'),
+    ('okx', 'btc'): (('okx_usdt', 'okx_btc'), 'okx'),
+}
+
+
+def _fee_decimal(value, quantum):
+    try:
+        return abs(Decimal(str(value))).quantize(quantum)
+    except (InvalidOperation, TypeError, ValueError):
+        raise ValueError(f'invalid fee value: {value!r}')
+
+
+def _percent(fraction):
+    """Exchanges report 0.0005 for 0.05%."""
+    return _fee_decimal(Decimal(str(fraction)) * 100, FEE_RATE_QUANTUM)
+
+
+def _b64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def upbit_jwt(access_key, secret_key, query='', **claims):
+    """Upbit/Bithumb bearer token: HS256 JWT carrying the SHA512 hash of the (unquoted) query string."""
+    payload = {'access_key': access_key, 'nonce': str(uuid.uuid4()), **claims}
+    if query:
+        payload['query_hash'] = hashlib.sha512(unquote(query).encode('utf-8')).hexdigest()
+        payload['query_hash_alg'] = 'SHA512'
+    segments = [
+        _b64url(json.dumps(part, separators=(',', ':')).encode('utf-8'))
+        for part in ({'alg': 'HS256', 'typ': 'JWT'}, payload)
+    ]
+    signing_input = '.'.join(segments).encode('ascii')
+    signature = hmac.new(secret_key.encode('utf-8'), signing_input, hashlib.sha256).digest()
+    return '.'.join(segments + [_b64url(signature)])
+
+
+def _sign_upbit(credentials, path, query):
+    return query, {'Authorization': f"Bearer {upbit_jwt(credentials['key'], credentials['secret'], query)}"}
+
+
+def _sign_bithumb(credentials, path, query):
+    token = upbit_jwt(credentials['key'], credentials['secret'], query, timestamp=int(time.time() * 1000))
+    return query, {'Authorization': f'Bearer {token}'}
+
+
+def _sign_binance(credentials, path, query):
+    query = '&'.join(filter(None, [query, f'timestamp={int(time.time() * 1000)}']))
+    signature = hmac.new(credentials['secret'].encode('utf-8'), query.encode('utf-8'), hashlib.sha256).hexdigest()
+    return f'{query}&signature={signature}', {'X-MBX-APIKEY': credentials['key']}
+
+
+def okx_signature(secret, timestamp, method, request_path, body=''):
+    message = f'{timestamp}{method.upper()}{request_path}{body}'.encode('utf-8')
+    return base64.b64encode(hmac.new(secret.encode('utf-8'), message, hashlib.sha256).digest()).decode('ascii')
+
+
+def _sign_okx(credentials, path, query):
+    now = datetime.now(dt_timezone.utc)
+    timestamp = now.strftime('%Y-%m-%dT%H:%M:%S.') + f'{now.microsecond // 1000:03d}Z'
+    request_path = f'{path}?{query}' if query else path
+    return query, {
+        'OK-ACCESS-KEY': credentials['key'],
+        'OK-ACCESS-SIGN': okx_signature(credentials['secret'], timestamp, 'GET', request_path),
+        'OK-ACCESS-TIMESTAMP': timestamp,
+        'OK-ACCESS-PASSPHRASE': credentials['passphrase'],
+    }
+
+
+# exchange -> (settings names for key, secret[, passphrase], signer(credentials, path, query) -> (query, headers))
+EXCHANGE_AUTH = {
+    'upbit': (('UPBIT_ACCESS_KEY', 'UPBIT_SECRET_KEY'), _sign_upbit),
+    'bithumb': (('BITHUMB_ACCESS_KEY', 'BITHUMB_SECRET_KEY'), _sign_bithumb),
+    'binance': (('BINANCE_API_KEY', 'BINANCE_API_SECRET'), _sign_binance),
+    'okx': (('OKX_API_KEY', 'OKX_API_SECRET', 'OKX_API_PASSPHRASE'), _sign_okx),
+}
+
+
+def exchange_credentials(exchange):
+    """{'key', 'secret'[, 'passphrase']} from settings, or None when any of them is missing."""
+    names, _ = EXCHANGE_AUTH[exchange]
+    values = [getattr(settings, name, '') or '' for name in names]
+    if not all(values):
+        return None
+    return dict(zip(('key', 'secret', 'passphrase'), values))
+
+
+def _get_json(exchange, base_url, path, params=None, timeout=FEE_INGEST_TIMEOUT):
+    """Signed GET of ``base_url + path``; the query string is built once so the signature covers it exactly."""
+    query = urlencode(params or {})
+    headers = {}
+    credentials = exchange_credentials(exchange)
+    if credentials is not None:
+        query, headers = EXCHANGE_AUTH[exchange][1](credentials, path, query)
+    elif not getattr(settings, 'FEE_INGEST_BASE_URL', ''):
+        raise ValueError(f'{exchange} API 키가 설정되지 않았습니다.')
+    resp = requests.get(f'{base_url}{path}?{query}' if query else f'{base_url}{path}', headers=headers, timeout=timeout)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def _fetch_upbit_style(exchange, base_url, timeout):
+    """Upbit and Bithumb (v1) share the orders/withdraws 'chance' endpoints."""
+    quotes = []
+    for market in ('btc', 'usdt'):
+        data = _get_json(exchange, base_url, '/v1/orders/chance', {'market': f'KRW-{market.upper()}'}, timeout)
+        quotes.append({
+            'exchange': exchange, 'kind': 'trading', 'market': market,
+            'fee_rate': _percent(max(Decimal(str(data['bid_fee'])), Decimal(str(data['ask_fee'])))),
+        })
+    data = _get_json(exchange, base_url, '/v1/withdraws/chance', {'currency': 'BTC', 'net_type': 'BTC'}, timeout)
+    quotes.append({
+        'exchange': exchange, 'kind': 'withdrawal', 'withdrawal_type': 'onchain',
+        'fee_btc': _fee_decimal(data['currency']['withdraw_fee'], FEE_BTC_QUANTUM),
+    })
+    return quotes
+
+
+def fetch_upbit_fees(base_url, timeout=FEE_INGEST_TIMEOUT):
+    return _fetch_upbit_style('upbit', base_url, timeout)
+
+
+def fetch_bithumb_fees(base_url, timeout=FEE_INGEST_TIMEOUT):
+    return _fetch_upbit_style('bithumb', base_url, timeout)
+
+
+def fetch_binance_fees(base_url, timeout=FEE_INGEST_TIMEOUT):
+    quotes = []
+    data = _get_json('binance', base_url, '/sapi/v1/asset/tradeFee', {'symbol': 'BTCUSDT'}, timeout)
+    quotes.append({
+        'exchange': 'binance', 'kind': 'trading', 'market': 'btc',
+        'fee_rate': _percent(data[0]['takerCommission']),
+    })
+    coins = _get_json('binance', base_url, '/sapi/v1/capital/config/getall', timeout=timeout)
+    networks = next((c.get('networkList') or [] for c in coins if c.get('coin') == 'BTC'), [])
+    for network in networks:
+        withdrawal_type = {'BTC': 'onchain', 'LIGHTNING': 'lightning'}.get(network.get('network'))
+        if withdrawal_type:
+            quotes.append({
+                'exchange': 'binance', 'kind': 'withdrawal', 'withdrawal_type': withdrawal_type,
+                'fee_btc': _fee_decimal(network['withdrawFee'], FEE_BTC_QUANTUM),
+            })
+    return quotes
+
+
+def fetch_okx_fees(base_url, timeout=FEE_INGEST_TIMEOUT):
+    quotes = []
+    data = _get_json(
+        'okx', base_url, '/api/v5/account/trade-fee', {'instType': 'SPOT', 'instId': 'BTC-USDT'}, timeout
+    )
+    # OKX reports charged fees as negative numbers
+    quotes.append({
+        'exchange': 'okx', 'kind': 'trading', 'market': 'btc',
+        'fee_rate': _percent(data['data'][0]['taker']),
+    })
+    data = _get_json('okx', base_url, '/api/v5/asset/currencies', {'ccy': 'BTC'}, timeout)
+    for chain in data.get('data') or []:
+        withdrawal_type = {'BTC-Bitcoin': 'onchain', 'BTC-Lightning': 'lightning'}.get(chain.get('chain'))
+        if withdrawal_type:
+            quotes.append({
+                'exchange': 'okx', 'kind': 'withdrawal', 'withdrawal_type': withdrawal_type,
+                'fee_btc': _fee_decimal(chain['minFee'], FEE_BTC_QUANTUM),
+            })
+    return quotes
+
+
+FEE_ADAPTERS = {
+    'upbit': fetch_upbit_fees,
+    'bithumb': fetch_bithumb_fees,
+    'binance': fetch_binance_fees,
+    'okx': fetch_okx_fees,
+}
+
+
+def _exchange_base_url(exchange):
+    override = (getattr(settings, 'FEE_INGEST_BASE_URL', '') or '').rstrip('/')
+    if override:
+        return f'{override}/{exchange}'
+    return EXCHANGE_API_BASES[exchange]
+
+
+def fetch_exchange_fees(exchanges=None, timeout=FEE_INGEST_TIMEOUT):
+    """Run the adapters concurrently. Returns (quotes, errors by exchange)."""
+    exchanges = list(exchanges or FEE_ADAPTERS)
+    unknown = [name for name in exchanges if name not in FEE_ADAPTERS]
+    if unknown:
+        raise ValueError(f'지원하지 않는 거래소입니다: {", ".join(unknown)}')
+
+    quotes = []
+    errors = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=FEE_INGEST_WORKERS) as executor:
+        futures = {
+            executor.submit(FEE_ADAPTERS[name], _exchange_base_url(name), timeout): name
+            for name in exchanges
+        }
+        for future in concurrent.futures.as_completed(futures):
+            name = futures[future]
+            try:
+                quotes.extend(future.result())
+            except Exception as exc:
+                logger.warning('Fee ingestion failed for %s: %s', name, exc)
+                errors[name] = str(exc)
+    return quotes, errors
+
+
+def _planned_updates(quotes):
+    """Split quotes into target field values per table."""
+    route_fees = {}  # (source, destination, route_type) -> {field: value}
+    exchange_rates = {}
+    withdrawal_fees = {}
+    for quote in quotes:
+        exchange = quote['exchange']
+        if quote['kind'] == 'trading':
+            target = TRADING_ROUTES.get((exchange, quote['market']))
+            if target is None:
+                continue
+            (source, destination), rate_key = target
+            route_fees[(source, destination, 'trading')] = {'fee_rate': quote['fee_rate']}
+            if rate_key:
+                exchange_rates[rate_key] = quote['fee_rate']
+        else:
+            route_type = f"withdrawal_{quote['withdrawal_type']}"
+            route_fees[(f'{exchange}_btc', None, route_type)] = {
+                'fee_fixed': quote['fee_btc'], 'fee_fixed_currency': 'BTC',
+            }
+            withdrawal_fees[(exchange, quote['withdrawal_type'])] = quote['fee_btc']
+    return route_fees, exchange_rates, withdrawal_fees
+
+
+def apply_fee_quotes(quotes):
+    """
+    Write the quoted fees that differ from the database and, if any route
+    changed, bump the shared routing graph version, all in one transaction.
+    Returns changed-row counts.
+    """
+    route_fees, exchange_rates, withdrawal_fees = _planned_updates(quotes)
+    now = timezone.now()
+    changed_routes = []
+    changed_rates = []
+    changed_withdrawals = []
+    with transaction.atomic():
+        sources = {source for source, _, _ in route_fees}
+        routes = Route.objects.filter(source__service__in=sources).select_related('source', 'destination')
+        for route in routes:
+            values = (
+                route_fees.get((route.source.service, route.destination.service, route.route_type))
+                or route_fees.get((route.source.service, None, route.route_type))
+            )
+            if values is None or route.is_event:
+                continue
+            if any(getattr(route, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(route, field, value)
+                route.updated_at = now
+                changed_routes.append(route)
+        Route.objects.bulk_update(changed_routes, ['fee_rate', 'fee_fixed', 'fee_fixed_currency', 'updated_at'])
+
+        for rate in ExchangeRate.objects.filter(exchange__in=exchange_rates, is_event=False):
+            if rate.fee_rate != exchange_rates[rate.exchange]:
+                rate.fee_rate = exchange_rates[rate.exchange]
+                rate.updated_at = now
+                changed_rates.append(rate)
+        ExchangeRate.objects.bulk_update(changed_rates, ['fee_rate', 'updated_at'])
+
+        for fee in WithdrawalFee.objects.filter(exchange__in={exchange for exchange, _ in withdrawal_fees}):
+            value = withdrawal_fees.get((fee.exchange, fee.withdrawal_type))
+            if value is not None and fee.fee_btc != value:
+                fee.fee_btc = value
+                fee.updated_at = now
+                changed_withdrawals.append(fee)
+        WithdrawalFee.objects.bulk_update(changed_withdrawals, ['fee_btc', 'updated_at'])
+
+        # Recorded in the same transaction, so web workers see the new version together with the fees
+        if changed_routes:
+            bump_routing_graph_version([
+                {'op': 'upsert_route', 'route': route.as_dict()} for route in changed_routes
+            ])
+    return {
+        'routes': len(changed_routes),
+        'exchange_rates': len(changed_rates),
+        'withdrawal_fees': len(changed_withdrawals),
+    }
+
+
+def ingest_exchange_fees(exchanges=None, timeout=FEE_INGEST_TIMEOUT):
+    """Fetch fees from every adapter and apply the changes."""
+    quotes, errors = fetch_exchange_fees(exchanges, timeout=timeout)
+    changes = apply_fee_quotes(quotes)
+    logger.info('Fee ingestion: %s quotes, changes=%s, errors=%s', len(quotes), changes, errors)
+    return {'quotes': len(quotes), 'changes': changes, 'errors': errors}
@@ -0,0 +1,519 @@
+"""
+Single entry point for LLM calls (OpenAI and Gemini).
+
+chat() sends one system + user prompt through an ordered list of providers
+and returns
+
+    {'text': ..., 'provider': 'openai', 'model': ..., 'latency_ms': ..., 'usage': {...}}
+
+Per provider the gateway keeps:
+
+* a pooled requests.Session (keep-alive connections reused across calls);
+* a concurrency semaphore (LLM_MAX_CONCURRENCY in-flight calls);
+* a token bucket (LLM_RATE_PER_MINUTE requests, bursting to the same number);
+* a circuit breaker that opens after LLM_CIRCUIT_FAILURES consecutive
+  429/5xx/timeout failures and lets one trial call through after
+  LLM_CIRCUIT_RESET_SECONDS.
+
+A retryable failure (those above, an open circuit, a missing API key) moves
+on to the next provider in the route; anything else is raised immediately.
+llm_metrics() reports call counts, latency and token usage per provider.
+
+Prompts are laid out static-first: the system prompt leads every request
+(OpenAI messages[0], Responses input prefix, Gemini systemInstruction) and
+only the user prompt varies, so the providers' automatic prefix caches can
+reuse it. OpenAI requests also carry a prompt_cache_key (the caller's
+cache_key, else a hash of the system prompt) that routes same-prefix calls
+to the same cache; cached prompt tokens are counted in the metrics.
+
+chat_json_batch() runs one instruction over many inputs as a single JSON
+request (split into chunks of LLM_BATCH_SIZE items) and returns one result
+per input.
+
+The callers are synchronous Django views, so the pool is thread-based
+(requests + urllib3) rather than an asyncio client. Token streams, which
+must not block the ASGI event loop, run on httpx in blocks/llm_stream.py
+and pass through the same limits, breaker and metrics via stream_slot(). blocks/fake_llm.py
+serves both provider APIs locally for tests (OPENAI_API_BASE /
+GEMINI_API_BASE).
+"""
+import contextlib
+import hashlib
+import json
+import logging
+import threading
+import time
+
+import httpx
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 90
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_RATE_PER_MINUTE = 120
+DEFAULT_CIRCUIT_FAILURES = 3
+DEFAULT_CIRCUIT_RESET_SECONDS = 30
+# How long a call may wait for a concurrency slot or a rate-limit token
+DEFAULT_QUEUE_TIMEOUT = 30
+DEFAULT_BATCH_SIZE = 20
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+PROVIDER_LABELS = {'openai': 'OpenAI', 'gemini': 'Gemini'}
+
+
+class LLMError(Exception):
+    """A provider call failed. ``status`` is the HTTP status when there was one."""
+
+    def __init__(self, message, provider=None, status=None, retryable=False):
+        super().__init__(message)
+        self.provider = provider
+        self.status = status
+        self.retryable = retryable
+
+
+class _TokenBucket:
+    def __init__(self, rate_per_minute):
+        self.capacity = max(1.0, float(rate_per_minute))
+        self.refill_per_second = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return True
+                wait = (1.0 - self.tokens) / self.refill_per_second
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class _CircuitBreaker:
+    def __init__(self, failure_threshold, reset_seconds):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_seconds:
+                # Half-open: let one trial call through; a failure re-opens the circuit
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+    @property
+    def state(self):
+        return 'closed' if self.opened_at is None else 'open'
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+_metrics_lock = threading.Lock()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _provider_state(provider):
+    with _providers_lock:
+        state = _providers.get(provider)
+        if state is None:
+            concurrency = int(_setting('LLM_MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY))
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            state = {
+                'session': session,
+                'semaphore': threading.BoundedSemaphore(concurrency),
+                'bucket': _TokenBucket(_setting('LLM_RATE_PER_MINUTE', DEFAULT_RATE_PER_MINUTE)),
+                'breaker': _CircuitBreaker(
+                    int(_setting('LLM_CIRCUIT_FAILURES', DEFAULT_CIRCUIT_FAILURES)),
+                    float(_setting('LLM_CIRCUIT_RESET_SECONDS', DEFAULT_CIRCUIT_RESET_SECONDS)),
+                ),
+                'metrics': {
+                    'calls': 0, 'errors': 0, 'rejected': 0, 'latency_ms_total': 0.0, 'last_latency_ms': None,
+                    'prompt_tokens': 0, 'cached_prompt_tokens': 0, 'completion_tokens': 0,
+                },
+            }
+            _providers[provider] = state
+        return state
+
+
+def provider_session(provider):
+    """Pooled HTTP session for a provider."""
+    return _provider_state(provider)['session']
+
+
+def reset_llm_gateway():
+    """Drop sessions, limits, breakers and metrics (tests, settings changes)."""
+    with _providers_lock:
+        for state in _providers.values():
+            state['session'].close()
+        _providers.clear()
+
+
+def llm_metrics():
+    """Per-provider counters: calls, errors, rejected, latency and tokens, circuit state."""
+    with _providers_lock:
+        states = dict(_providers)
+    report = {}
+    for provider, state in states.items():
+        with _metrics_lock:
+            metrics = dict(state['metrics'])
+        calls = metrics['calls']
+        metrics['avg_latency_ms'] = round(metrics['latency_ms_total'] / calls, 1) if calls else None
+        metrics['circuit'] = state['breaker'].state
+        report[provider] = metrics
+    return report
+
+
+def _raise_for_status(provider, response):
+    if response.status_code < 400:
+        return
+    label = PROVIDER_LABELS.get(provider, provider)
+    raise LLMError(
+        f'{label} API 오류 ({response.status_code}): {response.text}',
+        provider=provider,
+        status=response.status_code,
+        retryable=response.status_code in RETRYABLE_STATUSES,
+    )
+
+
+def _openai_request(session, model, system_prompt, user_prompt, options, timeout):
+    api_key = _setting('OPENAI_API_KEY', '')
+    if not api_key:
+        raise LLMError('OPENAI_API_KEY is not configured.', provider='openai', retryable=True)
+    base_url = _setting('OPENAI_API_BASE', 'https://api.openai.com/v1').rstrip('/')
+    headers = {'Authorization': f'Bearer {api_key}', 'Content-Type': 'application/json'}
+
+    if 'gpt-5' in model.lower():
+        # GPT-5 계열: Responses API (model + input only; sampling options are not supported)
+        response = session.post(
+            f'{base_url}/responses', headers=headers, timeout=timeout,
+            json={
+                'model': model, 'input': f'{system_prompt}\n\n{user_prompt}',
+                'prompt_cache_key': options['cache_key'],
+            },
+        )
+        _raise_for_status('openai', response)
+        data = response.json()
+        text = None
+        for item in data.get('output') or []:
+            if item.get('type') != 'message':
+                continue
+            for content in item.get('content') or []:
+                if content.get('type') == 'output_text':
+                    text = content.get('text', '')
+                    break
+            break
+        if text is None:
+            raise LLMError('Responses API 응답에서 텍스트를 찾을 수 없습니다.', provider='openai')
+        usage = data.get('usage') or {}
+        return text, data.get('model') or model, {
+            'prompt_tokens': usage.get('input_tokens', 0),
+            'cached_tokens': (usage.get('input_tokens_details') or {}).get('cached_tokens', 0),
+            'completion_tokens': usage.get('output_tokens', 0),
+        }
+
+    payload = {
+        'model': model,
+        'messages': [
+            {'role': 'system', 'content': system_prompt},
+            {'role': 'user', 'content': user_prompt},
+        ],
+        'prompt_cache_key': options['cache_key'],
+    }
+    for key in ('temperature', 'top_p', 'presence_penalty', 'frequency_penalty', 'max_tokens'):
+        if options.get(key) is not None:
+            payload[key] = options[key]
+    if options.get('json_mode'):
+        payload['response_format'] = {'type': 'json_object'}
+    response = session.post(f'{base_url}/chat/completions', headers=headers, json=payload, timeout=timeout)
+    _raise_for_status('openai', response)
+    data = response.json()
+    choices = data.get('choices') or []
+    if not choices:
+        raise LLMError('OpenAI 응답이 비어 있습니다.', provider='openai')
+    usage = data.get('usage') or {}
+    return (choices[0].get('message') or {}).get('content') or '', data.get('model') or model, {
+        'prompt_tokens': usage.get('prompt_tokens', 0),
+        'cached_tokens': (usage.get('prompt_tokens_details') or {}).get('cached_tokens', 0),
+        'completion_tokens': usage.get('completion_tokens', 0),
+    }
+
+
+def _gemini_request(session, model, system_prompt, user_prompt, options, timeout):
+    api_key = _setting('GEMINI_API_KEY', '')
+    if not api_key:
+        raise LLMError('GEMINI_API_KEY is not configured.', provider='gemini', retryable=True)
+    base_url = _setting('GEMINI_API_BASE', 'https://generativelanguage.googleapis.com').rstrip('/')
+    generation_config = {}
+    if options.get('temperature') is not None:
+        generation_config['temperature'] = options['temperature']
+    if options.get('top_p') is not None:
+        generation_config['topP'] = options['top_p']
+    if options.get('max_tokens') is not None:
+        generation_config['maxOutputTokens'] = options['max_tokens']
+    if options.get('json_mode'):
+        generation_config['responseMimeType'] = 'application/json'
+    payload = {
+        'systemInstruction': {'parts': [{'text': system_prompt}]},
+        'contents': [{'role': 'user', 'parts': [{'text': user_prompt}]}],
+    }
+    if generation_config:
+        payload['generationConfig'] = generation_config
+
+    response = session.post(
+        f'{base_url}/v1beta/models/{model}:generateContent',
+        headers={'x-goog-api-key': api_key, 'Content-Type': 'application/json'},
+        json=payload, timeout=timeout,
+    )
+    _raise_for_status('gemini', response)
+    data = response.json()
+    candidates = data.get('candidates') or []
+    parts = ((candidates[0].get('content') or {}).get('parts') or []) if candidates else []
+    text = ''.join(part.get('text', '') for part in parts)
+    if not text:
+        raise LLMError('Gemini 응답이 비어 있습니다.', provider='gemini')
+    usage = data.get('usageMetadata') or {}
+    # Gemini 2.5 caches repeated prefixes implicitly; there is no per-request key
+    return text, data.get('modelVersion') or model, {
+        'prompt_tokens': usage.get('promptTokenCount', 0),
+        'cached_tokens': usage.get('cachedContentTokenCount', 0),
+        'completion_tokens': usage.get('candidatesTokenCount', 0),
+    }
+
+
+_REQUESTS = {'openai': _openai_request, 'gemini': _gemini_request}
+
+
+def default_model(provider):
+    if provider == 'gemini':
+        return _setting('GEMINI_MODEL', 'gemini-2.5-flash')
+    return _setting('OPENAI_MODEL', 'gpt-4o-mini')
+
+
+def _count(state, **increments):
+    with _metrics_lock:
+        for key, value in increments.items():
+            state['metrics'][key] += value
+
+
+def _record_success(state, started, usage):
+    """Close the breaker and count a finished call; returns its latency in ms."""
+    latency_ms = (time.monotonic() - started) * 1000
+    usage = usage or {}
+    state['breaker'].record_success()
+    _count(
+        state, calls=1, latency_ms_total=latency_ms,
+        prompt_tokens=usage.get('prompt_tokens') or 0, cached_prompt_tokens=usage.get('cached_tokens') or 0,
+        completion_tokens=usage.get('completion_tokens') or 0,
+    )
+    with _metrics_lock:
+        state['metrics']['last_latency_ms'] = round(latency_ms, 1)
+    return latency_ms
+
+
+@contextlib.asynccontextmanager
+async def stream_slot(provider):
+    """
+    Admission and accounting for one streamed call (blocks/llm_stream.py), as
+    _call_provider does for blocking calls: breaker, token bucket and
+    concurrency slot on entry (waited for in a worker thread, not on the event
+    loop), held until the stream is consumed. Failures feed the breaker; a
+    finished stream counts as a call with the usage the caller stores in the
+    yielded dict. A client that disconnects mid-stream only frees the slot.
+    """
+    state = _provider_state(provider)
+    if not state['breaker'].allow():
+        _count(state, rejected=1)
+        raise LLMError(f'{provider} circuit open', provider=provider, retryable=True)
+    queue_timeout = float(_setting('LLM_QUEUE_TIMEOUT', DEFAULT_QUEUE_TIMEOUT))
+    if not await sync_to_async(state['bucket'].acquire, thread_sensitive=False)(queue_timeout):
+        _count(state, rejected=1)
+        raise LLMError(f'{provider} rate limit reached', provider=provider, status=429, retryable=True)
+    if not await sync_to_async(state['semaphore'].acquire, thread_sensitive=False)(timeout=queue_timeout):
+        _count(state, rejected=1)
+        raise LLMError(f'{provider} concurrency limit reached', provider=provider, retryable=True)
+
+    call = {'usage': None}
+    started = time.monotonic()
+    try:
+        yield call
+    except LLMError as exc:
+        _count(state, errors=1)
+        if exc.retryable and exc.status is not None:
+            state['breaker'].record_failure()
+        raise
+    except httpx.TransportError as exc:
+        _count(state, errors=1)
+        state['breaker'].record_failure()
+        raise LLMError(f'{provider} 연결 실패: {exc}', provider=provider, retryable=True) from exc
+    except Exception:
+        _count(state, errors=1)
+        raise
+    else:
+        _record_success(state, started, call['usage'])
+    finally:
+        state['semaphore'].release()
+
+
+def _call_provider(provider, model, system_prompt, user_prompt, options, timeout):
+    state = _provider_state(provider)
+    if not state['breaker'].allow():
+        _count(state, rejected=1)
+        raise LLMError(f'{provider} circuit open', provider=provider, retryable=True)
+    queue_timeout = float(_setting('LLM_QUEUE_TIMEOUT', DEFAULT_QUEUE_TIMEOUT))
+    if not state['bucket'].acquire(queue_timeout):
+        _count(state, rejected=1)
+        raise LLMError(f'{provider} rate limit reached', provider=provider, status=429, retryable=True)
+    if not state['semaphore'].acquire(timeout=queue_timeout):
+        _count(state, rejected=1)
+        raise LLMError(f'{provider} concurrency limit reached', provider=provider, retryable=True)
+
+    started = time.monotonic()
+    try:
+        text, model_used, usage = _REQUESTS[provider](
+            state['session'], model, system_prompt, user_prompt, options, timeout,
+        )
+    except LLMError as exc:
+        _count(state, errors=1)
+        if exc.retryable and exc.status is not None:
+            state['breaker'].record_failure()
+        raise
+    except (requests.Timeout, requests.ConnectionError) as exc:
+        _count(state, errors=1)
+        state['breaker'].record_failure()
+        raise LLMError(f'{provider} 연결 실패: {exc}', provider=provider, retryable=True) from exc
+    except ValueError as exc:  # malformed JSON body
+        _count(state, errors=1)
+        raise LLMError(f'{provider} 응답 파싱 실패: {exc}', provider=provider) from exc
+    finally:
+        state['semaphore'].release()
+
+    latency_ms = _record_success(state, started, usage)
+    return {
+        'text': (text or '').strip(),
+        'provider': provider,
+        'model': model_used,
+        'latency_ms': round(latency_ms, 1),
+        'usage': usage,
+    }
+
+
+def prefix_cache_key(system_prompt):
+    """Stable prompt-cache routing key for a system prompt."""
+    return 'sp-' + hashlib.sha256((system_prompt or '').encode('utf-8')).hexdigest()[:32]
+
+
+def chat(system_prompt, user_prompt, route=None, *, temperature=None, top_p=None, presence_penalty=None,
+         frequency_penalty=None, max_tokens=None, json_mode=False, timeout=DEFAULT_TIMEOUT, tag='',
+         cache_key=None):
+    """
+    Run one prompt through ``route``, a list of (provider, model) tried in order
+    (model '' or None = that provider's default). Defaults to OpenAI only.
+    ``cache_key`` groups calls sharing a prompt prefix for the provider's
+    prompt cache (default: derived from the system prompt).
+    Raises the last LLMError when every provider failed.
+    """
+    route = route or [('openai', None)]
+    options = {
+        'temperature': temperature, 'top_p': top_p, 'presence_penalty': presence_penalty,
+        'frequency_penalty': frequency_penalty, 'max_tokens': max_tokens, 'json_mode': json_mode,
+        'cache_key': cache_key or prefix_cache_key(system_prompt),
+    }
+    last_error = None
+    for provider, model in route:
+        if provider not in _REQUESTS:
+            raise ValueError(f'Unknown LLM provider: {provider}')
+        model = model or default_model(provider)
+        try:
+            result = _call_provider(provider, model, system_prompt, user_prompt, options, timeout)
+        except LLMError as exc:
+            last_error = exc
+            if not exc.retryable:
+                raise
+            logger.warning('[LLM%s] %s/%s failed (%s), trying next provider', f':{tag}' if tag else '',
+                           provider, model, exc)
+            continue
+        logger.info('[LLM%s] %s/%s %.0fms tokens=%s', f':{tag}' if tag else '', result['provider'],
+                    result['model'], result['latency_ms'], result['usage'])
+        return result
+    raise last_error
+
+
+def chat_json(system_prompt, user_prompt, route=None, **kwargs):
+    """chat() in JSON mode; returns (parsed object, result)."""
+    result = chat(system_prompt, user_prompt, route, json_mode=True, **kwargs)
+    try:
+        return json.loads(result['text']), result
+    except ValueError as exc:
+        raise LLMError(f"{result['provider']} JSON 파싱 실패: {exc}", provider=result['provider']) from exc
+
+
+# Appended after the caller's instructions so the combined system prompt is
+# the same for every batch and stays cacheable.
+BATCH_INSTRUCTIONS = (
+    "\n\nBatch mode: the user message is JSON {\"items\": [{\"id\": <int>, \"input\": <input>}, ...]}. "
+    "Apply the instructions above to each item's input independently. "
+    "Return only JSON {\"results\": [{\"id\": <same id>, ...the output object for that item...}]} "
+    "with exactly one result per item."
+)
+
+
+def chat_json_batch(system_prompt, inputs, route=None, *, batch_size=None, **kwargs):
+    """
+    Apply one JSON-mode instruction to many inputs with one request per
+    ``batch_size`` items (LLM_BATCH_SIZE). Returns a list aligned with
+    ``inputs``: the parsed result dict for each item, or None when the
+    model left it out. Errors propagate like chat_json().
+    """
+    inputs = list(inputs)
+    batch_size = max(1, int(batch_size or _setting('LLM_BATCH_SIZE', DEFAULT_BATCH_SIZE)))
+    batch_prompt = system_prompt + BATCH_INSTRUCTIONS
+    results = [None] * len(inputs)
+    for start in range(0, len(inputs), batch_size):
+        chunk = inputs[start:start + batch_size]
+        user_prompt = json.dumps(
+            {'items': [{'id': i, 'input': item} for i, item in enumerate(chunk)]}, ensure_ascii=False,
+        )
+        parsed, _result = chat_json(batch_prompt, user_prompt, route, **kwargs)
+        entries = parsed.get('results') if isinstance(parsed, dict) else parsed
+        for entry in entries or []:
+            if not isinstance(entry, dict):
+                continue
+            try:
+                index = int(entry.get('id'))
+            except (TypeError, ValueError):
+                continue
+            if 0 <= index < len(chunk):
+                results[start + index] = entry
+    return results
@@ -0,0 +1,272 @@
+"""
+Token streaming for the chat providers used by the compatibility agents.
+
+stream_chat() is the streaming counterpart of llm_gateway.chat(): it walks
+the same (provider, model) route, takes each provider's gateway slot
+(llm_gateway.stream_slot: breaker, rate limit, concurrency, metrics) and
+fails over on a retryable error before the first chunk. It returns an
+async generator of text chunks; the provider and model that answered are
+written to ``info`` and token usage is recorded when the stream ends.
+
+stream_openai_chat / stream_gemini_chat are the per-provider coroutines:
+awaiting one sends the request and raises LLMStreamError on an error
+status, then returns the chunk generator.
+
+Streams run on httpx.AsyncClient so an async StreamingHttpResponse can hand
+every chunk to the ASGI server as it arrives; a sync generator would be
+drained by Django's ASGI handler before the first byte is sent. Both
+providers are called over their REST streaming endpoints (OpenAI SSE with
+``stream: true``, Gemini ``streamGenerateContent?alt=sse``), which
+blocks/fake_llm.py also serves.
+"""
+import asyncio
+import contextlib
+import json
+import logging
+import weakref
+
+import httpx
+from django.conf import settings
+
+from . import llm_gateway
+from .llm_gateway import RETRYABLE_STATUSES, LLMError
+
+logger = logging.getLogger(__name__)
+
+STREAM_CONNECT_TIMEOUT = 10
+# Max silence between two chunks, not a limit on the whole answer
+STREAM_READ_TIMEOUT = 60
+
+# One pooled client per event loop (an AsyncClient cannot be shared across loops)
+_clients = weakref.WeakKeyDictionary()
+
+
+class LLMStreamError(LLMError):
+    """Provider error raised before or while streaming; ``status`` is the HTTP status if any."""
+
+    def __init__(self, message, provider=None, status=None):
+        super().__init__(message, provider=provider, status=status, retryable=status in RETRYABLE_STATUSES)
+
+
+def is_quota_error(exc):
+    """Rate-limit/quota failures that should fail over to another provider."""
+    text = str(exc)
+    return (
+        getattr(exc, 'status', None) == 429
+        or 'ResourceExhausted' in str(type(exc))
+        or '429' in text
+        or 'quota' in text.lower()
+    )
+
+
+def stream_client():
+    """Keep-alive AsyncClient for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(timeout=httpx.Timeout(STREAM_READ_TIMEOUT, connect=STREAM_CONNECT_TIMEOUT))
+        _clients[loop] = client
+    return client
+
+
+async def _open_stream(provider, url, headers, payload):
+    """POST with a streamed body; raises LLMStreamError on an error status."""
+    client = stream_client()
+    response = await client.send(client.build_request('POST', url, headers=headers, json=payload), stream=True)
+    if response.status_code >= 400:
+        body = (await response.aread()).decode('utf-8', 'replace')
+        await response.aclose()
+        raise LLMStreamError(
+            f'{llm_gateway.PROVIDER_LABELS[provider]} API 오류 ({response.status_code}): {body}',
+            provider=provider, status=response.status_code,
+        )
+    return response
+
+
+async def _aiter_sse_data(response):
+    """Yield decoded JSON payloads from a text/event-stream response."""
+    async for raw in response.aiter_lines():
+        if not raw or not raw.startswith('data:'):
+            continue
+        data = raw[5:].strip()
+        if data == '[DONE]':
+            return
+        try:
+            yield json.loads(data)
+        except ValueError:
+            logger.debug('[LLMStream] Skipping non-JSON SSE line: %s', data[:200])
+
+
+async def stream_openai_chat(model_name, system_prompt, user_prompt, temperature=0.7, top_p=1.0,
+                             presence_penalty=0.0, frequency_penalty=0.0, max_tokens=None, info=None):
+    api_key = getattr(settings, 'OPENAI_API_KEY', '')
+    if not api_key:
+        raise LLMError('OPENAI_API_KEY is not configured.', provider='openai', retryable=True)
+    base_url = getattr(settings, 'OPENAI_API_BASE', 'https://api.openai.com/v1').rstrip('/')
+    resolved_model = model_name or getattr(
+        settings, 'COMPATIBILITY_OPENAI_MODEL', getattr(settings, 'OPENAI_MODEL', 'gpt-4o-mini')
+    )
+    info = info if info is not None else {}
+    info['model'] = resolved_model
+
+    # GPT-5 계열 모델은 Responses API 사용 (temperature 등 미지원)
+    is_gpt5 = 'gpt-5' in resolved_model.lower()
+    if is_gpt5:
+        url = f'{base_url}/responses'
+        json_payload = {'model': resolved_model, 'input': f'{system_prompt}\n\n{user_prompt}', 'stream': True}
+    else:
+        url = f'{base_url}/chat/completions'
+        json_payload = {
+            'model': resolved_model,
+            'messages': [
+                {'role': 'system', 'content': system_prompt},
+                {'role': 'user', 'content': user_prompt},
+            ],
+            'temperature': temperature,
+            'top_p': top_p,
+            'presence_penalty': presence_penalty,
+            'frequency_penalty': frequency_penalty,
+            'stream': True,
+            # The last chunk then carries the token usage
+            'stream_options': {'include_usage': True},
+        }
+        if max_tokens is not None:
+            json_payload['max_tokens'] = max_tokens
+
+    response = await _open_stream(
+        'openai', url, {'Authorization': f'Bearer {api_key}', 'Content-Type': 'application/json'}, json_payload,
+    )
+
+    async def chunks():
+        try:
+            async for event in _aiter_sse_data(response):
+                if is_gpt5:
+                    event_type = event.get('type')
+                    if event_type == 'response.output_text.delta':
+                        text = event.get('delta') or ''
+                    elif event_type == 'response.completed':
+                        completed = event.get('response') or {}
+                        info['model'] = completed.get('model') or resolved_model
+                        usage = completed.get('usage') or {}
+                        info['usage'] = {
+                            'prompt_tokens': usage.get('input_tokens', 0),
+                            'cached_tokens': (usage.get('input_tokens_details') or {}).get('cached_tokens', 0),
+                            'completion_tokens': usage.get('output_tokens', 0),
+                        }
+                        continue
+                    elif event_type in ('response.failed', 'error'):
+                        raise LLMStreamError(f'OpenAI 스트림 오류: {event}', provider='openai')
+                    else:
+                        continue
+                else:
+                    if event.get('model'):
+                        info['model'] = event['model']
+                    if event.get('usage'):
+                        usage = event['usage']
+                        info['usage'] = {
+                            'prompt_tokens': usage.get('prompt_tokens', 0),
+                            'cached_tokens': (usage.get('prompt_tokens_details') or {}).get('cached_tokens', 0),
+                            'completion_tokens': usage.get('completion_tokens', 0),
+                        }
+                    choices = event.get('choices') or []
+                    text = ((choices[0].get('delta') or {}).get('content') or '') if choices else ''
+                if text:
+                    yield text
+        finally:
+            await response.aclose()
+
+    return chunks()
+
+
+async def stream_gemini_chat(model_name, system_prompt, user_prompt, temperature=0.7, top_p=1.0,
+                             presence_penalty=0.0, frequency_penalty=0.0, max_tokens=None, info=None):
+    api_key = getattr(settings, 'GEMINI_API_KEY', '')
+    if not api_key:
+        raise LLMError('GEMINI_API_KEY is not configured.', provider='gemini', retryable=True)
+    base_url = getattr(settings, 'GEMINI_API_BASE', 'https://generativelanguage.googleapis.com').rstrip('/')
+    resolved_model = model_name or getattr(settings, 'GEMINI_MODEL', 'gemini-2.5-flash')
+    info = info if info is not None else {}
+    info['model'] = resolved_model
+
+    generation_config = {'temperature': temperature, 'topP': top_p}
+    if max_tokens is not None:
+        generation_config['maxOutputTokens'] = max_tokens
+    payload = {
+        'systemInstruction': {'parts': [{'text': system_prompt}]},
+        'contents': [{'role': 'user', 'parts': [{'text': user_prompt}]}],
+        'generationConfig': generation_config,
+    }
+    # The request is sent here, so auth/quota errors surface before the first chunk
+    response = await _open_stream(
+        'gemini', f'{base_url}/v1beta/models/{resolved_model}:streamGenerateContent?alt=sse',
+        {'x-goog-api-key': api_key, 'Content-Type': 'application/json'}, payload,
+    )
+
+    async def chunks():
+        try:
+            async for event in _aiter_sse_data(response):
+                if event.get('modelVersion'):
+                    info['model'] = event['modelVersion']
+                if event.get('usageMetadata'):
+                    usage = event['usageMetadata']
+                    info['usage'] = {
+                        'prompt_tokens': usage.get('promptTokenCount', 0),
+                        'cached_tokens': usage.get('cachedContentTokenCount', 0),
+                        'completion_tokens': usage.get('candidatesTokenCount', 0),
+                    }
+                candidates = event.get('candidates') or []
+                # Safety-filtered chunks come without text parts
+                parts = ((candidates[0].get('content') or {}).get('parts') or []) if candidates else []
+                text = ''.join(part.get('text', '') for part in parts)
+                if text:
+                    yield text
+        finally:
+            await response.aclose()
+
+    return chunks()
+
+
+STREAMERS = {
+    'openai': stream_openai_chat,
+    'gemini': stream_gemini_chat,
+}
+
+
+async def _metered(chunks, slot, call, info):
+    """Hold the provider's gateway slot until the chunks are consumed, then record the usage."""
+    async with slot:
+        async for text in chunks:
+            yield text
+        call['usage'] = info.get('usage')
+
+
+async def stream_chat(system_prompt, user_prompt, route=None, *, info=None, tag='', **options):
+    """
+    Stream one prompt through ``route`` (as llm_gateway.chat). Awaiting it
+    returns the chunk generator once a provider has accepted the request;
+    raises the last LLMError when every provider failed.
+    """
+    route = route or [('openai', None)]
+    info = info if info is not None else {}
+    last_error = None
+    for provider, model in route:
+        if provider not in STREAMERS:
+            raise ValueError(f'Unknown LLM provider: {provider}')
+        slot = contextlib.AsyncExitStack()
+        try:
+            call = await slot.enter_async_context(llm_gateway.stream_slot(provider))
+            try:
+                chunks = await STREAMERS[provider](model or None, system_prompt, user_prompt, info=info, **options)
+            except BaseException as exc:
+                if not await slot.__aexit__(type(exc), exc, exc.__traceback__):
+                    raise
+        except LLMError as exc:
+            last_error = exc
+            if not exc.retryable:
+                raise
+            logger.warning('[LLMStream%s] %s/%s failed (%s), trying next provider', f':{tag}' if tag else '',
+                           provider, model, exc)
+            continue
+        info['provider'] = provider
+        return _metered(chunks, slot, call, info)
+    raise last_error
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from blocks.models import KingstoneWallet
+
+
+class Command(BaseCommand):
+    help = 'Derive and store the account zpub of Kingstone wallets that have not been derived yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='recompute every wallet, not only missing ones')
+        parser.add_argument('--batch-size', type=int, default=200, help='rows fetched per query')
+
+    def handle(self, *args, **options):
+        wallets = KingstoneWallet.objects.exclude(mnemonic='').only(
+            'id', 'wallet_id', 'mnemonic', 'zpub', 'zpub_mnemonic_hash',
+        )
+
+        derived = failed = skipped = 0
+        for wallet in wallets.order_by('id').iterator(chunk_size=options['batch_size']):
+            if not options['all'] and not wallet._zpub_stale():
+                skipped += 1
+                continue
+            previous = (wallet.zpub, wallet.zpub_mnemonic_hash)
+            wallet.refresh_zpub()
+            if (wallet.zpub, wallet.zpub_mnemonic_hash) != previous:
+                # A failed derivation is stored as well, so it is not retried on load
+                KingstoneWallet.objects.filter(pk=wallet.pk).update(
+                    zpub=wallet.zpub, zpub_mnemonic_hash=wallet.zpub_mnemonic_hash,
+                )
+            if wallet.zpub:
+                derived += 1
+            else:
+                failed += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'zpub stored for {derived} wallet(s); {failed} without a valid BIP39 mnemonic; {skipped} up to date'
+        ))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from blocks.encryption import pin_lookup_key_id, rebuild_pin_lookups
+from blocks.models import KingstoneWallet
+
+
+class Command(BaseCommand):
+    help = 'Recompute the PIN lookup digests of Kingstone wallets, e.g. after changing KINGSTONE_PIN_LOOKUP_KEY.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='recompute every wallet, not only other-key ones')
+        parser.add_argument('--batch-size', type=int, default=200, help='rows fetched per query')
+
+    def handle(self, *args, **options):
+        wallets = KingstoneWallet.objects.exclude(pin_encrypted='')
+        if not options['all']:
+            wallets = wallets.exclude(pin_lookup_key_id=pin_lookup_key_id())
+
+        total = wallets.count()
+        rebuilt = rebuild_pin_lookups(wallets.order_by('id').iterator(chunk_size=options['batch_size']))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'PIN lookup rebuilt for {rebuilt} wallet(s); {total - rebuilt} left for their next PIN check'
+        ))
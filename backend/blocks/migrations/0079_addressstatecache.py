@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blocks', '0078_rename_blocks_comp_category_0c2b59_idx_blocks_comp_categor_490c32_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AddressStateCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('address', models.CharField(max_length=100, unique=True)),
+                ('scripthash', models.CharField(max_length=64, unique=True)),
+                ('chain_balance_sats', models.BigIntegerField(default=0)),
+                ('mempool_balance_sats', models.BigIntegerField(default=0)),
+                ('tx_count', models.PositiveIntegerField(default=0)),
+                ('utxos', models.JSONField(blank=True, null=True)),
+                ('tip_height', models.PositiveIntegerField(blank=True, null=True)),
+                ('is_stale', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['address'],
+                'indexes': [models.Index(fields=['updated_at'], name='blocks_addr_updated_6be4dc_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blocks', '0079_addressstatecache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='compatibilityagentcache',
+            name='saju_signature',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='compatibilityagentcache',
+            index=models.Index(fields=['saju_signature'], name='blocks_comp_saju_si_3af6ad_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blocks', '0080_compatibilityagentcache_saju_signature'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='compatibilityanalysis',
+            index=models.Index(fields=['-created_at', '-id'], name='compat_analysis_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timecapsule',
+            index=models.Index(fields=['-created_at', '-id'], name='time_capsule_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:31
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils.crypto import salted_hmac
+
+from blocks.encryption import decrypt_mnemonic
+
+
+def backfill_pin_lookups(apps, schema_editor):
+    # Frozen copy of the digest as of this migration; rows left '' are
+    # filled in by 0086 or at their next successful PIN check
+    KingstoneWallet = apps.get_model('blocks', 'KingstoneWallet')
+    secret = getattr(settings, 'KINGSTONE_PIN_LOOKUP_KEY', '') or None
+    for wallet in KingstoneWallet.objects.exclude(pin_encrypted='').iterator():
+        try:
+            pin = decrypt_mnemonic(wallet.pin_encrypted)
+        except ValueError:
+            continue
+        wallet.pin_lookup = salted_hmac(
+            'blocks.KingstoneWallet.pin_lookup', f'{wallet.username}\x00{pin}', secret=secret, algorithm='sha256',
+        ).hexdigest()
+        wallet.save(update_fields=['pin_lookup'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blocks', '0081_keyset_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kingstonewallet',
+            name='pin_lookup',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='kingstonewallet',
+            index=models.Index(fields=['username', 'pin_lookup'], name='kingstone_pin_lookup_idx'),
+        ),
+        migrations.RunPython(backfill_pin_lookups, migrations.RunPython.noop),
+    ]
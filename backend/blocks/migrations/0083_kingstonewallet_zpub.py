@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blocks', '0082_kingstonewallet_pin_lookup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kingstonewallet',
+            name='zpub',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=128),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:55
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils.crypto import salted_hmac
+
+from blocks.encryption import decrypt_mnemonic
+
+
+def rekey_pin_lookups(apps, schema_editor):
+    # Frozen copy of the digest and key id as of this migration; rows whose
+    # PIN cannot be decrypted keep no key id and are re-keyed at their next
+    # successful PIN check
+    KingstoneWallet = apps.get_model('blocks', 'KingstoneWallet')
+    secret = getattr(settings, 'KINGSTONE_PIN_LOOKUP_KEY', '') or None
+    key_id = salted_hmac(
+        'blocks.KingstoneWallet.pin_lookup_key_id', '', secret=secret, algorithm='sha256',
+    ).hexdigest()[:16]
+    for wallet in KingstoneWallet.objects.exclude(pin_encrypted='').iterator():
+        try:
+            pin = decrypt_mnemonic(wallet.pin_encrypted)
+        except ValueError:
+            continue
+        wallet.pin_lookup = salted_hmac(
+            'blocks.KingstoneWallet.pin_lookup', f'{wallet.username}\x00{pin}', secret=secret, algorithm='sha256',
+        ).hexdigest()
+        wallet.pin_lookup_key_id = key_id
+        wallet.save(update_fields=['pin_lookup', 'pin_lookup_key_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blocks', '0085_compatibility_precompute_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kingstonewallet',
+            name='pin_lookup_key_id',
+            field=models.CharField(blank=True, default='', max_length=16),
+        ),
+        migrations.RunPython(rekey_pin_lookups, migrations.RunPython.noop),
+    ]
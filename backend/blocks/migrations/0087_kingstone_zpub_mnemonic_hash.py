@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:56
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def mark_derived_zpubs(apps, schema_editor):
+    # Stored zpubs were derived from the row's current mnemonic on save; rows
+    # without one are derived (and marked) at their next load or backfill
+    KingstoneWallet = apps.get_model('blocks', 'KingstoneWallet')
+    for wallet in KingstoneWallet.objects.exclude(zpub='').exclude(mnemonic='').only('id', 'mnemonic').iterator():
+        KingstoneWallet.objects.filter(pk=wallet.pk).update(
+            zpub_mnemonic_hash=hashlib.sha256(wallet.mnemonic.encode('utf-8')).hexdigest(),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blocks', '0086_kingstone_pin_lookup_key_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kingstonewallet',
+            name='zpub_mnemonic_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.RunPython(mark_derived_zpubs, migrations.RunPython.noop),
+    ]
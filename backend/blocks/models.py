@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.hashers import make_password, check_password
-from .encryption import encrypt_mnemonic, decrypt_mnemonic
+from .encryption import encrypt_mnemonic, decrypt_mnemonic, pin_lookup_digest, pin_lookup_key_id
+import hashlib
 import logging
 import uuid
 import random
@@ -83,11 +84,23 @@ class KingstoneWallet(models.Model):
     username = models.CharField(max_length=64)
     pin_hash = models.CharField(max_length=256)
     pin_encrypted = models.CharField(max_length=256, blank=True, default='')
+    # pin_lookup_digest(username, pin): finds the wallet for a PIN without
+    # hashing it against every wallet. '' for rows not backfilled yet.
+    pin_lookup = models.CharField(max_length=64, blank=True, default='')
+    # pin_lookup_key_id() of the key pin_lookup was computed with; rows from
+    # another key are checked the slow way and re-keyed
+    pin_lookup_key_id = models.CharField(max_length=16, blank=True, default='')
     wallet_id = models.CharField(max_length=64, unique=True)
     wallet_name = models.CharField(max_length=64)
     index = models.PositiveSmallIntegerField()
     created_at = models.DateTimeField(auto_now_add=True)
     mnemonic = models.CharField(max_length=512, blank=True, default='')
+    # BIP84 account 0 zpub of the mnemonic, derived on save when the mnemonic
+    # changes; '' when the mnemonic is not a valid BIP39 phrase
+    zpub = models.CharField(max_length=128, blank=True, default='', db_index=True)
+    # SHA-256 of the mnemonic zpub was derived from, also set when derivation
+    # failed, so an invalid mnemonic is not retried on every load
+    zpub_mnemonic_hash = models.CharField(max_length=64, blank=True, default='')
 
     class Meta:
         unique_together = (
@@ -95,12 +108,15 @@ class KingstoneWallet(models.Model):
         )
         indexes = [
             models.Index(fields=['username']),
+            models.Index(fields=['username', 'pin_lookup'], name='kingstone_pin_lookup_idx'),
         ]
 
     def set_pin(self, pin: str):
         if not pin:
             raise ValueError('PIN must not be empty')
         self.pin_hash = make_password(pin)
+        self.pin_lookup = pin_lookup_digest(self.username, pin)
+        self.pin_lookup_key_id = pin_lookup_key_id()
         try:
             self.pin_encrypted = encrypt_mnemonic(pin)
         except Exception:
@@ -112,6 +128,31 @@ class KingstoneWallet(models.Model):
             return False
         return check_password(pin, self.pin_hash)
 
+    @classmethod
+    def find_by_pin(cls, username: str, pin: str, wallets=None):
+        """
+        The user's wallet whose PIN is ``pin``, or None. The lookup digest
+        picks the candidate, so one password hash is checked per attempt;
+        rows without a digest under the current key (not backfilled yet, or
+        made before a key change) are checked the slow way and re-keyed.
+        ``wallets`` may be the user's already loaded rows.
+        """
+        lookup = pin_lookup_digest(username, pin)
+        key_id = pin_lookup_key_id()
+        if wallets is None:
+            wallets = cls.objects.filter(username=username).filter(
+                models.Q(pin_lookup=lookup) | ~models.Q(pin_lookup_key_id=key_id)
+            )
+        for wallet in wallets:
+            if wallet.pin_lookup_key_id == key_id and wallet.pin_lookup == lookup and wallet.check_pin(pin):
+                return wallet
+        for wallet in wallets:
+            if wallet.pin_lookup_key_id != key_id and wallet.check_pin(pin):
+                wallet.pin_lookup, wallet.pin_lookup_key_id = lookup, key_id
+                wallet.save(update_fields=['pin_lookup', 'pin_lookup_key_id'])
+                return wallet
+        return None
+
     def ensure_defaults(self):
         """Ensure wallet_id and wallet_name are populated before saving."""
         if not self.wallet_id:
@@ -121,20 +162,42 @@ class KingstoneWallet(models.Model):
         if not self.mnemonic:
             self.mnemonic = self.generate_mock_mnemonic()
 
+    @staticmethod
+    def mnemonic_hash(mnemonic: str) -> str:
+        return hashlib.sha256(mnemonic.encode('utf-8')).hexdigest()
+
+    def _zpub_stale(self):
+        return bool(self.mnemonic) and self.zpub_mnemonic_hash != self.mnemonic_hash(self.mnemonic)
+
+    def refresh_zpub(self):
+        """Derive zpub from the mnemonic (seed + HD derivation, tens of ms)."""
+        from .btc import derive_bip84_account_zpub
+        self.zpub = ''
+        if self.mnemonic:
+            try:
+                self.zpub = derive_bip84_account_zpub(self.mnemonic, account=0)
+            except Exception:
+                # The error text contains the mnemonic; keep it out of the logs
+                logger.warning(f"Failed to derive zpub for wallet {self.wallet_id}: invalid or unsupported mnemonic")
+        self.zpub_mnemonic_hash = self.mnemonic_hash(self.mnemonic) if self.mnemonic else ''
+
     def save(self, *args, **kwargs):
         self.ensure_defaults()
+        update_fields = kwargs.get('update_fields')
+        if self._zpub_stale() and (update_fields is None or 'mnemonic' in update_fields):
+            self.refresh_zpub()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'zpub', 'zpub_mnemonic_hash'}
         super().save(*args, **kwargs)
 
     def as_dict(self):
-        from .btc import derive_bip84_account_zpub
-        zpub = None
-        try:
-            if self.mnemonic:
-                zpub = derive_bip84_account_zpub(self.mnemonic, account=0)
-        except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Failed to derive zpub for wallet {self.wallet_id}: {e}")
+        if self.pk and self._zpub_stale():
+            # Row saved before the zpub column existed and not backfilled yet;
+            # a failed derivation is stored too (zpub '' with the hash)
+            self.refresh_zpub()
+            KingstoneWallet.objects.filter(pk=self.pk).update(
+                zpub=self.zpub, zpub_mnemonic_hash=self.zpub_mnemonic_hash,
+            )
 
         return {
             'id': self.id,
@@ -144,7 +207,7 @@ class KingstoneWallet(models.Model):
             'index': self.index,
             'created_at': self.created_at.isoformat(),
             'mnemonic': self.mnemonic,
-            'zpub': zpub,
+            'zpub': self.zpub or None,
         }
 
     @staticmethod
@@ -371,6 +434,30 @@ class Route(models.Model):
         }
 
 
+
+class RoutingGraphEvent(models.Model):
+    """One routing graph change; the newest row is the graph version shared by every process."""
+    version = models.PositiveIntegerField(unique=True)
+    # Random per change, so a version number reused after a DB restore is not mistaken for the old one
+    stamp = models.CharField(max_length=32)
+    ops = models.JSONField(null=True, blank=True)  # Delta operations, None for "reload everything"
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['version']
+
+    def __str__(self):
+        return f"RoutingGraphEvent<v{self.version}>"
+
+    def as_event(self):
+        return {
+            'type': 'graph_delta',
+            'version': self.version,
+            'base_version': self.version - 1,
+            'ops': self.ops,
+            'ts': self.created_at.timestamp(),
+        }
+
 class LightningService(models.Model):
     """Lightning network service fees - DEPRECATED, use ServiceNode and Route instead"""
     SERVICE_CHOICES = [
@@ -788,11 +875,35 @@ class CompatibilityAnalysis(models.Model):
         indexes = [
             models.Index(fields=['-created_at']),
             models.Index(fields=['user_ip']),
+            # Keyset pagination (see api_helpers.keyset_page)
+            models.Index(fields=['-created_at', '-id'], name='compat_analysis_keyset_idx'),
         ]
 
+    # Columns read by the admin list; the narrative is fetched per record
+    SUMMARY_FIELDS = (
+        'id', 'birthdate', 'birth_time', 'gender', 'element', 'zodiac', 'yin_yang', 'score', 'rating',
+        'user_ip', 'created_at',
+    )
+
     def __str__(self):
         return f"{self.birthdate} - {self.element} ({self.score}점)"
 
+    def as_summary_dict(self):
+        """as_dict() without the narrative (safe on a .only(*SUMMARY_FIELDS) queryset)."""
+        return {
+            'id': self.id,
+            'birthdate': self.birthdate.isoformat(),
+            'birth_time': self.birth_time.isoformat() if self.birth_time else None,
+            'gender': self.gender,
+            'element': self.element,
+            'zodiac': self.zodiac,
+            'yin_yang': self.yin_yang,
+            'score': self.score,
+            'rating': self.rating,
+            'user_ip': self.user_ip,
+            'created_at': self.created_at.isoformat(),
+        }
+
     def as_dict(self):
         return {
             'id': self.id,
@@ -850,6 +961,41 @@ class CompatibilityQuickPreset(models.Model):
         }
 
 
+
+class CompatibilityPrecomputeJob(models.Model):
+    """One background run of compat_presets.precompute_preset_pairs, visible to every worker."""
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='running')
+    params = models.JSONField(default=dict, blank=True)
+    summary = models.JSONField(default=dict, blank=True)  # Running totals, final once finished
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"CompatibilityPrecomputeJob<{self.id}> {self.status}"
+
+    def as_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'params': self.params,
+            'summary': self.summary,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
 class CompatibilityReportTemplate(models.Model):
     """Editable LLM instruction templates for different compatibility contexts."""
 
@@ -888,6 +1034,8 @@ class CompatibilityAgentCache(models.Model):
     target_name = models.CharField(max_length=120, blank=True, default='')
     profile_signature = models.CharField(max_length=255, blank=True, default='')
     target_signature = models.CharField(max_length=255, blank=True, default='')
+    # Hash of the derived pillars/elements (compat_cache.saju_signature) for reuse across identical charts
+    saju_signature = models.CharField(max_length=64, blank=True, default='')
     request_payload = models.JSONField(default=dict, blank=True)
     response_text = models.TextField(blank=True, default='')
     metadata = models.JSONField(default=dict, blank=True)
@@ -902,6 +1050,7 @@ class CompatibilityAgentCache(models.Model):
             models.Index(fields=['subject_name']),
             models.Index(fields=['target_name']),
             models.Index(fields=['updated_at']),
+            models.Index(fields=['saju_signature']),
         ]
 
     def __str__(self):
@@ -916,6 +1065,7 @@ class CompatibilityAgentCache(models.Model):
             'cache_key': self.cache_key,
             'subject_name': self.subject_name,
             'target_name': self.target_name,
+            'saju_signature': self.saju_signature,
             'response_text': self.response_text,
             'metadata': self.metadata,
             'request_payload': self.request_payload,
@@ -960,10 +1110,35 @@ class TimeCapsule(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination (see api_helpers.keyset_page)
+            models.Index(fields=['-created_at', '-id'], name='time_capsule_keyset_idx'),
+        ]
+
+    # Columns read by the admin list; the encrypted message is fetched per record
+    SUMMARY_FIELDS = (
+        'id', 'bitcoin_address', 'user_info', 'is_coupon_used', 'mnemonic', 'address_index',
+        'broadcast_txid', 'broadcasted_at', 'created_at',
+    )
 
     def __str__(self):
         return f"TimeCapsule {self.id} ({self.created_at.strftime('%Y-%m-%d')})"
 
+    def as_summary_dict(self):
+        """as_dict() without encrypted_message (safe on a .only(*SUMMARY_FIELDS) queryset)."""
+        return {
+            'id': self.id,
+            'bitcoin_address': self.bitcoin_address,
+            'user_info': self.user_info,
+            'is_coupon_used': self.is_coupon_used,
+            'mnemonic_id': self.mnemonic_id,
+            'has_mnemonic': self.mnemonic_id is not None,
+            'address_index': self.address_index,
+            'broadcast_txid': self.broadcast_txid,
+            'broadcasted_at': self.broadcasted_at.isoformat() if self.broadcasted_at else None,
+            'created_at': self.created_at.isoformat(),
+        }
+
     def as_dict(self):
         return {
             'id': self.id,
@@ -978,3 +1153,45 @@ class TimeCapsule(models.Model):
             'broadcasted_at': self.broadcasted_at.isoformat() if self.broadcasted_at else None,
             'created_at': self.created_at.isoformat(),
         }
+
+
+class AddressStateCache(models.Model):
+    """Explorer-derived state for a single address, shared across processes and restarts."""
+    address = models.CharField(max_length=100, unique=True)
+    # Electrum-style scripthash (reversed SHA-256 of scriptPubKey) used for invalidation
+    scripthash = models.CharField(max_length=64, unique=True)
+    chain_balance_sats = models.BigIntegerField(default=0)
+    mempool_balance_sats = models.BigIntegerField(default=0)  # Unconfirmed delta
+    tx_count = models.PositiveIntegerField(default=0)
+    utxos = models.JSONField(null=True, blank=True)  # None until the UTXO set is fetched
+    tip_height = models.PositiveIntegerField(null=True, blank=True)  # Chain tip when fetched
+    is_stale = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['address']
+        indexes = [
+            models.Index(fields=['updated_at']),
+        ]
+
+    def __str__(self):
+        return f"AddressState<{self.address}> tip={self.tip_height}"
+
+    def balance_sats(self, include_mempool=True):
+        bal = int(self.chain_balance_sats or 0)
+        if include_mempool:
+            bal += int(self.mempool_balance_sats or 0)
+        return max(0, bal)
+
+    def as_dict(self):
+        return {
+            'address': self.address,
+            'scripthash': self.scripthash,
+            'chain_balance_sats': int(self.chain_balance_sats or 0),
+            'mempool_balance_sats': int(self.mempool_balance_sats or 0),
+            'tx_count': int(self.tx_count or 0),
+            'utxos': self.utxos,
+            'tip_height': self.tip_height,
+            'is_stale': self.is_stale,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
@@ -0,0 +1,229 @@
+"""
+K-shortest simple paths over the service routing graph.
+
+The graph is held as integer arrays: nodes are 0..n-1, edge ``e`` runs from
+``edge_tail[e]`` to ``edge_head[e]`` with cost ``edge_cost[e]``, and
+``out_edges[v]`` / ``in_edges[v]`` list edge ids. Parallel edges (several
+routes between the same pair of services) yield distinct paths.
+
+Paths are enumerated with Yen's algorithm plus Lawler's refinement (a new
+path only spawns spur searches from its deviation point onwards). Each spur
+search is an A* over parent pointers guided by the exact distance-to-target
+from one reverse Dijkstra. Blocking nodes or edges can only lengthen paths,
+so that heuristic stays admissible and consistent, and a spur search mostly
+touches just the nodes on its answer.
+
+With max_hops, spur searches run over (node, hops used) states and prune
+any state that cannot reach the target within the remaining hop budget
+(reverse BFS hop counts), so results are the k cheapest paths of at most
+max_hops edges rather than a filtered prefix of the unconstrained list.
+
+Edge costs must be non-negative.
+"""
+import heapq
+import math
+
+
+def build_adjacency(num_nodes, edge_tail, edge_head):
+    """Return (out_edges, in_edges): per-node lists of edge ids."""
+    out_edges = [[] for _ in range(num_nodes)]
+    in_edges = [[] for _ in range(num_nodes)]
+    for edge, (tail, head) in enumerate(zip(edge_tail, edge_head)):
+        out_edges[tail].append(edge)
+        in_edges[head].append(edge)
+    return out_edges, in_edges
+
+
+def distances_to(target, num_nodes, in_edges, edge_tail, edge_cost):
+    """Reverse Dijkstra: cheapest cost from every node to target (inf if unreachable)."""
+    dist = [math.inf] * num_nodes
+    dist[target] = 0.0
+    heap = [(0.0, target)]
+    while heap:
+        d, node = heapq.heappop(heap)
+        if d > dist[node]:
+            continue
+        for edge in in_edges[node]:
+            tail = edge_tail[edge]
+            nd = d + edge_cost[edge]
+            if nd < dist[tail]:
+                dist[tail] = nd
+                heapq.heappush(heap, (nd, tail))
+    return dist
+
+
+def hops_to(target, num_nodes, in_edges, edge_tail):
+    """Reverse BFS: fewest edges from every node to target (inf if unreachable)."""
+    hops = [math.inf] * num_nodes
+    hops[target] = 0
+    frontier = [target]
+    while frontier:
+        next_frontier = []
+        for node in frontier:
+            for edge in in_edges[node]:
+                tail = edge_tail[edge]
+                if hops[tail] == math.inf:
+                    hops[tail] = hops[node] + 1
+                    next_frontier.append(tail)
+        frontier = next_frontier
+    return hops
+
+
+def _spur_search(spur, target, out_edges, edge_tail, edge_head, edge_cost, heuristic,
+                 blocked_nodes, blocked_edges):
+    """A* from spur to target avoiding blocked nodes and blocked first edges; edge ids or None."""
+    if heuristic[spur] == math.inf:
+        return None
+    best = {spur: 0.0}
+    parent = {}
+    heap = [(heuristic[spur], 0.0, spur)]
+    while heap:
+        _, g, node = heapq.heappop(heap)
+        if g > best[node]:
+            continue
+        if node == target:
+            edges = []
+            while node != spur:
+                edge = parent[node]
+                edges.append(edge)
+                node = edge_tail[edge]
+            edges.reverse()
+            return edges
+        for edge in out_edges[node]:
+            if node == spur and edge in blocked_edges:
+                continue
+            head = edge_head[edge]
+            if head in blocked_nodes:
+                continue
+            h = heuristic[head]
+            if h == math.inf:
+                continue
+            ng = g + edge_cost[edge]
+            if ng < best.get(head, math.inf):
+                best[head] = ng
+                parent[head] = edge
+                heapq.heappush(heap, (ng + h, ng, head))
+    return None
+
+
+def _spur_search_hops(spur, target, budget, out_edges, edge_tail, edge_head, edge_cost, heuristic,
+                      min_hops, blocked_nodes, blocked_edges):
+    """_spur_search limited to ``budget`` edges, over (node, hops) states."""
+    if heuristic[spur] == math.inf or min_hops[spur] > budget:
+        return None
+    start = (spur, 0)
+    best = {start: 0.0}
+    parent = {}
+    # Equal-cost ties pop the state with fewer hops first, keeping answers loopless
+    heap = [(heuristic[spur], 0.0, 0, spur)]
+    while heap:
+        _, g, hops, node = heapq.heappop(heap)
+        state = (node, hops)
+        if g > best[state]:
+            continue
+        if node == target:
+            edges = []
+            while state != start:
+                edge = parent[state]
+                edges.append(edge)
+                state = (edge_tail[edge], state[1] - 1)
+            edges.reverse()
+            return edges
+        for edge in out_edges[node]:
+            if node == spur and edge in blocked_edges:
+                continue
+            head = edge_head[edge]
+            if head in blocked_nodes or head == spur:
+                continue
+            if hops + 1 + min_hops[head] > budget:
+                continue
+            h = heuristic[head]
+            next_state = (head, hops + 1)
+            ng = g + edge_cost[edge]
+            if ng < best.get(next_state, math.inf):
+                best[next_state] = ng
+                parent[next_state] = edge
+                heapq.heappush(heap, (ng + h, ng, hops + 1, head))
+    return None
+
+
+def _path_cost(edges, edge_cost):
+    cost = 0.0
+    for edge in edges:
+        cost += edge_cost[edge]
+    return cost
+
+
+def k_shortest_paths(source, target, k, *, num_nodes, edge_tail, edge_head, edge_cost,
+                     out_edges=None, in_edges=None, max_hops=None, stats=None):
+    """
+    Return up to k loopless paths from source to target, cheapest first,
+    as a list of (total_cost, edge_id_tuple). Ties are ordered by hop count
+    and then edge ids, so results are deterministic.
+
+    Pass masked out_edges/in_edges to search a subgraph; max_hops limits
+    the number of edges per path. A ``stats`` dict receives the number of
+    spur searches and candidate paths (used by the benchmark gate).
+    """
+    if k <= 0:
+        return []
+    if any(cost < 0 for cost in edge_cost):
+        raise ValueError('Edge costs must be non-negative')
+    if source == target:
+        return [(0.0, ())]
+    if out_edges is None or in_edges is None:
+        out_edges, in_edges = build_adjacency(num_nodes, edge_tail, edge_head)
+
+    heuristic = distances_to(target, num_nodes, in_edges, edge_tail, edge_cost)
+    if max_hops is None:
+        def spur_search(spur, depth, blocked_nodes, blocked_edges):
+            return _spur_search(spur, target, out_edges, edge_tail, edge_head, edge_cost,
+                                heuristic, blocked_nodes, blocked_edges)
+    else:
+        min_hops = hops_to(target, num_nodes, in_edges, edge_tail)
+
+        def spur_search(spur, depth, blocked_nodes, blocked_edges):
+            return _spur_search_hops(spur, target, max_hops - depth, out_edges, edge_tail, edge_head,
+                                     edge_cost, heuristic, min_hops, blocked_nodes, blocked_edges)
+
+    spur_searches = 1
+    first = spur_search(source, 0, frozenset(), frozenset())
+    if first is None:
+        if stats is not None:
+            stats.update(spur_searches=spur_searches, candidates=0)
+        return []
+
+    accepted = []
+    # Edges already taken after each accepted root prefix (Yen's removed edges)
+    next_edges = {}
+    seen = {tuple(first)}
+    candidates = [(_path_cost(first, edge_cost), len(first), tuple(first), 0)]
+
+    while candidates and len(accepted) < k:
+        cost, _, path, deviation = heapq.heappop(candidates)
+        accepted.append((cost, path))
+        for i, edge in enumerate(path):
+            next_edges.setdefault(path[:i], set()).add(edge)
+        if len(accepted) >= k:
+            break
+
+        nodes = [source] + [edge_head[edge] for edge in path]
+        for i in range(deviation, len(path)):
+            root = path[:i]
+            spur_searches += 1
+            spur = spur_search(
+                nodes[i], i,
+                blocked_nodes=set(nodes[:i]),
+                blocked_edges=next_edges.get(root, ()),
+            )
+            if spur is None:
+                continue
+            candidate = root + tuple(spur)
+            if candidate in seen:
+                continue
+            seen.add(candidate)
+            heapq.heappush(candidates, (_path_cost(candidate, edge_cost), len(candidate), candidate, i))
+
+    if stats is not None:
+        stats.update(spur_searches=spur_searches, candidates=len(seen))
+    return accepted
@@ -0,0 +1,219 @@
+"""
+Benchmark harness for the k-shortest-path search in blocks/routing.py.
+
+Pure Python (no Django), shared by benchmark_routing.py and the regression
+tests. Two graph families:
+
+* synthetic_graph: random services with a few outgoing routes each,
+  including parallel routes, costs in the range of real fees;
+* seed_shaped_graph: initial_data/routing.json with every intermediate
+  service cloned ``copies`` times and fees jittered, so the layering
+  (KRW exchange -> offshore exchange -> lightning -> wallet) stays realistic
+  while the path count explodes the way it does when services are added.
+
+Graphs are (num_nodes, edge_tail, edge_head, edge_cost, source, target).
+Results carry a deterministic work measure (spur searches, candidates)
+next to wall time; compare_to_baseline flags regressions in either.
+"""
+import json
+import os
+import random
+import time
+
+from . import routing
+
+SATS_PER_BTC = 100000000
+SEED_ROUTING_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'initial_data', 'routing.json')
+DEFAULT_K_VALUES = (10, 100, 300, 1000)
+# Wall time may vary this much against a baseline before it counts as a regression
+DEFAULT_TIME_TOLERANCE = 1.5
+# Spur-search counts are deterministic; allow a little slack for tie-order changes
+DEFAULT_WORK_TOLERANCE = 1.1
+
+
+def synthetic_graph(num_services, rng, out_degree=4):
+    """Node 0 is the source, node 1 the target, the rest are services."""
+    num_nodes = num_services + 2
+    edge_tail, edge_head, edge_cost = [], [], []
+
+    def add(tail, head):
+        edge_tail.append(tail)
+        edge_head.append(head)
+        edge_cost.append(rng.uniform(0.0, 0.5) + rng.choice([0, 0, 200, 1000, 5000]))
+
+    for service in range(2, num_nodes):
+        if rng.random() < 0.3:
+            add(0, service)
+        if rng.random() < 0.3:
+            add(service, 1)
+        for _ in range(out_degree):
+            other = rng.randrange(2, num_nodes)
+            if other != service:
+                add(service, other)
+                if rng.random() < 0.2:
+                    add(service, other)  # parallel route of another type
+    return num_nodes, edge_tail, edge_head, edge_cost, 0, 1
+
+
+def _seed_route_cost(route, btc_usdt_price):
+    """Same formula as routing_graph.route_cost."""
+    cost = float(route.get('fee_rate') or 0)
+    fixed = float(route.get('fee_fixed') or 0)
+    if fixed and (route.get('fee_fixed_currency') or 'BTC').upper() == 'USDT':
+        fixed /= btc_usdt_price
+    return cost + fixed * SATS_PER_BTC
+
+
+def seed_shaped_graph(copies=1, rng=None, seed_file=SEED_ROUTING_FILE, btc_usdt_price=60000.0,
+                      source='user', target='personal_wallet', fan_out=3):
+    """The seed routing graph with intermediate services cloned ``copies`` times."""
+    with open(seed_file, encoding='utf-8') as f:
+        data = json.load(f)
+    rng = rng or random.Random(0)
+
+    clones = {}
+    num_nodes = 0
+    for node in data['nodes']:
+        count = 1 if node['service'] in (source, target) else copies
+        clones[node['service']] = list(range(num_nodes, num_nodes + count))
+        num_nodes += count
+
+    edge_tail, edge_head, edge_cost = [], [], []
+    for route in data['routes']:
+        if route.get('is_enabled') is False:
+            continue
+        if route['source'] not in clones or route['destination'] not in clones:
+            continue
+        base = _seed_route_cost(route, btc_usdt_price)
+        heads = clones[route['destination']]
+        for tail in clones[route['source']]:
+            for head in rng.sample(heads, min(fan_out, len(heads))):
+                edge_tail.append(tail)
+                edge_head.append(head)
+                edge_cost.append(base * rng.uniform(0.8, 1.2) if copies > 1 else base)
+    return num_nodes, edge_tail, edge_head, edge_cost, clones[source][0], clones[target][0]
+
+
+def brute_force_paths(num_nodes, edge_tail, edge_head, edge_cost, source, target, max_hops=None):
+    """Every simple path by DFS, sorted like k_shortest_paths. Small graphs only."""
+    out_edges, _ = routing.build_adjacency(num_nodes, edge_tail, edge_head)
+    found = []
+
+    def walk(node, visited, path):
+        if node == target:
+            found.append((sum(edge_cost[e] for e in path), tuple(path)))
+            return
+        if max_hops is not None and len(path) >= max_hops:
+            return
+        for edge in out_edges[node]:
+            head = edge_head[edge]
+            if head not in visited:
+                walk(head, visited | {head}, path + [edge])
+
+    walk(source, {source}, [])
+    return sorted(found, key=lambda item: (item[0], len(item[1]), item[1]))
+
+
+def oracle_mismatches(trials=200, seed=3, max_nodes=7, max_edges=20, with_hops=True):
+    """Compare k_shortest_paths with brute force on random small graphs; returns failing cases."""
+    rng = random.Random(seed)
+    failures = []
+    for trial in range(trials):
+        num_nodes = rng.randint(2, max_nodes)
+        num_edges = rng.randint(1, max_edges)
+        edge_tail = [rng.randrange(num_nodes) for _ in range(num_edges)]
+        edge_head = [rng.randrange(num_nodes) for _ in range(num_edges)]
+        edge_cost = [float(rng.randint(0, 9)) for _ in range(num_edges)]
+        k = rng.randint(1, 40)
+        max_hops = rng.randint(1, 5) if with_hops and rng.random() < 0.5 else None
+
+        paths = routing.k_shortest_paths(
+            0, num_nodes - 1, k, max_hops=max_hops,
+            num_nodes=num_nodes, edge_tail=edge_tail, edge_head=edge_head, edge_cost=edge_cost,
+        )
+        expected = brute_force_paths(
+            num_nodes, edge_tail, edge_head, edge_cost, 0, num_nodes - 1, max_hops=max_hops,
+        )[:k]
+        if (
+            [cost for cost, _ in paths] != [cost for cost, _ in expected]
+            or len({edges for _, edges in paths}) != len(paths)
+        ):
+            failures.append({'trial': trial, 'k': k, 'max_hops': max_hops, 'edges': num_edges})
+    return failures
+
+
+def time_search(name, graph, k_values=DEFAULT_K_VALUES, repeat=3):
+    """One result row per k: best-of-``repeat`` wall time plus work counters."""
+    num_nodes, edge_tail, edge_head, edge_cost, source, target = graph
+    out_edges, in_edges = routing.build_adjacency(num_nodes, edge_tail, edge_head)
+    rows = []
+    for k in k_values:
+        best_ms = None
+        for _ in range(repeat):
+            stats = {}
+            started = time.perf_counter()
+            paths = routing.k_shortest_paths(
+                source, target, k, num_nodes=num_nodes, edge_tail=edge_tail, edge_head=edge_head,
+                edge_cost=edge_cost, out_edges=out_edges, in_edges=in_edges, stats=stats,
+            )
+            elapsed = (time.perf_counter() - started) * 1000
+            best_ms = elapsed if best_ms is None else min(best_ms, elapsed)
+        rows.append({
+            'graph': name,
+            'nodes': num_nodes,
+            'edges': len(edge_tail),
+            'k': k,
+            'paths': len(paths),
+            'ms': round(best_ms, 3),
+            'spur_searches': stats['spur_searches'],
+            'candidates': stats['candidates'],
+        })
+    return rows
+
+
+def benchmark_graphs(quick=False):
+    """The standard graph set: name -> graph (same graphs on every run)."""
+    graphs = {}
+    for size in ((50, 250) if quick else (50, 100, 250, 500)):
+        graphs[f'synthetic-{size}'] = synthetic_graph(size, random.Random(size))
+    for copies in ((1, 4) if quick else (1, 4, 8)):
+        graphs[f'seed-x{copies}'] = seed_shaped_graph(copies, random.Random(copies))
+    return graphs
+
+
+def run_benchmark(k_values=DEFAULT_K_VALUES, quick=False, repeat=3, oracle_trials=200):
+    """Timing rows for every standard graph plus the oracle check."""
+    results = []
+    for name, graph in benchmark_graphs(quick).items():
+        results.extend(time_search(name, graph, k_values, repeat))
+    failures = oracle_mismatches(trials=oracle_trials)
+    return {
+        'k_values': list(k_values),
+        'results': results,
+        'oracle': {'trials': oracle_trials, 'failures': failures},
+    }
+
+
+def compare_to_baseline(report, baseline, time_tolerance=DEFAULT_TIME_TOLERANCE,
+                        work_tolerance=DEFAULT_WORK_TOLERANCE):
+    """
+    Regressions of ``report`` against a previous run_benchmark() report, as
+    readable strings. time_tolerance=None compares only the deterministic
+    counters (what the test suite does).
+    """
+    previous = {(row['graph'], row['k']): row for row in baseline.get('results', [])}
+    regressions = []
+    if report.get('oracle', {}).get('failures'):
+        regressions.append(f"oracle: {len(report['oracle']['failures'])} mismatching graphs")
+    for row in report['results']:
+        old = previous.get((row['graph'], row['k']))
+        if old is None:
+            continue
+        label = f"{row['graph']} k={row['k']}"
+        if row['paths'] != old['paths']:
+            regressions.append(f"{label}: {row['paths']} paths (was {old['paths']})")
+        if row['spur_searches'] > old['spur_searches'] * work_tolerance:
+            regressions.append(f"{label}: {row['spur_searches']} spur searches (was {old['spur_searches']})")
+        if time_tolerance is not None and row['ms'] > max(old['ms'] * time_tolerance, old['ms'] + 1.0):
+            regressions.append(f"{label}: {row['ms']:.2f} ms (was {old['ms']:.2f} ms)")
+    return regressions
@@ -0,0 +1,324 @@
+"""
+Compiled, in-memory copy of the routing graph (ServiceNode + enabled Route).
+
+Path queries run against the compiled arrays; the only database read is the
+current graph version. Every write to service nodes or routes must call
+bump_routing_graph_version(); the next query in any process recompiles the
+graph once and later queries reuse it.
+
+Each bump records a versioned ``graph_delta`` event (RoutingGraphEvent;
+``ops`` lists upserted/deleted nodes and routes, or is null when the change
+was a bulk rewrite and clients should refetch). /api/routing-stream relays
+the events, and the last ones are kept so a reconnecting client can catch
+up from its version.
+
+Constrained queries (no KYC nodes, no custodial nodes, allowed route types)
+search masked copies of the adjacency lists, built once per constraint set
+and cached on the compiled graph like the edge costs.
+
+Serialized path responses are memoized on the compiled graph, keyed by the
+shared graph version, the query and the BTC/USDT price bucket, so they are
+dropped with the graph and never outlive a change made in another process.
+
+Amount-aware costing: a route turns x sats into x * (1 - fee_rate / 100)
+minus its fixed fee. Composed along a path this stays affine,
+received = multiplier * amount - fixed_sats (floored at 0, since every step
+is monotone and maps 0 to 0 or below), so k paths x n amounts is a single
+outer product.
+"""
+import logging
+import math
+import threading
+import uuid
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+from django.db import IntegrityError, transaction
+
+from .models import Route, RoutingGraphEvent, ServiceNode
+from .routing import build_adjacency
+
+logger = logging.getLogger(__name__)
+
+SATS_PER_BTC = 100000000
+# USDT fixed fees are costed at the price bucket's lower bound; buckets are 0.5% wide
+PRICE_BUCKET_RATIO = 1.005
+MAX_CACHED_RESPONSES = 64
+MAX_RECENT_GRAPH_EVENTS = 200
+MAX_CACHED_MASKS = 32
+BUMP_ATTEMPTS = 3
+
+_graph_state = {'graph': None}
+_graph_lock = threading.Lock()
+_responses_lock = threading.Lock()
+
+
+def routing_graph_state():
+    """(version, stamp) of the newest recorded change; (1, '') before the first one."""
+    return RoutingGraphEvent.objects.order_by('-version').values_list('version', 'stamp').first() or (1, '')
+
+
+def routing_graph_version():
+    return routing_graph_state()[0]
+
+
+def bump_routing_graph_version(ops=None):
+    """
+    Invalidate the compiled graph after service nodes or routes change and
+    record the change. ops is a list of delta operations:
+    {'op': 'upsert_node', 'node': {...}}, {'op': 'delete_node', 'id': ...},
+    {'op': 'upsert_route', 'route': {...}}, {'op': 'delete_route', 'id': ...};
+    None means "reload everything".
+
+    The change is recorded as a RoutingGraphEvent row, so web workers and
+    scripts such as ingest_fees.py all see the same version.
+    """
+    for attempt in range(BUMP_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                version = routing_graph_version() + 1
+                RoutingGraphEvent.objects.create(version=version, stamp=uuid.uuid4().hex, ops=ops)
+                RoutingGraphEvent.objects.filter(version__lte=version - MAX_RECENT_GRAPH_EVENTS).delete()
+            break
+        except IntegrityError:
+            # Another process recorded the same version first
+            if attempt == BUMP_ATTEMPTS - 1:
+                raise
+    with _graph_lock:
+        _graph_state['graph'] = None
+    return version
+
+
+def graph_events_since(version):
+    """Delta events after ``version``, or None if they are no longer all recorded."""
+    events = [
+        row.as_event()
+        for row in RoutingGraphEvent.objects.filter(version__gt=version).order_by('version')
+    ]
+    if events and events[0]['base_version'] != version:
+        return None
+    if not events and version < routing_graph_version():
+        return None
+    return events
+
+
+def route_cost(fee_rate, fee_fixed, fee_fixed_currency, btc_usdt_price=None):
+    """Percent fee plus the fixed fee in sats (USDT fees converted at btc_usdt_price when known)."""
+    cost = 0.0
+    if fee_rate:
+        cost += float(fee_rate)  # Percentage cost
+    if fee_fixed:
+        fixed_amount = float(fee_fixed)
+        if (fee_fixed_currency or 'BTC').upper() == 'USDT' and btc_usdt_price:
+            fixed_amount = fixed_amount / btc_usdt_price
+        cost += fixed_amount * SATS_PER_BTC  # Convert BTC to satoshis for comparison
+    return cost
+
+
+def compile_routing_graph(version=None, stamp=''):
+    """Load nodes and enabled routes once and lay them out as integer-indexed arrays."""
+    nodes = list(ServiceNode.objects.all())
+    routes = list(Route.objects.filter(is_enabled=True).select_related('source', 'destination'))
+
+    node_index = {node.id: i for i, node in enumerate(nodes)}
+    edge_tail = []
+    edge_head = []
+    edge_fee_rate = []
+    edge_fee_fixed = []
+    edge_is_usdt = []
+    edge_route_type = []
+    for route in routes:
+        edge_tail.append(node_index[route.source_id])
+        edge_head.append(node_index[route.destination_id])
+        edge_fee_rate.append(float(route.fee_rate) if route.fee_rate else 0.0)
+        edge_fee_fixed.append(float(route.fee_fixed) if route.fee_fixed else 0.0)
+        edge_is_usdt.append((route.fee_fixed_currency or 'BTC').upper() == 'USDT' and bool(route.fee_fixed))
+        edge_route_type.append(route.route_type)
+    out_edges, in_edges = build_adjacency(len(nodes), edge_tail, edge_head)
+
+    return {
+        'version': version,
+        'stamp': stamp,
+        'nodes': nodes,
+        'routes': routes,
+        'node_index': node_index,
+        'service_index': {node.service: i for i, node in enumerate(nodes)},
+        'edge_tail': edge_tail,
+        'edge_head': edge_head,
+        'edge_fee_rate': edge_fee_rate,
+        'edge_fee_fixed': edge_fee_fixed,
+        'edge_is_usdt': edge_is_usdt,
+        'has_usdt_fees': any(edge_is_usdt),
+        'edge_route_type': edge_route_type,
+        'node_is_kyc': [bool(node.is_kyc) for node in nodes],
+        'node_is_custodial': [bool(node.is_custodial) for node in nodes],
+        'out_edges': out_edges,
+        'in_edges': in_edges,
+        # btc_usdt_price -> edge cost array (only the latest price is kept)
+        'edge_costs': {},
+        # constraint key -> (out_edges, in_edges) over the allowed edges
+        'masked_adjacency': {},
+        # query key -> serialized response body
+        'responses': {},
+    }
+
+
+def get_routing_graph():
+    """Return the compiled graph for the shared current version, compiling it on first use."""
+    version, stamp = routing_graph_state()
+    graph = _graph_state['graph']
+    if graph is not None and (graph['version'], graph['stamp']) == (version, stamp):
+        return graph
+    with _graph_lock:
+        graph = _graph_state['graph']
+        if graph is not None and (graph['version'], graph['stamp']) == (version, stamp):
+            return graph
+        graph = compile_routing_graph(version, stamp)
+        _graph_state['graph'] = graph
+        logger.info(
+            'Compiled routing graph v%s: %s nodes, %s routes',
+            version, len(graph['nodes']), len(graph['routes']),
+        )
+        return graph
+
+
+def graph_edge_costs(graph, btc_usdt_price=None):
+    """Edge cost array for a BTC/USDT price; cached on the graph per price."""
+    if not graph['has_usdt_fees']:
+        btc_usdt_price = None
+    costs = graph['edge_costs'].get(btc_usdt_price)
+    if costs is not None:
+        return costs
+    costs = [
+        route_cost(fee_rate, fee_fixed, 'USDT' if is_usdt else 'BTC', btc_usdt_price)
+        for fee_rate, fee_fixed, is_usdt in zip(
+            graph['edge_fee_rate'], graph['edge_fee_fixed'], graph['edge_is_usdt']
+        )
+    ]
+    graph['edge_costs'] = {btc_usdt_price: costs}
+    return costs
+
+
+def constraint_key(constraints):
+    """Hashable form of a constraints dict (None when unconstrained)."""
+    if not constraints:
+        return None
+    return tuple(sorted(constraints.items()))
+
+
+def constrained_adjacency(graph, start_index, end_index, constraints=None):
+    """
+    (out_edges, in_edges) restricted to the edges a constrained query may use.
+
+    constraints keys: exclude_kyc, exclude_custodial (skip edges touching such
+    nodes, except the query's own endpoints) and route_types (allowed
+    route_type values, None for all). max_hops is ignored here.
+    """
+    exclude_kyc = bool((constraints or {}).get('exclude_kyc'))
+    exclude_custodial = bool((constraints or {}).get('exclude_custodial'))
+    route_types = (constraints or {}).get('route_types')
+    if not (exclude_kyc or exclude_custodial or route_types is not None):
+        return graph['out_edges'], graph['in_edges']
+
+    key = (start_index, end_index, exclude_kyc, exclude_custodial, route_types)
+    masks = graph['masked_adjacency']
+    adjacency = masks.get(key)
+    if adjacency is not None:
+        return adjacency
+
+    node_blocked = [
+        (exclude_kyc and is_kyc) or (exclude_custodial and is_custodial)
+        for is_kyc, is_custodial in zip(graph['node_is_kyc'], graph['node_is_custodial'])
+    ]
+    for endpoint in (start_index, end_index):
+        node_blocked[endpoint] = False
+    allowed_types = set(route_types) if route_types is not None else None
+    allowed = [
+        not node_blocked[tail] and not node_blocked[head]
+        and (allowed_types is None or route_type in allowed_types)
+        for tail, head, route_type in zip(graph['edge_tail'], graph['edge_head'], graph['edge_route_type'])
+    ]
+    adjacency = (
+        [[edge for edge in edges if allowed[edge]] for edges in graph['out_edges']],
+        [[edge for edge in edges if allowed[edge]] for edges in graph['in_edges']],
+    )
+    with _responses_lock:
+        if len(masks) >= MAX_CACHED_MASKS:
+            masks.clear()
+        masks[key] = adjacency
+    return adjacency
+
+
+def edge_fixed_sats(graph, btc_usdt_price=None):
+    """Fixed fee of every edge in sats."""
+    return [
+        fee_fixed * SATS_PER_BTC / (btc_usdt_price if is_usdt and btc_usdt_price else 1)
+        for fee_fixed, is_usdt in zip(graph['edge_fee_fixed'], graph['edge_is_usdt'])
+    ]
+
+
+def amount_edge_costs(graph, amount_sats, btc_usdt_price=None):
+    """Additive search cost: sats an edge charges when amount_sats passes through it."""
+    amount = float(amount_sats)
+    return [
+        amount * fee_rate / 100.0 + fixed_sats
+        for fee_rate, fixed_sats in zip(graph['edge_fee_rate'], edge_fixed_sats(graph, btc_usdt_price))
+    ]
+
+
+def path_transfer(graph, edges, btc_usdt_price=None, fixed_sats=None):
+    """Compose a path into (multiplier, fixed_sats): received = multiplier * amount - fixed_sats."""
+    if fixed_sats is None:
+        fixed_sats = edge_fixed_sats(graph, btc_usdt_price)
+    multiplier = 1.0
+    fixed = 0.0
+    for edge in edges:
+        keep = 1.0 - graph['edge_fee_rate'][edge] / 100.0
+        multiplier *= keep
+        fixed = fixed * keep + fixed_sats[edge]
+    return multiplier, fixed
+
+
+def received_sats_matrix(transfers, amounts):
+    """Received sats for every (path, amount) pair as a list of int rows."""
+    if not transfers or not amounts:
+        return [[] for _ in transfers]
+    if np is not None:
+        multipliers = np.array([m for m, _ in transfers], dtype=float)
+        fixed = np.array([f for _, f in transfers], dtype=float)
+        received = np.outer(multipliers, np.asarray(amounts, dtype=float)) - fixed[:, None]
+        return np.floor(np.maximum(received, 0.0)).astype(np.int64).tolist()
+    return [
+        [int(math.floor(max(0.0, multiplier * amount - fixed))) for amount in amounts]
+        for multiplier, fixed in transfers
+    ]
+
+
+def price_bucket(btc_usdt_price):
+    """Log-scale bucket for a BTC/USDT price (None when unknown)."""
+    if not btc_usdt_price or btc_usdt_price <= 0:
+        return None
+    return int(math.floor(math.log(btc_usdt_price) / math.log(PRICE_BUCKET_RATIO)))
+
+
+def bucket_price(bucket):
+    """Representative price for a bucket, so every query in it sees identical costs."""
+    if bucket is None:
+        return None
+    return PRICE_BUCKET_RATIO ** bucket
+
+
+def get_cached_response(graph, key):
+    return graph['responses'].get(key)
+
+
+def store_cached_response(graph, key, body):
+    responses = graph['responses']
+    with _responses_lock:
+        if key not in responses and len(responses) >= MAX_CACHED_RESPONSES:
+            responses.pop(next(iter(responses)))
+        responses[key] = body
+    return body
@@ -0,0 +1,192 @@
+"""
+Bulk export/restore of the routing graph (ServiceNode + Route).
+
+Used by routing_snapshot_view (save/reset), export_routing_seed.py and the
+initial_data/routing.json loading in init_defaults.py. Nodes are keyed by
+``service`` and routes by (source service, destination service, route_type);
+every restore runs in a single transaction.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Route, ServiceNode
+
+NODE_FIELDS = [
+    'display_name', 'node_type', 'is_kyc', 'is_custodial', 'is_enabled', 'description', 'website_url',
+]
+ROUTE_FIELDS = [
+    'fee_rate', 'fee_fixed', 'fee_fixed_currency', 'is_enabled', 'description',
+    'is_event', 'event_title', 'event_description', 'event_url',
+]
+
+
+def serialize_routing_graph():
+    """Return {'nodes': [...], 'routes': [...]} in the snapshot/seed file format."""
+    nodes = list(ServiceNode.objects.all().values('service', *NODE_FIELDS))
+    routes = []
+    for r in Route.objects.select_related('source', 'destination').all():
+        routes.append({
+            'source': r.source.service,
+            'destination': r.destination.service,
+            'route_type': r.route_type,
+            'fee_rate': float(r.fee_rate) if r.fee_rate is not None else None,
+            'fee_fixed': float(r.fee_fixed) if r.fee_fixed is not None else None,
+            'fee_fixed_currency': r.fee_fixed_currency,
+            'is_enabled': bool(r.is_enabled),
+            'description': r.description or '',
+            'is_event': bool(r.is_event),
+            'event_title': r.event_title or '',
+            'event_description': r.event_description or '',
+            'event_url': r.event_url or '',
+        })
+    return {'nodes': nodes, 'routes': routes}
+
+
+def _decimal_or_none(value):
+    if value is None or value == '':
+        return None
+    return Decimal(str(value))
+
+
+def _node_values(n):
+    return {
+        'display_name': n.get('display_name') or n['service'],
+        'node_type': n.get('node_type') or 'service',
+        'is_kyc': bool(n.get('is_kyc', False)),
+        'is_custodial': bool(n.get('is_custodial', True)),
+        'is_enabled': bool(n.get('is_enabled', True)),
+        'description': n.get('description') or '',
+        'website_url': n.get('website_url') or '',
+    }
+
+
+def _route_values(r):
+    valid_fee_currencies = {choice[0] for choice in Route.FEE_CURRENCY_CHOICES}
+    currency = (r.get('fee_fixed_currency') or 'BTC').upper()
+    if currency not in valid_fee_currencies:
+        currency = 'BTC'
+    return {
+        'fee_rate': _decimal_or_none(r.get('fee_rate')),
+        'fee_fixed': _decimal_or_none(r.get('fee_fixed')),
+        'fee_fixed_currency': currency,
+        'is_enabled': bool(r.get('is_enabled', True)),
+        'description': r.get('description') or '',
+        'is_event': bool(r.get('is_event', False)),
+        'event_title': r.get('event_title') or '',
+        'event_description': r.get('event_description') or '',
+        'event_url': r.get('event_url') or '',
+    }
+
+
+def _normalize(data):
+    """Dedupe records by their natural keys (last one wins)."""
+    nodes = {}
+    for n in (data or {}).get('nodes') or []:
+        if n.get('service'):
+            nodes[n['service']] = _node_values(n)
+    routes = {}
+    for r in (data or {}).get('routes') or []:
+        if r.get('source') and r.get('destination') and r.get('route_type'):
+            routes[(r['source'], r['destination'], r['route_type'])] = _route_values(r)
+    return nodes, routes
+
+
+def _changed(obj, values):
+    return any(getattr(obj, field) != value for field, value in values.items())
+
+
+def replace_routing_graph(data):
+    """Delete every node and route and bulk-insert the given graph atomically."""
+    nodes, routes = _normalize(data)
+    with transaction.atomic():
+        Route.objects.all().delete()
+        ServiceNode.objects.all().delete()
+        ServiceNode.objects.bulk_create([
+            ServiceNode(service=service, **values) for service, values in nodes.items()
+        ])
+        service_to_id = dict(ServiceNode.objects.values_list('service', 'id'))
+        new_routes = [
+            Route(
+                source_id=service_to_id[src], destination_id=service_to_id[dst], route_type=route_type, **values
+            )
+            for (src, dst, route_type), values in routes.items()
+            if src in service_to_id and dst in service_to_id
+        ]
+        Route.objects.bulk_create(new_routes)
+    return {'nodes': len(service_to_id), 'routes': len(new_routes)}
+
+
+def sync_routing_graph(data, *, delete_missing=True, update_nodes=True, update_routes=True):
+    """
+    Diff the given graph against the database and write only what changed,
+    in one transaction. Returns per-table created/updated/deleted counts.
+
+    delete_missing=False keeps rows absent from ``data``; update_routes=False
+    leaves existing routes (e.g. admin-edited fees) untouched.
+    """
+    nodes, routes = _normalize(data)
+    counts = {
+        'nodes': {'created': 0, 'updated': 0, 'deleted': 0},
+        'routes': {'created': 0, 'updated': 0, 'deleted': 0},
+    }
+    now = timezone.now()
+    with transaction.atomic():
+        existing_nodes = {node.service: node for node in ServiceNode.objects.all()}
+        if delete_missing:
+            stale = [node.id for service, node in existing_nodes.items() if service not in nodes]
+            if stale:
+                # Routes touching a removed node go with it (CASCADE)
+                _, per_model = ServiceNode.objects.filter(id__in=stale).delete()
+                counts['nodes']['deleted'] = per_model.get(ServiceNode._meta.label, 0)
+                counts['routes']['deleted'] += per_model.get(Route._meta.label, 0)
+        new_nodes = [
+            ServiceNode(service=service, **values)
+            for service, values in nodes.items() if service not in existing_nodes
+        ]
+        changed_nodes = []
+        if update_nodes:
+            for service, values in nodes.items():
+                node = existing_nodes.get(service)
+                if node is not None and _changed(node, values):
+                    for field, value in values.items():
+                        setattr(node, field, value)
+                    node.updated_at = now
+                    changed_nodes.append(node)
+        ServiceNode.objects.bulk_create(new_nodes)
+        ServiceNode.objects.bulk_update(changed_nodes, NODE_FIELDS + ['updated_at'])
+        counts['nodes']['created'] = len(new_nodes)
+        counts['nodes']['updated'] = len(changed_nodes)
+
+        service_to_id = dict(ServiceNode.objects.values_list('service', 'id'))
+        id_to_service = {node_id: service for service, node_id in service_to_id.items()}
+        existing_routes = {
+            (id_to_service[route.source_id], id_to_service[route.destination_id], route.route_type): route
+            for route in Route.objects.all()
+        }
+        if delete_missing:
+            stale = [route.id for key, route in existing_routes.items() if key not in routes]
+            if stale:
+                counts['routes']['deleted'] += Route.objects.filter(id__in=stale).delete()[0]
+        new_routes = []
+        changed_routes = []
+        for key, values in routes.items():
+            src, dst, route_type = key
+            if src not in service_to_id or dst not in service_to_id:
+                continue
+            route = existing_routes.get(key)
+            if route is None:
+                new_routes.append(Route(
+                    source_id=service_to_id[src], destination_id=service_to_id[dst], route_type=route_type, **values
+                ))
+            elif update_routes and _changed(route, values):
+                for field, value in values.items():
+                    setattr(route, field, value)
+                route.updated_at = now
+                changed_routes.append(route)
+        Route.objects.bulk_create(new_routes)
+        Route.objects.bulk_update(changed_routes, ROUTE_FIELDS + ['updated_at'])
+        counts['routes']['created'] = len(new_routes)
+        counts['routes']['updated'] = len(changed_routes)
+    return counts
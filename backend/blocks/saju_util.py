@@ -1,4 +1,11 @@
 import datetime
+import threading
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
 
 # Heavenly Stems (Cheongan)
 CHEONGAN = ["갑", "을", "병", "정", "무", "기", "경", "신", "임", "계"]
@@ -154,9 +161,9 @@ def get_day_pillar(year, month, day):
     current_idx = (9 + delta) % 60
     return get_ganji(current_idx)
 
-def calculate_saju(year, month, day, hour=None, minute=None):
+def _calculate_saju_reference(year, month, day, hour=None, minute=None):
     """
-    Calculate full Saju pillars.
+    Calculate full Saju pillars from the formulas (used outside the table range).
     """
     # 1. Year Pillar
     year_ganji, solar_year = get_year_pillar(year, month, day)
@@ -208,6 +215,23 @@ def calculate_saju(year, month, day, hour=None, minute=None):
         "solar_year": solar_year
     }
 
+# Element Mapping
+# Wood: Gap, Eul, In, Myo
+# Fire: Byeong, Jeong, Sa, O
+# Earth: Mu, Gi, Jin, Sul, Chuk, Mi
+# Metal: Gyeong, Shin, Shin, Yu
+# Water: Im, Gye, Hae, Ja
+# '신' is both the stem 辛 and the branch 申; both are Metal, so one entry covers them.
+ELEMENT_MAP = {
+    '갑': 'wood', '을': 'wood', '인': 'wood', '묘': 'wood',
+    '병': 'fire', '정': 'fire', '사': 'fire', '오': 'fire',
+    '무': 'earth', '기': 'earth', '진': 'earth', '술': 'earth', '축': 'earth', '미': 'earth',
+    '경': 'metal', '신': 'metal', '유': 'metal',
+    '임': 'water', '계': 'water', '해': 'water', '자': 'water'
+}
+ELEMENT_NAMES = ('wood', 'fire', 'earth', 'metal', 'water')
+
+
 def analyze_elements(saju_result):
     """
     Analyze element distribution based on pillars.
@@ -215,40 +239,201 @@ def analyze_elements(saju_result):
     pillars = [saju_result['year_pillar'], saju_result['month_pillar'], saju_result['day_pillar']]
     if saju_result['time_pillar']:
         pillars.append(saju_result['time_pillar'])
-        
-    # Element Mapping
-    # Wood: Gap, Eul, In, Myo
-    # Fire: Byeong, Jeong, Sa, O
-    # Earth: Mu, Gi, Jin, Sul, Chuk, Mi
-    # Metal: Gyeong, Shin, Shin, Yu (Note: Shin(Monkey)=Metal, Shin(Stem)=Metal)
-    # Water: Im, Gye, Hae, Ja
-    
-    element_map = {
-        '갑': 'wood', '을': 'wood', '인': 'wood', '묘': 'wood',
-        '병': 'fire', '정': 'fire', '사': 'fire', '오': 'fire',
-        '무': 'earth', '기': 'earth', '진': 'earth', '술': 'earth', '축': 'earth', '미': 'earth',
-        '경': 'metal', '신': 'metal', '유': 'metal', # Handle Hanja/Hangul ambiguity carefully if needed. 
-        # Here '신' is ambiguous in Hangul (Shin-Metal vs Shin-Monkey).
-        # But Shin-Metal is Stem, Shin-Monkey is Branch.
-        # My CHEONGAN/JIJI arrays use specific Hangul.
-        # CHEONGAN: ... 경, 신(辛) ...
-        # JIJI: ... 신(申), 유 ...
-        # Both represent Metal. Wait, is Monkey(申) Metal? Yes.
-        # Is 辛 Metal? Yes.
-        # So '신' maps to metal regardless.
-        '임': 'water', '계': 'water', '해': 'water', '자': 'water'
-    }
-    
+
     counts = {'wood': 0, 'fire': 0, 'earth': 0, 'metal': 0, 'water': 0}
-    
     for p in pillars:
-        stem = p[0]
-        branch = p[1]
-        
-        s_elem = element_map.get(stem)
-        b_elem = element_map.get(branch)
-        
-        if s_elem: counts[s_elem] += 1
-        if b_elem: counts[b_elem] += 1
-        
+        for char in p[:2]:
+            element = ELEMENT_MAP.get(char)
+            if element:
+                counts[element] += 1
     return counts
+
+
+# --- Precomputed tables ---
+#
+# Pillars are stored as sexagenary indices (0 = 갑자 ... 59 = 계해; GANJI[i]
+# is the string). Year, month and day pillars for every date in
+# TABLE_START..TABLE_END are packed one byte each and built once, on first
+# use, from the reference functions above, so the tables return exactly
+# what those functions return. Dates outside the range use the reference
+# functions directly.
+
+TABLE_START = datetime.date(1900, 1, 1)
+TABLE_END = datetime.date(2100, 12, 31)
+GANJI = [CHEONGAN[i % 10] + JIJI[i % 12] for i in range(60)]
+GANJI_INDEX = {ganji: i for i, ganji in enumerate(GANJI)}
+# Element counts of each pillar, in ELEMENT_NAMES order
+GANJI_ELEMENTS = [
+    tuple(sum(1 for char in ganji if ELEMENT_MAP.get(char) == name) for name in ELEMENT_NAMES)
+    for ganji in GANJI
+]
+
+_tables = None
+_tables_lock = threading.Lock()
+
+
+def _build_tables():
+    # Year and month pillars only depend on (year stem, month, day), so the
+    # reference functions are evaluated once per calendar day and stem
+    # group, not once per date.
+    leap_days = [datetime.date(2000, 1, 1) + datetime.timedelta(days=i) for i in range(366)]
+    before_ipchun = {(d.month, d.day): get_year_pillar(2000, d.month, d.day)[1] == 1999 for d in leap_days}
+    month_index = {
+        (stem_group, d.month, d.day): GANJI_INDEX[get_month_pillar(stem_group, d.month, d.day)]
+        for stem_group in range(5) for d in leap_days
+    }
+
+    num_days = (TABLE_END - TABLE_START).days + 1
+    base_day_index = GANJI_INDEX[get_day_pillar(TABLE_START.year, TABLE_START.month, TABLE_START.day)]
+    year_table = array('B', bytes(num_days))
+    month_table = array('B', bytes(num_days))
+    day_table = array('B', ((base_day_index + offset) % 60 for offset in range(num_days)))
+    current = TABLE_START
+    one_day = datetime.timedelta(days=1)
+    for offset in range(num_days):
+        md = (current.month, current.day)
+        year_idx = (current.year - (1 if before_ipchun[md] else 0) - 4) % 60
+        year_table[offset] = year_idx
+        month_table[offset] = month_index[(year_idx % 10 % 5, current.month, current.day)]
+        current += one_day
+
+    tables = {'year': year_table, 'month': month_table, 'day': day_table}
+    if np is not None:
+        tables['np'] = {key: np.frombuffer(value, dtype=np.uint8) for key, value in tables.items()}
+        # Row 60 is all zeros so time index -1 (unknown) adds nothing
+        tables['np']['elements'] = np.array(GANJI_ELEMENTS + [(0,) * 5], dtype=np.int16)
+    return tables
+
+
+def _get_tables():
+    global _tables
+    if _tables is None:
+        with _tables_lock:
+            if _tables is None:
+                _tables = _build_tables()
+    return _tables
+
+
+if np is not None:
+    _MONTH_LENGTHS = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31], dtype=np.int64)
+
+
+def _days_since_table_start(years, months, days):
+    """Vectorized proleptic Gregorian day count (days-from-civil) relative to TABLE_START."""
+    shifted_years = years - (months <= 2)
+    era = shifted_years // 400
+    year_of_era = shifted_years - era * 400
+    day_of_year = (153 * (months + np.where(months > 2, -3, 9)) + 2) // 5 + days - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - (TABLE_START.toordinal() + 305)
+
+
+def _time_index(day_idx, hour):
+    branch_idx = ((hour + 1) // 2) % 12
+    stem_idx = ((day_idx % 10) % 5 * 2 + branch_idx) % 10
+    # Sexagenary index with this stem and branch (they always share parity)
+    return (6 * stem_idx - 5 * branch_idx) % 60
+
+
+def _is_before_ipchun(month, day):
+    return month < 2 or (month == 2 and day < 4)
+
+
+def calculate_saju(year, month, day, hour=None, minute=None):
+    """
+    Calculate full Saju pillars.
+    """
+    offset = (datetime.date(year, month, day) - TABLE_START).days
+    tables = _get_tables()
+    if not 0 <= offset < len(tables['day']):
+        return _calculate_saju_reference(year, month, day, hour, minute)
+    day_idx = tables['day'][offset]
+    return {
+        "year_pillar": GANJI[tables['year'][offset]],
+        "month_pillar": GANJI[tables['month'][offset]],
+        "day_pillar": GANJI[day_idx],
+        "time_pillar": GANJI[_time_index(day_idx, hour)] if hour is not None else None,
+        "solar_year": year - 1 if _is_before_ipchun(month, day) else year,
+    }
+
+
+def calculate_saju_many(years, months, days, hours=None):
+    """
+    calculate_saju over equal-length sequences of dates in one pass.
+
+    ``hours`` may hold None or -1 for an unknown birth time. Returns columns
+    (numpy arrays when numpy is installed, lists otherwise):
+
+        {'year', 'month', 'day', 'time'}: sexagenary indices into GANJI (time -1 if unknown)
+        'solar_year': year of the year pillar
+        'elements': per-row element counts in ELEMENT_NAMES order
+
+    saju_row(result, i) turns row i into the calculate_saju dict. Dates must
+    fall inside TABLE_START..TABLE_END; anything else raises ValueError.
+    """
+    tables = _get_tables()
+    size = len(years)
+    if hours is None:
+        hours = [-1] * size
+    if not (len(months) == len(days) == len(hours) == size):
+        raise ValueError('years, months, days, hours 길이가 같아야 합니다.')
+
+    if np is not None:
+        years_arr = np.asarray(years, dtype=np.int64)
+        months_arr = np.asarray(months, dtype=np.int64)
+        days_arr = np.asarray(days, dtype=np.int64)
+        if isinstance(hours, np.ndarray):
+            hours_arr = hours.astype(np.int64)
+        else:
+            hours_arr = np.array([-1 if h is None else h for h in hours], dtype=np.int64)
+
+        leap = (years_arr % 4 == 0) & ((years_arr % 100 != 0) | (years_arr % 400 == 0))
+        month_lengths = _MONTH_LENGTHS[np.clip(months_arr, 1, 12)] + ((months_arr == 2) & leap)
+        if size and ((months_arr < 1) | (months_arr > 12) | (days_arr < 1) | (days_arr > month_lengths)).any():
+            raise ValueError('유효하지 않은 날짜가 포함되어 있습니다.')
+        offsets = _days_since_table_start(years_arr, months_arr, days_arr)
+        if size and (offsets.min() < 0 or offsets.max() >= len(tables['day'])):
+            raise ValueError(f'{TABLE_START.year}~{TABLE_END.year}년 범위를 벗어난 날짜가 있습니다.')
+
+        packed = tables['np']
+        year_idx = packed['year'][offsets]
+        month_idx = packed['month'][offsets]
+        day_idx = packed['day'][offsets].astype(np.int64)
+        branch_idx = ((hours_arr + 1) // 2) % 12
+        stem_idx = (day_idx % 10 % 5 * 2 + branch_idx) % 10
+        time_idx = np.where(hours_arr >= 0, (6 * stem_idx - 5 * branch_idx) % 60, -1)
+        element_table = packed['elements']
+        elements = element_table[year_idx] + element_table[month_idx] + element_table[day_idx] + element_table[time_idx]
+        before = (months_arr < 2) | ((months_arr == 2) & (days_arr < 4))
+        return {
+            'year': year_idx, 'month': month_idx, 'day': day_idx, 'time': time_idx,
+            'solar_year': years_arr - before, 'elements': elements,
+        }
+
+    result = {'year': [], 'month': [], 'day': [], 'time': [], 'solar_year': [], 'elements': []}
+    for year, month, day, hour in zip(years, months, days, hours):
+        offset = (datetime.date(year, month, day) - TABLE_START).days
+        if not 0 <= offset < len(tables['day']):
+            raise ValueError(f'{TABLE_START.year}~{TABLE_END.year}년 범위를 벗어난 날짜가 있습니다.')
+        year_idx, month_idx, day_idx = tables['year'][offset], tables['month'][offset], tables['day'][offset]
+        time_idx = _time_index(day_idx, hour) if hour is not None and hour >= 0 else -1
+        pillars = [year_idx, month_idx, day_idx] + ([time_idx] if time_idx >= 0 else [])
+        result['year'].append(year_idx)
+        result['month'].append(month_idx)
+        result['day'].append(day_idx)
+        result['time'].append(time_idx)
+        result['solar_year'].append(year - 1 if _is_before_ipchun(month, day) else year)
+        result['elements'].append([sum(GANJI_ELEMENTS[idx][k] for idx in pillars) for k in range(5)])
+    return result
+
+
+def saju_row(result, i):
+    """Row ``i`` of a calculate_saju_many result as a calculate_saju dict."""
+    time_idx = int(result['time'][i])
+    return {
+        "year_pillar": GANJI[int(result['year'][i])],
+        "month_pillar": GANJI[int(result['month'][i])],
+        "day_pillar": GANJI[int(result['day'][i])],
+        "time_pillar": GANJI[time_idx] if time_idx >= 0 else None,
+        "solar_year": int(result['solar_year'][i]),
+    }
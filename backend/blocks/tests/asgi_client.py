@@ -0,0 +1,66 @@
+"""Drive a Django view through the real ASGIHandler and read its body chunk by chunk."""
+import asyncio
+import contextlib
+from urllib.parse import urlsplit
+
+from django.core import signals
+from django.core.handlers.asgi import ASGIHandler
+from django.db import close_old_connections
+
+
+@contextlib.asynccontextmanager
+async def asgi_stream(url, method='GET', body=b'', headers=()):
+    """
+    Yield a ``next_chunk(timeout)`` coroutine returning each body chunk as the
+    handler sends it (b'' once the response is complete). The request stays
+    open until the block exits, so endless streams can be read too.
+    """
+    parts = urlsplit(url)
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': parts.path,
+        'raw_path': parts.path.encode(),
+        'query_string': parts.query.encode(),
+        'headers': [(b'host', b'testserver'), *headers],
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 0),
+    }
+    chunks = asyncio.Queue()
+    disconnected = asyncio.Event()
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.body':
+            if message.get('body'):
+                await chunks.put(message['body'])
+            if not message.get('more_body'):
+                await chunks.put(b'')
+
+    async def next_chunk(timeout=5):
+        return await asyncio.wait_for(chunks.get(), timeout)
+
+    # Like django.test.Client: keep the test transaction's connection open
+    signals.request_started.disconnect(close_old_connections)
+    signals.request_finished.disconnect(close_old_connections)
+    task = asyncio.ensure_future(ASGIHandler()(scope, receive, send))
+    try:
+        yield next_chunk
+    finally:
+        disconnected.set()
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+        signals.request_started.connect(close_old_connections)
+        signals.request_finished.connect(close_old_connections)
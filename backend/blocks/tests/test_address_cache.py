@@ -0,0 +1,81 @@
+import hashlib
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from blocks import address_cache
+from blocks.models import AddressStateCache
+
+ADDR = 'bc1qar0srrr7xfkvy5l643lydnw9re59gtzzwf5mdq'
+EMPTY_ADDR = 'bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t4'
+
+
+def _stats(addresses, base_url=None, timeout=8.0):
+    return {
+        addr: {
+            'chain_balance': 5000 if addr == ADDR else 0,
+            'mempool_balance': 0,
+            'tx_count': 1 if addr == ADDR else 0,
+        }
+        for addr in addresses
+    }
+
+
+class AddressStateCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @mock.patch('blocks.address_cache.fetch_blockstream_tip_height', return_value=800000)
+    @mock.patch('blocks.address_cache.fetch_blockstream_address_stats', side_effect=_stats)
+    def test_balances_are_reused_until_tip_moves(self, stats_mock, tip_mock):
+        first = address_cache.get_cached_balances([ADDR, EMPTY_ADDR])
+        self.assertEqual(first, {ADDR: 5000, EMPTY_ADDR: 0})
+        self.assertEqual(AddressStateCache.objects.get(address=EMPTY_ADDR).utxos, [])
+
+        second = address_cache.get_cached_balances([ADDR, EMPTY_ADDR])
+        self.assertEqual(second, first)
+        self.assertEqual(stats_mock.call_count, 1)
+
+        cache.clear()
+        tip_mock.return_value = 800001
+        address_cache.get_cached_balances([ADDR])
+        self.assertEqual(stats_mock.call_count, 2)
+
+    @mock.patch('blocks.address_cache.fetch_blockstream_tip_height', return_value=800000)
+    @mock.patch('blocks.address_cache.fetch_blockstream_utxos')
+    def test_utxos_invalidated_by_scripthash(self, utxo_mock, _tip_mock):
+        utxo_mock.return_value = [{'txid': 'aa' * 32, 'vout': 0, 'value': 1000, 'status': {'confirmed': True}}]
+        self.assertEqual(len(address_cache.get_cached_utxos(ADDR)), 1)
+        address_cache.get_cached_utxos(ADDR)
+        self.assertEqual(utxo_mock.call_count, 1)
+
+        self.assertEqual(address_cache.invalidate_addresses([ADDR]), 1)
+        address_cache.get_cached_utxos(ADDR)
+        self.assertEqual(utxo_mock.call_count, 2)
+
+    @mock.patch('blocks.address_cache.fetch_blockstream_tip_height', return_value=800000)
+    @mock.patch('blocks.address_cache.fetch_blockstream_address_stats', side_effect=_stats)
+    @mock.patch('blocks.address_cache.fetch_blockstream_utxos')
+    def test_balance_refresh_keeps_utxos_unless_the_address_changed(self, utxo_mock, stats_mock, tip_mock):
+        utxo_mock.return_value = [{'txid': 'aa' * 32, 'vout': 0, 'value': 5000, 'status': {'confirmed': True}}]
+        address_cache.get_cached_utxos(ADDR)
+
+        cache.clear()
+        tip_mock.return_value = 800001
+        address_cache.get_cached_balances([ADDR])
+        self.assertEqual(AddressStateCache.objects.get(address=ADDR).utxos, utxo_mock.return_value)
+
+        cache.clear()
+        tip_mock.return_value = 800002
+        stats_mock.side_effect = lambda addresses, **kwargs: {
+            addr: {'chain_balance': 7000, 'mempool_balance': 0, 'tx_count': 2} for addr in addresses
+        }
+        address_cache.get_cached_balances([ADDR])
+        self.assertIsNone(AddressStateCache.objects.get(address=ADDR).utxos)
+
+    def test_scripthash_matches_electrum_convention(self):
+        script = bytes.fromhex('0014e8df018c7e326cc253faac7e46cdc51e68542c42')
+        expected = hashlib.sha256(script).digest()[::-1].hex()
+        self.assertEqual(address_cache.address_scripthash(ADDR), expected)
+        self.assertEqual(address_cache.address_scripthash('not-an-address'), '')
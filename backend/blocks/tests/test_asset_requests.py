@@ -1,4 +1,6 @@
-from django.test import SimpleTestCase
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
 
 from blocks import views
 
@@ -59,3 +61,26 @@ class AssetRequestBuilderTests(SimpleTestCase):
         deposit = next(asset for asset in assets if asset['id'] != 'bitcoin')
         self.assertEqual(deposit['metadata']['synthetic_asset'], 'deposit')
         self.assertEqual(deposit['metadata']['target_rate_pct'], 3.0)
+
+
+@override_settings(OPENAI_API_KEY='test-key')
+class AssetResolutionBatchTests(TestCase):
+    def test_unknown_assets_are_translated_and_looked_up_in_one_batch_each(self):
+        def fake_batch(system_prompt, inputs, *args, **kwargs):
+            if kwargs.get('tag') == 'Translate':
+                return [{'english': {'팔란티어': 'Palantir', '루시드': 'Lucid'}[name]} for name in inputs]
+            return [
+                {'found': True, 'ticker': 'pltr', 'label': 'Palantir'} if 'Palantir' in item else {'found': False}
+                for item in inputs
+            ]
+
+        with mock.patch('blocks.views.llm_gateway.chat_json_batch', side_effect=fake_batch) as batch_mock:
+            resolved = views._resolve_assets(['팔란티어', '비트코인', '루시드', '팔란티어'])
+
+        self.assertEqual(batch_mock.call_count, 2)
+        lookup_inputs = batch_mock.call_args_list[1].args[1]
+        self.assertEqual(len(lookup_inputs), 2)
+        self.assertIn('English translation: Lucid', lookup_inputs[0])
+        self.assertIn('English translation: Palantir', lookup_inputs[1])
+        self.assertEqual([asset['ticker'] for asset in resolved], ['PLTR', 'BTC-USD', '루시드', 'PLTR'])
+        self.assertEqual(resolved[0]['category'], '미국 주식')
@@ -0,0 +1,69 @@
+import random
+
+from django.test import SimpleTestCase
+
+from blocks import coin_selection
+
+BASE_VBYTES = 41  # header + one P2WPKH recipient
+
+
+def _utxos(values):
+    return [{'txid': f'{i:064x}', 'vout': 0, 'value': value} for i, value in enumerate(values)]
+
+
+class CoinSelectionTests(SimpleTestCase):
+    def test_branch_and_bound_finds_changeless_match(self):
+        fee_rate = 2
+        amount = 50_000
+        # 30_000 + 20_000 + two input fees + base fee is an exact changeless spend
+        exact_pair = [30_000 + 68 * fee_rate, 20_000 + 68 * fee_rate + BASE_VBYTES * fee_rate]
+        utxos = _utxos([1_000, 5_000, 90_000, *exact_pair, 7_000])
+
+        result = coin_selection.select_coins(utxos, amount, fee_rate, base_vbytes=BASE_VBYTES)
+
+        self.assertEqual(result['algorithm'], 'bnb')
+        self.assertFalse(result['has_change'])
+        self.assertEqual(sorted(u['value'] for u in result['selected']), sorted(exact_pair))
+        self.assertEqual(result['fee_sats'], result['total_sats'] - amount)
+
+    def test_change_is_created_above_dust(self):
+        utxos = _utxos([200_000])
+        result = coin_selection.select_coins(utxos, 50_000, 3, base_vbytes=BASE_VBYTES)
+        self.assertTrue(result['has_change'])
+        self.assertEqual(result['total_sats'], 50_000 + result['fee_sats'] + result['change_sats'])
+        self.assertEqual(result['fee_sats'], 3 * (BASE_VBYTES + 68 + 31))
+
+    def test_returns_none_when_funds_are_insufficient(self):
+        utxos = _utxos([1_000, 2_000])
+        self.assertIsNone(coin_selection.select_coins(utxos, 5_000, 1, base_vbytes=BASE_VBYTES))
+
+    def test_uneconomic_inputs_are_ignored(self):
+        utxos = _utxos([100, 60_000])
+        result = coin_selection.select_coins(utxos, 10_000, 2, base_vbytes=BASE_VBYTES)
+        self.assertEqual([u['value'] for u in result['selected']], [60_000])
+
+    def test_fragmented_wallet_uses_few_inputs(self):
+        rng = random.Random(7)
+        utxos = _utxos([rng.randint(1_000, 100_000) for _ in range(2_000)])
+        result = coin_selection.select_coins(utxos, 500_000, 5, base_vbytes=BASE_VBYTES)
+        self.assertIsNotNone(result)
+        self.assertLess(len(result['selected']), 60)
+
+    def test_extra_inputs_must_pay_for_themselves_by_default(self):
+        fee_rate = 5
+        amount = 50_000
+        # Seven inputs that match the amount exactly (no change) against one large input with change
+        exact = [7_000 + 68 * fee_rate] * 6 + [8_000 + 68 * fee_rate + BASE_VBYTES * fee_rate]
+        utxos = _utxos([*exact, 500_000])
+
+        result = coin_selection.select_coins(utxos, amount, fee_rate, base_vbytes=BASE_VBYTES)
+        self.assertEqual([u['value'] for u in result['selected']], [500_000])
+        self.assertEqual(result['fee_sats'], fee_rate * (BASE_VBYTES + 68 + 31))
+        # Waste: the input at half the rate plus change (output now, spend later at half the rate)
+        self.assertEqual(result['waste'], 68 * 2.5 + (31 * 5 + 68 * 2.5))
+
+        consolidating = coin_selection.select_coins(
+            utxos, amount, fee_rate, base_vbytes=BASE_VBYTES, long_term_fee_rate=20,
+        )
+        self.assertEqual(len(consolidating['selected']), 7)
+        self.assertFalse(consolidating['has_change'])
@@ -0,0 +1,362 @@
+import json
+import threading
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from blocks import compat_cache, compat_presets, llm_gateway
+from blocks.fake_llm import FakeLLMServer
+from blocks.llm_stream import stream_chat, stream_gemini_chat, stream_openai_chat
+from blocks.models import CompatibilityAgentCache, CompatibilityAnalysis, CompatibilityQuickPreset
+from blocks.tests.asgi_client import asgi_stream
+
+
+def _parse_sse(body):
+    return [json.loads(line[len('data: '):]) for line in body.split('\n\n') if line.startswith('data: ')]
+
+
+def _sse_events(response):
+    async def read():
+        return [chunk async for chunk in response.streaming_content]
+    return _parse_sse(b''.join(async_to_sync(read)()).decode('utf-8'))
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+class CompatibilityStreamTests(TestCase):
+    def setUp(self):
+        compat_cache.reset_hot_cache()
+        self.addCleanup(compat_cache.reset_hot_cache)
+
+    def post(self, payload):
+        return self.client.post(
+            '/api/compatibility/agent/generate', data=json.dumps(payload), content_type='application/json',
+        )
+
+    def test_stream_proxies_chunks_and_caches_the_final_text(self):
+        async def fake_stream(model_name, system_prompt, user_prompt, info=None, **kwargs):
+            info['model'] = 'gpt-test'
+            return _aiter(['궁합은 ', '좋습니다.'])
+
+        payload = {
+            'context': '두 사람의 궁합',
+            'stream': True,
+            'cache': {'category': 'compat', 'profile': {'name': 'A', 'birthdate': '1990-01-01'}},
+        }
+        with mock.patch.dict('blocks.llm_stream.STREAMERS', {'openai': fake_stream, 'gemini': fake_stream}):
+            response = self.post(payload)
+            events = _sse_events(response)
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream; charset=utf-8')
+        self.assertEqual([e['type'] for e in events], ['start', 'delta', 'delta', 'done'])
+        self.assertEqual(events[-1]['narrative'], '궁합은 좋습니다.')
+        self.assertEqual(events[-1]['model'], 'gpt-test')
+        self.assertEqual(CompatibilityAgentCache.objects.get().response_text, '궁합은 좋습니다.')
+
+        cached = _sse_events(self.post(payload))
+        self.assertEqual([e['type'] for e in cached], ['done'])
+        self.assertTrue(cached[0]['cached'])
+
+    def test_stream_reports_provider_errors_as_events(self):
+        async def failing_stream(*args, **kwargs):
+            raise RuntimeError('HTTP 429 Too Many Requests')
+
+        with mock.patch.dict('blocks.llm_stream.STREAMERS', {'openai': failing_stream, 'gemini': failing_stream}):
+            events = _sse_events(self.post({'context': 'x', 'stream': True}))
+
+        self.assertEqual(events[-1]['type'], 'error')
+        self.assertEqual(events[-1]['error_type'], 'quota_exceeded')
+
+
+class CompatibilityCacheKeyTests(TestCase):
+    def setUp(self):
+        compat_cache.reset_hot_cache()
+        self.addCleanup(compat_cache.reset_hot_cache)
+        patcher = mock.patch('blocks.views.llm_gateway.chat', return_value={
+            'text': '좋은 궁합입니다.', 'provider': 'openai', 'model': 'gpt-test', 'latency_ms': 1, 'usage': {},
+        })
+        self.chat_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, payload):
+        response = self.client.post(
+            '/api/compatibility/agent/generate', data=json.dumps(payload), content_type='application/json',
+        )
+        return response.json()
+
+    def test_structured_inputs_share_a_key_regardless_of_order_and_format(self):
+        cache = {'category': 'compat', 'profile': {'name': 'A', 'birthdate': '1990-01-01', 'gender': 'male'}}
+        first = self.post({'data': {'birthdate': '1990-01-01', 'birth_time': '09:05', 'note': 'hi'}, 'cache': cache})
+        again = self.post({
+            'data': {'note': ' hi ', 'birth_time': '09:05', 'birthdate': '1990-01-01'},
+            'cache': dict(cache, profile={'gender': '남', 'birthdate': '1990.1.1', 'name': 'A'}),
+        })
+
+        self.assertFalse(first.get('cached'))
+        self.assertTrue(again['cached'])
+        self.assertEqual(again['cache_key'], CompatibilityAgentCache.objects.get().cache_key)
+        self.assertEqual(self.chat_mock.call_count, 1)
+
+    def test_identical_charts_reuse_narratives_only_when_requested(self):
+        def request(name, **extra):
+            return self.post({
+                'context': f'{name}의 비트코인 궁합',
+                'cache': {'category': 'user_report', 'profile': {'name': name, 'birthdate': '1990-01-01'}, **extra},
+            })
+
+        request('A')
+        self.assertFalse(request('B').get('cached'))
+        reused = request('C', match='saju')
+
+        self.assertTrue(reused['cached'])
+        self.assertEqual(reused['cache_match'], 'saju')
+        self.assertEqual(self.chat_mock.call_count, 2)
+
+
+    def test_saju_reuse_swaps_names_and_skips_context_derived_agents(self):
+        self.chat_mock.return_value = dict(self.chat_mock.return_value, text='민수님은 지수님과 잘 맞습니다.')
+
+        def request(subject, target, agent_key='pair_compatibility', context=None):
+            return self.post({
+                'agent_key': agent_key,
+                'context': context or f'{subject}와 {target}의 궁합',
+                'cache': {
+                    'category': 'pair_report', 'match': 'saju',
+                    'profile': {'name': subject, 'birthdate': '1990-01-01'},
+                    'target_profile': {'name': target, 'birthdate': '1992-05-05'},
+                },
+            })
+
+        request('민수', '지수')
+        reused = request('철수', '영희')
+        self.assertEqual((reused['cache_match'], reused['narrative']), ('saju', '철수님은 영희님과 잘 맞습니다.'))
+        # The stored row and its hot-tier copy keep the original names
+        self.assertEqual(CompatibilityAgentCache.objects.get().response_text, '민수님은 지수님과 잘 맞습니다.')
+        self.assertEqual(request('민수', '지수')['narrative'], '민수님은 지수님과 잘 맞습니다.')
+
+        self.assertFalse(request('철수', '').get('cached'))
+        self.assertEqual(self.chat_mock.call_count, 2)
+
+        request('민수', '지수', agent_key='highlight_story', context='하이라이트: 첫 번째 이야기')
+        other = request('민수', '지수', agent_key='highlight_story', context='하이라이트: 두 번째 이야기')
+        self.assertFalse(other.get('cached'))
+        self.assertEqual(self.chat_mock.call_count, 4)
+
+class QuickPresetPairPrecomputeTests(TestCase):
+    def setUp(self):
+        compat_cache.reset_hot_cache()
+        self.addCleanup(compat_cache.reset_hot_cache)
+        patcher = mock.patch('blocks.views.llm_gateway.chat', return_value={
+            'text': '서로를 북돋는 궁합입니다.', 'provider': 'openai', 'model': 'gpt-test', 'latency_ms': 1, 'usage': {},
+        })
+        self.chat_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+        CompatibilityQuickPreset.objects.all().delete()
+        CompatibilityQuickPreset.objects.create(label='사토시', birthdate='1975-04-05', sort_order=1)
+        CompatibilityQuickPreset.objects.create(label='비탈릭', birthdate='1994-01-31', birth_time='09:30', sort_order=2)
+
+    def test_precomputed_pairs_answer_the_page_requests_from_cache(self):
+        summary = compat_presets.precompute_preset_pairs(concurrency=1)
+
+        # 2 ordered pairs x 2 reports, each report plus its highlight
+        self.assertEqual((summary['chains'], summary['generated'], summary['failed']), (4, 8, 0))
+        self.assertEqual(CompatibilityAgentCache.objects.count(), 8)
+
+        first, second = (compat_presets.page_profile(p) for p in compat_presets.active_presets())
+        agent_key, context, cache_payload, _ = compat_presets.pair_requests(second, first, 'duo')
+        response = self.client.post('/api/compatibility/agent/generate', data=json.dumps({
+            'agent_key': agent_key, 'context': context, 'cache': cache_payload,
+        }), content_type='application/json').json()
+        self.assertTrue(response['cached'])
+        self.assertEqual(self.chat_mock.call_count, 8)
+
+        self.assertEqual(compat_presets.precompute_preset_pairs(concurrency=1)['generated'], 0)
+        matrix = compat_presets.preset_pair_matrix()
+        self.assertEqual(len(matrix['pairs']), 2)
+        self.assertEqual(matrix['presets'][0]['chart']['day_pillar'], '신축')
+
+
+    def test_admin_post_starts_a_background_job_and_returns_its_handle(self):
+        started = []
+
+        class InlineThread:
+            def __init__(self, target, args, **kwargs):
+                self.args = args
+
+            def start(self):
+                started.append(self.args)
+
+        headers = {'HTTP_X_ADMIN_USERNAME': 'admin'}
+        with mock.patch('blocks.compat_presets.threading.Thread', InlineThread):
+            response = self.client.post('/api/compatibility/admin/quick-presets/pairs', data=json.dumps({
+                'concurrency': 1,
+            }), content_type='application/json', **headers)
+            self.assertEqual(response.status_code, 202)
+            job = response.json()['job']
+            self.assertEqual(job['status'], 'running')
+            self.chat_mock.assert_not_called()
+
+            again = self.client.post('/api/compatibility/admin/quick-presets/pairs', data='{}',
+                                     content_type='application/json', **headers)
+            self.assertEqual((again.status_code, again.json()['job']['id']), (409, job['id']))
+
+        compat_presets.run_precompute_job(*started[0])
+        status = self.client.get('/api/compatibility/admin/quick-presets/pairs', {'job': job['id']}, **headers).json()
+        self.assertEqual(status['job']['status'], 'succeeded')
+        self.assertEqual((status['job']['summary']['done'], status['job']['summary']['generated']), (4, 8))
+
+class CompatibilityHotCacheTests(TestCase):
+    def setUp(self):
+        compat_cache.reset_hot_cache()
+        self.addCleanup(compat_cache.reset_hot_cache)
+
+    def test_hits_are_served_from_memory_and_flushed_in_batches(self):
+        first = CompatibilityAgentCache.objects.create(agent_key='a', cache_key='compat:1', response_text='one')
+        second = CompatibilityAgentCache.objects.create(agent_key='a', cache_key='compat:2', response_text='two')
+        compat_cache.get_cached_entry('compat:1')
+        compat_cache.get_cached_entry('compat:2')
+
+        with self.assertNumQueries(0):
+            for _ in range(3):
+                self.assertEqual(compat_cache.get_cached_entry('compat:1').response_text, 'one')
+            compat_cache.get_cached_entry('compat:2')
+        self.assertEqual(compat_cache.pending_hit_count('compat:1'), 4)
+
+        # Keys with the same pending count share one UPDATE
+        self.assertEqual(compat_cache.flush_hit_counts(), 2)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.hit_count, second.hit_count), (4, 2))
+        self.assertIsNone(compat_cache.get_cached_entry('compat:missing'))
+
+    def test_admin_edit_invalidates_the_hot_entry(self):
+        entry = CompatibilityAgentCache.objects.create(agent_key='a', cache_key='compat:1', response_text='old')
+        compat_cache.get_cached_entry('compat:1')
+        self.client.cookies['username'] = 'admin'
+        self.client.patch(
+            f'/api/compatibility/admin/cache/{entry.pk}', data=json.dumps({'response_text': 'new'}),
+            content_type='application/json',
+        )
+        self.assertEqual(compat_cache.get_cached_entry('compat:1').response_text, 'new')
+
+
+class CompatibilityAnalysisListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_keyset_pages_omit_the_narrative_and_detail_returns_it(self):
+        for score in range(3):
+            CompatibilityAnalysis.objects.create(
+                birthdate='1990-01-01', element='목(木)', zodiac='쥐', yin_yang='양', score=score, rating='중립형 합',
+                narrative='긴 분석' * 500,
+            )
+
+        first = self.client.get('/api/compatibility/analysis/list', {'limit': 2, 'with_count': 1}).json()
+        second = self.client.get('/api/compatibility/analysis/list', {'limit': 2, 'cursor': first['next_cursor']}).json()
+        self.assertEqual(first['total_count'], 3)
+        self.assertNotIn('total_count', second)
+        default = self.client.get('/api/compatibility/analysis/list').json()
+        self.assertEqual((len(default['analyses']), default['limit']), (3, 20))
+        self.assertNotIn('narrative', default['analyses'][0])
+
+        self.assertEqual([a['score'] for a in first['analyses'] + second['analyses']], [2, 1, 0])
+        self.assertNotIn('narrative', first['analyses'][0])
+        self.assertIsNone(second['next_cursor'])
+        detail = self.client.get(f"/api/compatibility/analysis/{second['analyses'][0]['id']}").json()
+        self.assertEqual(detail['analysis']['narrative'], '긴 분석' * 500)
+
+
+class ProviderStreamTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FakeLLMServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        compat_cache.reset_hot_cache()
+        self.addCleanup(compat_cache.reset_hot_cache)
+        self.server.reply = '궁합이 아주 좋습니다'
+        self.server.stream_gate = None
+        overrides = override_settings(
+            OPENAI_API_KEY='test-key', OPENAI_API_BASE=f'{self.server.url}/v1',
+            GEMINI_API_KEY='test-key', GEMINI_API_BASE=self.server.url,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_streams_go_through_the_gateway_limits_breaker_and_metrics(self):
+        llm_gateway.reset_llm_gateway()
+        self.addCleanup(llm_gateway.reset_llm_gateway)
+        self.server.fail('gemini', 503)
+        info = {}
+
+        async def run():
+            chunks = await stream_chat('sys', 'user', [('gemini', 'gemini-test'), ('openai', 'gpt-4o-mini')], info=info)
+            return [chunk async for chunk in chunks]
+
+        with override_settings(LLM_CIRCUIT_FAILURES=1):
+            self.assertEqual(''.join(async_to_sync(run)()), '궁합이 아주 좋습니다')
+            metrics = llm_gateway.llm_metrics()
+            self.assertEqual(info['provider'], 'openai')
+            self.assertEqual((metrics['gemini']['errors'], metrics['gemini']['circuit']), (1, 'open'))
+            self.assertEqual(metrics['openai']['calls'], 1)
+            self.assertEqual(metrics['openai']['completion_tokens'], 3)
+
+            # The open circuit skips Gemini without sending a request
+            sent = len(self.server.requests)
+            async_to_sync(run)()
+            self.assertEqual([provider for provider, _, _ in self.server.requests[sent:]], ['openai'])
+            self.assertEqual(llm_gateway.llm_metrics()['gemini']['rejected'], 1)
+
+    def collect(self, streamer, model):
+        info = {}
+
+        async def run():
+            return [chunk async for chunk in await streamer(model, 'sys', 'user', info=info)]
+        return async_to_sync(run)(), info
+
+    def test_provider_chunks_are_yielded_in_order(self):
+        for streamer, model in [
+            (stream_openai_chat, 'gpt-4o-mini'), (stream_openai_chat, 'gpt-5-mini'), (stream_gemini_chat, 'gemini-test'),
+        ]:
+            chunks, info = self.collect(streamer, model)
+            self.assertEqual(chunks, ['궁합이 ', '아주 ', '좋습니다'])
+            self.assertEqual(info['model'], model)
+        self.assertTrue(all(body.get('stream') for provider, _, body in self.server.requests if provider == 'openai'))
+
+    def test_asgi_response_sends_the_first_delta_before_the_answer_is_complete(self):
+        self.server.stream_gate = threading.Event()
+        body = json.dumps({'context': '두 사람의 궁합', 'stream': True}).encode('utf-8')
+
+        async def read_events():
+            events, text = [], ''
+            async with asgi_stream(
+                '/api/compatibility/agent/generate', method='POST', body=body,
+                headers=[(b'content-type', b'application/json')],
+            ) as next_chunk:
+                while True:
+                    chunk = await next_chunk()
+                    if not chunk:
+                        return events
+                    complete, _, text = (text + chunk.decode('utf-8')).rpartition('\n\n')
+                    events += _parse_sse(complete)
+                    if any(event['type'] == 'delta' for event in events) and not self.server.stream_gate.is_set():
+                        # The provider is still holding the rest of the answer
+                        self.assertNotIn('done', [event['type'] for event in events])
+                        self.server.stream_gate.set()
+
+        events = async_to_sync(read_events)()
+
+        self.assertTrue(self.server.stream_gate.is_set())
+        self.assertEqual([event['type'] for event in events], ['start', 'delta', 'delta', 'delta', 'done'])
+        self.assertEqual(events[-1]['narrative'], '궁합이 아주 좋습니다')
@@ -0,0 +1,112 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from blocks.fake_exchange import FakeExchangeServer
+from blocks.fee_ingest import ingest_exchange_fees
+from blocks.models import ExchangeRate, Route, ServiceNode, WithdrawalFee
+from blocks.routing_graph import graph_events_since, routing_graph_version
+
+
+CREDENTIALS = {
+    'upbit': {'key': 'upbit-key', 'secret': 'upbit-secret'},
+    'bithumb': {'key': 'bithumb-key', 'secret': 'bithumb-secret'},
+    'binance': {'key': 'binance-key', 'secret': 'binance-secret'},
+    'okx': {'key': 'okx-key', 'secret': 'okx-secret', 'passphrase': 'okx-pass'},
+}
+KEY_SETTINGS = {
+    'UPBIT_ACCESS_KEY': 'upbit-key', 'UPBIT_SECRET_KEY': 'upbit-secret',
+    'BITHUMB_ACCESS_KEY': 'bithumb-key', 'BITHUMB_SECRET_KEY': 'bithumb-secret',
+    'BINANCE_API_KEY': 'binance-key', 'BINANCE_API_SECRET': 'binance-secret',
+    'OKX_API_KEY': 'okx-key', 'OKX_API_SECRET': 'okx-secret', 'OKX_API_PASSPHRASE': 'okx-pass',
+}
+
+
+class FeeIngestTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FakeExchangeServer(credentials=CREDENTIALS).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.settings_override = override_settings(FEE_INGEST_BASE_URL=self.server.url, **KEY_SETTINGS)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.server.failing = set()
+
+        nodes = {
+            service: ServiceNode.objects.create(service=service, display_name=service)
+            for service in ['user', 'upbit_btc', 'okx_usdt', 'okx_btc', 'binance_btc', 'personal_wallet', 'coinos']
+        }
+        self.trading = Route.objects.create(
+            source=nodes['user'], destination=nodes['upbit_btc'], route_type='trading', fee_rate=Decimal('0.1'),
+        )
+        self.okx_trading = Route.objects.create(
+            source=nodes['okx_usdt'], destination=nodes['okx_btc'], route_type='trading', fee_rate=Decimal('0.1'),
+        )
+        self.onchain = Route.objects.create(
+            source=nodes['okx_btc'], destination=nodes['personal_wallet'], route_type='withdrawal_onchain',
+            fee_fixed=Decimal('0.0005'),
+        )
+        self.lightning = Route.objects.create(
+            source=nodes['okx_btc'], destination=nodes['coinos'], route_type='withdrawal_lightning',
+            fee_fixed=Decimal('0.0001'), is_event=True,
+        )
+        ExchangeRate.objects.create(exchange='upbit_btc', fee_rate=Decimal('0.1'))
+        WithdrawalFee.objects.create(exchange='okx', withdrawal_type='onchain', fee_btc=Decimal('0.0005'))
+
+    def test_changed_fees_are_written_once_and_published(self):
+        version = routing_graph_version()
+        result = ingest_exchange_fees(['upbit', 'okx'])
+        [event] = graph_events_since(version)
+
+        self.assertEqual(result['errors'], {})
+        self.assertEqual(result['changes'], {'routes': 2, 'exchange_rates': 1, 'withdrawal_fees': 1})
+        self.trading.refresh_from_db()
+        self.onchain.refresh_from_db()
+        self.lightning.refresh_from_db()
+        self.assertEqual(self.trading.fee_rate, Decimal('0.05'))
+        self.assertEqual(self.onchain.fee_fixed, Decimal('0.00001'))
+        self.assertEqual(self.lightning.fee_fixed, Decimal('0.0001'))  # event fees stay
+        self.assertEqual(ExchangeRate.objects.get(exchange='upbit_btc').fee_rate, Decimal('0.05'))
+        self.assertEqual(event['base_version'], version)
+        self.assertEqual({op['route']['id'] for op in event['ops']}, {self.trading.id, self.onchain.id})
+
+        version = routing_graph_version()
+        again = ingest_exchange_fees(['upbit', 'okx'])
+        self.assertEqual(again['changes'], {'routes': 0, 'exchange_rates': 0, 'withdrawal_fees': 0})
+        self.assertEqual(routing_graph_version(), version)
+
+    def test_failing_exchange_does_not_block_others(self):
+        self.server.failing = {'okx'}
+        self.server.set_fee('upbit', 'trading', 'btc', '0.00025')
+
+        result = ingest_exchange_fees(['upbit', 'okx'])
+
+        self.assertEqual(set(result['errors']), {'okx'})
+        self.trading.refresh_from_db()
+        self.okx_trading.refresh_from_db()
+        self.assertEqual(self.trading.fee_rate, Decimal('0.025'))
+        self.assertEqual(self.okx_trading.fee_rate, Decimal('0.1'))
+
+    def test_requests_are_signed_with_each_exchanges_keys(self):
+        result = ingest_exchange_fees()
+        self.assertEqual(result['errors'], {})
+        self.assertEqual(result['quotes'], 12)
+
+        with override_settings(OKX_API_SECRET='wrong-secret', BINANCE_API_KEY=''):
+            result = ingest_exchange_fees(['okx', 'binance'])
+        self.assertIn('401', result['errors']['okx'])
+        self.assertIn('401', result['errors']['binance'])  # unsigned request
+
+        with override_settings(FEE_INGEST_BASE_URL='', UPBIT_ACCESS_KEY=''):
+            with mock.patch('blocks.fee_ingest.requests.get') as get_mock:
+                result = ingest_exchange_fees(['upbit'])
+        get_mock.assert_not_called()
+        self.assertIn('API 키', result['errors']['upbit'])
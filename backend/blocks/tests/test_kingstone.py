@@ -0,0 +1,103 @@
+import io
+import json
+from unittest import mock
+
+from django.contrib.auth import hashers
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from blocks.btc import derive_bip84_account_zpub
+from blocks.encryption import pin_lookup_key_id, rebuild_pin_lookups
+from blocks.models import KingstoneWallet
+
+
+class KingstonePinLookupTests(TestCase):
+    def post(self, path, payload):
+        return self.client.post(f'/api/kingstone/pin/{path}', data=json.dumps(payload), content_type='application/json')
+
+    def test_verify_and_register_hash_at_most_one_pin(self):
+        for pin in ('111111', '222222'):
+            self.assertTrue(self.post('register', {'username': 'kim', 'pin': pin}).json()['ok'])
+
+        with mock.patch('blocks.models.check_password', wraps=hashers.check_password) as check_mock:
+            verified = self.post('verify', {'username': 'kim', 'pin': '222222'}).json()
+            self.assertEqual(check_mock.call_count, 1)
+            self.assertEqual(verified['wallet']['index'], 2)
+
+            self.assertEqual(self.post('verify', {'username': 'kim', 'pin': '999999'}).json()['code'], 'invalid_pin')
+            self.assertEqual(self.post('verify', {'username': 'lee', 'pin': '222222'}).json()['code'], 'no_pins')
+            self.assertEqual(check_mock.call_count, 1)
+
+            duplicate = self.post('register', {'username': 'kim', 'pin': '111111'})
+            self.assertEqual(duplicate.json()['code'], 'duplicate_pin')
+            self.assertEqual(check_mock.call_count, 2)
+
+    def test_rows_without_a_lookup_are_rebuilt_or_backfilled_on_verify(self):
+        self.post('register', {'username': 'kim', 'pin': '123456'})
+        KingstoneWallet.objects.update(pin_lookup='')
+        self.assertEqual(rebuild_pin_lookups(KingstoneWallet.objects.all()), 1)
+        self.assertNotEqual(KingstoneWallet.objects.get().pin_lookup, '')
+
+        KingstoneWallet.objects.update(pin_lookup='', pin_lookup_key_id='', pin_encrypted='')
+        self.assertTrue(self.post('verify', {'username': 'kim', 'pin': '123456'}).json()['ok'])
+        self.assertNotEqual(KingstoneWallet.objects.get().pin_lookup, '')
+
+    def test_rows_digested_under_another_key_are_still_found_and_rekeyed(self):
+        for pin in ('111111', '222222'):
+            self.post('register', {'username': 'kim', 'pin': pin})
+
+        with override_settings(KINGSTONE_PIN_LOOKUP_KEY='rotated-key'):
+            self.assertEqual(self.post('register', {'username': 'kim', 'pin': '222222'}).json()['code'], 'duplicate_pin')
+            self.assertEqual(self.post('verify', {'username': 'kim', 'pin': '111111'}).json()['wallet']['index'], 1)
+            self.assertEqual(KingstoneWallet.objects.get(index=1).pin_lookup_key_id, pin_lookup_key_id())
+
+            KingstoneWallet.objects.update(pin_lookup_key_id='old-key')
+            out = io.StringIO()
+            call_command('rebuild_kingstone_pin_lookups', stdout=out)
+            self.assertIn('rebuilt for 2 wallet', out.getvalue())
+            with mock.patch('blocks.models.check_password', wraps=hashers.check_password) as check_mock:
+                self.assertTrue(self.post('verify', {'username': 'kim', 'pin': '222222'}).json()['ok'])
+            self.assertEqual(check_mock.call_count, 1)
+
+
+class KingstoneWalletZpubTests(TestCase):
+    MNEMONIC = ' '.join(['abandon'] * 11 + ['about'])
+
+    def test_zpub_is_stored_on_save_and_serialized_without_derivation(self):
+        wallet = KingstoneWallet(username='kim', index=1, mnemonic=self.MNEMONIC)
+        wallet.set_pin('123456')
+        wallet.save()
+        expected = derive_bip84_account_zpub(self.MNEMONIC, account=0)
+        self.assertEqual(KingstoneWallet.objects.get().zpub, expected)
+
+        with mock.patch('blocks.btc.derive_bip84_account_zpub') as derive_mock:
+            listed = self.client.get('/api/kingstone/wallets', {'username': 'kim'}).json()
+        derive_mock.assert_not_called()
+        self.assertEqual(listed['wallets'][0]['zpub'], expected)
+
+        wallet = KingstoneWallet.objects.get()
+        wallet.mnemonic = 'not a valid phrase'
+        wallet.save(update_fields=['mnemonic'])
+        self.assertEqual(KingstoneWallet.objects.get().zpub, '')
+
+    def test_backfill_command_fills_rows_saved_without_a_zpub(self):
+        wallet = KingstoneWallet(username='kim', index=1, mnemonic=self.MNEMONIC)
+        wallet.set_pin('123456')
+        wallet.save()
+        KingstoneWallet.objects.update(zpub='', zpub_mnemonic_hash='')
+
+        call_command('backfill_kingstone_zpubs', stdout=io.StringIO())
+        self.assertEqual(KingstoneWallet.objects.get().zpub, derive_bip84_account_zpub(self.MNEMONIC, account=0))
+
+    def test_failed_derivation_is_recorded_and_not_retried_on_load(self):
+        wallet = KingstoneWallet(username='kim', index=1)
+        wallet.set_pin('123456')
+        wallet.save()  # mock mnemonic: not a valid BIP39 phrase
+        KingstoneWallet.objects.update(zpub_mnemonic_hash='')
+
+        with self.assertLogs('blocks.models', 'WARNING'):
+            KingstoneWallet.objects.get().as_dict()
+        with mock.patch('blocks.btc.derive_bip84_account_zpub') as derive_mock:
+            self.assertIsNone(KingstoneWallet.objects.get().as_dict()['zpub'])
+            call_command('backfill_kingstone_zpubs', stdout=io.StringIO())
+        derive_mock.assert_not_called()
@@ -0,0 +1,95 @@
+import json
+
+from django.test import SimpleTestCase, override_settings
+
+from blocks import llm_gateway
+from blocks.fake_llm import FakeLLMServer
+
+
+class LLMGatewayTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FakeLLMServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.settings_override = override_settings(
+            OPENAI_API_BASE=f'{self.server.url}/v1',
+            GEMINI_API_BASE=self.server.url,
+            OPENAI_API_KEY='test-openai',
+            GEMINI_API_KEY='test-gemini',
+            LLM_CIRCUIT_FAILURES=2,
+            LLM_CIRCUIT_RESET_SECONDS=60,
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        llm_gateway.reset_llm_gateway()
+        self.addCleanup(llm_gateway.reset_llm_gateway)
+        self.server.failures = {}
+        self.server.requests = []
+        self.server.reply = None
+        self.server.prefixes = set()
+
+    def test_rate_limited_provider_fails_over_and_metrics_record_usage(self):
+        self.server.fail('openai', 429)
+        route = [('openai', 'gpt-4o-mini'), ('gemini', 'gemini-2.5-flash')]
+
+        result = llm_gateway.chat('sys', 'hello there', route, temperature=0.2)
+
+        self.assertEqual(result['provider'], 'gemini')
+        self.assertEqual(result['text'], 'echo: hello there')
+        self.assertEqual(result['usage'], {'prompt_tokens': 3, 'cached_tokens': 0, 'completion_tokens': 3})
+        gemini_body = self.server.requests[-1][2]
+        self.assertEqual(gemini_body['systemInstruction']['parts'][0]['text'], 'sys')
+        self.assertEqual(gemini_body['generationConfig']['temperature'], 0.2)
+
+        metrics = llm_gateway.llm_metrics()
+        self.assertEqual(metrics['openai']['errors'], 1)
+        self.assertEqual(metrics['gemini']['calls'], 1)
+        self.assertEqual(metrics['gemini']['completion_tokens'], 3)
+        self.assertIsNotNone(metrics['gemini']['avg_latency_ms'])
+
+    def test_circuit_opens_after_repeated_failures(self):
+        self.server.fail('openai', 503, times=2)
+        for _ in range(2):
+            with self.assertRaises(llm_gateway.LLMError):
+                llm_gateway.chat('sys', 'x')
+
+        with self.assertRaisesMessage(llm_gateway.LLMError, 'circuit open'):
+            llm_gateway.chat('sys', 'x')
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(llm_gateway.llm_metrics()['openai']['circuit'], 'open')
+
+    def test_client_errors_are_not_retried_and_json_mode_parses(self):
+        self.server.fail('openai', 400)
+        with self.assertRaisesMessage(llm_gateway.LLMError, 'OpenAI API 오류 (400)'):
+            llm_gateway.chat('sys', 'x', [('openai', None), ('gemini', None)])
+        self.assertEqual([provider for provider, _, _ in self.server.requests], ['openai'])
+
+        self.server.reply = '{"found": true, "ticker": "AAPL"}'
+        parsed, result = llm_gateway.chat_json('sys', 'Apple')
+        self.assertEqual(parsed['ticker'], 'AAPL')
+        self.assertEqual(self.server.requests[-1][2]['response_format'], {'type': 'json_object'})
+
+    def test_batch_sends_one_request_with_a_cacheable_prefix(self):
+        def reply(prompt):
+            items = json.loads(prompt)['items']
+            # Answer out of order and leave the last item out
+            return json.dumps({'results': [{'id': item['id'], 'upper': item['input'].upper()} for item in items[-2::-1]]})
+
+        self.server.reply = reply
+        results = llm_gateway.chat_json_batch('Uppercase the input.', ['a', 'b', 'c'])
+        self.assertEqual([r and r['upper'] for r in results], ['A', 'B', None])
+        self.assertEqual(len(self.server.requests), 1)
+
+        llm_gateway.chat_json_batch('Uppercase the input.', ['d', 'e', 'f', 'g', 'h'], batch_size=4)
+        bodies = [body for _, _, body in self.server.requests]
+        self.assertEqual(len(bodies), 3)
+        self.assertEqual(len({body['prompt_cache_key'] for body in bodies}), 1)
+        self.assertEqual(len({body['messages'][0]['content'] for body in bodies}), 1)
+        self.assertGreater(llm_gateway.llm_metrics()['openai']['cached_prompt_tokens'], 0)
@@ -0,0 +1,284 @@
+import json
+import random
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from blocks import routing, routing_bench
+from blocks.models import Route, RoutingGraphEvent, ServiceNode
+from blocks.routing_graph import (
+    bucket_price,
+    bump_routing_graph_version,
+    graph_events_since,
+    price_bucket,
+    received_sats_matrix,
+    routing_graph_version,
+)
+from blocks.tests.asgi_client import asgi_stream
+from blocks.views import find_optimal_paths
+
+
+class KShortestPathsTests(SimpleTestCase):
+    def test_matches_exhaustive_enumeration_on_small_graphs(self):
+        rng = random.Random(3)
+        for _ in range(200):
+            num_nodes = rng.randint(2, 7)
+            num_edges = rng.randint(1, 20)
+            edge_tail = [rng.randrange(num_nodes) for _ in range(num_edges)]
+            edge_head = [rng.randrange(num_nodes) for _ in range(num_edges)]
+            edge_cost = [float(rng.randint(0, 9)) for _ in range(num_edges)]
+            k = rng.randint(1, 40)
+
+            paths = routing.k_shortest_paths(
+                0, num_nodes - 1, k,
+                num_nodes=num_nodes, edge_tail=edge_tail, edge_head=edge_head, edge_cost=edge_cost,
+            )
+            expected = routing_bench.brute_force_paths(num_nodes, edge_tail, edge_head, edge_cost, 0, num_nodes - 1)[:k]
+
+            self.assertEqual([cost for cost, _ in paths], [cost for cost, _ in expected])
+            self.assertEqual(len({edges for _, edges in paths}), len(paths))
+
+    def test_parallel_edges_are_distinct_paths(self):
+        paths = routing.k_shortest_paths(
+            0, 1, 5, num_nodes=2, edge_tail=[0, 0], edge_head=[1, 1], edge_cost=[2.0, 1.0],
+        )
+        self.assertEqual(paths, [(1.0, (1,)), (2.0, (0,))])
+
+    def test_max_hops_returns_cheapest_short_paths(self):
+        rng = random.Random(11)
+        for _ in range(200):
+            num_nodes = rng.randint(2, 7)
+            num_edges = rng.randint(1, 20)
+            edge_tail = [rng.randrange(num_nodes) for _ in range(num_edges)]
+            edge_head = [rng.randrange(num_nodes) for _ in range(num_edges)]
+            edge_cost = [float(rng.randint(0, 3)) for _ in range(num_edges)]
+            k, max_hops = rng.randint(1, 30), rng.randint(1, 4)
+
+            paths = routing.k_shortest_paths(
+                0, num_nodes - 1, k, max_hops=max_hops,
+                num_nodes=num_nodes, edge_tail=edge_tail, edge_head=edge_head, edge_cost=edge_cost,
+            )
+            expected = routing_bench.brute_force_paths(
+                num_nodes, edge_tail, edge_head, edge_cost, 0, num_nodes - 1, max_hops=max_hops,
+            )[:k]
+
+            self.assertEqual([cost for cost, _ in paths], [cost for cost, _ in expected])
+            self.assertTrue(all(len(edges) <= max_hops for _, edges in paths))
+
+    def test_negative_costs_are_rejected(self):
+        with self.assertRaises(ValueError):
+            routing.k_shortest_paths(0, 1, 1, num_nodes=2, edge_tail=[0], edge_head=[1], edge_cost=[-1.0])
+
+
+class RoutingBenchmarkGateTests(SimpleTestCase):
+    # Spur searches per (graph, k) on the quick benchmark set. Deterministic, so an
+    # increase means the search does more work; refresh from
+    # `python benchmark_routing.py --quick --json` when a change is intended.
+    WORK_BASELINE = {
+        ('synthetic-50', 10): 36, ('synthetic-50', 300): 1313,
+        ('synthetic-250', 10): 32, ('synthetic-250', 300): 1212,
+        ('seed-x1', 10): 26, ('seed-x1', 300): 105,
+        ('seed-x4', 10): 46, ('seed-x4', 300): 710,
+    }
+
+    def test_oracle_agrees_with_search(self):
+        self.assertEqual(routing_bench.oracle_mismatches(trials=100, seed=7), [])
+
+    def test_search_work_has_not_regressed(self):
+        results = []
+        for name, graph in routing_bench.benchmark_graphs(quick=True).items():
+            results.extend(routing_bench.time_search(name, graph, k_values=(10, 300), repeat=1))
+        baseline = {
+            'results': [
+                dict(row, spur_searches=self.WORK_BASELINE[(row['graph'], row['k'])]) for row in results
+            ],
+        }
+        self.assertEqual(
+            routing_bench.compare_to_baseline({'results': results}, baseline, time_tolerance=None), [],
+        )
+
+
+class FindOptimalPathsTests(TestCase):
+    def setUp(self):
+        self.nodes = {
+            service: ServiceNode.objects.create(service=service, display_name=service)
+            for service in ['user', 'upbit_krw', 'upbit_btc', 'personal_wallet']
+        }
+        self.route('user', 'upbit_krw', 'trading', '0')
+        self.route('upbit_krw', 'upbit_btc', 'trading', '0.05')
+        self.route('upbit_btc', 'personal_wallet', 'withdrawal_onchain', '0.3')
+        self.route('upbit_btc', 'personal_wallet', 'withdrawal_lightning', '0.1')
+        self.route('upbit_krw', 'personal_wallet', 'withdrawal_onchain', '0.01', is_enabled=False)
+        # Rows were written directly, not through the admin views
+        bump_routing_graph_version()
+
+    def route(self, source, destination, route_type, fee_rate, is_enabled=True):
+        return Route.objects.create(
+            source=self.nodes[source], destination=self.nodes[destination],
+            route_type=route_type, fee_rate=Decimal(fee_rate), is_enabled=is_enabled,
+        )
+
+    def test_returns_route_objects_cheapest_first(self):
+        nodes = self.nodes
+        paths = find_optimal_paths(nodes['user'], nodes['personal_wallet'], max_paths=10)
+
+        self.assertEqual(len(paths), 2)
+        self.assertAlmostEqual(paths[0]['total_cost'], 0.15)
+        self.assertEqual(paths[0]['routes'][-1].route_type, 'withdrawal_lightning')
+        self.assertEqual(paths[0]['path_signature'], tuple(r.id for r in paths[0]['routes']))
+
+    def test_compiled_graph_serves_queries_without_db_until_routes_change(self):
+        self.client.get('/api/optimal-paths')
+        # Only the shared graph version is read
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/optimal-paths?max_paths=5')
+        self.assertEqual(len(response.json()['paths']), 2)
+        self.assertEqual(response.json()['graph_version'], routing_graph_version())
+
+        version = routing_graph_version()
+        disabled = Route.objects.get(is_enabled=False)
+        response = self.client.post('/api/routes/admin', data=json.dumps({
+            'username': 'admin',
+            'id': disabled.id,
+            'source_id': disabled.source_id,
+            'destination_id': disabled.destination_id,
+            'route_type': disabled.route_type,
+            'fee_rate': 0.01,
+            'is_enabled': True,
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(routing_graph_version(), version)
+
+        paths = self.client.get('/api/optimal-paths').json()['paths']
+        self.assertEqual(len(paths), 3)
+        self.assertEqual(paths[0]['routes'][-1]['id'], disabled.id)
+
+    def test_changes_recorded_by_another_process_recompile_the_graph(self):
+        self.assertEqual(len(self.client.get('/api/optimal-paths').json()['paths']), 2)
+        # Another worker or ingest_fees.py enables the route and records the version in the database
+        Route.objects.filter(is_enabled=False).update(is_enabled=True)
+        RoutingGraphEvent.objects.create(version=routing_graph_version() + 1, stamp='other-process', ops=None)
+
+        self.assertEqual(len(self.client.get('/api/optimal-paths').json()['paths']), 3)
+
+    def test_path_responses_are_memoized_per_query(self):
+        first = self.client.get('/api/optimal-paths?max_paths=5').content
+        with mock.patch('blocks.views.find_optimal_paths') as search_mock:
+            second = self.client.get('/api/optimal-paths?max_paths=5').content
+        search_mock.assert_not_called()
+        self.assertEqual(first, second)
+
+        RoutingGraphEvent.objects.create(version=routing_graph_version() + 1, stamp='other-process', ops=None)
+        with mock.patch('blocks.views.find_optimal_paths', return_value=[]) as search_mock:
+            self.client.get('/api/optimal-paths?max_paths=5')
+        search_mock.assert_called_once()
+
+    def test_price_buckets_are_narrow_and_stable(self):
+        bucket = price_bucket(65_000.0)
+        low = bucket_price(bucket)
+        self.assertLessEqual(low, 65_000.0)
+        self.assertEqual(price_bucket(low * 1.002), bucket)
+        self.assertEqual(price_bucket(low * 1.004), bucket)
+        self.assertNotEqual(price_bucket(65_000.0 * 1.02), bucket)
+        self.assertIsNone(price_bucket(None))
+
+    def test_amount_ranking_switches_between_percent_and_fixed_fees(self):
+        Route.objects.create(
+            source=self.nodes['upbit_krw'], destination=self.nodes['personal_wallet'],
+            route_type='withdrawal_lightning', fee_fixed=Decimal('0.0001'),
+        )
+        bump_routing_graph_version()
+
+        data = self.client.get('/api/optimal-paths?amounts=1000000,100000000').json()
+
+        self.assertEqual(data['amounts'], [1_000_000, 100_000_000])
+        best_small, best_large = (data['paths'][i] for i in data['best_path_index'])
+        self.assertEqual(len(best_small['routes']), 3)
+        self.assertEqual(best_small['fee_sats'][0], 1_000_000 - best_small['received_sats'][0])
+        self.assertEqual(best_large['routes'][-1]['fee_fixed'], 0.0001)
+        self.assertEqual(best_large['received_sats'][1], 100_000_000 - 10_000)
+
+    def test_invalid_amounts_are_rejected(self):
+        response = self.client.get('/api/optimal-paths?amounts=abc')
+        self.assertEqual(response.status_code, 400)
+
+    def test_compact_format_references_shared_tables(self):
+        full = self.client.get('/api/optimal-paths')
+        compact = self.client.get('/api/optimal-paths?format=compact')
+        full_paths = full.json()['paths']
+        data = compact.json()
+
+        self.assertEqual(data['format'], 'compact')
+        self.assertEqual(len(data['paths']), len(full_paths))
+        for full_path, compact_path in zip(full_paths, data['paths']):
+            edges = [data['edges'][i] for i in compact_path['edges']]
+            self.assertEqual([e['id'] for e in edges], [r['id'] for r in full_path['routes']])
+            self.assertEqual(data['nodes'][edges[0]['source']]['service'], 'user')
+            self.assertEqual(compact_path['total_cost'], full_path['total_cost'])
+
+    @override_settings(ROUTING_STREAM_POLL_SECONDS=0.01)
+    def test_route_changes_are_streamed_as_versioned_deltas(self):
+        version = routing_graph_version()
+
+        async def stream_events():
+            events = []
+            async with asgi_stream('/api/routing-stream') as next_chunk:
+                while len(events) < 2:
+                    chunk = (await next_chunk()).decode()
+                    events += [json.loads(line[6:]) for line in chunk.splitlines() if line.startswith('data: ')]
+                    if len(events) == 1:
+                        # The endless stream has already delivered its first event
+                        response = await sync_to_async(self.client.post)('/api/routes/admin', data=json.dumps({
+                            'username': 'admin',
+                            'source_id': self.nodes['upbit_krw'].id,
+                            'destination_id': self.nodes['personal_wallet'].id,
+                            'route_type': 'withdrawal_lightning',
+                            'fee_rate': 0.2,
+                        }), content_type='application/json')
+            return events, response
+
+        (first, event), response = async_to_sync(stream_events)()
+
+        self.assertEqual(first, {'type': 'graph_version', 'version': version})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(event['type'], 'graph_delta')
+        self.assertEqual((event['base_version'], event['version']), (version, version + 1))
+        self.assertEqual(event['ops'][0]['op'], 'upsert_route')
+        self.assertEqual(event['ops'][0]['route']['id'], response.json()['route']['id'])
+        self.assertEqual(graph_events_since(version), [event])
+        self.assertEqual(graph_events_since(event['version']), [])
+        self.assertIsNone(graph_events_since(0))
+
+    def test_constraints_filter_the_search(self):
+        self.route('upbit_krw', 'personal_wallet', 'withdrawal_lightning', '0.5')
+        ServiceNode.objects.filter(service='upbit_btc').update(is_kyc=True)
+        bump_routing_graph_version()
+
+        def paths(query):
+            return [
+                [r['route_type'] for r in path['routes']]
+                for path in self.client.get(f'/api/optimal-paths?{query}').json()['paths']
+            ]
+
+        self.assertEqual(len(paths('')), 3)
+        self.assertEqual(paths('exclude_kyc=1'), [['trading', 'withdrawal_lightning']])
+        self.assertEqual(paths('max_hops=2'), [['trading', 'withdrawal_lightning']])
+        self.assertEqual(
+            paths('route_types=trading,withdrawal_onchain'),
+            [['trading', 'trading', 'withdrawal_onchain']],
+        )
+        response = self.client.get('/api/optimal-paths?route_types=teleport')
+        self.assertEqual(response.status_code, 400)
+
+
+class ReceivedSatsMatrixTests(SimpleTestCase):
+    def test_numpy_and_pure_python_agree(self):
+        transfers = [(0.999, 1_000.0), (0.9985, 0.0), (1.0, 50_000.0)]
+        amounts = [10_000, 1_000_000, 250_000_000]
+        vectorized = received_sats_matrix(transfers, amounts)
+        with mock.patch('blocks.routing_graph.np', None):
+            fallback = received_sats_matrix(transfers, amounts)
+        self.assertEqual(vectorized, fallback)
+        self.assertEqual(vectorized[2][0], 0)
@@ -0,0 +1,92 @@
+import json
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+
+from blocks.models import Route, RoutingSnapshot, ServiceNode
+from blocks.routing_graph import routing_graph_version
+from blocks.routing_seed import replace_routing_graph, serialize_routing_graph, sync_routing_graph
+
+SEED = {
+    'nodes': [
+        {'service': 'user', 'display_name': '사용자', 'node_type': 'user', 'is_custodial': False},
+        {'service': 'upbit_btc', 'display_name': '업비트 BTC', 'node_type': 'exchange', 'is_kyc': True},
+        {'service': 'personal_wallet', 'display_name': '개인지갑', 'node_type': 'wallet'},
+    ],
+    'routes': [
+        {'source': 'user', 'destination': 'upbit_btc', 'route_type': 'trading', 'fee_rate': 0.05},
+        {
+            'source': 'upbit_btc', 'destination': 'personal_wallet', 'route_type': 'withdrawal_onchain',
+            'fee_fixed': 0.0002, 'fee_fixed_currency': 'usdt',
+        },
+        {'source': 'upbit_btc', 'destination': 'missing', 'route_type': 'trading'},
+    ],
+}
+
+
+class RoutingSeedTests(TestCase):
+    def test_replace_round_trips_through_serialize(self):
+        restored = replace_routing_graph(SEED)
+        self.assertEqual(restored, {'nodes': 3, 'routes': 2})
+
+        exported = serialize_routing_graph()
+        self.assertEqual(replace_routing_graph(exported), restored)
+        self.assertEqual(serialize_routing_graph(), exported)
+        self.assertEqual(Route.objects.get(route_type='withdrawal_onchain').fee_fixed_currency, 'USDT')
+
+    def test_diff_only_writes_changed_rows(self):
+        replace_routing_graph(SEED)
+        ids_before = set(Route.objects.values_list('id', flat=True))
+
+        changed = json.loads(json.dumps(SEED))
+        changed['routes'][0]['fee_rate'] = 0.04
+        del changed['routes'][1]
+        counts = sync_routing_graph(changed)
+
+        self.assertEqual(counts['nodes'], {'created': 0, 'updated': 0, 'deleted': 0})
+        self.assertEqual(counts['routes'], {'created': 0, 'updated': 1, 'deleted': 1})
+        trading = Route.objects.get(route_type='trading')
+        self.assertEqual(trading.fee_rate, Decimal('0.04'))
+        self.assertIn(trading.id, ids_before)
+        self.assertEqual(sync_routing_graph(changed)['routes']['updated'], 0)
+
+    def test_failed_restore_leaves_graph_untouched(self):
+        replace_routing_graph(SEED)
+        with mock.patch.object(Route.objects, 'bulk_create', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                replace_routing_graph({'nodes': SEED['nodes'][:1], 'routes': []})
+        self.assertEqual(ServiceNode.objects.count(), 3)
+        self.assertEqual(Route.objects.count(), 2)
+
+    def test_snapshot_reset_diff_mode(self):
+        replace_routing_graph(SEED)
+        RoutingSnapshot.objects.create(name='default', nodes_json=SEED['nodes'], routes_json=SEED['routes'])
+        Route.objects.filter(route_type='trading').update(fee_rate=Decimal('1.0'))
+
+        response = self.client.post('/api/routing-snapshot', data=json.dumps({
+            'username': 'admin', 'action': 'reset', 'mode': 'diff',
+        }), content_type='application/json')
+
+        data = response.json()
+        self.assertTrue(data['ok'], data)
+        self.assertEqual(data['changes']['routes']['updated'], 1)
+        self.assertEqual(Route.objects.get(route_type='trading').fee_rate, Decimal('0.05'))
+
+    def test_snapshot_reset_bumps_the_graph_version_only_after_a_change(self):
+        def reset(mode):
+            return self.client.post('/api/routing-snapshot', data=json.dumps({
+                'username': 'admin', 'action': 'reset', 'mode': mode,
+            }), content_type='application/json')
+
+        replace_routing_graph(SEED)
+        version = routing_graph_version()
+        self.assertEqual(reset('diff').status_code, 400)  # no snapshot saved yet
+        RoutingSnapshot.objects.create(name='default', nodes_json=SEED['nodes'], routes_json=SEED['routes'])
+        self.assertTrue(reset('diff').json()['ok'])
+        with mock.patch('blocks.views.replace_routing_graph', side_effect=RuntimeError('boom')):
+            self.assertEqual(reset('replace').status_code, 500)
+        self.assertEqual(routing_graph_version(), version)
+
+        self.assertTrue(reset('replace').json()['ok'])
+        self.assertEqual(routing_graph_version(), version + 1)
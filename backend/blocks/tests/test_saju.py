@@ -0,0 +1,49 @@
+import datetime
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from blocks import saju_util
+
+
+class SajuTableTests(SimpleTestCase):
+    def sample_dates(self, step=11):
+        day = saju_util.TABLE_START
+        while day <= saju_util.TABLE_END:
+            yield day
+            day += datetime.timedelta(days=step)
+
+    def test_tables_match_the_reference_formulas(self):
+        for i, day in enumerate(self.sample_dates()):
+            hour = None if i % 5 == 0 else i % 24
+            self.assertEqual(
+                saju_util.calculate_saju(day.year, day.month, day.day, hour),
+                saju_util._calculate_saju_reference(day.year, day.month, day.day, hour),
+                day,
+            )
+        # Outside the table range the formulas are used directly
+        self.assertEqual(saju_util.calculate_saju(1850, 3, 1, 5), saju_util._calculate_saju_reference(1850, 3, 1, 5))
+
+    def test_batch_matches_single_calls_with_and_without_numpy(self):
+        dates = list(self.sample_dates(step=97))
+        years = [d.year for d in dates]
+        months = [d.month for d in dates]
+        days = [d.day for d in dates]
+        hours = [None if i % 3 == 0 else i % 24 for i in range(len(dates))]
+
+        for np_module in (saju_util.np, None):
+            with mock.patch.object(saju_util, 'np', np_module):
+                batch = saju_util.calculate_saju_many(years, months, days, hours)
+            for i, day in enumerate(dates):
+                single = saju_util.calculate_saju(day.year, day.month, day.day, hours[i])
+                self.assertEqual(saju_util.saju_row(batch, i), single)
+                elements = saju_util.analyze_elements(single)
+                self.assertEqual(
+                    [int(count) for count in batch['elements'][i]],
+                    [elements[name] for name in saju_util.ELEMENT_NAMES],
+                )
+
+        with self.assertRaises(ValueError):
+            saju_util.calculate_saju_many([2001], [2], [29])
+        with self.assertRaises(ValueError):
+            saju_util.calculate_saju_many([1899], [12], [31])
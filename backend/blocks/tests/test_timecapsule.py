@@ -0,0 +1,268 @@
+import json
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from blocks import timecapsule
+from blocks.models import TimeCapsule
+
+
+def _fake_addresses(mnemonic, account=0, change=0, start=0, count=20):
+    return [f'addr-{change}-{i}' for i in range(start, start + count)]
+
+
+class CollectTimeCapsuleUtxosTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @mock.patch('blocks.timecapsule.store_address_utxos')
+    @mock.patch('blocks.timecapsule.get_chain_tip_height', return_value=None)
+    @mock.patch('blocks.timecapsule.fetch_blockstream_utxos')
+    @mock.patch('blocks.timecapsule.get_cached_balances')
+    @mock.patch('blocks.timecapsule.derive_bip84_addresses', side_effect=_fake_addresses)
+    def test_skips_empty_addresses_and_stops_when_covered(self, derive_mock, balances_mock, utxo_mock, *_mocks):
+        funded = {'addr-0-3': 50_000, 'addr-0-7': 2_000}
+        balances_mock.side_effect = lambda addresses: {addr: funded.get(addr, 0) for addr in addresses}
+        utxo_mock.side_effect = lambda address, base_url=None: [
+            {'txid': 'ab' * 32, 'vout': 0, 'value': funded[address], 'status': {'confirmed': True}}
+        ]
+
+        utxos = timecapsule._collect_time_capsule_utxos(
+            'mnemonic', account=0, scan_limit=200, amount_sats=10_000, fee_rate=2, base_vbytes=120,
+        )
+
+        fetched = {call.args[0] for call in utxo_mock.call_args_list}
+        self.assertTrue(fetched <= set(funded))
+        self.assertIn('addr-0-3', fetched)
+        self.assertGreaterEqual(sum(u['value'] for u in utxos), 10_000)
+        self.assertEqual(utxos[0]['index'], 3)
+        # The external chain already covers the target, so the change chain is never scanned.
+        self.assertTrue(all(call.kwargs['change'] == 0 for call in derive_mock.call_args_list))
+
+    @mock.patch('blocks.timecapsule.store_address_utxos')
+    @mock.patch('blocks.timecapsule.get_chain_tip_height', return_value=None)
+    @mock.patch('blocks.timecapsule.fetch_blockstream_utxos')
+    @mock.patch('blocks.timecapsule.get_cached_balances')
+    @mock.patch('blocks.timecapsule.derive_bip84_addresses', side_effect=_fake_addresses)
+    def test_target_includes_the_fee_of_the_real_outputs(self, derive_mock, balances_mock, utxo_mock, *_mocks):
+        # 10,000 + the fee of 3 small outputs fits in addr-0-3; with 3,000 vB of outputs the
+        # change chain has to be scanned too
+        funded = {'addr-0-3': 12_000, 'addr-1-2': 5_000}
+        balances_mock.side_effect = lambda addresses: {addr: funded.get(addr, 0) for addr in addresses}
+        utxo_mock.side_effect = lambda address, base_url=None: [
+            {'txid': 'ab' * 32, 'vout': 0, 'value': funded[address], 'status': {'confirmed': True}}
+        ]
+
+        utxos = timecapsule._collect_time_capsule_utxos(
+            'mnemonic', account=0, scan_limit=20, amount_sats=10_000, fee_rate=2, base_vbytes=3_000,
+        )
+
+        self.assertEqual({u['address'] for u in utxos}, set(funded))
+
+
+TEST_MNEMONIC = 'abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about'
+
+
+class BuildTimeCapsuleTransactionTests(TestCase):
+    def _build(self, utxo_values, **kwargs):
+        address = timecapsule.derive_bip84_addresses(TEST_MNEMONIC, count=1)[0]
+        candidates = [
+            {'txid': f'{i + 1:064x}', 'vout': 0, 'value': value, 'address': address, 'change': 0, 'index': 0}
+            for i, value in enumerate(utxo_values)
+        ]
+        with mock.patch('blocks.timecapsule._collect_time_capsule_utxos', return_value=candidates):
+            return timecapsule._build_time_capsule_transaction(
+                None,
+                TEST_MNEMONIC,
+                to_address='bc1qar0srrr7xfkvy5l643lydnw9re59gtzzwf5mdq',
+                **kwargs,
+            )
+
+    def test_estimated_vsize_bounds_signed_size(self):
+        tx, details = self._build([40_000, 70_000], amount_sats=60_000, fee_rate=3, memo_text='hello capsule')
+        self.assertGreaterEqual(details['estimated_vsize'], details['vsize'])
+        self.assertLessEqual(details['estimated_vsize'] - details['vsize'], len(details['inputs']))
+        self.assertGreaterEqual(details['fee_sats'], 3 * details['vsize'])
+        self.assertTrue(any(out['is_memo'] for out in details['outputs']))
+        self.assertEqual(
+            details['total_input_sats'],
+            details['amount_sats'] + details['change_sats'] + details['fee_sats'],
+        )
+
+    def test_small_leftover_is_burned_instead_of_dust_change(self):
+        vsize = timecapsule.tx_vsize(['p2wpkh'], [timecapsule.address_lock_script('bc1qar0srrr7xfkvy5l643lydnw9re59gtzzwf5mdq')])
+        _, details = self._build([50_000 + 2 * vsize + 100], amount_sats=50_000, fee_rate=2)
+        self.assertEqual(details['change_sats'], 0)
+        self.assertEqual(details['dust_burned_sats'], 100)
+        self.assertEqual(len(details['outputs']), 1)
+
+    def test_batch_payout_uses_one_selection_for_all_recipients(self):
+        address = timecapsule.derive_bip84_addresses(TEST_MNEMONIC, count=1)[0]
+        candidates = [
+            {'txid': f'{i + 1:064x}', 'vout': 0, 'value': value, 'address': address, 'change': 0, 'index': 0}
+            for i, value in enumerate([80_000, 30_000])
+        ]
+        recipients = [
+            {'address': 'bc1qar0srrr7xfkvy5l643lydnw9re59gtzzwf5mdq', 'amount_sats': 20_000, 'memo_text': 'first'},
+            {'address': 'bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t4', 'amount_sats': 15_000},
+            {'address': address, 'amount_sats': 10_000},
+        ]
+        with mock.patch('blocks.timecapsule._collect_time_capsule_utxos', return_value=candidates) as collect_mock:
+            _, details = timecapsule._build_time_capsule_payout_transaction(
+                None, TEST_MNEMONIC, recipients=recipients, fee_rate=2,
+            )
+
+        self.assertEqual(collect_mock.call_count, 1)
+        self.assertEqual(details['amount_sats'], 45_000)
+        self.assertEqual([r['amount_sats'] for r in details['recipients']], [20_000, 15_000, 10_000])
+        self.assertEqual(details['recipients'][0]['memo_output_index'], details['recipients'][0]['output_index'] + 1)
+        self.assertGreaterEqual(details['estimated_vsize'], details['vsize'])
+
+    @mock.patch('blocks.timecapsule.store_address_utxos')
+    @mock.patch('blocks.timecapsule.get_chain_tip_height', return_value=None)
+    @mock.patch('blocks.timecapsule.fetch_blockstream_utxos')
+    @mock.patch('blocks.timecapsule.get_cached_balances')
+    def test_large_batch_collects_enough_for_its_outputs_across_addresses(self, balances_mock, utxo_mock, *_mocks):
+        # 150 outputs weigh ~4,700 vB; a 3-output estimate would stop after the external chain
+        funded = {address: 251_000 for address in timecapsule.derive_bip84_addresses(TEST_MNEMONIC, count=6)}
+        funded[timecapsule.derive_bip84_addresses(TEST_MNEMONIC, change=1, count=1)[0]] = 100_000
+        balances_mock.side_effect = lambda addresses: {addr: funded.get(addr, 0) for addr in addresses}
+        utxo_mock.side_effect = lambda address, base_url=None: [
+            {'txid': f'{hash(address) & 0xffffffff:064x}', 'vout': 0, 'value': funded[address]}
+        ]
+        recipients = [
+            {'address': address, 'amount_sats': 10_000}
+            for address in timecapsule.derive_bip84_addresses(TEST_MNEMONIC, account=1, count=150)
+        ]
+
+        _, details = timecapsule._build_time_capsule_payout_transaction(
+            None, TEST_MNEMONIC, recipients=recipients, fee_rate=5,
+        )
+
+        self.assertEqual(len(details['recipients']), 150)
+        self.assertEqual(len(details['inputs']), 7)
+        self.assertGreaterEqual(details['fee_sats'], 5 * details['vsize'])
+
+    def test_rejects_more_than_one_memo(self):
+        recipients = [
+            {'address': 'bc1qar0srrr7xfkvy5l643lydnw9re59gtzzwf5mdq', 'amount_sats': 20_000, 'memo_text': 'a'},
+            {'address': 'bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t4', 'amount_sats': 20_000, 'memo_text': 'b'},
+        ]
+        with self.assertRaises(ValueError):
+            timecapsule._build_time_capsule_payout_transaction(None, TEST_MNEMONIC, recipients=recipients, fee_rate=2)
+
+
+class BatchBroadcastViewTests(TestCase):
+    @mock.patch('blocks.timecapsule.invalidate_transaction')
+    @mock.patch('blocks.timecapsule._broadcast_raw_transaction', return_value='ok')
+    @mock.patch('blocks.timecapsule._get_broadcast_url', return_value='http://node/api/tx')
+    @mock.patch('blocks.timecapsule._get_time_capsule_mnemonic')
+    def test_records_txid_on_every_capsule(self, mnemonic_mock, _url_mock, broadcast_mock, _invalidate_mock):
+        mnemonic_mock.return_value.get_mnemonic.return_value = TEST_MNEMONIC
+        capsules = [
+            TimeCapsule.objects.create(encrypted_message='x', bitcoin_address=address)
+            for address in ['bc1qar0srrr7xfkvy5l643lydnw9re59gtzzwf5mdq', 'bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t4']
+        ]
+        summary = {'txid': 'ff' * 32, 'raw_tx': '00', 'recipients': [{}, {}], 'fee_sats': 500, 'vsize': 200}
+        with mock.patch(
+            'blocks.timecapsule._build_time_capsule_payout_transaction', return_value=(object(), summary)
+        ) as build_mock:
+            response = self.client.post(
+                '/api/time-capsule/admin/batch-broadcast-tx',
+                data=json.dumps({'capsule_ids': [c.id for c in capsules], 'amount_sats': 10_000, 'fee_rate_sats_vb': 2}),
+                content_type='application/json',
+            )
+
+        self.assertEqual(response.status_code, 200, response.content)
+        recipients = build_mock.call_args.kwargs['recipients']
+        self.assertEqual([r['address'] for r in recipients], [c.bitcoin_address for c in capsules])
+        broadcast_mock.assert_called_once_with('00', 'http://node/api/tx')
+        self.assertEqual(
+            set(TimeCapsule.objects.values_list('broadcast_txid', flat=True)), {'ff' * 32},
+        )
+
+
+    @mock.patch('blocks.timecapsule._broadcast_raw_transaction')
+    @mock.patch('blocks.timecapsule._get_broadcast_url', return_value='http://node/api/tx')
+    @mock.patch('blocks.timecapsule._get_time_capsule_mnemonic')
+    def test_capsules_claimed_by_a_concurrent_request_are_not_paid_twice(self, mnemonic_mock, _url_mock, broadcast_mock):
+        mnemonic_mock.return_value.get_mnemonic.return_value = TEST_MNEMONIC
+        first = TimeCapsule.objects.create(encrypted_message='x', bitcoin_address='bc1qar0srrr7xfkvy5l643lydnw9re59gtzzwf5mdq')
+        second = TimeCapsule.objects.create(encrypted_message='x', bitcoin_address='bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t4')
+        summary = {'txid': 'ff' * 32, 'raw_tx': '00', 'recipients': [{}, {}], 'fee_sats': 500, 'vsize': 200}
+
+        def build_while_another_request_claims(*args, **kwargs):
+            TimeCapsule.objects.filter(pk=second.pk).update(broadcast_txid='pending:' + 'ee' * 32)
+            return object(), summary
+
+        payload = json.dumps({'capsule_ids': [first.id, second.id], 'amount_sats': 10_000, 'fee_rate_sats_vb': 2})
+        with mock.patch(
+            'blocks.timecapsule._build_time_capsule_payout_transaction', side_effect=build_while_another_request_claims
+        ):
+            response = self.client.post(
+                '/api/time-capsule/admin/batch-broadcast-tx', data=payload, content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 409)
+        broadcast_mock.assert_not_called()
+        self.assertEqual(TimeCapsule.objects.get(pk=first.pk).broadcast_txid, '')
+
+        # A failed broadcast releases the claim so the capsules can be retried
+        TimeCapsule.objects.filter(pk=second.pk).update(broadcast_txid='')
+        broadcast_mock.side_effect = RuntimeError('node down')
+        with mock.patch(
+            'blocks.timecapsule._build_time_capsule_payout_transaction', return_value=(object(), summary)
+        ):
+            response = self.client.post(
+                '/api/time-capsule/admin/batch-broadcast-tx', data=payload, content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 502)
+        self.assertEqual(set(TimeCapsule.objects.values_list('broadcast_txid', flat=True)), {''})
+
+
+class AdminTimeCapsuleKeysetListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_cursor_pages_cover_every_capsule_once_without_messages(self):
+        capsules = [TimeCapsule.objects.create(encrypted_message=f'secret-{i}' * 100) for i in range(5)]
+        # Same created_at for three rows: the id breaks the tie
+        TimeCapsule.objects.filter(pk__in=[c.pk for c in capsules[1:4]]).update(created_at=capsules[1].created_at)
+        expected = list(TimeCapsule.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+        seen, cursor = [], ''
+        while True:
+            with self.assertNumQueries(1):
+                data = self.client.get('/api/time-capsule/admin/list', {'limit': 2, 'cursor': cursor}).json()
+            self.assertTrue(all('encrypted_message' not in row for row in data['results']))
+            seen.extend(row['id'] for row in data['results'])
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(seen, expected)
+
+        detail = self.client.get(f'/api/time-capsule/admin/{expected[0]}').json()
+        self.assertEqual(detail['encrypted_message'], TimeCapsule.objects.get(pk=expected[0]).encrypted_message)
+        self.assertEqual(self.client.get('/api/time-capsule/admin/list', {'cursor': 'bm9wZQ'}).status_code, 400)
+
+    def test_totals_are_opt_in_cached_and_refreshed_after_changes(self):
+        for i in range(3):
+            TimeCapsule.objects.create(encrypted_message=f'secret-{i}', is_coupon_used=i == 0)
+
+        self.assertNotIn('count', self.client.get('/api/time-capsule/admin/list', {'limit': 2}).json())
+        data = self.client.get('/api/time-capsule/admin/list', {'limit': 2, 'with_count': 1}).json()
+        with self.assertNumQueries(1):
+            self.client.get('/api/time-capsule/admin/list', {'limit': 2, 'with_count': 1})
+
+        self.assertEqual((data['count'], data['coupon_used_count']), (3, 1))
+        self.assertEqual(len(data['results']), 2)
+        self.assertNotIn('encrypted_message', data['results'][0])
+        self.assertTrue(data['has_next'])
+
+        capsule = TimeCapsule.objects.filter(is_coupon_used=False).first()
+        self.client.post(
+            f'/api/time-capsule/admin/update-coupon/{capsule.pk}', json.dumps({'is_coupon_used': True}),
+            content_type='application/json',
+        )
+        data = self.client.get('/api/time-capsule/admin/list', {'with_count': 1}).json()
+        self.assertEqual((data['count'], data['coupon_used_count']), (3, 2))
@@ -1,20 +1,31 @@
+import concurrent.futures
 import json
 import logging
+import math
 import os
 import time
 from urllib.parse import urlparse
 
 import requests
 from bitcoinlib.transactions import Transaction
-from django.core.cache import cache
 from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
 from django.db import transaction
+from django.db.models import Count, Q
 from django.http import JsonResponse
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from mnemonic import Mnemonic as MnemonicValidator
 
-from .api_helpers import _load_json_body, _parse_float, _parse_int
+from .address_cache import (
+    get_cached_balances,
+    get_cached_utxos,
+    get_chain_tip_height,
+    invalidate_addresses,
+    invalidate_transaction,
+    load_address_states,
+    store_address_utxos,
+)
+from .api_helpers import _load_json_body, _parse_float, _parse_int, cached_list_counts, invalidate_list_counts, keyset_page
 from .btc import (
     _normalize_mnemonic,
     calc_total_sats,
@@ -22,9 +33,21 @@ from .btc import (
     derive_bip84_addresses,
     derive_bip84_private_key,
     derive_master_fingerprint,
-    fetch_blockstream_balances,
+    fetch_blockstream_utxos,
 )
+from .coin_selection import select_coins
 from .models import Mnemonic, TimeCapsule, TimeCapsuleBroadcastSetting
+from .tx_size import (
+    P2WPKH_SCRIPT_BYTES,
+    WITNESS_SCALE_FACTOR,
+    address_lock_script,
+    fee_for_vsize,
+    input_weight,
+    output_weight,
+    overhead_weight,
+    script_output_weight,
+    tx_vsize,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +58,10 @@ MIN_TIME_CAPSULE_FEE_RATE = 0.5
 TIME_CAPSULE_GAP_LIMIT = 20
 TIME_CAPSULE_MAX_SCAN_ADDRESSES = 1000
 TIME_CAPSULE_SCAN_BATCH_SIZE = 50
+TIME_CAPSULE_UTXO_FETCH_WORKERS = 5
+TIME_CAPSULE_MAX_BATCH_RECIPIENTS = 200
+# Standard relay policy on most nodes accepts a single OP_RETURN output per transaction
+TIME_CAPSULE_MAX_MEMO_OUTPUTS = 1
 
 DEFAULT_BROADCAST_NODE = {
     'label': 'mempool.space',
@@ -102,32 +129,12 @@ def _get_time_capsule_broadcast_setting():
     return setting
 
 
-def _estimate_vbytes(num_inputs, num_outputs):
-    """Rudimentary estimator for transaction weight in virtual bytes."""
-    num_inputs = max(1, int(num_inputs))
-    num_outputs = max(1, int(num_outputs))
-    return 10 + num_inputs * 68 + num_outputs * 31
-
-
 def _fetch_address_utxos(address, base_url=None, use_cache=True):
     """Fetch UTXOs for a single address via the configured explorer with caching."""
-    cache_key = f'utxo:{address}'
-
-    if use_cache:
-        cached_utxos = cache.get(cache_key)
-        if cached_utxos is not None:
-            logger.debug('Cache HIT for address %s', address)
-            return cached_utxos
-
-    logger.debug('Cache MISS for address %s, fetching from API', address)
-
     base = (base_url or _get_block_explorer_base()).rstrip('/')
-    url = f'{base}/address/{address}/utxo'
 
     try:
-        resp = requests.get(url, timeout=5)
-        resp.raise_for_status()
-        data = resp.json()
+        return get_cached_utxos(address, base_url=base, force_refresh=not use_cache)
     except requests.exceptions.Timeout:
         logger.error('Timeout fetching UTXOs for %s', address)
         raise ValueError(f'주소 {address}의 UTXO 조회 시간이 초과되었습니다.')
@@ -135,26 +142,6 @@ def _fetch_address_utxos(address, base_url=None, use_cache=True):
         logger.error('Failed to fetch UTXOs for %s: %s', address, exc)
         raise ValueError(f'주소 {address}의 UTXO를 가져올 수 없습니다.')
 
-    utxos = []
-    for item in data:
-        txid = item.get('txid') or item.get('tx_hash') or ''
-        if not txid:
-            continue
-        vout = item.get('vout')
-        if vout is None:
-            vout = item.get('output') or item.get('n') or 0
-        utxos.append({
-            'txid': txid,
-            'vout': int(vout),
-            'value': int(item.get('value') or 0),
-            'status': item.get('status') or {},
-        })
-
-    if use_cache:
-        cache.set(cache_key, utxos, timeout=30)
-
-    return utxos
-
 
 def _locate_time_capsule_address_path(mnemonic_obj, mnemonic_plain, target_address, account=0, scan_limit=200):
     """Return (change, index) tuple for a given address controlled by the mnemonic."""
@@ -189,6 +176,118 @@ def _locate_time_capsule_address_path(mnemonic_obj, mnemonic_plain, target_addre
     return None, None
 
 
+def _collect_time_capsule_utxos(mnemonic_plain, *, account, scan_limit, amount_sats, fee_rate, base_vbytes):
+    """Gather spendable UTXOs from both chains, stopping once the target value is covered.
+
+    ``base_vbytes`` is the size of the transaction without inputs (overhead and
+    every output, change included), the same figure passed to select_coins, so
+    the target covers the fee of the real outputs.
+
+    Address balances come from the shared address state cache in batches, so empty
+    addresses are skipped without a UTXO request. UTXO sets of funded addresses are
+    then fetched in parallel, largest balance first.
+    """
+    scan_limit = max(1, min(int(scan_limit), 200))
+    input_vbytes = input_weight('p2wpkh') / WITNESS_SCALE_FACTOR
+
+    def target_sats(num_inputs):
+        return amount_sats + fee_for_vsize(math.ceil(base_vbytes + num_inputs * input_vbytes), fee_rate)
+
+    funded = []
+    funded_total = 0
+    for change_chain in (0, 1):
+        start = 0
+        while start < scan_limit and funded_total < target_sats(len(funded)):
+            count = min(TIME_CAPSULE_SCAN_BATCH_SIZE, scan_limit - start)
+            try:
+                addresses = derive_bip84_addresses(
+                    mnemonic_plain,
+                    account=account,
+                    change=change_chain,
+                    start=start,
+                    count=count,
+                )
+            except Exception as exc:
+                logger.error('Failed to derive addresses for change=%s: %s', change_chain, exc)
+                break
+            balances = get_cached_balances(addresses)
+            for offset, address in enumerate(addresses):
+                normalized = address.strip()
+                balance = int(balances.get(address) or 0)
+                if not normalized or balance <= 0:
+                    continue
+                funded.append({
+                    'address': normalized,
+                    'change': change_chain,
+                    'index': start + offset,
+                    'balance': balance,
+                })
+                funded_total += balance
+            start += count
+        if funded_total >= target_sats(len(funded)):
+            break
+
+    funded.sort(key=lambda entry: entry['balance'], reverse=True)
+    candidate_utxos = []
+    collected = 0
+
+    def add_utxos(entry, utxos):
+        nonlocal collected
+        for utxo in utxos or []:
+            value = int(utxo.get('value') or 0)
+            if value <= 0:
+                continue
+            candidate_utxos.append({
+                'txid': utxo['txid'],
+                'vout': int(utxo['vout']),
+                'value': value,
+                'address': entry['address'],
+                'change': entry['change'],
+                'index': entry['index'],
+            })
+            collected += value
+
+    tip_height = get_chain_tip_height()
+    cached_states = load_address_states([entry['address'] for entry in funded], tip_height)
+    pending = []
+    for entry in funded:
+        state = cached_states.get(entry['address'])
+        if state is not None and state.utxos is not None:
+            add_utxos(entry, state.utxos)
+        else:
+            pending.append(entry)
+
+    if not pending or collected >= target_sats(len(candidate_utxos)):
+        return candidate_utxos
+
+    # Workers only talk to the explorer; cache writes stay on this thread's DB connection.
+    base = _get_block_explorer_base()
+    fetched = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=TIME_CAPSULE_UTXO_FETCH_WORKERS) as executor:
+        futures = {
+            executor.submit(fetch_blockstream_utxos, entry['address'], base_url=base): entry
+            for entry in pending
+        }
+        for future in concurrent.futures.as_completed(futures):
+            entry = futures[future]
+            try:
+                utxos = future.result()
+            except Exception as exc:
+                logger.warning('Failed to fetch UTXOs for derived address %s: %s', entry['address'], exc)
+                continue
+            fetched.append((entry['address'], utxos))
+            add_utxos(entry, utxos)
+            if collected >= target_sats(len(candidate_utxos)):
+                for other in futures:
+                    other.cancel()
+                break
+
+    for address, utxos in fetched:
+        store_address_utxos(address, utxos, tip_height)
+
+    return candidate_utxos
+
+
 def _build_op_return_script(memo_text):
     memo = (memo_text or '').strip()
     if not memo:
@@ -202,6 +301,33 @@ def _build_op_return_script(memo_text):
     return b'\x6a\x4c' + bytes([len(memo_bytes)]) + memo_bytes
 
 
+def _normalize_payout_recipients(recipients):
+    """Validate recipient dicts and return (address, amount_sats, memo_text) entries."""
+    normalized = []
+    for recipient in recipients or []:
+        address = (recipient.get('address') or '').strip()
+        amount_sats = recipient.get('amount_sats')
+        if not address:
+            raise ValueError('받는 주소를 입력하세요.')
+        if amount_sats is None or amount_sats <= 0:
+            raise ValueError('양수 금액을 입력하세요.')
+        if amount_sats < DUST_LIMIT:
+            raise ValueError(f'출력 금액은 최소 {DUST_LIMIT} sats 이상이어야 합니다.')
+        normalized.append({
+            'address': address,
+            'amount_sats': int(amount_sats),
+            'memo_text': (recipient.get('memo_text') or '').strip(),
+        })
+    if not normalized:
+        raise ValueError('받는 주소를 입력하세요.')
+    if len(normalized) > TIME_CAPSULE_MAX_BATCH_RECIPIENTS:
+        raise ValueError(f'한 번에 최대 {TIME_CAPSULE_MAX_BATCH_RECIPIENTS}개 주소까지 보낼 수 있습니다.')
+    memo_count = sum(1 for r in normalized if r['memo_text'])
+    if memo_count > TIME_CAPSULE_MAX_MEMO_OUTPUTS:
+        raise ValueError(f'메모(OP_RETURN)는 트랜잭션당 최대 {TIME_CAPSULE_MAX_MEMO_OUTPUTS}개까지 넣을 수 있습니다.')
+    return normalized
+
+
 def _build_time_capsule_transaction(
     mnemonic_obj,
     mnemonic_plain,
@@ -214,14 +340,47 @@ def _build_time_capsule_transaction(
     scan_limit=50,
     memo_text='',
 ):
-    to_address = (to_address or '').strip()
-    if not to_address:
-        raise ValueError('받는 주소를 입력하세요.')
-    if amount_sats <= 0:
-        raise ValueError('양수 금액을 입력하세요.')
+    return _build_time_capsule_payout_transaction(
+        mnemonic_obj,
+        mnemonic_plain,
+        recipients=[{'address': to_address, 'amount_sats': amount_sats, 'memo_text': memo_text}],
+        fee_rate=fee_rate,
+        account=account,
+        from_address=from_address,
+        scan_limit=scan_limit,
+    )
+
+
+def _build_time_capsule_payout_transaction(
+    mnemonic_obj,
+    mnemonic_plain,
+    *,
+    recipients,
+    fee_rate,
+    account=0,
+    from_address='',
+    scan_limit=50,
+):
+    """Build and sign one transaction paying every recipient, with a single coin selection."""
     if fee_rate is None or fee_rate < MIN_TIME_CAPSULE_FEE_RATE:
         raise ValueError(f'수수료율은 최소 {MIN_TIME_CAPSULE_FEE_RATE} sats/vB 이상이어야 합니다.')
-    memo_text = (memo_text or '').strip()
+    recipients = _normalize_payout_recipients(recipients)
+    amount_sats = sum(r['amount_sats'] for r in recipients)
+
+    # Each memo OP_RETURN follows the output it annotates.
+    fixed_scripts = []
+    for recipient in recipients:
+        recipient['lock_script'] = address_lock_script(recipient['address'])
+        recipient['memo_script'] = _build_op_return_script(recipient['memo_text']) if recipient['memo_text'] else None
+        fixed_scripts.append(recipient['lock_script'])
+        if recipient['memo_script']:
+            fixed_scripts.append(recipient['memo_script'])
+    p2wpkh_input_weight = input_weight('p2wpkh')
+    # Overhead and outputs (plus a change output); shared by collection and selection
+    base_vbytes = (
+        overhead_weight(1, len(fixed_scripts) + 1)
+        + sum(output_weight(script) for script in fixed_scripts)
+    ) / WITNESS_SCALE_FACTOR
 
     candidate_utxos = []
     if from_address:
@@ -244,60 +403,52 @@ def _build_time_capsule_transaction(
                 'index': address_index,
             })
     else:
-        scan_limit = max(1, min(int(scan_limit), 200))
-        for change_chain in (0, 1):
-            try:
-                addresses = derive_bip84_addresses(
-                    mnemonic_plain,
-                    account=account,
-                    change=change_chain,
-                    start=0,
-                    count=scan_limit,
-                )
-            except Exception as exc:
-                logger.error('Failed to derive addresses for change=%s: %s', change_chain, exc)
-                continue
-
-            for idx, address in enumerate(addresses):
-                normalized = address.strip()
-                if not normalized:
-                    continue
-                try:
-                    utxos = _fetch_address_utxos(normalized)
-                except Exception as exc:
-                    logger.warning('Failed to fetch UTXOs for derived address %s: %s', normalized, exc)
-                    continue
-                if not utxos:
-                    continue
-                for utxo in utxos:
-                    value = int(utxo.get('value') or 0)
-                    if value <= 0:
-                        continue
-                    candidate_utxos.append({
-                        'txid': utxo['txid'],
-                        'vout': int(utxo['vout']),
-                        'value': value,
-                        'address': normalized,
-                        'change': change_chain,
-                        'index': idx,
-                    })
+        candidate_utxos = _collect_time_capsule_utxos(
+            mnemonic_plain,
+            account=account,
+            scan_limit=scan_limit,
+            amount_sats=amount_sats,
+            fee_rate=fee_rate,
+            base_vbytes=base_vbytes,
+        )
 
     if not candidate_utxos:
         raise ValueError('사용 가능한 주소의 UTXO가 없습니다.')
 
-    candidate_utxos.sort(key=lambda x: x['value'])
-    selected = []
-    total_in = 0
-    for utxo in candidate_utxos:
-        selected.append(utxo)
-        total_in += utxo['value']
-        est_fee = fee_rate * _estimate_vbytes(len(selected), 2)
-        if total_in >= amount_sats + est_fee:
-            break
-
-    est_needed_fee = fee_rate * _estimate_vbytes(len(selected) or 1, 2)
-    if total_in < amount_sats + est_needed_fee:
+    selection = select_coins(
+        candidate_utxos,
+        amount_sats,
+        fee_rate,
+        base_vbytes=base_vbytes,
+        input_vbytes=p2wpkh_input_weight / WITNESS_SCALE_FACTOR,
+        change_output_vbytes=script_output_weight(P2WPKH_SCRIPT_BYTES) / WITNESS_SCALE_FACTOR,
+        change_spend_vbytes=p2wpkh_input_weight / WITNESS_SCALE_FACTOR,
+        dust_limit=DUST_LIMIT,
+    )
+    if selection is None:
         raise ValueError('잔액이 부족합니다. (수수료 포함)')
+    selected = selection['selected']
+    total_in = selection['total_sats']
+    logger.info(
+        'Coin selection: %s picked %s of %s UTXOs for %s recipient(s) (waste=%.1f)',
+        selection['algorithm'], len(selected), len(candidate_utxos), len(recipients), selection['waste'],
+    )
+
+    # Size and fee are fixed before signing, so the transaction is built and signed once.
+    change_address = selected[0]['address']
+    input_types = ['p2wpkh'] * len(selected)
+    vsize_with_change = tx_vsize(input_types, fixed_scripts + [address_lock_script(change_address)])
+    change_sats = total_in - amount_sats - fee_for_vsize(vsize_with_change, fee_rate)
+    dust_burned_sats = 0
+    if change_sats >= DUST_LIMIT:
+        estimated_vsize = vsize_with_change
+    else:
+        estimated_vsize = tx_vsize(input_types, fixed_scripts)
+        leftover = total_in - amount_sats - fee_for_vsize(estimated_vsize, fee_rate)
+        if leftover < 0:
+            raise ValueError('잔액이 부족합니다. 수수료율을 낮춰주세요.')
+        dust_burned_sats = leftover
+        change_sats = 0
 
     key_cache = {}
     tx = Transaction(network='bitcoin')
@@ -320,50 +471,28 @@ def _build_time_capsule_transaction(
             witness_type='segwit',
         )
 
-    tx.add_output(int(amount_sats), to_address)
-    memo_output_index = None
-    if memo_text:
-        memo_output_index = tx.add_output(0, lock_script=_build_op_return_script(memo_text))
-    provisional_change = total_in - amount_sats
+    memo_output_indexes = set()
+    recipients_summary = []
+    for recipient in recipients:
+        output_index = tx.add_output(recipient['amount_sats'], recipient['address'])
+        memo_output_index = None
+        if recipient['memo_script']:
+            memo_output_index = tx.add_output(0, lock_script=recipient['memo_script'])
+            memo_output_indexes.add(memo_output_index)
+        recipients_summary.append({
+            'address': recipient['address'],
+            'amount_sats': recipient['amount_sats'],
+            'memo_text': recipient['memo_text'],
+            'output_index': output_index,
+            'memo_output_index': memo_output_index,
+        })
     change_output_index = None
-    change_address = selected[0]['address']
-    if provisional_change > 0:
-        change_output_index = tx.add_output(int(provisional_change), change_address, change=True)
-
-    base_outputs = 1 + (1 if memo_output_index is not None else 0)
-    num_outputs = base_outputs + (1 if change_output_index is not None else 0)
-    estimated_size = _estimate_vbytes(len(selected), num_outputs)
-    target_fee = fee_rate * estimated_size
-    final_change = total_in - amount_sats - target_fee
-
-    if final_change < 0:
-        raise ValueError('잔액이 부족합니다. 수수료율을 낮춰주세요.')
-
-    dust_burned_sats = 0
-    if change_output_index is not None:
-        if final_change <= 0:
-            tx.outputs.pop(change_output_index)
-            change_output_index = None
-            num_outputs = base_outputs
-        elif final_change < DUST_LIMIT:
-            dust_burned_sats = int(final_change)
-            tx.outputs.pop(change_output_index)
-            change_output_index = None
-            num_outputs = base_outputs
-            final_change = 0
-        else:
-            tx.outputs[change_output_index].value = int(final_change)
-    else:
-        if final_change >= DUST_LIMIT:
-            change_output_index = tx.add_output(int(final_change), change_address, change=True)
-            num_outputs = base_outputs + 1
-        elif final_change > 0:
-            dust_burned_sats = int(final_change)
-            final_change = 0
+    if change_sats:
+        change_output_index = tx.add_output(int(change_sats), change_address, change=True)
 
     tx.sign_and_update()
     tx.calc_weight_units()
-    final_vsize = tx.vsize or _estimate_vbytes(len(selected), num_outputs)
+    final_vsize = tx.vsize or estimated_vsize
     final_fee = total_in - sum(int(o.value) for o in tx.outputs)
     raw_tx = tx.raw_hex()
 
@@ -377,7 +506,7 @@ def _build_time_capsule_transaction(
             'address': out.address,
             'value': int(out.value),
             'is_change': change_output_index == idx,
-            'is_memo': memo_output_index == idx or lock_script.startswith(b'\x6a'),
+            'is_memo': idx in memo_output_indexes or lock_script.startswith(b'\x6a'),
         })
 
     inputs_summary = [{
@@ -399,6 +528,7 @@ def _build_time_capsule_transaction(
     metadata = {
         'inputs': inputs_summary,
         'outputs': outputs,
+        'recipients': recipients_summary,
         'total_input_sats': total_in,
         'amount_sats': amount_sats,
         'change_sats': change_sats,
@@ -406,6 +536,7 @@ def _build_time_capsule_transaction(
         'fee_rate_sats_vb': effective_fee_rate,
         'requested_fee_rate_sats_vb': fee_rate,
         'vsize': final_vsize,
+        'estimated_vsize': estimated_vsize,
         'raw_tx': raw_tx,
         'txid': tx.txid,
         'change_address': change_address if change_sats > 0 else '',
@@ -413,7 +544,8 @@ def _build_time_capsule_transaction(
         'from_addresses': used_from_addresses,
         'dust_limit_sats': DUST_LIMIT,
         'dust_burned_sats': dust_burned_sats,
-        'memo_text': memo_text,
+        'memo_text': next((r['memo_text'] for r in recipients if r['memo_text']), ''),
+        'coin_selection': selection['algorithm'],
     }
 
     return tx, metadata
@@ -705,6 +837,7 @@ def admin_time_capsule_xpub_balance_view(request):
         account = 0
     include_mempool = str(request.GET.get('include_mempool', '1')).lower() in ('1', 'true', 'yes')
     both_chains = str(request.GET.get('both_chains', '1')).lower() in ('1', 'true', 'yes')
+    force_refresh = str(request.GET.get('refresh', '0')).lower() in ('1', 'true', 'yes')
     assigned_capsules = list(
         TimeCapsule.objects.filter(mnemonic=mnemonic_obj).exclude(bitcoin_address='').values(
             'id', 'bitcoin_address', 'address_index', 'user_info'
@@ -753,9 +886,10 @@ def admin_time_capsule_xpub_balance_view(request):
                 break
             idx += batch_count
             try:
-                batch_balances = fetch_blockstream_balances(
+                batch_balances = get_cached_balances(
                     derived,
                     include_mempool=include_mempool,
+                    force_refresh=force_refresh,
                 )
             except Exception as exc:
                 logger.error('Failed to fetch balances for derived addresses (change=%s): %s', change, exc)
@@ -783,9 +917,10 @@ def admin_time_capsule_xpub_balance_view(request):
     ]
     if assigned_only_addresses:
         try:
-            assigned_balances = fetch_blockstream_balances(
+            assigned_balances = get_cached_balances(
                 assigned_only_addresses,
                 include_mempool=include_mempool,
+                force_refresh=force_refresh,
             )
         except Exception as exc:
             logger.error('Failed to fetch balances for assigned addresses: %s', exc)
@@ -804,7 +939,7 @@ def admin_time_capsule_xpub_balance_view(request):
         utxos = []
         if balance > 0:
             try:
-                utxos = _fetch_address_utxos(addr)
+                utxos = _fetch_address_utxos(addr, use_cache=not force_refresh)
             except Exception as exc:
                 logger.warning('Failed to fetch UTXOs for %s: %s', addr, exc)
                 utxos = []
@@ -837,6 +972,7 @@ def admin_time_capsule_xpub_balance_view(request):
         'balance_sats': max(0, total),
         'include_mempool': include_mempool,
         'both_chains': both_chains,
+        'refreshed': force_refresh,
         'count_per_chain': scanned_counts,
         'address_count': len(addresses),
         'by_address': by_address,
@@ -902,24 +1038,15 @@ def admin_time_capsule_broadcast_transaction_view(request):
             logger.error('Failed to build transaction for broadcast: %s', exc)
             return JsonResponse({'ok': False, 'error': '트랜잭션 생성에 실패했습니다.'}, status=500)
 
-    setting = _get_time_capsule_broadcast_setting()
-    _, hostname, scheme, normalized_port = _parse_broadcast_target(
-        setting.fullnode_host, setting.fullnode_port
-    )
-    broadcast_url = f"{scheme}://{hostname}:{normalized_port}/api/tx"
+    broadcast_url = _get_broadcast_url()
     try:
-        resp = requests.post(
-            broadcast_url,
-            data=summary['raw_tx'],
-            timeout=10,
-            headers={'Content-Type': 'text/plain'},
-        )
-        resp.raise_for_status()
-        broadcast_result = resp.text.strip()
+        broadcast_result = _broadcast_raw_transaction(summary['raw_tx'], broadcast_url)
     except Exception as exc:
         logger.error('Time capsule transaction broadcast failed via %s: %s', broadcast_url, exc)
         return JsonResponse({'ok': False, 'error': f'트랜잭션 전파에 실패했습니다. ({exc})'}, status=502)
 
+    invalidate_transaction(tx)
+
     return JsonResponse({
         'ok': True,
         'txid': summary.get('txid'),
@@ -934,6 +1061,129 @@ def admin_time_capsule_broadcast_transaction_view(request):
     })
 
 
+# Marks capsules claimed by an in-flight batch payout until its broadcast succeeds
+PENDING_BROADCAST_PREFIX = 'pending:'
+
+
+@csrf_exempt
+def admin_time_capsule_batch_broadcast_view(request):
+    """Pay many time capsule addresses from one transaction and record its txid on each capsule.
+
+    Payload: {"payouts": [{"capsule_id", "amount_sats", "memo_text"?}, ...]} or
+    {"capsule_ids": [...], "amount_sats": N}, plus "fee_rate_sats_vb", "account",
+    optional "from_address" and "dry_run" (build only, nothing is broadcast or saved).
+    """
+    if request.method != 'POST':
+        return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
+
+    payload = _load_json_body(request)
+    if payload is None:
+        return JsonResponse({'ok': False, 'error': '잘못된 JSON 데이터입니다.'}, status=400)
+
+    fee_rate = _parse_float(payload.get('fee_rate_sats_vb'))
+    account = max(0, _parse_int(payload.get('account'), 0) or 0)
+    from_address = (payload.get('from_address') or '').strip()
+    dry_run = bool(payload.get('dry_run'))
+    default_amount = _parse_int(payload.get('amount_sats'))
+
+    payouts = payload.get('payouts')
+    if not isinstance(payouts, list):
+        payouts = [{'capsule_id': cid} for cid in (payload.get('capsule_ids') or [])]
+    requested = []
+    for item in payouts:
+        if not isinstance(item, dict):
+            return JsonResponse({'ok': False, 'error': '잘못된 지급 항목입니다.'}, status=400)
+        capsule_id = _parse_int(item.get('capsule_id'))
+        amount_sats = _parse_int(item.get('amount_sats'), default_amount)
+        if capsule_id is None:
+            return JsonResponse({'ok': False, 'error': 'capsule_id가 필요합니다.'}, status=400)
+        requested.append((capsule_id, amount_sats, (item.get('memo_text') or '').strip()))
+    if not requested:
+        return JsonResponse({'ok': False, 'error': '지급할 타임캡슐을 선택하세요.'}, status=400)
+    capsule_ids = [capsule_id for capsule_id, _, _ in requested]
+    if len(set(capsule_ids)) != len(capsule_ids):
+        return JsonResponse({'ok': False, 'error': '같은 타임캡슐이 중복되었습니다.'}, status=400)
+
+    capsules = TimeCapsule.objects.in_bulk(capsule_ids)
+    missing = [cid for cid in capsule_ids if cid not in capsules]
+    if missing:
+        return JsonResponse({'ok': False, 'error': f'타임캡슐을 찾을 수 없습니다: {missing}'}, status=404)
+    unassigned = [cid for cid in capsule_ids if not capsules[cid].bitcoin_address]
+    if unassigned:
+        return JsonResponse({'ok': False, 'error': f'주소가 할당되지 않은 타임캡슐입니다: {unassigned}'}, status=400)
+    already_sent = [cid for cid in capsule_ids if capsules[cid].broadcast_txid]
+    if already_sent:
+        return JsonResponse({'ok': False, 'error': f'이미 전송된 타임캡슐입니다: {already_sent}'}, status=400)
+
+    mnemonic_obj = _get_time_capsule_mnemonic()
+    if not mnemonic_obj:
+        return JsonResponse({'ok': False, 'error': '타임캡슐 니모닉이 없습니다.'}, status=404)
+    try:
+        mnemonic_plain = mnemonic_obj.get_mnemonic()
+    except Exception:
+        return JsonResponse({'ok': False, 'error': '니모닉을 불러오지 못했습니다.'}, status=500)
+
+    recipients = [
+        {'address': capsules[cid].bitcoin_address, 'amount_sats': amount_sats, 'memo_text': memo_text}
+        for cid, amount_sats, memo_text in requested
+    ]
+    start_time = time.time()
+    try:
+        tx, summary = _build_time_capsule_payout_transaction(
+            mnemonic_obj,
+            mnemonic_plain,
+            recipients=recipients,
+            fee_rate=fee_rate,
+            account=account,
+            from_address=from_address,
+        )
+    except ValueError as exc:
+        return JsonResponse({'ok': False, 'error': str(exc)}, status=400)
+    except Exception as exc:
+        logger.error('Failed to build batch payout transaction: %s', exc, exc_info=True)
+        return JsonResponse({'ok': False, 'error': '트랜잭션 생성에 실패했습니다.'}, status=500)
+
+    for recipient, capsule_id in zip(summary['recipients'], capsule_ids):
+        recipient['capsule_id'] = capsule_id
+    logger.info(
+        'Built batch payout for %s capsules in %.2fs: fee=%s sats, vsize=%s vB',
+        len(capsule_ids), time.time() - start_time, summary.get('fee_sats'), summary.get('vsize'),
+    )
+    if dry_run:
+        return JsonResponse({'ok': True, 'dry_run': True, **summary})
+
+    # Claim the capsules before paying them: the conditional update only matches rows nobody
+    # else has claimed or sent, so a concurrent request for the same capsules stops here.
+    claim = f'{PENDING_BROADCAST_PREFIX}{summary["txid"]}'
+    with transaction.atomic():
+        claimed = TimeCapsule.objects.filter(pk__in=capsule_ids, broadcast_txid='').update(broadcast_txid=claim)
+        if claimed != len(capsule_ids):
+            transaction.set_rollback(True)
+    if claimed != len(capsule_ids):
+        return JsonResponse({'ok': False, 'error': '이미 전송 중이거나 전송된 타임캡슐입니다.'}, status=409)
+    claimed_rows = TimeCapsule.objects.filter(pk__in=capsule_ids, broadcast_txid=claim)
+
+    broadcast_url = _get_broadcast_url()
+    try:
+        broadcast_result = _broadcast_raw_transaction(summary['raw_tx'], broadcast_url)
+    except Exception as exc:
+        logger.error('Batch payout broadcast failed via %s: %s', broadcast_url, exc)
+        claimed_rows.update(broadcast_txid='')
+        return JsonResponse({'ok': False, 'error': f'트랜잭션 전파에 실패했습니다. ({exc})'}, status=502)
+
+    invalidate_transaction(tx)
+    claimed_rows.update(broadcast_txid=summary['txid'], broadcasted_at=timezone.now())
+
+    return JsonResponse({
+        'ok': True,
+        'dry_run': False,
+        **summary,
+        'capsule_ids': capsule_ids,
+        'broadcast_url': broadcast_url,
+        'broadcast_response': broadcast_result or summary.get('txid'),
+    })
+
+
 @csrf_exempt
 def admin_time_capsule_fee_estimates_view(request):
     """Fetch current fee estimates from mempool.space."""
@@ -1083,6 +1333,7 @@ def time_capsule_save_view(request):
             bitcoin_address='',
             user_info=user_info
         )
+        invalidate_list_counts('time_capsule')
 
         return JsonResponse(capsule.as_dict())
     except Exception as exc:
@@ -1092,13 +1343,19 @@ def time_capsule_save_view(request):
 
 @csrf_exempt
 def admin_time_capsules_view(request):
+    """
+    Keyset pages of capsule summaries, newest first (?cursor=/&limit=); the
+    encrypted message is fetched per record from time-capsule/admin/<pk>.
+    With ?with_count=1 the response also carries the total and used-coupon
+    counts (cached, see cached_list_counts). ?page= keeps the numbered pages
+    with full records that the time capsule page shows.
+    """
     if request.method != 'GET':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
 
-    capsules = TimeCapsule.objects.all().order_by('-created_at')
-
     page_number = request.GET.get('page')
     if page_number:
+        capsules = TimeCapsule.objects.all().order_by('-created_at')
         paginator = Paginator(capsules, 20)
         try:
             page_obj = paginator.page(page_number)
@@ -1117,7 +1374,32 @@ def admin_time_capsules_view(request):
         }
         return JsonResponse(data)
 
-    return JsonResponse([c.as_dict() for c in capsules], safe=False)
+    cursor = request.GET.get('cursor')
+    limit = max(1, min(_parse_int(request.GET.get('limit'), 50), 200))
+    try:
+        rows, next_cursor = keyset_page(TimeCapsule.objects.only(*TimeCapsule.SUMMARY_FIELDS), cursor, limit)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    data = {
+        'results': [capsule.as_summary_dict() for capsule in rows],
+        'next_cursor': next_cursor,
+        'has_next': next_cursor is not None,
+        'limit': limit,
+    }
+    if request.GET.get('with_count') == '1':
+        data.update(cached_list_counts('time_capsule', lambda: TimeCapsule.objects.aggregate(
+            count=Count('id'), coupon_used_count=Count('id', filter=Q(is_coupon_used=True)),
+        )))
+    return JsonResponse(data)
+
+
+def admin_time_capsule_detail_view(request, pk):
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+    try:
+        return JsonResponse(TimeCapsule.objects.get(pk=pk).as_dict())
+    except TimeCapsule.DoesNotExist:
+        return JsonResponse({'error': 'Time capsule not found'}, status=404)
 
 
 @csrf_exempt
@@ -1133,6 +1415,7 @@ def admin_time_capsule_update_coupon_view(request, pk):
         if is_coupon_used is not None:
             capsule.is_coupon_used = bool(is_coupon_used)
             capsule.save()
+            invalidate_list_counts('time_capsule')
 
         return JsonResponse(capsule.as_dict())
     except TimeCapsule.DoesNotExist:
@@ -1163,6 +1446,7 @@ def admin_time_capsule_record_broadcast_view(request, pk):
     capsule.broadcast_txid = txid
     capsule.broadcasted_at = timezone.now()
     capsule.save(update_fields=['broadcast_txid', 'broadcasted_at'])
+    invalidate_addresses([capsule.bitcoin_address])
 
     return JsonResponse({'ok': True, 'capsule': capsule.as_dict()})
 
@@ -1176,6 +1460,7 @@ def admin_time_capsule_delete_view(request, pk):
         capsule = TimeCapsule.objects.get(pk=pk)
         capsule_id = capsule.id
         capsule.delete()
+        invalidate_list_counts('time_capsule')
 
         return JsonResponse({'ok': True, 'deleted_id': capsule_id})
     except TimeCapsule.DoesNotExist:
@@ -1185,6 +1470,27 @@ def admin_time_capsule_delete_view(request, pk):
         return JsonResponse({'error': str(exc)}, status=500)
 
 
+def _get_broadcast_url():
+    """REST endpoint of the configured full node used to broadcast raw transactions."""
+    setting = _get_time_capsule_broadcast_setting()
+    _, hostname, scheme, normalized_port = _parse_broadcast_target(
+        setting.fullnode_host, setting.fullnode_port
+    )
+    return f"{scheme}://{hostname}:{normalized_port}/api/tx"
+
+
+def _broadcast_raw_transaction(raw_tx, broadcast_url):
+    """POST a raw transaction hex and return the node's response text (raises on failure)."""
+    resp = requests.post(
+        broadcast_url,
+        data=raw_tx,
+        timeout=10,
+        headers={'Content-Type': 'text/plain'},
+    )
+    resp.raise_for_status()
+    return resp.text.strip()
+
+
 def _parse_broadcast_target(host, port):
     """Return sanitized storage value, hostname, scheme, and port."""
     raw_host = (host or '').strip()
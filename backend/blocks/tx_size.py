@@ -0,0 +1,112 @@
+"""
+Exact transaction weight/vsize for the script types the admin tools build.
+
+Sizes follow BIP141: weight = 4 * non-witness bytes + witness bytes and
+vsize = ceil(weight / 4). Signature sizes assume low-S DER signatures
+(at most 71 bytes plus the sighash byte), so the result is an upper bound
+that a signed transaction never exceeds.
+"""
+import math
+
+from bitcoinlib.transactions import Output
+
+WITNESS_SCALE_FACTOR = 4
+MAX_SIG_WITH_SIGHASH = 72
+COMPRESSED_PUBKEY = 33
+SCHNORR_SIG = 64
+
+# Non-witness bytes: version + locktime
+TX_FIXED_BYTES = 8
+# Segwit marker + flag (witness bytes)
+SEGWIT_MARKER_WEIGHT = 2
+# Outpoint (36) + sequence (4)
+OUTPOINT_SEQUENCE_BYTES = 40
+# OP_0 <20-byte key hash>
+P2WPKH_SCRIPT_BYTES = 22
+
+# Input weight per spent script type (P2SH-P2WPKH includes its 23-byte redeem script push)
+INPUT_WEIGHTS = {
+    'p2wpkh': WITNESS_SCALE_FACTOR * (OUTPOINT_SEQUENCE_BYTES + 1)
+    + (1 + 1 + MAX_SIG_WITH_SIGHASH + 1 + COMPRESSED_PUBKEY),
+    'p2tr': WITNESS_SCALE_FACTOR * (OUTPOINT_SEQUENCE_BYTES + 1) + (1 + 1 + SCHNORR_SIG),
+    'p2sh-p2wpkh': WITNESS_SCALE_FACTOR * (OUTPOINT_SEQUENCE_BYTES + 1 + 23)
+    + (1 + 1 + MAX_SIG_WITH_SIGHASH + 1 + COMPRESSED_PUBKEY),
+    'p2pkh': WITNESS_SCALE_FACTOR * (OUTPOINT_SEQUENCE_BYTES + 1 + 1 + MAX_SIG_WITH_SIGHASH + 1 + COMPRESSED_PUBKEY),
+}
+
+
+def varint_size(n):
+    """Bytes needed for a Bitcoin CompactSize integer."""
+    if n < 0xfd:
+        return 1
+    if n <= 0xffff:
+        return 3
+    if n <= 0xffffffff:
+        return 5
+    return 9
+
+
+def address_lock_script(address):
+    """Return the scriptPubKey bytes for an address (raises ValueError if it cannot be parsed)."""
+    try:
+        return Output(0, address, network='bitcoin').lock_script
+    except Exception as exc:
+        raise ValueError(f'주소를 해석할 수 없습니다: {address}') from exc
+
+
+def output_weight(lock_script):
+    """Weight of one output: value (8) + script length + script."""
+    return script_output_weight(len(lock_script or b''))
+
+
+def script_output_weight(script_len):
+    return WITNESS_SCALE_FACTOR * (8 + varint_size(script_len) + script_len)
+
+
+def input_weight(script_type='p2wpkh'):
+    try:
+        return INPUT_WEIGHTS[script_type]
+    except KeyError:
+        raise ValueError(f'지원하지 않는 입력 스크립트 유형입니다: {script_type}')
+
+
+def overhead_weight(num_inputs, num_outputs, segwit=True):
+    weight = WITNESS_SCALE_FACTOR * (TX_FIXED_BYTES + varint_size(num_inputs) + varint_size(num_outputs))
+    return weight + (SEGWIT_MARKER_WEIGHT if segwit else 0)
+
+
+def tx_weight(input_types, output_scripts):
+    """Total weight for the given input script types and output scriptPubKeys."""
+    input_types = list(input_types)
+    output_scripts = list(output_scripts)
+    segwit = any(t != 'p2pkh' for t in input_types)
+    weight = overhead_weight(len(input_types), len(output_scripts), segwit=segwit)
+    weight += sum(input_weight(t) for t in input_types)
+    weight += sum(output_weight(script) for script in output_scripts)
+    if segwit:
+        # Legacy inputs in a segwit tx still carry an empty witness stack
+        weight += sum(1 for t in input_types if t == 'p2pkh')
+    return weight
+
+
+def p2wpkh_tx_vsize(num_inputs, num_outputs):
+    """vsize of an all-P2WPKH transaction when only input/output counts are known."""
+    num_inputs = max(1, int(num_inputs))
+    num_outputs = max(1, int(num_outputs))
+    weight = overhead_weight(num_inputs, num_outputs)
+    weight += num_inputs * INPUT_WEIGHTS['p2wpkh']
+    weight += num_outputs * script_output_weight(P2WPKH_SCRIPT_BYTES)
+    return weight_to_vsize(weight)
+
+
+def weight_to_vsize(weight):
+    return math.ceil(weight / WITNESS_SCALE_FACTOR)
+
+
+def tx_vsize(input_types, output_scripts):
+    return weight_to_vsize(tx_weight(input_types, output_scripts))
+
+
+def fee_for_vsize(vsize, fee_rate):
+    """Smallest integer fee meeting fee_rate (sats/vB) for the given vsize."""
+    return int(math.ceil(float(fee_rate) * vsize - 1e-9))
@@ -37,6 +37,8 @@ urlpatterns = [
     # Withdrawal fee endpoints
     path('withdrawal-fees', views.withdrawal_fees_view, name='withdrawal_fees'),
     path('withdrawal-fees/admin', views.admin_withdrawal_fees_view, name='admin_withdrawal_fees'),
+    path('fees/admin/ingest', views.admin_fee_ingest_view, name='admin_fee_ingest'),
+    path('llm/admin/metrics', views.admin_llm_metrics_view, name='admin_llm_metrics'),
     # Lightning service endpoints
     path('lightning-services', views.lightning_services_view, name='lightning_services'),
     path('lightning-services/admin', views.admin_lightning_services_view, name='admin_lightning_services'),
@@ -44,6 +46,7 @@ urlpatterns = [
     path('service-nodes/admin', views.admin_service_nodes_view, name='admin_service_nodes'),
     path('routes/admin', views.admin_routes_view, name='admin_routes'),
     path('optimal-paths', views.get_optimal_paths_view, name='optimal_paths'),
+    path('routing-stream', views.routing_stream_view, name='routing_stream'),
     path('routing-snapshot', views.routing_snapshot_view, name='routing_snapshot'),
     # Sidebar config endpoints
     path('sidebar-config', views.sidebar_config_view, name='sidebar_config'),
@@ -67,12 +70,14 @@ urlpatterns = [
     path('compatibility/admin/report-templates/<str:key>', views.compatibility_admin_report_template_detail_view, name='compatibility_admin_report_template_detail'),
     path('compatibility/quick-presets', views.compatibility_quick_presets_view, name='compatibility_quick_presets'),
     path('compatibility/admin/quick-presets', views.compatibility_admin_quick_presets_view, name='compatibility_admin_quick_presets'),
+    path('compatibility/admin/quick-presets/pairs', views.compatibility_admin_quick_preset_pairs_view, name='compatibility_admin_quick_preset_pairs'),
     path('compatibility/admin/quick-presets/<int:pk>', views.compatibility_admin_quick_preset_detail_view, name='compatibility_admin_quick_preset_detail'),
     path('compatibility/admin/cache', views.compatibility_agent_cache_list_view, name='compatibility_agent_cache_list'),
     path('compatibility/admin/cache/<int:pk>', views.compatibility_agent_cache_detail_view, name='compatibility_agent_cache_detail'),
     # Compatibility analysis endpoints
     path('compatibility/analysis/save', views.compatibility_analysis_save_view, name='compatibility_analysis_save'),
     path('compatibility/analysis/list', views.compatibility_analysis_list_view, name='compatibility_analysis_list'),
+    path('compatibility/analysis/<int:pk>', views.compatibility_analysis_detail_view, name='compatibility_analysis_detail'),
     # Finance management endpoints
     path('finance/admin/logs', views.admin_finance_logs_view, name='admin_finance_logs'),
     path('finance/admin/stats', views.admin_finance_stats_view, name='admin_finance_stats'),
@@ -86,6 +91,7 @@ urlpatterns = [
     # Time Capsule endpoints
     path('time-capsule/save', timecapsule.time_capsule_save_view, name='time_capsule_save'),
     path('time-capsule/admin/list', timecapsule.admin_time_capsules_view, name='admin_time_capsules'),
+    path('time-capsule/admin/<int:pk>', timecapsule.admin_time_capsule_detail_view, name='admin_time_capsule_detail'),
     path('time-capsule/admin/mnemonic', timecapsule.admin_time_capsule_mnemonic_view, name='admin_time_capsule_mnemonic'),
     path('time-capsule/admin/broadcast-settings', timecapsule.admin_time_capsule_broadcast_settings_view, name='admin_time_capsule_broadcast_settings'),
     path('time-capsule/admin/broadcast-test', timecapsule.admin_time_capsule_broadcast_test_view, name='admin_time_capsule_broadcast_test'),
@@ -93,6 +99,7 @@ urlpatterns = [
     path('time-capsule/admin/xpub', timecapsule.admin_time_capsule_xpub_view, name='admin_time_capsule_xpub'),
     path('time-capsule/admin/xpub/balance', timecapsule.admin_time_capsule_xpub_balance_view, name='admin_time_capsule_xpub_balance'),
     path('time-capsule/admin/broadcast-tx', timecapsule.admin_time_capsule_broadcast_transaction_view, name='admin_time_capsule_broadcast_tx'),
+    path('time-capsule/admin/batch-broadcast-tx', timecapsule.admin_time_capsule_batch_broadcast_view, name='admin_time_capsule_batch_broadcast_tx'),
     path('time-capsule/admin/broadcast-record/<int:pk>', timecapsule.admin_time_capsule_record_broadcast_view, name='admin_time_capsule_record_broadcast'),
     path('time-capsule/admin/fee-estimates', timecapsule.admin_time_capsule_fee_estimates_view, name='admin_time_capsule_fee_estimates'),
     path('time-capsule/admin/assign-address/<int:pk>', timecapsule.admin_time_capsule_assign_address_view, name='admin_time_capsule_assign_address'),
@@ -1,3 +1,4 @@
+import asyncio
 import copy
 import csv
 import io
@@ -14,14 +15,16 @@ import contextvars
 from datetime import datetime, timedelta, date
 from collections import defaultdict
 import requests
-from . import yahoo_finance
+from . import compat_cache, compat_presets, llm_gateway, yahoo_finance
 try:
     from pykrx import stock as pykrx_stock
 except ImportError:  # pragma: no cover - optional dependency
     pykrx_stock = None
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import transaction, OperationalError, ProgrammingError
-from django.db.models import Max, Q, Prefetch
-from django.http import JsonResponse, StreamingHttpResponse
+from django.db.models import Count, Max, Q, Prefetch
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from .models import (
     Block,
@@ -43,6 +46,8 @@ from .models import (
     CompatibilityAgentPrompt,
     CompatibilityAgentCache,
     CompatibilityAgentCache,
+    CompatibilityAnalysis,
+    CompatibilityPrecomputeJob,
     CompatibilityQuickPreset,
     CompatibilityReportTemplate,
 )
@@ -50,17 +55,40 @@ from django.db import connection
 from django.utils import timezone
 from django.conf import settings
 from .broadcast import broadcaster
+from .fee_ingest import ingest_exchange_fees
+from .llm_gateway import LLMError
+from .llm_stream import is_quota_error, stream_chat
 from .finance_stream import finance_stream_manager
+from .address_cache import get_cached_balances
 from .btc import (
     derive_bip84_addresses,
-    fetch_blockstream_balances,
     calc_total_sats,
     derive_bip84_account_zpub,
     derive_master_fingerprint,
     _normalize_mnemonic,
     derive_bip84_private_key,
 )
-from .api_helpers import _parse_int, _parse_float, _load_json_body
+from .api_helpers import _parse_int, _parse_float, _load_json_body, cached_list_counts, invalidate_list_counts, keyset_page
+from .routing import k_shortest_paths
+from .routing_seed import replace_routing_graph, serialize_routing_graph, sync_routing_graph
+from .routing_graph import (
+    amount_edge_costs,
+    bucket_price,
+    bump_routing_graph_version,
+    constrained_adjacency,
+    constraint_key,
+    edge_fixed_sats,
+    get_cached_response,
+    get_routing_graph,
+    graph_edge_costs,
+    graph_events_since,
+    path_transfer,
+    price_bucket,
+    received_sats_matrix,
+    route_cost,
+    routing_graph_version,
+    store_cached_response,
+)
 from mnemonic import Mnemonic as MnemonicValidator
 from .prompts import (
     COMPATIBILITY_AGENT_DEFAULT_PROMPT,
@@ -96,9 +124,9 @@ def _normalize_cache_profile(profile):
     if not isinstance(profile, dict):
         return ''
     name = _clean_cache_value(profile.get('name') or profile.get('label'))
-    birthdate = _clean_cache_value(profile.get('birthdate') or profile.get('birth_date'))
-    birth_time = _clean_cache_value(profile.get('birth_time') or profile.get('birthtime'))
-    gender = _clean_cache_value(profile.get('gender'))
+    birthdate = compat_cache.normalize_birthdate(profile.get('birthdate') or profile.get('birth_date'))
+    birth_time = compat_cache.normalize_birth_time(profile.get('birth_time') or profile.get('birthtime'))
+    gender = compat_cache.normalize_gender(profile.get('gender'))
     zodiac = _clean_cache_value(profile.get('zodiac'))
     yin_yang = _clean_cache_value(profile.get('yin_yang') or profile.get('yinyang'))
     element = _clean_cache_value(profile.get('element'))
@@ -113,7 +141,23 @@ def _normalize_cache_profile(profile):
     ])
 
 
-def _resolve_cache_metadata(agent_key, cache_payload, context):
+def _cache_key_for(category, base_components, context_hash):
+    digest_source = '|'.join(filter(None, base_components + [context_hash]))
+    return f"{category.lower()}:{hashlib.sha256(digest_source.encode('utf-8')).hexdigest()}"
+
+
+def _resolve_cache_metadata(agent_key, cache_payload, context, structured=None, count_hit=True):
+    """
+    Cache metadata and the cached row (or None) for a compatibility request.
+
+    The key covers the normalized profiles plus a context hash: structured
+    request data (``structured``) hashes as canonical JSON with its derived
+    saju, free-text context with whitespace collapsed. Rows stored under the
+    older raw-context key are still found. With cache ``{"match": "saju"}``
+    a miss falls back to any narrative whose subject/target charts are
+    identical (cache_meta['match'] == 'saju'). count_hit=False looks up
+    without counting a hit (background precompute).
+    """
     if not cache_payload or not isinstance(cache_payload, dict) or not context:
         return None, None
     category = _clean_cache_value(cache_payload.get('category') or agent_key or 'compat')
@@ -134,26 +178,38 @@ def _resolve_cache_metadata(agent_key, cache_payload, context):
         target_signature,
         scope,
     ]
-    context_hash = hashlib.sha256((context or '').encode('utf-8')).hexdigest()
-    digest_source = '|'.join(filter(None, base_components + [context_hash]))
-    cache_key = hashlib.sha256(digest_source.encode('utf-8')).hexdigest()
+    if isinstance(structured, dict):
+        context_hash = compat_cache.structured_context_hash(structured)
+    else:
+        context_hash = hashlib.sha256(' '.join(context.split()).encode('utf-8')).hexdigest()
+    legacy_hash = hashlib.sha256(context.encode('utf-8')).hexdigest()
     cache_meta = {
-        'cache_key': f"{category.lower()}:{cache_key}",
+        'cache_key': _cache_key_for(category, base_components, context_hash),
         'category': category,
         'profile_signature': profile_signature,
         'target_signature': target_signature,
+        'saju_signature': compat_cache.saju_signature(
+            agent_key, category, scope, cache_payload.get('profile'), cache_payload.get('target_profile'),
+        ),
         'context_hash': context_hash,
         'subject_name': _clean_cache_value((cache_payload.get('profile') or {}).get('name')),
         'target_name': _clean_cache_value((cache_payload.get('target_profile') or {}).get('name')),
         'payload': cache_payload,
+        'match': 'exact',
     }
     try:
-        cache_entry = CompatibilityAgentCache.objects.get(cache_key=cache_meta['cache_key'])
-        cache_entry.hit_count += 1
-        cache_entry.save(update_fields=['hit_count', 'updated_at'])
+        cache_entry = compat_cache.get_cached_entry(cache_meta['cache_key'], count_hit)
+        if cache_entry is None and legacy_hash != context_hash:
+            cache_entry = compat_cache.get_cached_entry(
+                _cache_key_for(category, base_components, legacy_hash), count_hit,
+            )
+        if cache_entry is None and cache_payload.get('match') == 'saju':
+            cache_entry = compat_cache.get_entry_by_saju_signature(
+                cache_meta['saju_signature'], cache_meta['subject_name'], cache_meta['target_name'],
+            )
+            if cache_entry is not None:
+                cache_meta['match'] = 'saju'
         return cache_meta, cache_entry
-    except CompatibilityAgentCache.DoesNotExist:
-        return cache_meta, None
     except (OperationalError, ProgrammingError):
         logger.warning('[Compatibility] Cache storage unavailable - skipping cache lookup')
         return None, None
@@ -168,7 +224,7 @@ def _store_cache_entry(agent_key, cache_meta, narrative, provider, model_used):
             'model': model_used,
             'context_hash': cache_meta.get('context_hash'),
         }
-        CompatibilityAgentCache.objects.update_or_create(
+        cache_entry, _created = CompatibilityAgentCache.objects.update_or_create(
             cache_key=cache_meta['cache_key'],
             defaults={
                 'agent_key': agent_key,
@@ -177,180 +233,27 @@ def _store_cache_entry(agent_key, cache_meta, narrative, provider, model_used):
                 'target_name': cache_meta.get('target_name', ''),
                 'profile_signature': cache_meta.get('profile_signature', ''),
                 'target_signature': cache_meta.get('target_signature', ''),
+                'saju_signature': cache_meta.get('saju_signature', ''),
                 'request_payload': cache_meta.get('payload') or {},
                 'response_text': narrative,
                 'metadata': metadata,
             }
         )
+        compat_cache.remember_entry(cache_entry)
     except (OperationalError, ProgrammingError):
         logger.warning('[Compatibility] Cache storage unavailable - skipping cache save')
 
 
-def _call_openai_chat_model(model_name, system_prompt, user_prompt, temperature=0.7, top_p=1.0, presence_penalty=0.0, frequency_penalty=0.0, max_tokens=None):
-    api_key = getattr(settings, 'OPENAI_API_KEY', '')
-    if not api_key:
-        raise ValueError('OPENAI_API_KEY is not configured.')
-
-    base_url = getattr(settings, 'OPENAI_API_BASE', 'https://api.openai.com/v1').rstrip('/')
-    resolved_model = model_name or getattr(settings, 'COMPATIBILITY_OPENAI_MODEL', getattr(settings, 'OPENAI_MODEL', 'gpt-4o-mini'))
-
-    # GPT-5 계열 모델은 Responses API 사용
-    is_gpt5 = 'gpt-5' in resolved_model.lower()
-
-    if is_gpt5:
-        logger.info('[Compatibility][OpenAI] GPT-5 감지 - Responses API 사용 - model=%s', resolved_model)
-    else:
-        logger.info('[Compatibility][OpenAI] Chat Completions API 사용 - model=%s', resolved_model)
-
-    try:
-        if is_gpt5:
-            # GPT-5: Responses API 사용
-            # system_prompt와 user_prompt를 결합하여 input으로 전달
-            combined_input = f"{system_prompt}\n\n{user_prompt}"
-
-            # Responses API는 model과 input만 지원 (temperature, max_tokens 등 불지원)
-            json_payload = {
-                'model': resolved_model,
-                'input': combined_input,
-            }
-
-            response = requests.post(
-                f"{base_url}/responses",
-                headers={
-                    'Authorization': f'Bearer {api_key}',
-                    'Content-Type': 'application/json'
-                },
-                json=json_payload,
-                timeout=90
-            )
-            response.raise_for_status()
-            data = response.json()
-
-            # Responses API 응답 형식 처리
-            # 응답 구조: data['output'] 배열에서 type='message'인 항목의 content에서 text 추출
-            if 'output' not in data:
-                logger.error('[Compatibility][OpenAI][GPT-5] output 필드 없음: %s', data)
-                raise ValueError('Responses API 응답에 output 필드가 없습니다.')
-
-            # output 배열에서 message 타입 찾기
-            message_output = None
-            for item in data['output']:
-                if item.get('type') == 'message':
-                    message_output = item
-                    break
-
-            if not message_output:
-                logger.error('[Compatibility][OpenAI][GPT-5] message 타입을 찾을 수 없음: %s', data)
-                raise ValueError('Responses API 응답에서 message를 찾을 수 없습니다.')
-
-            # content 배열에서 output_text 찾기
-            content_text = None
-            for content_item in message_output.get('content', []):
-                if content_item.get('type') == 'output_text':
-                    content_text = content_item.get('text', '')
-                    break
-
-            if content_text is None:
-                logger.error('[Compatibility][OpenAI][GPT-5] output_text를 찾을 수 없음: %s', message_output)
-                raise ValueError('Responses API 응답에서 텍스트를 찾을 수 없습니다.')
-
-            actual_model = data.get('model', resolved_model)
-            logger.info('[Compatibility][OpenAI][GPT-5] 응답 수신 - model=%s, tokens=%s', actual_model, data.get('usage'))
-            return content_text.strip(), 'openai', actual_model
-        else:
-            # GPT-4 등 기존 모델: Chat Completions API 사용
-            json_payload = {
-                'model': resolved_model,
-                'messages': [
-                    {'role': 'system', 'content': system_prompt},
-                    {'role': 'user', 'content': user_prompt}
-                ],
-                'temperature': temperature,
-                'top_p': top_p,
-                'presence_penalty': presence_penalty,
-                'frequency_penalty': frequency_penalty,
-            }
-            if max_tokens is not None:
-                json_payload['max_tokens'] = max_tokens
-
-            response = requests.post(
-                f"{base_url}/chat/completions",
-                headers={
-                    'Authorization': f'Bearer {api_key}',
-                    'Content-Type': 'application/json'
-                },
-                json=json_payload,
-                timeout=90
-            )
-            response.raise_for_status()
-            data = response.json()
-            choices = data.get('choices') or []
-            if not choices:
-                logger.error('[Compatibility][OpenAI] 응답 choices 비어 있음: %s', data)
-                raise ValueError('OpenAI 응답이 비어 있습니다.')
-            logger.info('[Compatibility][OpenAI] 응답 수신 - tokens=%s', data.get('usage'))
-            return choices[0]['message']['content'].strip(), 'openai', resolved_model
-    except requests.HTTPError as exc:
-        error_body = exc.response.text if exc.response else ''
-        error_status = exc.response.status_code if exc.response else 'N/A'
-        logger.exception('[Compatibility][OpenAI] HTTP 오류 status=%s body=%s', error_status, error_body)
-        # 에러 메시지에 상세 정보 포함
-        raise ValueError(f'OpenAI API 오류 ({error_status}): {error_body}') from exc
-    except Exception:
-        logger.exception('[Compatibility][OpenAI] 호출 실패')
-        raise
-
-
-def _call_gemini_chat_model(model_name, system_prompt, user_prompt, temperature=0.7, top_p=1.0, presence_penalty=0.0, frequency_penalty=0.0, max_tokens=None):
-    """Call Google Gemini API for compatibility analysis."""
-    api_key = getattr(settings, 'GEMINI_API_KEY', '')
-    if not api_key:
-        raise ValueError('GEMINI_API_KEY is not configured.')
-
-    resolved_model = model_name or getattr(settings, 'GEMINI_MODEL', 'gemini-2.5-flash')
-    logger.info('[Compatibility][Gemini] 호출 준비 - model=%s', resolved_model)
-
-    try:
-        import google.generativeai as genai
-
-        # Configure Gemini API
-        genai.configure(api_key=api_key)
-
-        # Initialize model
-        model = genai.GenerativeModel(resolved_model)
-
-        # Combine system prompt and user prompt
-        full_prompt = f"{system_prompt}\n\n{user_prompt}"
-
-        # Generate content
-        generation_config = {
-            'temperature': temperature,
-            'top_p': top_p,
-        }
-        if max_tokens is not None:
-            generation_config['max_output_tokens'] = max_tokens
-        
-        # presence_penalty and frequency_penalty are not directly supported by Gemini's generation_config
-        # and would require more complex mapping or safety settings.
-
-        response = model.generate_content(
-            full_prompt,
-            generation_config=generation_config
-        )
-
-        if not response.text:
-            logger.error('[Compatibility][Gemini] 응답이 비어 있음')
-            raise ValueError('Gemini 응답이 비어 있습니다.')
-
-        logger.info('[Compatibility][Gemini] 응답 수신 - model=%s', resolved_model)
-        return response.text.strip(), 'gemini', resolved_model
-
-    except ImportError:
-        logger.exception('[Compatibility][Gemini] google-generativeai 패키지가 설치되지 않음')
-        raise ValueError('google-generativeai 패키지를 설치해야 합니다: pip install google-generativeai')
-    except Exception as exc:
-        logger.exception('[Compatibility][Gemini] 호출 실패: %s', str(exc))
-        raise
+def _compatibility_route(provider, model_name):
+    """
+    Gateway route for a compatibility agent: OpenAI agents stay on OpenAI,
+    Gemini (and unknown) providers fail over to the OpenAI fallback model.
+    """
+    if provider == 'openai':
+        return [('openai', model_name or _resolve_openai_model_name())]
+    if provider != 'gemini':
+        logger.warning('[Compatibility] Unknown provider "%s", falling back to gemini', provider)
+    return [('gemini', model_name or None), ('openai', _resolve_openai_model_name())]
 
 
 
@@ -1580,6 +1483,7 @@ def mnemonic_onchain_balance_view(request):
       - account: BIP84 account index (default 0)
       - include_mempool: '1' to include mempool deltas (default 1)
       - both_chains: '1' to check both external (0) and internal (1) chains (default 1)
+      - refresh: '1' to bypass the address state cache (default 0)
     """
     if request.method != 'GET':
         return JsonResponse({'ok': False, 'error': 'GET only'}, status=405)
@@ -1600,6 +1504,7 @@ def mnemonic_onchain_balance_view(request):
     # Check both external and internal chains by default (BIP44 standard)
     both_chains = str(request.GET.get('both_chains', '1')) in ('1', 'true', 'True')
     include_mempool = str(request.GET.get('include_mempool', '1')) in ('1', 'true', 'True')
+    force_refresh = str(request.GET.get('refresh', '0')) in ('1', 'true', 'True')
 
     try:
         m = Mnemonic.objects.get(id=mid)
@@ -1633,7 +1538,7 @@ def mnemonic_onchain_balance_view(request):
         return JsonResponse({'ok': False, 'error': f'address derivation failed: {e}'}, status=400)
 
     try:
-        by_addr = fetch_blockstream_balances(all_addresses, include_mempool=include_mempool)
+        by_addr = get_cached_balances(all_addresses, include_mempool=include_mempool, force_refresh=force_refresh)
         total = calc_total_sats(by_addr)
     except Exception as e:
         import logging
@@ -2049,6 +1954,40 @@ def admin_withdrawal_fees_view(request):
     return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
 
 
+@csrf_exempt
+def admin_fee_ingest_view(request):
+    """Admin endpoint to pull current fees from the exchange APIs into routes/rates"""
+    if request.method != 'POST':
+        return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
+    if not is_admin(request):
+        return JsonResponse({'ok': False, 'error': 'Admin access required'}, status=403)
+
+    try:
+        data = json.loads(request.body or b'{}')
+    except json.JSONDecodeError:
+        return JsonResponse({'ok': False, 'error': 'Invalid JSON'}, status=400)
+
+    exchanges = data.get('exchanges') or None
+    try:
+        result = ingest_exchange_fees(exchanges)
+    except ValueError as e:
+        return JsonResponse({'ok': False, 'error': str(e)}, status=400)
+    except Exception as e:
+        logger.error(f"Error ingesting exchange fees: {e}")
+        return JsonResponse({'ok': False, 'error': '수수료 수집 중 오류가 발생했습니다'}, status=500)
+    return JsonResponse({'ok': True, **result})
+
+
+@csrf_exempt
+def admin_llm_metrics_view(request):
+    """Admin endpoint: per-provider LLM gateway counters (calls, latency, tokens, circuit state)"""
+    if request.method != 'GET':
+        return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
+    if not is_admin(request):
+        return JsonResponse({'ok': False, 'error': 'Admin access required'}, status=403)
+    return JsonResponse({'ok': True, 'providers': llm_gateway.llm_metrics()})
+
+
 @csrf_exempt
 def admin_lightning_services_view(request):
     """Admin endpoint to manage lightning services"""
@@ -2116,10 +2055,19 @@ def admin_lightning_services_view(request):
 
 # New routing system views
 
+def _routing_table_state():
+    """Cheap fingerprint of the routing tables, used to notice changes made by GET-time seeding."""
+    return tuple(
+        tuple(model.objects.aggregate(count=Count('id'), last_id=Max('id'), updated=Max('updated_at')).values())
+        for model in (ServiceNode, Route)
+    )
+
+
 @csrf_exempt
 def admin_service_nodes_view(request):
     """Admin endpoint to manage service nodes. GET is public (read-only)."""
     if request.method == 'GET':
+        state_before = _routing_table_state()
         # Ensure required service nodes exist (idempotent)
         try:
             required = [
@@ -2156,6 +2104,8 @@ def admin_service_nodes_view(request):
         except Exception as e:
             import logging
             logging.getLogger(__name__).error(f"Error seeding default service nodes: {e}")
+        if _routing_table_state() != state_before:
+            _routing_graph_changed()
 
         nodes = ServiceNode.objects.all()
         nodes_list = [node.as_dict() for node in nodes]
@@ -2198,6 +2148,7 @@ def admin_service_nodes_view(request):
                     'website_url': website_url
                 }
             )
+            _routing_graph_changed([{'op': 'upsert_node', 'node': node.as_dict()}])
 
             return JsonResponse({
                 'ok': True,
@@ -2218,6 +2169,7 @@ def admin_service_nodes_view(request):
 def admin_routes_view(request):
     """Admin endpoint to manage routes. GET is public (read-only)."""
     if request.method == 'GET':
+        state_before = _routing_table_state()
         # Seed/ensure a richer default graph based on requested reference
         try:
             user = ServiceNode.objects.filter(service='user').first()
@@ -2426,6 +2378,8 @@ def admin_routes_view(request):
             pass
 
         # Note: Keep OKX USDT → OKX BTC trading route (0.1%) as requested
+        if _routing_table_state() != state_before:
+            _routing_graph_changed()
 
         routes = Route.objects.select_related('source', 'destination').all()
         routes_list = [route.as_dict() for route in routes]
@@ -2513,6 +2467,7 @@ def admin_routes_view(request):
                         'event_url': event_url,
                     }
                 )
+            _routing_graph_changed([{'op': 'upsert_route', 'route': route.as_dict()}])
 
             return JsonResponse({
                 'ok': True,
@@ -2537,7 +2492,9 @@ def admin_routes_view(request):
             if not route_id:
                 return JsonResponse({'ok': False, 'error': 'Route ID required'}, status=400)
 
-            Route.objects.filter(id=route_id).delete()
+            deleted, _ = Route.objects.filter(id=route_id).delete()
+            if deleted:
+                _routing_graph_changed([{'op': 'delete_route', 'id': route_id}])
             return JsonResponse({'ok': True})
         except Exception as e:
             return JsonResponse({'ok': False, 'error': str(e)}, status=500)
@@ -2545,25 +2502,191 @@ def admin_routes_view(request):
     return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
 
 
+DEFAULT_OPTIMAL_PATHS = 300
+MAX_PATH_AMOUNTS = 100
+MAX_PATH_AMOUNT_SATS = 21_000_000 * 100_000_000
+MAX_PATH_HOPS = 20
+
+
+def _routing_price_bucket(graph):
+    """BTC/USDT price bucket used for costing; None when no route has a USDT fixed fee."""
+    if not graph['has_usdt_fees']:
+        return None
+    return price_bucket(get_cached_btc_usdt_price())
+
+
+def _parse_path_amounts(params):
+    """Amounts (sats) from ?amounts=a,b,c or ?amount_sats=a; raises ValueError on bad input."""
+    raw = params.get('amounts') or params.get('amount_sats') or ''
+    amounts = []
+    for part in str(raw).split(','):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            amount = int(part)
+        except ValueError:
+            raise ValueError('금액은 sats 단위 정수로 입력하세요.')
+        if amount <= 0 or amount > MAX_PATH_AMOUNT_SATS:
+            raise ValueError('금액은 0보다 크고 2100만 BTC 이하여야 합니다.')
+        amounts.append(amount)
+    if len(amounts) > MAX_PATH_AMOUNTS:
+        raise ValueError(f'금액은 최대 {MAX_PATH_AMOUNTS}개까지 입력할 수 있습니다.')
+    return tuple(amounts)
+
+
+def _parse_path_constraints(params):
+    """
+    Search constraints from ?exclude_kyc=1&exclude_custodial=1&route_types=a,b&max_hops=n,
+    or None when there are none; raises ValueError on bad input.
+    """
+    truthy = ('1', 'true', 'yes', 'on')
+    constraints = {}
+    if str(params.get('exclude_kyc', '')).lower() in truthy:
+        constraints['exclude_kyc'] = True
+    if str(params.get('exclude_custodial', '')).lower() in truthy:
+        constraints['exclude_custodial'] = True
+    raw_types = params.get('route_types')
+    if raw_types:
+        valid_types = {choice[0] for choice in Route.ROUTE_TYPE_CHOICES}
+        route_types = {part.strip() for part in str(raw_types).split(',') if part.strip()}
+        invalid = route_types - valid_types
+        if invalid:
+            raise ValueError(f'알 수 없는 라우트 유형입니다: {", ".join(sorted(invalid))}')
+        constraints['route_types'] = tuple(sorted(route_types))
+    raw_hops = params.get('max_hops')
+    if raw_hops not in (None, ''):
+        try:
+            max_hops = int(raw_hops)
+        except (TypeError, ValueError):
+            raise ValueError('max_hops는 정수로 입력하세요.')
+        if not 1 <= max_hops <= MAX_PATH_HOPS:
+            raise ValueError(f'max_hops는 1 이상 {MAX_PATH_HOPS} 이하여야 합니다.')
+        constraints['max_hops'] = max_hops
+    return constraints or None
+
+
+def _compact_routing_tables(graph):
+    """Node and edge tables for the compact format, built once per compiled graph."""
+    tables = graph.get('compact_tables')
+    if tables is None:
+        node_index = graph['node_index']
+        edges = []
+        for route in graph['routes']:
+            edge = route.as_dict()
+            edge['source'] = node_index[route.source_id]
+            edge['destination'] = node_index[route.destination_id]
+            edges.append(edge)
+        tables = {'nodes': [node.as_dict() for node in graph['nodes']], 'edges': edges}
+        graph['compact_tables'] = tables
+    return tables
+
+
+def compact_path_to_dict(path):
+    """Compact format: the path as indices into the response's edge table"""
+    data = {'edges': list(path['edges']), 'total_cost': path['total_cost']}
+    if 'received_sats' in path:
+        data['received_sats'] = path['received_sats']
+        data['fee_sats'] = path['fee_sats']
+    return data
+
+
+def _optimal_paths_body(graph, start_index, end_index, max_paths, bucket, amounts=(), compact=False,
+                        constraints=None):
+    """Serialized /optimal-paths response, memoized on the compiled graph under its shared version."""
+    key = (
+        graph['version'], graph['stamp'],
+        start_index, end_index, max_paths, bucket, amounts, compact, constraint_key(constraints),
+    )
+    body = get_cached_response(graph, key)
+    if body is None:
+        start_node, end_node = graph['nodes'][start_index], graph['nodes'][end_index]
+        payload = {'ok': True, 'graph_version': graph['version']}
+        if constraints:
+            payload['constraints'] = constraints
+        if amounts:
+            paths = find_paths_for_amounts(
+                start_node, end_node, amounts, max_paths=max_paths, graph=graph, bucket=bucket,
+                constraints=constraints,
+            )
+            payload['amounts'] = list(amounts)
+            payload['best_path_index'] = [
+                max(range(len(paths)), key=lambda i: paths[i]['received_sats'][j]) if paths else None
+                for j in range(len(amounts))
+            ]
+        else:
+            paths = find_optimal_paths(
+                start_node, end_node, max_paths=max_paths, graph=graph, bucket=bucket, constraints=constraints,
+            )
+        if compact:
+            payload['format'] = 'compact'
+            payload.update(_compact_routing_tables(graph))
+            payload['paths'] = [compact_path_to_dict(path) for path in paths]
+        else:
+            payload['paths'] = [path_to_dict(path) for path in paths]
+        body = json.dumps(payload, cls=DjangoJSONEncoder).encode('utf-8')
+        store_cached_response(graph, key, body)
+    return body
+
+
+def _routing_graph_changed(ops=None):
+    """Invalidate the compiled graph, publish the delta and precompute the default /optimal-paths answer."""
+    bump_routing_graph_version(ops)
+    _warm_default_optimal_paths()
+
+
+def _warm_default_optimal_paths():
+    """Compile the current graph and memoize the default /optimal-paths answer."""
+    try:
+        graph = get_routing_graph()
+        service_index = graph['service_index']
+        if 'user' in service_index and 'personal_wallet' in service_index:
+            _optimal_paths_body(
+                graph, service_index['user'], service_index['personal_wallet'],
+                DEFAULT_OPTIMAL_PATHS, _routing_price_bucket(graph),
+            )
+    except Exception as e:
+        logger.warning(f"Failed to precompute optimal paths: {e}")
+
+
 def get_optimal_paths_view(request):
-    """Get optimal paths from user to personal wallet"""
+    """Get optimal paths from user to personal wallet.
+
+    With ?amounts=100000,1000000 (sats) paths are ranked by the sats actually
+    received for the first amount, and each path carries received_sats /
+    fee_sats for every amount.
+
+    With ?format=compact the response holds a node table, an edge table
+    (source/destination as node-table indices) and each path as a list of
+    edge-table indices, instead of repeating full route objects per path.
+
+    ?exclude_kyc=1, ?exclude_custodial=1, ?route_types=a,b and ?max_hops=n
+    restrict the search itself (see _parse_path_constraints).
+    """
+    try:
+        amounts = _parse_path_amounts(request.GET)
+        constraints = _parse_path_constraints(request.GET)
+    except ValueError as e:
+        return JsonResponse({'ok': False, 'error': str(e)}, status=400)
     try:
-        user = ServiceNode.objects.get(service='user')
-        personal_wallet = ServiceNode.objects.get(service='personal_wallet')
+        graph = get_routing_graph()
+        service_index = graph['service_index']
+        if 'user' not in service_index or 'personal_wallet' not in service_index:
+            raise ServiceNode.DoesNotExist
 
         # Allow clients to request more paths; clamp to avoid explosion
         try:
-            max_paths = int(request.GET.get('max_paths', '300'))
+            max_paths = int(request.GET.get('max_paths', str(DEFAULT_OPTIMAL_PATHS)))
         except (TypeError, ValueError):
-            max_paths = 300
+            max_paths = DEFAULT_OPTIMAL_PATHS
         max_paths = max(1, min(max_paths, 1000))
 
-        paths = find_optimal_paths(user, personal_wallet, max_paths=max_paths)
-
-        return JsonResponse({
-            'ok': True,
-            'paths': [path_to_dict(path) for path in paths]
-        })
+        compact = request.GET.get('format') == 'compact'
+        body = _optimal_paths_body(
+            graph, service_index['user'], service_index['personal_wallet'],
+            max_paths, _routing_price_bucket(graph), amounts, compact, constraints,
+        )
+        return HttpResponse(body, content_type='application/json')
 
     except ServiceNode.DoesNotExist:
         return JsonResponse({'ok': False, 'error': 'Required service nodes not found'}, status=404)
@@ -2574,85 +2697,167 @@ def get_optimal_paths_view(request):
         return JsonResponse({'ok': False, 'error': '경로 찾기 중 오류가 발생했습니다'}, status=500)
 
 
+def routing_stream_view(request):
+    """SSE stream of routing graph changes.
+
+    Sends {'type': 'graph_version'} first, then 'graph_delta' events as admins
+    edit nodes and routes or ingest_fees.py writes new fees. A client that
+    applies delta N must hold version N - 1 (base_version); otherwise, or when
+    ops is null, it should refetch. ?since=<version> replays recorded deltas
+    after a reconnect.
+
+    The events come from the shared RoutingGraphEvent table, polled every
+    ROUTING_STREAM_POLL_SECONDS, and the body is an async generator so the
+    ASGI server sends each event as soon as it is yielded.
+    """
+    since = _parse_int(request.GET.get('since'))
+    poll_seconds = getattr(settings, 'ROUTING_STREAM_POLL_SECONDS', 1.0)
+
+    async def deltas_after(version):
+        events = await sync_to_async(graph_events_since)(version)
+        if events is None:
+            latest = await sync_to_async(routing_graph_version)()
+            events = [{'type': 'graph_delta', 'version': latest, 'base_version': version, 'ops': None}]
+        return events
+
+    async def event_stream():
+        yield "retry: 3000\n\n"
+        current = await sync_to_async(routing_graph_version)()
+        yield f"data: {json.dumps({'type': 'graph_version', 'version': current})}\n\n"
+        if since is not None and since < current:
+            for event in await deltas_after(since):
+                yield f"data: {json.dumps(event)}\n\n"
+
+        last_heartbeat = time.monotonic()
+        while True:
+            await asyncio.sleep(poll_seconds)
+            for event in await deltas_after(current):
+                current = event['version']
+                yield f"data: {json.dumps(event)}\n\n"
+            if time.monotonic() - last_heartbeat > 15:
+                yield ": heartbeat\n\n"
+                last_heartbeat = time.monotonic()
+
+    resp = StreamingHttpResponse(event_stream(), content_type='text/event-stream; charset=utf-8')
+    resp['Cache-Control'] = 'no-cache'
+    # For Nginx: disable proxy buffering to support SSE
+    resp['X-Accel-Buffering'] = 'no'
+    return resp
+
+
 # Path finding algorithm
-def find_optimal_paths(start_node, end_node, max_paths=10):
-    """Find optimal paths between two nodes using Dijkstra-like algorithm"""
-    from collections import defaultdict, deque
-    import heapq
-
-    # Get all enabled routes
-    routes = Route.objects.filter(is_enabled=True).select_related('source', 'destination')
-
-    # Build adjacency list
-    graph = defaultdict(list)
-    for route in routes:
-        graph[route.source.id].append(route)
-
-    # Priority queue: (total_cost, tie_breaker, path_routes, current_node_id)
-    from itertools import count
-    _tie = count()
-    pq = [(0.0, next(_tie), [], start_node.id)]
-    completed_paths = []
-    visited_paths = set()
+def find_optimal_paths(start_node, end_node, max_paths=10, graph=None, bucket=None, constraints=None):
+    """Find the max_paths cheapest loopless route sequences (Yen's k-shortest paths)"""
+    if graph is None:
+        graph = get_routing_graph()
+        bucket = _routing_price_bucket(graph)
+    node_index = graph['node_index']
+    if start_node.id not in node_index or end_node.id not in node_index:
+        return []
 
-    while pq and len(completed_paths) < max_paths:
-        current_cost, _seq, path_routes, current_node_id = heapq.heappop(pq)
+    start_index, end_index = node_index[start_node.id], node_index[end_node.id]
+    out_edges, in_edges = constrained_adjacency(graph, start_index, end_index, constraints)
+    found = k_shortest_paths(
+        start_index,
+        end_index,
+        max_paths,
+        num_nodes=len(graph['nodes']),
+        edge_tail=graph['edge_tail'],
+        edge_head=graph['edge_head'],
+        edge_cost=graph_edge_costs(graph, bucket_price(bucket)),
+        out_edges=out_edges,
+        in_edges=in_edges,
+        max_hops=(constraints or {}).get('max_hops'),
+    )
 
-        # Create path signature to avoid duplicates
-        path_signature = tuple(route.id for route in path_routes)
-        if path_signature in visited_paths:
-            continue
-        visited_paths.add(path_signature)
-
-        # If we reached the destination
-        if current_node_id == end_node.id:
-            completed_paths.append({
-                'routes': path_routes,
-                'total_cost': current_cost,
-                'path_signature': path_signature
-            })
-            continue
+    routes = graph['routes']
+    completed_paths = []
+    for total_cost, edges in found:
+        path_routes = [routes[edge] for edge in edges]
+        completed_paths.append({
+            'routes': path_routes,
+            'edges': edges,
+            'total_cost': total_cost,
+            'path_signature': tuple(route.id for route in path_routes)
+        })
+    return completed_paths
 
-        # Explore neighbors
-        for route in graph[current_node_id]:
-            # Avoid cycles (don't go back to nodes already in path)
-            nodes_in_path = {start_node.id} | {r.destination.id for r in path_routes}
-            if route.destination.id in nodes_in_path:
-                continue
 
-            # Calculate route cost
-            route_cost = calculate_route_cost(route)
-            new_cost = current_cost + route_cost
-            new_path = path_routes + [route]
+def find_paths_for_amounts(start_node, end_node, amounts, max_paths=10, graph=None, bucket=None,
+                           constraints=None):
+    """
+    Rank loopless paths by sats received for amounts[0] and score each for every amount.
 
-            heapq.heappush(pq, (new_cost, next(_tie), new_path, route.destination.id))
+    Candidates come from k-shortest searches with sats-denominated edge costs
+    at the smallest and largest amount; the exact received amounts are then
+    computed for all candidates and amounts in one vectorized pass.
+    """
+    if graph is None:
+        graph = get_routing_graph()
+        bucket = _routing_price_bucket(graph)
+    node_index = graph['node_index']
+    if not amounts or start_node.id not in node_index or end_node.id not in node_index:
+        return []
 
+    btc_usdt_price = bucket_price(bucket)
+    start_index, end_index = node_index[start_node.id], node_index[end_node.id]
+    out_edges, in_edges = constrained_adjacency(graph, start_index, end_index, constraints)
+    candidates = {}
+    for amount in sorted({min(amounts), max(amounts)}):
+        for _, edges in k_shortest_paths(
+            start_index,
+            end_index,
+            max_paths,
+            num_nodes=len(graph['nodes']),
+            edge_tail=graph['edge_tail'],
+            edge_head=graph['edge_head'],
+            edge_cost=amount_edge_costs(graph, amount, btc_usdt_price),
+            out_edges=out_edges,
+            in_edges=in_edges,
+            max_hops=(constraints or {}).get('max_hops'),
+        ):
+            candidates.setdefault(edges, None)
+
+    fixed_sats = edge_fixed_sats(graph, btc_usdt_price)
+    edge_lists = list(candidates)
+    transfers = [path_transfer(graph, edges, fixed_sats=fixed_sats) for edges in edge_lists]
+    received = received_sats_matrix(transfers, list(amounts))
+    order = sorted(range(len(edge_lists)), key=lambda i: (-received[i][0], len(edge_lists[i]), edge_lists[i]))
+
+    routes = graph['routes']
+    completed_paths = []
+    for i in order[:max_paths]:
+        path_routes = [routes[edge] for edge in edge_lists[i]]
+        completed_paths.append({
+            'routes': path_routes,
+            'edges': edge_lists[i],
+            'total_cost': amounts[0] - received[i][0],
+            'path_signature': tuple(route.id for route in path_routes),
+            'received_sats': received[i],
+            'fee_sats': [amount - got for amount, got in zip(amounts, received[i])],
+        })
     return completed_paths
 
 
 def calculate_route_cost(route):
     """Calculate the cost of a single route"""
-    cost = 0.0
-    if route.fee_rate:
-        cost += float(route.fee_rate)  # Percentage cost
-    if route.fee_fixed:
-        fixed_amount = float(route.fee_fixed)
-        currency = (route.fee_fixed_currency or 'BTC').upper()
-        if currency == 'USDT':
-            btc_usdt_price = get_cached_btc_usdt_price()
-            if btc_usdt_price:
-                fixed_amount = fixed_amount / btc_usdt_price
-        cost += fixed_amount * 100000000  # Convert BTC to satoshis for comparison
-    return cost
+    btc_usdt_price = None
+    if route.fee_fixed and (route.fee_fixed_currency or 'BTC').upper() == 'USDT':
+        btc_usdt_price = get_cached_btc_usdt_price()
+    return route_cost(route.fee_rate, route.fee_fixed, route.fee_fixed_currency, btc_usdt_price)
 
 
 def path_to_dict(path):
     """Convert path data to dictionary format"""
-    return {
+    data = {
         'routes': [route.as_dict() for route in path['routes']],
         'total_cost': path['total_cost'],
         'path_signature': path['path_signature']
     }
+    if 'received_sats' in path:
+        data['received_sats'] = path['received_sats']
+        data['fee_sats'] = path['fee_sats']
+    return data
 
 
 @csrf_exempt
@@ -2686,26 +2891,8 @@ def routing_snapshot_view(request):
 
         if action == 'save':
             try:
-                nodes = list(ServiceNode.objects.all().values(
-                    'service', 'display_name', 'node_type', 'is_kyc', 'is_custodial', 'is_enabled', 'description', 'website_url'
-                ))
-                routes_qs = Route.objects.select_related('source', 'destination').all()
-                routes = []
-                for r in routes_qs:
-                    routes.append({
-                        'source': r.source.service,
-                        'destination': r.destination.service,
-                        'route_type': r.route_type,
-                        'fee_rate': float(r.fee_rate) if r.fee_rate is not None else None,
-                        'fee_fixed': float(r.fee_fixed) if r.fee_fixed is not None else None,
-                        'fee_fixed_currency': r.fee_fixed_currency,
-                        'is_enabled': bool(r.is_enabled),
-                        'description': r.description or '',
-                        'is_event': bool(r.is_event),
-                        'event_title': r.event_title or '',
-                        'event_description': r.event_description or '',
-                        'event_url': r.event_url or '',
-                    })
+                graph = serialize_routing_graph()
+                nodes, routes = graph['nodes'], graph['routes']
                 snap, _ = RoutingSnapshot.objects.update_or_create(
                     name='default',
                     defaults={'nodes_json': nodes, 'routes_json': routes}
@@ -2715,56 +2902,43 @@ def routing_snapshot_view(request):
                 return JsonResponse({'ok': False, 'error': f'스냅샷 저장 중 오류: {e}'}, status=500)
 
         if action == 'reset':
+            # mode 'replace' (default) rebuilds every row; 'diff' only writes rows that differ
+            mode = (data.get('mode') or 'replace').lower()
+            if mode not in ('replace', 'diff'):
+                return JsonResponse({'ok': False, 'error': 'mode는 replace 또는 diff여야 합니다'}, status=400)
             try:
                 snap = RoutingSnapshot.objects.filter(name='default').first()
                 if not snap:
                     return JsonResponse({'ok': False, 'error': '저장된 스냅샷이 없습니다'}, status=400)
-                nodes = snap.nodes_json or []
-                routes = snap.routes_json or []
-                # Clear and restore
-                Route.objects.all().delete()
-                ServiceNode.objects.all().delete()
-                service_to_node = {}
-                valid_fee_currencies = {choice[0] for choice in Route.FEE_CURRENCY_CHOICES}
-                for n in nodes:
-                    node = ServiceNode.objects.create(
-                        service=n['service'],
-                        display_name=n.get('display_name') or n['service'],
-                        node_type=n.get('node_type', 'service'),
-                        is_kyc=bool(n.get('is_kyc', False)),
-                        is_custodial=bool(n.get('is_custodial', True)),
-                        is_enabled=bool(n.get('is_enabled', True)),
-                        description=n.get('description', ''),
-                        website_url=n.get('website_url', ''),
-                    )
-                    service_to_node[n['service']] = node
-                created = 0
-                for r in routes:
-                    src = service_to_node.get(r['source'])
-                    dst = service_to_node.get(r['destination'])
-                    if not src or not dst:
-                        continue
-                    currency = (r.get('fee_fixed_currency') or 'BTC').upper()
-                    if currency not in valid_fee_currencies:
-                        currency = 'BTC'
-                    Route.objects.create(
-                        source=src,
-                        destination=dst,
-                        route_type=r['route_type'],
-                        fee_rate=r.get('fee_rate', None),
-                        fee_fixed=r.get('fee_fixed', None),
-                        fee_fixed_currency=currency,
-                        is_enabled=bool(r.get('is_enabled', True)),
-                        description=r.get('description', ''),
-                        is_event=bool(r.get('is_event', False)),
-                        event_title=r.get('event_title', ''),
-                        event_description=r.get('event_description', ''),
-                        event_url=r.get('event_url', ''),
-                    )
-                    created += 1
-                return JsonResponse({'ok': True, 'restored_nodes': len(service_to_node), 'restored_routes': created})
+                graph = {'nodes': snap.nodes_json or [], 'routes': snap.routes_json or []}
+                # The version bump commits with the rows, and only when something was written
+                with transaction.atomic():
+                    if mode == 'diff':
+                        changes = sync_routing_graph(graph)
+                        changed = any(count for table in changes.values() for count in table.values())
+                    else:
+                        restored = replace_routing_graph(graph)
+                        changed = True
+                    if changed:
+                        bump_routing_graph_version()
             except Exception as e:
                 return JsonResponse({'ok': False, 'error': f'스냅샷 초기화 중 오류: {e}'}, status=500)
+            if changed:
+                _warm_default_optimal_paths()
+            if mode == 'diff':
+                return JsonResponse({
+                    'ok': True,
+                    'mode': mode,
+                    'restored_nodes': ServiceNode.objects.count(),
+                    'restored_routes': Route.objects.count(),
+                    'changes': changes,
+                })
+            return JsonResponse({
+                'ok': True,
+                'mode': mode,
+                'restored_nodes': restored['nodes'],
+                'restored_routes': restored['routes'],
+            })
 
         return JsonResponse({'ok': False, 'error': 'Invalid action'}, status=400)
 
@@ -3083,9 +3257,6 @@ def _call_seoul_apartment_data_agent(start_year, end_year):
         logger.info('[서울 아파트] OPENAI_API_KEY가 없어 Agent 호출을 건너뜁니다.')
         return [], None
 
-    base_url = getattr(settings, 'OPENAI_API_BASE', 'https://api.openai.com/v1').rstrip('/')
-    model = getattr(settings, 'OPENAI_MODEL', 'gpt-4o-mini')
-
     default_prompt = (
         "You are a data researcher that compiles verified South Korean real estate statistics. "
         "When asked for Seoul apartment prices, you must rely on KB부동산 리브온 (KB Housing Price Trend) "
@@ -3104,33 +3275,9 @@ def _call_seoul_apartment_data_agent(start_year, end_year):
     )
 
     try:
-        response = requests.post(
-            f"{base_url}/chat/completions",
-            headers={
-                'Authorization': f'Bearer {api_key}',
-                'Content-Type': 'application/json'
-            },
-            json={
-                'model': model,
-                'messages': [
-                    {'role': 'system', 'content': system_prompt},
-                    {'role': 'user', 'content': user_prompt}
-                ],
-                'temperature': 0.1,
-                'max_tokens': 1200,
-                'response_format': {'type': 'json_object'},
-            },
-            timeout=45
+        parsed, _result = llm_gateway.chat_json(
+            system_prompt, user_prompt, temperature=0.1, max_tokens=1200, timeout=45, tag='서울 아파트',
         )
-        response.raise_for_status()
-        payload = response.json()
-        choices = payload.get('choices') or []
-        if not choices:
-            raise RuntimeError('에이전트 응답이 비어 있습니다.')
-        content = (choices[0]['message'] or {}).get('content', '').strip()
-        if not content:
-            raise RuntimeError('에이전트 응답을 파싱할 수 없습니다.')
-        parsed = json.loads(content)
     except Exception as exc:
         raise RuntimeError(f'에이전트 호출 실패: {exc}') from exc
 
@@ -5294,52 +5441,44 @@ def _contains_korean(text):
     return bool(re.search(r'[\uac00-\ud7a3]', str(text)))
 
 
+TRANSLATE_SYSTEM_PROMPT = (
+    "You are a translator specializing in financial assets. "
+    "Translate Korean company or asset names into the most likely official English names. "
+    "Each input is one Korean name; the output object for it is {\"english\": \"concise English name\"}."
+)
+
+
 def _translate_to_english_if_needed(text):
     """
     Translate Korean asset/company names for better ticker lookup accuracy.
     """
-    cleaned = (text or '').strip()
-    if not cleaned or not _contains_korean(cleaned):
-        return cleaned
+    return _translate_many_to_english([text])[0]
 
-    api_key = getattr(settings, 'OPENAI_API_KEY', '')
-    if not api_key:
-        return cleaned
 
-    base_url = getattr(settings, 'OPENAI_API_BASE', 'https://api.openai.com/v1').rstrip('/')
-    model = getattr(settings, 'OPENAI_MODEL', 'gpt-4o-mini')
-    system_prompt = (
-        "You are a translator specializing in financial assets. "
-        "Translate Korean company or asset names into the most likely official English names. "
-        "Return concise English text only."
-    )
-    user_prompt = f"Korean name: {cleaned}"
+def _translate_many_to_english(texts):
+    """
+    Batched form of _translate_to_english_if_needed: every Korean name in
+    ``texts`` goes out in one JSON request. Returns the texts in order,
+    translated where possible and stripped otherwise.
+    """
+    cleaned = [(text or '').strip() for text in texts]
+    korean = sorted({text for text in cleaned if text and _contains_korean(text)})
+    if not korean or not getattr(settings, 'OPENAI_API_KEY', ''):
+        return cleaned
 
+    translations = {}
     try:
-        response = requests.post(
-            f"{base_url}/chat/completions",
-            headers={
-                'Authorization': f'Bearer {api_key}',
-                'Content-Type': 'application/json'
-            },
-            json={
-                'model': model,
-                'messages': [
-                    {'role': 'system', 'content': system_prompt},
-                    {'role': 'user', 'content': user_prompt}
-                ],
-                'temperature': 0.0,
-            },
-            timeout=10
+        results = llm_gateway.chat_json_batch(
+            TRANSLATE_SYSTEM_PROMPT, korean, temperature=0.0, timeout=15, tag='Translate',
         )
-        response.raise_for_status()
-        content = response.json()['choices'][0]['message']['content'].strip()
-        if content:
-            return content
+        for name, result in zip(korean, results):
+            english = ((result or {}).get('english') or '').strip()
+            if english:
+                translations[name] = english
     except Exception as exc:
-        logger.warning("Korean→English translation failed for '%s': %s", cleaned, exc)
+        logger.warning("Korean→English translation failed for %s: %s", korean, exc)
 
-    return cleaned
+    return [translations.get(text, text) for text in cleaned]
 
 
 def _normalize_asset_category(ticker, raw_category):
@@ -5416,8 +5555,8 @@ def _infer_asset_unit(ticker, category):
     return 'USD'
 
 
-def _lookup_ticker_with_llm(asset_id, label):
-    system_prompt = _get_agent_prompt('ticker_finder',
+def _ticker_finder_prompt():
+    return _get_agent_prompt('ticker_finder',
         "You are a financial data assistant. Your goal is to find the correct Yahoo Finance ticker symbol for a given asset name.\n"
         "Input: Asset Name / ID\n"
         "Output JSON: { \"found\": true, \"ticker\": \"SYMBOL\", \"label\": \"Official Name\", \"category\": \"Category\" }\n"
@@ -5431,58 +5570,57 @@ def _lookup_ticker_with_llm(asset_id, label):
         "- BE PRECISE. Incorrect tickers cause errors."
     )
 
-    resolved_name = (label or asset_id or '').strip()
-    english_hint = _translate_to_english_if_needed(resolved_name or asset_id)
-    user_content = f"Find ticker for: {resolved_name or asset_id} (ID: {asset_id})"
-    if english_hint and english_hint.lower() != (resolved_name or '').lower():
-        user_content += f"\nEnglish translation: {english_hint}"
 
-    try:
-        api_key = getattr(settings, 'OPENAI_API_KEY', '')
-        base_url = getattr(settings, 'OPENAI_API_BASE', 'https://api.openai.com/v1').rstrip('/')
-        model = getattr(settings, 'OPENAI_MODEL', 'gpt-4o-mini')
-
-        response = requests.post(
-            f"{base_url}/chat/completions",
-            headers={
-                'Authorization': f'Bearer {api_key}',
-                'Content-Type': 'application/json'
-            },
-            json={
-                'model': model,
-                'messages': [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_content}
-                ],
-                'temperature': 0.0,
-                'response_format': {'type': 'json_object'},
-            },
-            timeout=10
-        )
-        response.raise_for_status()
-        content = response.json()['choices'][0]['message']['content']
-        result = json.loads(content)
+def _ticker_candidate(result, label):
+    if not result or not result.get('found') or not result.get('ticker'):
+        return None
+    ticker = str(result['ticker']).strip().upper()
+    found_label = (result.get('label') or label or ticker).strip()
 
-        if result.get('found') and result.get('ticker'):
-            ticker = result['ticker'].strip().upper()
-            found_label = (result.get('label') or label or ticker).strip()
+    # Normalize category
+    raw_category = result.get('category') or ''
+    normalized_category = _normalize_asset_category(ticker, raw_category)
 
-            # Normalize category
-            raw_category = result.get('category') or ''
-            normalized_category = _normalize_asset_category(ticker, raw_category)
+    return {
+        'id': ticker,
+        'label': found_label,
+        'ticker': ticker,
+        'category': normalized_category,
+        'unit': _infer_asset_unit(ticker, normalized_category)
+    }
 
-            return {
-                'id': ticker,
-                'label': found_label,
-                'ticker': ticker,
-                'category': normalized_category,
-                'unit': _infer_asset_unit(ticker, normalized_category)
-            }
 
+def _lookup_ticker_with_llm(asset_id, label):
+    return _lookup_tickers_with_llm([(asset_id, label)])[0]
+
+
+def _lookup_tickers_with_llm(assets):
+    """
+    Ticker lookup for several (asset_id, label) pairs: one batched
+    translation request for the Korean names, then one batched ticker
+    request. Returns a candidate dict or None per pair, in order.
+    """
+    if not assets:
+        return []
+    names = [(label or asset_id or '').strip() for asset_id, label in assets]
+    english_hints = _translate_many_to_english([name or asset_id for name, (asset_id, _) in zip(names, assets)])
+
+    inputs = []
+    for name, english_hint, (asset_id, _label) in zip(names, english_hints, assets):
+        item = f"Find ticker for: {name or asset_id} (ID: {asset_id})"
+        if english_hint and english_hint.lower() != (name or '').lower():
+            item += f"\nEnglish translation: {english_hint}"
+        inputs.append(item)
+
+    try:
+        results = llm_gateway.chat_json_batch(
+            _ticker_finder_prompt(), inputs, temperature=0.0, timeout=20, tag='TickerFinder',
+        )
     except Exception as exc:
-        logger.warning("LLM ticker lookup failed for %s (%s): %s", label, asset_id, exc)
+        logger.warning("LLM ticker lookup failed for %s: %s", names, exc)
+        return [None] * len(assets)
 
-    return None
+    return [_ticker_candidate(result, label) for result, (_asset_id, label) in zip(results, assets)]
 
 
 # --- Agent Classes ---
@@ -7025,9 +7163,9 @@ def kingstone_verify_pin_view(request):
     if not wallets:
         return JsonResponse({'ok': False, 'code': 'no_pins', 'error': '등록된 핀번호가 없습니다. 새 핀번호를 등록하세요.'})
 
-    for wallet in wallets:
-        if wallet.check_pin(pin):
-            return JsonResponse({'ok': True, 'wallet': wallet.as_dict()})
+    wallet = KingstoneWallet.find_by_pin(username, pin, wallets)
+    if wallet:
+        return JsonResponse({'ok': True, 'wallet': wallet.as_dict()})
 
     return JsonResponse({'ok': False, 'code': 'invalid_pin', 'error': '핀번호가 올바르지 않습니다. 새 핀번호를 등록하세요.'})
 
@@ -7058,9 +7196,8 @@ def kingstone_register_pin_view(request):
     if len(existing_wallets) >= KINGSTONE_WALLET_LIMIT:
         return JsonResponse({'ok': False, 'code': 'limit_reached', 'error': f'핀번호는 최대 {KINGSTONE_WALLET_LIMIT}개까지 등록할 수 있습니다.'}, status=400)
 
-    for wallet in existing_wallets:
-        if wallet.check_pin(pin):
-            return JsonResponse({'ok': False, 'code': 'duplicate_pin', 'error': '이미 등록된 핀번호입니다.'}, status=400)
+    if KingstoneWallet.find_by_pin(username, pin, existing_wallets):
+        return JsonResponse({'ok': False, 'code': 'duplicate_pin', 'error': '이미 등록된 핀번호입니다.'}, status=400)
 
     used_indexes = {wallet.index for wallet in existing_wallets if wallet.index is not None}
     next_index = None
@@ -7422,19 +7559,9 @@ def _ensure_default_report_templates():
         logger.warning('[Compatibility] Report template table unavailable - default seeding skipped')
 
 
-def _run_compatibility_agent(prompt, user_context, temperature=0.7):
-    """Run compatibility agent with either OpenAI or Gemini based on configuration."""
-    # Extract all parameters from the prompt object
+def _resolve_compatibility_provider(prompt):
+    """Return (provider, model_name) from the prompt's model_name ('provider:model' or bare model)."""
     model_name_from_prompt = (prompt.model_name or '').strip()
-    temperature_from_prompt = prompt.temperature
-    top_p_from_prompt = prompt.top_p
-    presence_penalty_from_prompt = prompt.presence_penalty
-    frequency_penalty_from_prompt = prompt.frequency_penalty
-    max_tokens_from_prompt = prompt.max_tokens
-
-    # Use the temperature passed from frontend payload if available, otherwise use prompt's config
-    # The 'temperature' argument to this function comes from payload.get('temperature', 0.7)
-    resolved_temperature = temperature
 
     # Determine provider based on model_name_from_prompt
     default_provider = getattr(settings, 'COMPATIBILITY_DEFAULT_PROVIDER', 'openai').lower()
@@ -7461,85 +7588,169 @@ def _run_compatibility_agent(prompt, user_context, temperature=0.7):
             logger.warning('[Compatibility] Model "%s" is Gemini model but provider is openai, using default OpenAI model', model_name)
             model_name = ''  # Use default OpenAI model
 
+    return provider, model_name
+
+
+def _run_compatibility_agent(prompt, user_context, temperature=0.7):
+    """Run compatibility agent with either OpenAI or Gemini based on configuration."""
+    # Extract all parameters from the prompt object
+    temperature_from_prompt = prompt.temperature
+    top_p_from_prompt = prompt.top_p
+    presence_penalty_from_prompt = prompt.presence_penalty
+    frequency_penalty_from_prompt = prompt.frequency_penalty
+    max_tokens_from_prompt = prompt.max_tokens
+
+    # Use the temperature passed from frontend payload if available, otherwise use prompt's config
+    # The 'temperature' argument to this function comes from payload.get('temperature', 0.7)
+    resolved_temperature = temperature
+
+    provider, model_name = _resolve_compatibility_provider(prompt)
+
     logger.info('[Compatibility] 에이전트 실행 - provider=%s, model_name=%s, temp=%.2f, top_p=%.2f, pres_p=%.2f, freq_p=%.2f, max_tokens=%s',
                 provider, model_name, resolved_temperature, top_p_from_prompt,
                 presence_penalty_from_prompt, frequency_penalty_from_prompt, max_tokens_from_prompt)
 
-    # Call the appropriate API with fallback
-    if provider == 'gemini':
-        try:
-            return _call_gemini_chat_model(
-                model_name,
-                prompt.system_prompt,
-                user_context,
-                temperature=resolved_temperature,
-                top_p=top_p_from_prompt,
-                max_tokens=max_tokens_from_prompt
-            )
-        except Exception as gemini_error:
-            # Check if it's a quota/rate limit error
-            error_str = str(gemini_error)
-            if 'ResourceExhausted' in str(type(gemini_error)) or '429' in error_str or 'quota' in error_str.lower():
-                logger.warning('[Compatibility] Gemini API quota exceeded, falling back to OpenAI')
-                try:
-                    fallback_openai_model = _resolve_openai_model_name()
-                    return _call_openai_chat_model(
-                        fallback_openai_model,
-                        prompt.system_prompt,
-                        user_context,
-                        temperature=resolved_temperature,
-                        top_p=top_p_from_prompt,
-                        presence_penalty=presence_penalty_from_prompt,
-                        frequency_penalty=frequency_penalty_from_prompt,
-                        max_tokens=max_tokens_from_prompt
-                    )
-                except Exception as openai_error:
-                    logger.error('[Compatibility] OpenAI fallback also failed: %s', openai_error)
-                    # Re-raise the original Gemini error
-                    raise gemini_error
-            else:
-                # Not a quota error, re-raise
-                raise
-    elif provider == 'openai':
-        return _call_openai_chat_model(
-            model_name,
-            prompt.system_prompt,
-            user_context,
-            temperature=resolved_temperature,
-            top_p=top_p_from_prompt,
-            presence_penalty=presence_penalty_from_prompt,
-            frequency_penalty=frequency_penalty_from_prompt,
-            max_tokens=max_tokens_from_prompt
+    result = llm_gateway.chat(
+        prompt.system_prompt,
+        user_context,
+        _compatibility_route(provider, model_name),
+        temperature=resolved_temperature,
+        top_p=top_p_from_prompt,
+        presence_penalty=presence_penalty_from_prompt,
+        frequency_penalty=frequency_penalty_from_prompt,
+        max_tokens=max_tokens_from_prompt,
+        tag='Compatibility',
+    )
+    return result['text'], result['provider'], result['model']
+
+
+def _generate_cached_narrative(agent_key, context, cache_payload, temperature=0.7):
+    """
+    Narrative for one agent request as the generate view would produce it:
+    from the cache if present, otherwise generated and stored. Returns
+    (narrative, generated). Used by the quick-preset pair precompute.
+    """
+    cache_meta, cache_entry = _resolve_cache_metadata(agent_key, cache_payload, context, count_hit=False)
+    if cache_entry:
+        return cache_entry.response_text, False
+    prompt = _get_or_create_compatibility_prompt(agent_key)
+    if not prompt.is_active:
+        raise ValueError(f'{agent_key} 에이전트가 비활성화되어 있습니다.')
+    narrative, provider, model_used = _run_compatibility_agent(prompt, context, temperature)
+    if cache_meta and narrative:
+        _store_cache_entry(agent_key, cache_meta, narrative, provider, model_used)
+    return narrative, True
+
+
+async def _stream_compatibility_agent(prompt, user_context, temperature, info):
+    """
+    Streaming counterpart of _run_compatibility_agent: returns an async generator
+    of text chunks and fills info['provider'] / info['model']. Goes through the
+    gateway's limits and breakers on the same route, so a Gemini failure before
+    the first chunk fails over to OpenAI as the blocking path does.
+    """
+    provider, model_name = _resolve_compatibility_provider(prompt)
+    logger.info('[Compatibility] 스트리밍 에이전트 실행 - provider=%s, model_name=%s', provider, model_name)
+    return await stream_chat(
+        prompt.system_prompt,
+        user_context,
+        _compatibility_route(provider, model_name),
+        info=info,
+        temperature=temperature,
+        top_p=prompt.top_p,
+        presence_penalty=prompt.presence_penalty,
+        frequency_penalty=prompt.frequency_penalty,
+        max_tokens=prompt.max_tokens,
+        tag='Compatibility',
+    )
+
+
+def _compatibility_agent_error(exc):
+    """(error payload, status) for a failed agent call, shared by the JSON and streaming responses."""
+    if isinstance(exc, ValueError):
+        return {'ok': False, 'error': str(exc)}, 400
+    error_msg = str(exc)
+    # 할당량 초과 / 게이트웨이 rate limit
+    if is_quota_error(exc):
+        return {
+            'ok': False,
+            'error': 'API 할당량이 초과되었습니다. 잠시 후 다시 시도해주세요.',
+            'error_type': 'quota_exceeded'
+        }, 429
+    # OpenAI API key 미설정 에러 처리
+    if 'OPENAI_API_KEY is not configured' in error_msg:
+        return {
+            'ok': False,
+            'error': 'OpenAI API 키가 설정되지 않았습니다. 관리자에게 문의하세요.',
+            'error_type': 'api_key_missing'
+        }, 503
+    # 모든 provider의 circuit이 열려 있거나 동시 호출 한도 초과
+    if isinstance(exc, LLMError) and exc.retryable:
+        return {
+            'ok': False,
+            'error': 'AI 서비스가 일시적으로 불안정합니다. 잠시 후 다시 시도해주세요.',
+            'error_type': 'provider_unavailable'
+        }, 503
+    return {'ok': False, 'error': 'Agent request failed'}, 502
+
+
+def _sse_response(events):
+    """StreamingHttpResponse for an (async) iterable of event dicts (one SSE data line each).
+
+    The body is an async generator, so under ASGI each event is flushed as soon
+    as it is produced instead of after the whole answer.
+    """
+    async def event_stream():
+        if hasattr(events, '__aiter__'):
+            async for event in events:
+                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+        else:
+            for event in events:
+                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+    resp = StreamingHttpResponse(event_stream(), content_type='text/event-stream; charset=utf-8')
+    resp['Cache-Control'] = 'no-cache'
+    # For Nginx: disable proxy buffering to support SSE
+    resp['X-Accel-Buffering'] = 'no'
+    return resp
+
+
+async def _compatibility_stream_events(agent_key, prompt, context, temperature, cache_meta):
+    """SSE events for a streamed agent answer: start, delta..., then done (or error)."""
+    info = {}
+    parts = []
+    try:
+        chunks = await _stream_compatibility_agent(prompt, context, temperature, info)
+        yield {
+            'type': 'start',
+            'provider': info.get('provider'),
+            'model': info.get('model'),
+            'agent_key': agent_key,
+            'prompt_version': prompt.version,
+        }
+        async for text in chunks:
+            parts.append(text)
+            yield {'type': 'delta', 'text': text}
+    except Exception as exc:
+        logger.exception("[Compatibility:%s] Streaming agent request failed", agent_key)
+        error, _status = _compatibility_agent_error(exc)
+        yield dict(error, type='error')
+        return
+
+    narrative = ''.join(parts).strip()
+    if cache_meta and narrative:
+        await sync_to_async(_store_cache_entry)(
+            agent_key, cache_meta, narrative, info.get('provider'), info.get('model'),
         )
-    else:
-        # Fallback to gemini as default
-        logger.warning('[Compatibility] Unknown provider "%s", falling back to gemini', provider)
-        try:
-            return _call_gemini_chat_model(
-                model_name,
-                prompt.system_prompt,
-                user_context,
-                temperature=resolved_temperature,
-                top_p=top_p_from_prompt,
-                max_tokens=max_tokens_from_prompt
-            )
-        except Exception as gemini_error:
-            error_str = str(gemini_error)
-            if 'ResourceExhausted' in str(type(gemini_error)) or '429' in error_str or 'quota' in error_str.lower():
-                logger.warning('[Compatibility] Gemini API quota exceeded, falling back to OpenAI')
-                fallback_openai_model = _resolve_openai_model_name()
-                return _call_openai_chat_model(
-                    fallback_openai_model,
-                    prompt.system_prompt,
-                    user_context,
-                    temperature=resolved_temperature,
-                    top_p=top_p_from_prompt,
-                    presence_penalty=presence_penalty_from_prompt,
-                    frequency_penalty=frequency_penalty_from_prompt,
-                    max_tokens=max_tokens_from_prompt
-                )
-            else:
-                raise
+    yield {
+        'type': 'done',
+        'ok': True,
+        'narrative': narrative,
+        'provider': info.get('provider'),
+        'model': info.get('model'),
+        'prompt_version': prompt.version,
+        'agent_key': agent_key,
+    }
 
 
 @csrf_exempt
@@ -7627,7 +7838,12 @@ from .saju_util import calculate_saju, analyze_elements
 
 @csrf_exempt
 def compatibility_agent_generate_view(request):
-    """Call the compatibility agent (OpenAI or Gemini) to produce narrative text."""
+    """Call the compatibility agent (OpenAI or Gemini) to produce narrative text.
+
+    With "stream": true the answer is sent as SSE while the provider generates it:
+    {'type': 'start'}, {'type': 'delta', 'text': ...}..., then {'type': 'done', 'narrative': ...}
+    (same fields as the JSON response) or {'type': 'error', 'error': ...}.
+    """
     if request.method != 'POST':
         return JsonResponse({'ok': False, 'error': 'POST only'}, status=405)
 
@@ -7636,10 +7852,13 @@ def compatibility_agent_generate_view(request):
         return JsonResponse({'ok': False, 'error': 'Invalid JSON'}, status=400)
 
     agent_key = (payload.get('agent_key') or DEFAULT_COMPATIBILITY_AGENT_KEY).strip()
+    stream = bool(payload.get('stream'))
 
     # 1. Extract context or build it from structured data
     context = (payload.get('context') or '').strip()
     structured = payload.get('data')  # Expecting { 'birthdate': 'YYYY-MM-DD', 'birth_time': 'HH:MM', ... }
+    # Context derived from structured data is cached by the data itself, not its JSON rendering
+    cache_structured = structured if not context and isinstance(structured, dict) else None
 
     if not context and structured:
         context = json.dumps(structured, ensure_ascii=False, indent=2)
@@ -7690,11 +7909,12 @@ def compatibility_agent_generate_view(request):
     cache_meta = None
     cache_entry = None
     if cache_payload:
-        cache_meta, cache_entry = _resolve_cache_metadata(agent_key, cache_payload, context)
+        cache_meta, cache_entry = _resolve_cache_metadata(agent_key, cache_payload, context, cache_structured)
         if cache_entry and cache_meta:
-            logger.info('[Compatibility:%s] Cache hit - category=%s key=%s', agent_key, cache_meta.get('category'), cache_meta.get('cache_key'))
+            logger.info('[Compatibility:%s] Cache hit (%s) - category=%s key=%s', agent_key, cache_meta.get('match'),
+                        cache_meta.get('category'), cache_entry.cache_key)
             cache_metadata = cache_entry.metadata or {}
-            return JsonResponse({
+            cached_body = {
                 'ok': True,
                 'narrative': cache_entry.response_text,
                 'provider': cache_metadata.get('provider') or 'cache',
@@ -7703,7 +7923,11 @@ def compatibility_agent_generate_view(request):
                 'cached': True,
                 'cache_key': cache_entry.cache_key,
                 'cache_category': cache_entry.category,
-            })
+                'cache_match': cache_meta.get('match'),
+            }
+            if stream:
+                return _sse_response(iter([dict(cached_body, type='done')]))
+            return JsonResponse(cached_body)
 
     temp = payload.get('temperature', 0.7)
     try:
@@ -7717,31 +7941,21 @@ def compatibility_agent_generate_view(request):
     if not prompt.is_active:
         return JsonResponse({'ok': False, 'error': 'Compatibility agent is inactive.'}, status=503)
 
+    if stream:
+        return _sse_response(_compatibility_stream_events(agent_key, prompt, context, temperature, cache_meta))
+
     try:
         logger.info('[Compatibility:%s] 에이전트 요청 시작 - context_len=%d', agent_key, len(context))
         logger.info('[Compatibility:%s] System Prompt Preview: %s...', agent_key, prompt.system_prompt[:100].replace('\n', ' '))
         narrative, provider, model_used = _run_compatibility_agent(prompt, context, temperature)
     except ValueError as exc:
         logger.warning('[Compatibility:%s] 에이전트 입력 오류: %s', agent_key, exc)
-        return JsonResponse({'ok': False, 'error': str(exc)}, status=400)
+        error, status = _compatibility_agent_error(exc)
+        return JsonResponse(error, status=status)
     except Exception as exc:  # pragma: no cover - network failures
         logger.exception("[Compatibility:%s] Agent request failed", agent_key)
-        error_msg = str(exc)
-        # Gemini 할당량 초과 에러 처리
-        if 'ResourceExhausted' in str(type(exc)) or '429' in error_msg or 'quota' in error_msg.lower():
-            return JsonResponse({
-                'ok': False,
-                'error': 'API 할당량이 초과되었습니다. 잠시 후 다시 시도해주세요.',
-                'error_type': 'quota_exceeded'
-            }, status=429)
-        # OpenAI API key 미설정 에러 처리
-        if 'OPENAI_API_KEY is not configured' in error_msg:
-            return JsonResponse({
-                'ok': False,
-                'error': 'OpenAI API 키가 설정되지 않았습니다. 관리자에게 문의하세요.',
-                'error_type': 'api_key_missing'
-            }, status=503)
-        return JsonResponse({'ok': False, 'error': 'Agent request failed'}, status=502)
+        error, status = _compatibility_agent_error(exc)
+        return JsonResponse(error, status=status)
 
     if cache_meta and narrative:
         _store_cache_entry(agent_key, cache_meta, narrative, provider, model_used)
@@ -7774,7 +7988,6 @@ def compatibility_analysis_save_view(request):
 
     try:
         from datetime import datetime as dt
-        from .models import CompatibilityAnalysis
 
         # Parse birthdate
         birthdate = dt.strptime(payload['birthdate'], '%Y-%m-%d').date()
@@ -7804,6 +8017,7 @@ def compatibility_analysis_save_view(request):
             narrative=payload['narrative'],
             user_ip=user_ip
         )
+        invalidate_list_counts('compatibility_analysis')
 
         return JsonResponse({'ok': True, 'id': analysis.id, 'analysis': analysis.as_dict()})
 
@@ -7814,13 +8028,40 @@ def compatibility_analysis_save_view(request):
 
 @csrf_exempt
 def compatibility_analysis_list_view(request):
-    """List compatibility analysis results with pagination (admin only)"""
+    """
+    List compatibility analysis results (admin only): keyset pages of
+    summaries without the narrative (?cursor=/&limit=, see
+    compatibility_analysis_detail_view); ?with_count=1 adds the total
+    (cached, see cached_list_counts). ?page=/&per_page= keeps the numbered
+    pages of full records.
+    """
     if request.method != 'GET':
         return JsonResponse({'ok': False, 'error': 'GET only'}, status=405)
 
+    if 'page' not in request.GET and 'per_page' not in request.GET:
+        cursor = request.GET.get('cursor')
+        limit = max(1, min(_parse_int(request.GET.get('limit'), 20), 100))
+        try:
+            rows, next_cursor = keyset_page(
+                CompatibilityAnalysis.objects.only(*CompatibilityAnalysis.SUMMARY_FIELDS), cursor, limit,
+            )
+        except ValueError as exc:
+            return JsonResponse({'ok': False, 'error': str(exc)}, status=400)
+        data = {
+            'ok': True,
+            'analyses': [analysis.as_summary_dict() for analysis in rows],
+            'next_cursor': next_cursor,
+            'has_next': next_cursor is not None,
+            'limit': limit,
+        }
+        if request.GET.get('with_count') == '1':
+            data.update(cached_list_counts(
+                'compatibility_analysis', lambda: {'total_count': CompatibilityAnalysis.objects.count()},
+            ))
+        return JsonResponse(data)
+
     try:
         from django.core.paginator import Paginator
-        from .models import CompatibilityAnalysis
 
         # Get pagination parameters
         page = int(request.GET.get('page', 1))
@@ -7852,6 +8093,16 @@ def compatibility_analysis_list_view(request):
         return JsonResponse({'ok': False, 'error': str(e)}, status=500)
 
 
+def compatibility_analysis_detail_view(request, pk):
+    if request.method != 'GET':
+        return JsonResponse({'ok': False, 'error': 'GET only'}, status=405)
+    try:
+        analysis = CompatibilityAnalysis.objects.get(pk=pk)
+    except CompatibilityAnalysis.DoesNotExist:
+        return JsonResponse({'ok': False, 'error': 'Analysis not found'}, status=404)
+    return JsonResponse({'ok': True, 'analysis': analysis.as_dict()})
+
+
 def _ensure_default_compatibility_presets():
     defaults = [
         {
@@ -8106,6 +8357,52 @@ def compatibility_admin_quick_preset_detail_view(request, pk):
     return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
 
 
+@csrf_exempt
+def compatibility_admin_quick_preset_pairs_view(request):
+    """
+    GET: saju features for every preset pair, or with ``?job=<id>`` the
+    status of a precompute job. POST: start precomputing the pair reports
+    into the cache in the background; returns the job to poll.
+    """
+    if not is_admin(request):
+        return JsonResponse({'ok': False, 'error': 'Admin access required'}, status=403)
+
+    if request.method == 'GET':
+        job_id = request.GET.get('job')
+        if job_id:
+            job = CompatibilityPrecomputeJob.objects.filter(pk=_parse_int(job_id)).first()
+            if job is None:
+                return JsonResponse({'ok': False, 'error': '작업을 찾을 수 없습니다.'}, status=404)
+            return JsonResponse({'ok': True, 'job': job.as_dict()})
+        return JsonResponse({'ok': True, **compat_presets.preset_pair_matrix()})
+
+    if request.method == 'POST':
+        payload = _load_json_body(request)
+        if payload is None:
+            return JsonResponse({'ok': False, 'error': 'Invalid JSON'}, status=400)
+        reports = payload.get('reports') or None
+        preset_ids = payload.get('preset_ids') or None
+        if (reports is not None and not isinstance(reports, list)) or (
+            preset_ids is not None and not isinstance(preset_ids, list)
+        ):
+            return JsonResponse({'ok': False, 'error': 'reports와 preset_ids는 배열이어야 합니다.'}, status=400)
+        concurrency = max(1, min(_parse_int(payload.get('concurrency'), compat_presets.DEFAULT_CONCURRENCY), 16))
+        limit = _parse_int(payload.get('limit'))
+        try:
+            job, started = compat_presets.start_precompute_job(
+                reports=reports, preset_ids=preset_ids, concurrency=concurrency, limit=limit,
+            )
+        except ValueError as exc:
+            return JsonResponse({'ok': False, 'error': str(exc)}, status=400)
+        if not started:
+            return JsonResponse({
+                'ok': False, 'error': '이미 실행 중인 사전 생성 작업이 있습니다.', 'job': job.as_dict(),
+            }, status=409)
+        return JsonResponse({'ok': True, 'job': job.as_dict()}, status=202)
+
+    return JsonResponse({'ok': False, 'error': 'Method not allowed'}, status=405)
+
+
 @csrf_exempt
 def compatibility_agent_cache_list_view(request):
     if not is_admin(request):
@@ -8123,6 +8420,7 @@ def compatibility_agent_cache_list_view(request):
     limit_value = max(1, min(limit_value, 200))
 
     try:
+        compat_cache.flush_hit_counts()
         caches = CompatibilityAgentCache.objects.all().order_by('-updated_at', '-created_at')
         if category:
             caches = caches.filter(category=category)
@@ -8180,9 +8478,11 @@ def compatibility_agent_cache_detail_view(request, pk):
 
         if updated_fields:
             cache_entry.save(update_fields=list(set(updated_fields + ['updated_at'])))
+            compat_cache.invalidate(cache_entry.cache_key)
         return JsonResponse({'ok': True, 'cache': cache_entry.as_dict()})
 
     if request.method == 'DELETE':
+        compat_cache.invalidate(cache_entry.cache_key)
         cache_entry.delete()
         return JsonResponse({'ok': True})
 
@@ -8299,14 +8599,16 @@ def _resolve_assets(asset_names):
 
     Now uses canonical IDs (e.g., 'us10y', 'kospi') to prevent duplicate cache entries.
     """
-    resolved = []
-    for name in asset_names:
-        name = (name or '').strip()
-        if not name:
-            continue
+    names = [name.strip() for name in asset_names if (name or '').strip()]
+    configs = [_find_known_asset_config(name, name) for name in names]
 
+    # Names not in the known assets are looked up together in one LLM request
+    unknown = sorted({name for name, config in zip(names, configs) if not config})
+    candidates = dict(zip(unknown, _lookup_tickers_with_llm([(name, name) for name in unknown])))
+
+    resolved = []
+    for name, config in zip(names, configs):
         # Try to find in known assets first (returns canonical ID)
-        config = _find_known_asset_config(name, name)
         if config:
             # config['id'] now contains canonical key (e.g., 'us10y' instead of '미국 10년물 국채')
             resolved.append({
@@ -8318,8 +8620,8 @@ def _resolve_assets(asset_names):
             })
             continue
 
-        # Try LLM lookup
-        candidate = _lookup_ticker_with_llm(name, name)
+        # LLM lookup result
+        candidate = candidates.get(name)
         if candidate:
             resolved.append({
                 'id': candidate.get('id') or candidate.get('ticker') or name,
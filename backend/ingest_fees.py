@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Pull exchange trading/withdrawal fees into Route, ExchangeRate and WithdrawalFee.
+
+    python ingest_fees.py                      # one run
+    python ingest_fees.py --interval 600       # every 10 minutes (systemd/supervisor)
+    python ingest_fees.py --exchange okx --exchange binance
+
+Needs each exchange's read-only API key in the environment (UPBIT_ACCESS_KEY,
+BINANCE_API_KEY, ... see blocks/fee_ingest.py). Route changes bump the routing
+graph version in the database, so the web workers recompile on their next
+query and /api/routing-stream clients get the delta.
+
+Set FEE_INGEST_BASE_URL to a blocks/fake_exchange.py server to try it locally.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import django
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'playground_server.settings')
+django.setup()
+
+from blocks.fee_ingest import FEE_ADAPTERS, ingest_exchange_fees  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--exchange', action='append', choices=sorted(FEE_ADAPTERS), help='limit to these exchanges')
+    parser.add_argument('--interval', type=float, default=0, help='repeat every N seconds (0 = run once)')
+    args = parser.parse_args()
+
+    while True:
+        result = ingest_exchange_fees(args.exchange)
+        print(json.dumps(result, ensure_ascii=False), flush=True)
+        if args.interval <= 0:
+            return 1 if result['errors'] and not result['quotes'] else 0
+        time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
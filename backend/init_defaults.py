@@ -17,6 +17,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'playground_server.settings')
 django.setup()
 
 from blocks.models import ExchangeRate, WithdrawalFee, LightningService, Mnemonic, ServiceNode, Route
+from blocks.routing_seed import sync_routing_graph
 import json
 
 # Optional routing seed file (exported from dev) to sync to prod
@@ -117,23 +118,8 @@ def seed_service_nodes():
         try:
             with open(ROUTING_SEED_FILE, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-            nodes = data.get('nodes', [])
-            created = 0
-            for n in nodes:
-                obj, was_created = ServiceNode.objects.update_or_create(
-                    service=n['service'],
-                    defaults={
-                        'display_name': n.get('display_name') or n['service'],
-                        'node_type': n.get('node_type', 'service'),
-                        'is_kyc': bool(n.get('is_kyc', False)),
-                        'is_custodial': bool(n.get('is_custodial', True)),
-                        'is_enabled': bool(n.get('is_enabled', True)),
-                        'website_url': n.get('website_url') or '',
-                        'description': n.get('description') or '',
-                    }
-                )
-                created += 1 if was_created else 0
-            return created
+            counts = sync_routing_graph({'nodes': data.get('nodes', [])}, delete_missing=False)
+            return counts['nodes']['created']
         except Exception as e:
             print(f"Failed to load routing seed file for nodes: {e}. Falling back to built-in defaults.")
 
@@ -176,29 +162,15 @@ def seed_default_routes():
         try:
             with open(ROUTING_SEED_FILE, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-            routes = data.get('routes', [])
-
-            # Build lookup for ServiceNode by service code
-            service_to_node = {s.service: s for s in ServiceNode.objects.all()}
-            for r in routes:
-                src = service_to_node.get(r['source'])
-                dst = service_to_node.get(r['destination'])
-                if not src or not dst:
-                    continue
-
-                obj, was_created = Route.objects.get_or_create(
-                    source=src,
-                    destination=dst,
-                    route_type=r['route_type'],
-                    defaults={
-                        'fee_rate': r.get('fee_rate', None),
-                        'fee_fixed': r.get('fee_fixed', None),
-                        'is_enabled': bool(r.get('is_enabled', True)),
-                        'description': r.get('description', ''),
-                    }
-                )
-                created += 1 if was_created else 0
-            return created
+            # Nodes were synced by seed_service_nodes; only add missing routes so
+            # fees edited on this server are kept
+            counts = sync_routing_graph(
+                {'nodes': data.get('nodes', []), 'routes': data.get('routes', [])},
+                delete_missing=False,
+                update_nodes=False,
+                update_routes=False,
+            )
+            return counts['routes']['created']
         except Exception as e:
             print(f"Failed to load routing seed file for routes: {e}. Falling back to built-in defaults.")
 
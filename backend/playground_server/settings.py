@@ -18,6 +18,8 @@ config = Config(RepositoryEnv(env_path)) if env_path.exists() else Config({})
 
 # Load environment variables
 SECRET_KEY = config('SECRET_KEY', default='dev-secret-key-change-in-production')
+# Key for the Kingstone wallet PIN lookup HMAC (blocks/encryption.py); SECRET_KEY when empty
+KINGSTONE_PIN_LOOKUP_KEY = config('KINGSTONE_PIN_LOOKUP_KEY', default='')
 DEBUG = config('DEBUG', default=False, cast=bool)
 ALLOWED_HOSTS = config('ALLOWED_HOSTS', default='localhost,127.0.0.1').split(',')
 
@@ -146,9 +148,39 @@ COMPATIBILITY_OPENAI_MODEL = config('COMPATIBILITY_OPENAI_MODEL', default='gpt-5
 GEMINI_API_KEY = config('GEMINI_API_KEY', default='')
 GEMINI_MODEL = config('GEMINI_MODEL', default='gemini-2.5-flash')
 COMPATIBILITY_DEFAULT_PROVIDER = config('COMPATIBILITY_DEFAULT_PROVIDER', default='openai')  # 'openai' or 'gemini'
+GEMINI_API_BASE = config('GEMINI_API_BASE', default='https://generativelanguage.googleapis.com')
+
+# LLM gateway (blocks/llm_gateway.py): per-provider limits and circuit breaker
+LLM_MAX_CONCURRENCY = config('LLM_MAX_CONCURRENCY', default=8, cast=int)
+LLM_RATE_PER_MINUTE = config('LLM_RATE_PER_MINUTE', default=120, cast=int)
+LLM_QUEUE_TIMEOUT = config('LLM_QUEUE_TIMEOUT', default=30, cast=float)
+LLM_CIRCUIT_FAILURES = config('LLM_CIRCUIT_FAILURES', default=3, cast=int)
+LLM_CIRCUIT_RESET_SECONDS = config('LLM_CIRCUIT_RESET_SECONDS', default=30, cast=float)
+LLM_BATCH_SIZE = config('LLM_BATCH_SIZE', default=20, cast=int)  # items per chat_json_batch request
+
+# Compatibility cache hot tier (blocks/compat_cache.py)
+COMPAT_CACHE_HOT_SIZE = config('COMPAT_CACHE_HOT_SIZE', default=1024, cast=int)
+COMPAT_CACHE_HOT_TTL = config('COMPAT_CACHE_HOT_TTL', default=300, cast=float)
+COMPAT_CACHE_FLUSH_SECONDS = config('COMPAT_CACHE_FLUSH_SECONDS', default=30, cast=float)
 
 ECOS_API_KEY = config('ECOS_API_KEY', default='')
 
+# Exchange fee ingestion (blocks/fee_ingest.py); set to a fake_exchange server URL for local runs
+FEE_INGEST_BASE_URL = config('FEE_INGEST_BASE_URL', default='')
+# Read-only exchange API keys; the fee endpoints are private and requests are signed with these
+UPBIT_ACCESS_KEY = config('UPBIT_ACCESS_KEY', default='')
+UPBIT_SECRET_KEY = config('UPBIT_SECRET_KEY', default='')
+BITHUMB_ACCESS_KEY = config('BITHUMB_ACCESS_KEY', default='')
+BITHUMB_SECRET_KEY = config('BITHUMB_SECRET_KEY', default='')
+BINANCE_API_KEY = config('BINANCE_API_KEY', default='')
+BINANCE_API_SECRET = config('BINANCE_API_SECRET', default='')
+OKX_API_KEY = config('OKX_API_KEY', default='')
+OKX_API_SECRET = config('OKX_API_SECRET', default='')
+OKX_API_PASSPHRASE = config('OKX_API_PASSPHRASE', default='')
+
+# How often /api/routing-stream checks the shared RoutingGraphEvent table for new deltas
+ROUTING_STREAM_POLL_SECONDS = config('ROUTING_STREAM_POLL_SECONDS', default=1.0, cast=float)
+
 # FRED API for M2 Money Supply data
 FRED_API_KEY = config('FRED_API_KEY', default='')
 
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Precompute the compatibility page's pair reports for every ordered pair of
+active quick presets, so picking two presets is answered from the cache.
+
+    python precompute_preset_pairs.py                       # both reports, all presets
+    python precompute_preset_pairs.py --report pair --concurrency 8
+    python precompute_preset_pairs.py --preset 3 --preset 5 --limit 10
+
+Already cached requests are skipped, so reruns only fill gaps (new presets,
+invalidated entries).
+"""
+import argparse
+import json
+import os
+import sys
+
+import django
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'playground_server.settings')
+django.setup()
+
+from blocks.compat_presets import DEFAULT_CONCURRENCY, PAIR_REPORTS, precompute_preset_pairs  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--report', action='append', choices=sorted(PAIR_REPORTS), help='limit to these reports')
+    parser.add_argument('--preset', action='append', type=int, help='limit to these preset ids')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='parallel report chains')
+    parser.add_argument('--limit', type=int, default=None, help='at most N chains this run')
+    args = parser.parse_args()
+
+    result = precompute_preset_pairs(
+        reports=args.report, preset_ids=args.preset, concurrency=args.concurrency, limit=args.limit,
+    )
+    print(json.dumps(result, ensure_ascii=False), flush=True)
+    return 1 if result['failed'] and not result['generated'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -333,11 +333,14 @@ export async function saveCompatibilityAnalysis({ birthdate, birthTime, gender,
   return data
 }
 
-export async function fetchCompatibilityAnalysisList({ page = 1, perPage = 10, signal } = {}) {
-  const params = new URLSearchParams({
-    page: page.toString(),
-    per_page: perPage.toString()
-  })
+export async function fetchCompatibilityAnalysisList({ cursor = '', limit = 20, withCount = false, signal } = {}) {
+  const params = new URLSearchParams({ limit: limit.toString() })
+  if (cursor) {
+    params.append('cursor', cursor)
+  }
+  if (withCount) {
+    params.append('with_count', '1')
+  }
 
   const response = await fetch(`${BASE_URL}/api/compatibility/analysis/list?${params.toString()}`, {
     method: 'GET',
@@ -351,6 +354,19 @@ export async function fetchCompatibilityAnalysisList({ page = 1, perPage = 10, s
   return data
 }
 
+export async function fetchCompatibilityAnalysis(id, { signal } = {}) {
+  const response = await fetch(`${BASE_URL}/api/compatibility/analysis/${id}`, {
+    method: 'GET',
+    headers: defaultHeaders,
+    signal
+  })
+  const data = await handleResponse(response)
+  if (!data.ok) {
+    throw new Error(data.error || '궁합 분석 내용을 불러오지 못했습니다.')
+  }
+  return data.analysis
+}
+
 export async function fetchAdminCompatibilityQuickPresets({ username, signal } = {}) {
   if (!username) {
     throw new Error('관리자 인증 정보가 필요합니다.')